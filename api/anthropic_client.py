@@ -4,18 +4,21 @@ Anthropic Claude API Client
 Handles AI-powered cluster analysis and strategic recommendations.
 """
 
-import requests
 import json
 import pandas as pd
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+
+from api.llm_gateway import ANTHROPIC_MESSAGES_URL, LLMGateway, get_gateway
 
 class AnthropicClient:
-    """Client for Anthropic Claude API."""
+    """Client for Anthropic Claude API (calls go through the shared LLM gateway)."""
     
-    def __init__(self, api_key: str, model: str = "claude-sonnet-4-20250514"):
+    def __init__(self, api_key: str, model: str = "claude-sonnet-4-20250514",
+                 base_url: str = ANTHROPIC_MESSAGES_URL, gateway: Optional[LLMGateway] = None):
         self.api_key = api_key
         self.model = model
-        self.base_url = "https://api.anthropic.com/v1/messages"
+        self.base_url = base_url
+        self.gateway = gateway or get_gateway()
     
     def analyze_clusters(self, cluster_df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -106,8 +109,13 @@ Focus on:
 """
         return prompt
     
-    def _call_api(self, prompt: str) -> Dict:
-        """Call Claude API."""
+    def generate_response(self, system_prompt: str, prompt: str) -> str:
+        """Single-turn answer to prompt under system_prompt (text of the first content block)."""
+        response = self._call_api(prompt, system=system_prompt)
+        return response['content'][0]['text']
+    
+    def _call_api(self, prompt: str, system: Optional[str] = None) -> Dict:
+        """Call Claude API (cached / coalesced by the gateway)."""
         
         headers = {
             "x-api-key": self.api_key,
@@ -125,19 +133,11 @@ Focus on:
                 }
             ]
         }
+        if system:
+            payload["system"] = system
         
         try:
-            response = requests.post(
-                self.base_url,
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise Exception(f"API error: {response.status_code} - {response.text}")
+            return self.gateway.call(self.base_url, headers, payload, timeout=60)
         
         except Exception as e:
             raise Exception(f"Failed to call Claude API: {str(e)}")
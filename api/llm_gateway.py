@@ -0,0 +1,264 @@
+"""
+LLM Gateway
+
+Single path for LLM calls (Anthropic Messages and OpenAI Chat Completions):
+- Responses are cached on disk (SQLite) by model + normalized prompt hash, with a
+  TTL, so re-running an analysis on unchanged data makes no API call.
+- Requests go over a pooled keep-alive session.
+- Identical requests already in flight (e.g. two sessions opening the same
+  report) share one API call.
+- Every call is accounted: latency, input/output tokens, cache hits.
+
+Config (environment):
+    LLM_CACHE_PATH    SQLite file for cached responses (default data/llm_cache.db, "" disables)
+    LLM_CACHE_TTL     Seconds before a cached response expires (default 86400)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+ANTHROPIC_MESSAGES_URL = "https://api.anthropic.com/v1/messages"
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', 'data/llm_cache.db')
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(24 * 3600)))
+
+_GATEWAY = None
+_GATEWAY_LOCK = threading.Lock()
+
+
+class LLMAPIError(Exception):
+    """Non-200 response from an LLM endpoint (never cached)."""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"API error: {status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+def _normalize(value: Any) -> Any:
+    """Prompt payload with whitespace runs collapsed, so indentation-only differences share a key."""
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """Cache key for a request payload: '<model>:<sha256 of the normalized rest>'."""
+    body = {k: v for k, v in payload.items() if k != 'model'}
+    digest = hashlib.sha256(json.dumps(_normalize(body), sort_keys=True, default=str).encode()).hexdigest()
+    return f"{payload.get('model', '')}:{digest}"
+
+
+def _usage(response: Dict[str, Any]) -> Tuple[int, int]:
+    """(input, output) tokens from an Anthropic or OpenAI response body."""
+    usage = response.get('usage') or {}
+    return (int(usage.get('input_tokens', usage.get('prompt_tokens', 0)) or 0),
+            int(usage.get('output_tokens', usage.get('completion_tokens', 0)) or 0))
+
+
+class _InFlight:
+    """An API call other threads with the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.text: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class LLMGateway:
+    """
+    Cached, pooled, coalescing LLM client shared by every feature in the process.
+
+    call() returns the endpoint's decoded JSON body (a fresh dict per caller).
+    Only 200 responses are cached; errors raise LLMAPIError or the requests
+    exception, for the caller and any coalesced waiters alike.
+    """
+
+    def __init__(self, cache_path: Optional[str] = LLM_CACHE_PATH, ttl_seconds: int = LLM_CACHE_TTL,
+                 pool_size: int = 8, history: int = 200):
+        self.cache_path = cache_path or None
+        self.ttl = ttl_seconds
+        self.conn = None
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _InFlight] = {}
+        self._inflight_lock = threading.Lock()
+        self._stats = {'calls': 0, 'api_requests': 0, 'cache_hits': 0, 'coalesced': 0, 'errors': 0,
+                       'input_tokens': 0, 'output_tokens': 0, 'api_latency_ms': 0.0}
+        self._calls: deque = deque(maxlen=history)
+
+        # Pooled keep-alive connections, one pool per API host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        if self.cache_path:
+            self._init_db()
+
+    def _init_db(self):
+        """Open the response cache and drop expired entries."""
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                created REAL
+            )
+        ''')
+        self.conn.commit()
+        self.purge_expired()
+
+    # -------------------------------------------------------------------------
+    # Response cache
+    # -------------------------------------------------------------------------
+    def _cache_get(self, key: str) -> Optional[str]:
+        if self.conn is None:
+            return None
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT response FROM llm_responses WHERE key = ? AND created > ?', (key, time.time() - self.ttl)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _cache_set(self, key: str, model: str, text: str):
+        if self.conn is None:
+            return
+        with self._lock:
+            with self.conn:
+                self.conn.execute('INSERT OR REPLACE INTO llm_responses (key, model, response, created) VALUES (?, ?, ?, ?)',
+                                  (key, model, text, time.time()))
+
+    def purge_expired(self) -> int:
+        """Delete cached responses older than the TTL. Returns the number removed."""
+        if self.conn is None:
+            return 0
+        with self._lock:
+            with self.conn:
+                cursor = self.conn.execute('DELETE FROM llm_responses WHERE created <= ?', (time.time() - self.ttl,))
+        return cursor.rowcount
+
+    # -------------------------------------------------------------------------
+    # Calls
+    # -------------------------------------------------------------------------
+    def call(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+             timeout: float = 60, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        POST payload to an LLM endpoint through the cache.
+
+        use_cache=False always reaches the API (the result is still cached and
+        identical in-flight requests still share it).
+        """
+        started = time.perf_counter()
+        key = request_key(payload)
+        source = 'cache'
+        text = self._cache_get(key) if use_cache else None
+
+        if text is None:
+            with self._inflight_lock:
+                pending = self._inflight.get(key)
+                leader = pending is None
+                if leader:
+                    pending = self._inflight[key] = _InFlight()
+
+            if leader:
+                source = 'api'
+                try:
+                    pending.text = self._post(url, headers, payload, timeout, key)
+                except BaseException as e:
+                    pending.error = e
+                finally:
+                    with self._inflight_lock:
+                        del self._inflight[key]
+                    pending.done.set()
+            else:
+                source = 'coalesced'
+                pending.done.wait()
+
+            if pending.error is not None:
+                self._account(payload, source, started, None, error=True)
+                raise pending.error
+            text = pending.text
+
+        response = json.loads(text)
+        self._account(payload, source, started, response)
+        return response
+
+    def _post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: float, key: str) -> str:
+        """One API request; caches and returns the 200 body text."""
+        t0 = time.perf_counter()
+        try:
+            response = self.session.post(url, headers=headers, json=payload, timeout=timeout)
+        finally:
+            with self._lock:
+                self._stats['api_requests'] += 1
+                self._stats['api_latency_ms'] += (time.perf_counter() - t0) * 1000
+        if response.status_code != 200:
+            raise LLMAPIError(response.status_code, response.text)
+        self._cache_set(key, str(payload.get('model', '')), response.text)
+        return response.text
+
+    def _account(self, payload: Dict[str, Any], source: str, started: float,
+                 response: Optional[Dict[str, Any]], error: bool = False):
+        """Record one call: latency, tokens (API responses only) and where the answer came from."""
+        input_tokens, output_tokens = _usage(response) if response is not None and source == 'api' else (0, 0)
+        record = {
+            'model': payload.get('model'),
+            'source': source,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 1),
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'error': error,
+        }
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['errors'] += int(error)
+            self._stats['cache_hits'] += int(source == 'cache')
+            self._stats['coalesced'] += int(source == 'coalesced')
+            self._stats['input_tokens'] += input_tokens
+            self._stats['output_tokens'] += output_tokens
+            self._calls.append(record)
+
+    def stats(self) -> Dict[str, Any]:
+        """Call counters, token totals and mean API latency."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['mean_api_latency_ms'] = stats['api_latency_ms'] / stats['api_requests'] if stats['api_requests'] else 0.0
+        return stats
+
+    def recent_calls(self) -> List[Dict[str, Any]]:
+        """Accounting records of the most recent calls, oldest first."""
+        with self._lock:
+            return list(self._calls)
+
+    def close(self):
+        """Close the HTTP session and the cache connection."""
+        self.session.close()
+        if self.conn:
+            self.conn.close()
+
+
+def get_gateway() -> LLMGateway:
+    """The process-wide gateway (shared cache, pool and in-flight table)."""
+    global _GATEWAY
+    with _GATEWAY_LOCK:
+        if _GATEWAY is None:
+            _GATEWAY = LLMGateway()
+        return _GATEWAY
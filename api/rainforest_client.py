@@ -2,21 +2,48 @@
 Rainforest API Client
 
 Handles ASIN lookups with caching to minimize API costs.
+Batch lookups check the cache for every ASIN up front, then fetch the misses
+concurrently over a pooled session behind a shared token-bucket rate limit.
 """
 
+import os
 import requests
 import json
 import sqlite3
+import threading
 import time
-from typing import Dict, Optional
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
+from typing import Callable, Dict, Iterable, List, Optional
 from datetime import datetime, timedelta
 
+# In-process front layer shared by every ASINCache on the same file:
+# (db_path, ASIN, marketplace) -> (JSON text, lookup_date)
+_MEMORY_CACHE: "OrderedDict[tuple, tuple]" = OrderedDict()
+_MEMORY_CACHE_MAX = 4096
+_MEMORY_CACHE_LOCK = threading.Lock()
+
+# SQLite's default bound-parameter limit is 999
+_SQLITE_CHUNK = 500
+
+
 class ASINCache:
-    """SQLite cache for ASIN lookups (30-day TTL)."""
+    """
+    SQLite cache for ASIN lookups (30-day TTL).
+    
+    Entries older than ttl_days are never returned and are purged when the cache
+    is opened. Reads go through an in-process LRU shared by all instances on the
+    same file; bulk reads and writes (get_many / set_many) run as one query / one
+    transaction. The connection uses WAL so readers don't block the writer.
+    """
     
-    def __init__(self, db_path: str = 'data/asin_cache.db'):
+    def __init__(self, db_path: str = 'data/asin_cache.db', ttl_days: int = 30):
         self.db_path = db_path
+        self.ttl = timedelta(days=ttl_days)
         self.conn = None
+        # One connection shared by batch lookup workers
+        self._lock = threading.Lock()
         self._init_db()
     
     def _init_db(self):
@@ -25,6 +52,8 @@ class ASINCache:
         os.makedirs(os.path.dirname(self.db_path) if os.path.dirname(self.db_path) else '.', exist_ok=True)
         
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
         self.conn.execute('''
             CREATE TABLE IF NOT EXISTS asin_lookups (
                 asin TEXT,
@@ -35,30 +64,138 @@ class ASINCache:
             )
         ''')
         self.conn.commit()
+        self.purge_expired()
+    
+    def _cutoff(self) -> datetime:
+        return datetime.now() - self.ttl
+    
+    # -------------------------------------------------------------------------
+    # In-process LRU
+    # -------------------------------------------------------------------------
+    def _memory_get(self, asin: str, marketplace: str, cutoff: datetime) -> Optional[str]:
+        key = (self.db_path, asin, marketplace)
+        with _MEMORY_CACHE_LOCK:
+            entry = _MEMORY_CACHE.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= cutoff:
+                del _MEMORY_CACHE[key]
+                return None
+            _MEMORY_CACHE.move_to_end(key)
+            return entry[0]
+    
+    def _memory_put(self, marketplace: str, rows: Iterable[tuple]):
+        """Remember (ASIN, JSON text, lookup_date) rows."""
+        with _MEMORY_CACHE_LOCK:
+            for asin, data, lookup_date in rows:
+                key = (self.db_path, asin, marketplace)
+                _MEMORY_CACHE[key] = (data, lookup_date)
+                _MEMORY_CACHE.move_to_end(key)
+            while len(_MEMORY_CACHE) > _MEMORY_CACHE_MAX:
+                _MEMORY_CACHE.popitem(last=False)
+    
+    @staticmethod
+    def clear(db_path: str = 'data/asin_cache.db') -> bool:
+        """Delete a cache file (and its WAL files) and forget its in-memory entries. Returns True if it existed."""
+        with _MEMORY_CACHE_LOCK:
+            for key in [k for k in _MEMORY_CACHE if k[0] == db_path]:
+                del _MEMORY_CACHE[key]
+        existed = os.path.exists(db_path)
+        for path in (db_path, f'{db_path}-wal', f'{db_path}-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+        return existed
     
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
     def get(self, asin: str, marketplace: str = 'AE') -> Optional[Dict]:
         """Get cached lookup (valid for 30 days)."""
-        cutoff = datetime.now() - timedelta(days=30)
+        return self.get_many([asin], marketplace).get(asin.upper())
+    
+    def get_many(self, asins: Iterable[str], marketplace: str = 'AE') -> Dict[str, Dict]:
+        """Cached lookups for many ASINs in one query ({ASIN (upper): data}, hits only)."""
+        cutoff = self._cutoff()
+        texts, missing = {}, []
+        for asin in sorted({a.upper() for a in asins}):
+            data = self._memory_get(asin, marketplace, cutoff)
+            if data is None:
+                missing.append(asin)
+            else:
+                texts[asin] = data
         
-        cursor = self.conn.execute('''
-            SELECT data FROM asin_lookups
-            WHERE asin = ? AND marketplace = ?
-            AND lookup_date > ?
-        ''', (asin.upper(), marketplace, cutoff))
+        if missing:
+            rows = []
+            with self._lock:
+                for i in range(0, len(missing), _SQLITE_CHUNK):
+                    chunk = missing[i:i + _SQLITE_CHUNK]
+                    cursor = self.conn.execute(f'''
+                        SELECT asin, data, lookup_date FROM asin_lookups
+                        WHERE marketplace = ? AND lookup_date > ?
+                        AND asin IN ({','.join('?' * len(chunk))})
+                    ''', (marketplace, cutoff.isoformat(' '), *chunk))
+                    rows.extend((asin, data, datetime.fromisoformat(stamp)) for asin, data, stamp in cursor.fetchall())
+            self._memory_put(marketplace, rows)
+            texts.update((asin, data) for asin, data, _ in rows)
         
-        result = cursor.fetchone()
-        if result:
-            return json.loads(result[0])
-        return None
+        # Fresh dicts per call: callers annotate results in place
+        return {asin: json.loads(data) for asin, data in texts.items()}
     
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
     def set(self, asin: str, marketplace: str, data: Dict):
         """Cache lookup result."""
-        self.conn.execute('''
-            INSERT OR REPLACE INTO asin_lookups
-            (asin, marketplace, data, lookup_date)
-            VALUES (?, ?, ?, ?)
-        ''', (asin.upper(), marketplace, json.dumps(data), datetime.now()))
-        self.conn.commit()
+        self.set_many([(asin, data)], marketplace)
+    
+    def set_many(self, items: Iterable[tuple], marketplace: str = 'AE', overwrite: bool = True) -> int:
+        """
+        Cache many (ASIN, data) results in one transaction.
+        
+        overwrite=False keeps existing unexpired entries (INSERT OR IGNORE, first
+        occurrence wins within the batch), e.g. so placeholder rows never replace
+        real API data. Returns the number of rows written.
+        """
+        now = datetime.now()
+        stamp = now.isoformat(' ')
+        rows = [(asin.upper(), marketplace, json.dumps(data), stamp) for asin, data in items]
+        if not rows:
+            return 0
+        
+        verb = 'INSERT OR REPLACE' if overwrite else 'INSERT OR IGNORE'
+        with self._lock:
+            before = self.conn.total_changes
+            with self.conn:
+                if not overwrite:
+                    # Expired entries don't count as existing
+                    self.conn.execute(
+                        'DELETE FROM asin_lookups WHERE marketplace = ? AND lookup_date <= ?',
+                        (marketplace, self._cutoff().isoformat(' ')),
+                    )
+                    before = self.conn.total_changes
+                self.conn.executemany(f'''
+                    {verb} INTO asin_lookups
+                    (asin, marketplace, data, lookup_date)
+                    VALUES (?, ?, ?, ?)
+                ''', rows)
+            written = self.conn.total_changes - before
+        
+        # Keep the front layer coherent: written rows replace, ignored rows are re-read on demand
+        with _MEMORY_CACHE_LOCK:
+            for asin, *_ in rows:
+                _MEMORY_CACHE.pop((self.db_path, asin, marketplace), None)
+        if overwrite:
+            self._memory_put(marketplace, {asin: (asin, data, now) for asin, _, data, _ in rows}.values())
+        return written
+    
+    def purge_expired(self) -> int:
+        """Delete entries older than the TTL. Returns the number removed."""
+        with self._lock:
+            with self.conn:
+                cursor = self.conn.execute(
+                    'DELETE FROM asin_lookups WHERE lookup_date <= ?', (self._cutoff().isoformat(' '),)
+                )
+        return cursor.rowcount
     
     def close(self):
         """Close database connection."""
@@ -66,30 +203,63 @@ class ASINCache:
             self.conn.close()
 
 class RateLimiter:
-    """Simple rate limiter for API calls."""
+    """
+    Token-bucket rate limiter for API calls, shared by all lookup workers.
     
-    def __init__(self, requests_per_second: float = 2.0):
-        self.min_interval = 1.0 / requests_per_second
-        self.last_request = 0
+    Tokens refill at requests_per_second up to `burst`; burst=1 spaces every
+    call by 1 / requests_per_second.
+    """
     
-    def wait(self):
-        """Wait if necessary to respect rate limit."""
-        now = time.time()
-        elapsed = now - self.last_request
-        
-        if elapsed < self.min_interval:
-            time.sleep(self.min_interval - elapsed)
-        
-        self.last_request = time.time()
+    def __init__(self, requests_per_second: float = 2.0, burst: int = 1):
+        self.rate = requests_per_second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def wait(self, cancel_event: Optional[threading.Event] = None) -> bool:
+        """Block until a token is available. Returns False if cancelled while waiting."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                delay = (1 - self.tokens) / self.rate
+            
+            if cancel_event is None:
+                time.sleep(delay)
+            elif cancel_event.wait(delay):
+                return False
 
 class RainforestClient:
     """Client for Rainforest Amazon Product API."""
     
-    def __init__(self, api_key: str, cache_db: str = 'data/asin_cache.db'):
+    def __init__(self, api_key: str, cache_db: str = 'data/asin_cache.db',
+                 base_url: str = "https://api.rainforestapi.com/request",
+                 requests_per_second: float = 2.0, burst: int = 30, max_workers: int = 8):
+        """
+        Args:
+            requests_per_second: Sustained API request rate
+            burst: Requests allowed back-to-back before the rate applies
+                (30 covers the ASIN mapper's priority list in one window)
+            max_workers: Concurrent requests in batch_lookup
+        """
         self.api_key = api_key
-        self.base_url = "https://api.rainforestapi.com/request"
+        self.base_url = base_url
         self.cache = ASINCache(cache_db)
-        self.rate_limiter = RateLimiter(requests_per_second=2)
+        self.rate_limiter = RateLimiter(requests_per_second=requests_per_second, burst=burst)
+        self.max_workers = max_workers
+        # Full API responses are only dumped when debugging
+        self.verbose = os.getenv('RAINFOREST_DEBUG', '') not in ('', '0')
+        
+        # Pooled keep-alive connections, sized for the batch workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     def lookup_asin(self, asin: str, marketplace: str = 'AE') -> Dict:
         """
@@ -105,11 +275,17 @@ class RainforestClient:
         # Check cache first
         cached = self.cache.get(asin, marketplace)
         if cached:
-            print(f"DEBUG CACHE HIT {asin}: Title='{cached.get('title', 'N/A')}', Brand='{cached.get('brand', 'N/A')}'")
+            if self.verbose:
+                print(f"DEBUG CACHE HIT {asin}: Title='{cached.get('title', 'N/A')}', Brand='{cached.get('brand', 'N/A')}'")
             return cached
         
+        return self._fetch(asin, marketplace)
+    
+    def _fetch(self, asin: str, marketplace: str, cancel_event: Optional[threading.Event] = None) -> Dict:
+        """Rate-limited API lookup (no cache check); caches successful results."""
         # Rate limit
-        self.rate_limiter.wait()
+        if not self.rate_limiter.wait(cancel_event):
+            return {'asin': asin.upper(), 'status': 'cancelled', 'error': 'Lookup cancelled'}
         
         # API call
         params = {
@@ -120,31 +296,33 @@ class RainforestClient:
         }
         
         try:
-            response = requests.get(self.base_url, params=params, timeout=30)
+            response = self.session.get(self.base_url, params=params, timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
                 
                 # AGGRESSIVE DEBUG: Print EVERYTHING
-                print(f"\n{'='*80}")
-                print(f"DEBUG {asin}: Full API Response")
-                print(f"{'='*80}")
-                print(f"Response Keys: {list(data.keys())}")
+                if self.verbose:
+                    print(f"\n{'='*80}")
+                    print(f"DEBUG {asin}: Full API Response")
+                    print(f"{'='*80}")
+                    print(f"Response Keys: {list(data.keys())}")
                 
                 if 'product' in data:
                     product = data['product']
-                    print(f"Product Keys: {list(product.keys())[:20]}")  # First 20 keys
-                    print(f"Title in product: {'title' in product}")
-                    print(f"Brand in product: {'brand' in product}")
+                    if self.verbose:
+                        print(f"Product Keys: {list(product.keys())[:20]}")  # First 20 keys
+                        print(f"Title in product: {'title' in product}")
+                        print(f"Brand in product: {'brand' in product}")
                     
-                    # Print sample of what we see
-                    if 'title' in product:
-                        print(f"product['title'] = '{product['title'][:100] if product['title'] else 'EMPTY STRING'}'")
-                    if 'brand' in product:
-                        print(f"product['brand'] = '{product['brand']}'")
-                    if 'buybox_winner' in product:
-                        print(f"buybox_winner keys: {list(product['buybox_winner'].keys()) if isinstance(product['buybox_winner'], dict) else 'NOT A DICT'}")
-                    print(f"{'='*80}\n")
+                        # Print sample of what we see
+                        if 'title' in product:
+                            print(f"product['title'] = '{product['title'][:100] if product['title'] else 'EMPTY STRING'}'")
+                        if 'brand' in product:
+                            print(f"product['brand'] = '{product['brand']}'")
+                        if 'buybox_winner' in product:
+                            print(f"buybox_winner keys: {list(product['buybox_winner'].keys()) if isinstance(product['buybox_winner'], dict) else 'NOT A DICT'}")
+                        print(f"{'='*80}\n")
                     
                     # Extract title with fallbacks
                     title = product.get('title', '')
@@ -189,7 +367,8 @@ class RainforestClient:
                             currency = buybox['price'].get('currency')
                     
                     # DEBUG: Print extracted data
-                    print(f"DEBUG {asin}: Extracted -> Title='{title[:50] if title else 'EMPTY'}', Brand='{brand or 'EMPTY'}'")
+                    if self.verbose:
+                        print(f"DEBUG {asin}: Extracted -> Title='{title[:50] if title else 'EMPTY'}', Brand='{brand or 'EMPTY'}'")
                     
                     result = {
                         'asin': asin.upper(),
@@ -249,26 +428,74 @@ class RainforestClient:
             }
             return result
     
-    def batch_lookup(self, asin_list: list, marketplace: str = 'AE') -> list:
+    def batch_lookup(self, asin_list: list, marketplace: str = 'AE',
+                     max_workers: Optional[int] = None,
+                     progress_callback: Optional[Callable[[int, int], None]] = None,
+                     should_cancel: Optional[Callable[[], bool]] = None) -> list:
         """
         Batch lookup multiple ASINs.
         
+        All ASINs are checked against the cache in one query first, so cache hits
+        never touch the rate limiter. Misses are fetched concurrently (each distinct
+        ASIN once) by up to max_workers threads sharing the client's rate limiter.
+        
         Args:
             asin_list: List of ASINs to lookup
             marketplace: Amazon marketplace
+            max_workers: Concurrent API requests (defaults to the client's max_workers)
+            progress_callback: Called as progress_callback(done, total) from the
+                calling thread as results arrive (total = len(asin_list))
+            should_cancel: Polled from the calling thread; once it returns True no new
+                requests start and unfinished ASINs come back with status 'cancelled'
             
         Returns:
-            List of result dictionaries
+            List of result dictionaries, in asin_list order
         """
-        results = []
+        total = len(asin_list)
+        keys = [str(asin).upper() for asin in asin_list]
+        found = self.cache.get_many(keys, marketplace)
+        done = sum(1 for key in keys if found.get(key))
+        if progress_callback and total:
+            progress_callback(done, total)
         
-        for asin in asin_list:
-            result = self.lookup_asin(asin, marketplace)
-            results.append(result)
+        counts = Counter(keys)
+        pending = [key for key in counts if not found.get(key)]
+        if pending:
+            cancel_event = threading.Event()
+            workers = max(1, min(max_workers or self.max_workers, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rainforest') as executor:
+                futures = {executor.submit(self._fetch, key, marketplace, cancel_event): key for key in pending}
+                remaining = set(futures)
+                while remaining:
+                    finished, remaining = wait(remaining, timeout=0.1, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        if future.cancelled():
+                            continue
+                        key = futures[future]
+                        found[key] = future.result()
+                        done += counts[key]
+                    if finished and progress_callback:
+                        progress_callback(done, total)
+                    if not cancel_event.is_set() and should_cancel and should_cancel():
+                        # Queued lookups never start; workers waiting on the limiter give up
+                        cancel_event.set()
+                        for future in remaining:
+                            future.cancel()
         
-        return results
+        # Separate dicts per position: callers annotate results in place
+        return [
+            dict(found.get(key) or {'asin': key, 'status': 'cancelled', 'error': 'Lookup cancelled'})
+            for key in keys
+        ]
+    
+    def close(self):
+        """Release pooled connections and the cache connection."""
+        self.session.close()
+        self.cache.close()
     
     def __del__(self):
         """Cleanup cache connection."""
+        if hasattr(self, 'session'):
+            self.session.close()
         if hasattr(self, 'cache'):
             self.cache.close()
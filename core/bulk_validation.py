@@ -8,6 +8,7 @@ Validates bulk export files against Amazon's requirements including:
 - Auto Campaign Restrictions
 """
 
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass, field
 from enum import Enum
@@ -396,6 +397,183 @@ def validate_auto_campaign(row: dict, idx: int, campaign_type: str = "Manual") -
     return issues
 
 
+# ==========================================
+# COLUMN RULES (vectorized validation)
+# ==========================================
+# validate_bulk_export evaluates the rules above as boolean masks over whole
+# columns and builds ValidationIssue objects for the violating rows only. The
+# helpers keep the per-row semantics: row.get(col) is None for a missing column,
+# text checks use str(value), and `or` chains use Python truthiness. String checks
+# run once per distinct value (match types and states repeat across rows).
+# Each rule yields (position, rule order, issue) so issues keep the row-by-row order.
+
+def _iterrows_view(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The frame as iterrows() sees it, with a positional index.
+    
+    iterrows() interleaves each row into one array, so a frame without object
+    columns is upcast (int -> float next to float columns); mirror that so
+    str(value) in issue values stays identical.
+    """
+    if any(dtype == object for dtype in df.dtypes):
+        return df.reset_index(drop=True)
+    return pd.DataFrame(df.to_numpy(), columns=df.columns)
+
+
+def _values(df: pd.DataFrame, col: str, default=None) -> np.ndarray:
+    """row.get(col, default) for every row, as an object array."""
+    if col in df.columns:
+        return df[col].to_numpy(dtype=object)
+    return np.full(len(df), default, dtype=object)
+
+
+def _text(df: pd.DataFrame, col: str) -> np.ndarray:
+    """str(row.get(col, "")) for every row, as an object array."""
+    if col not in df.columns:
+        return np.full(len(df), "", dtype=object)
+    series = df[col]
+    if series.dtype == object or pd.api.types.is_numeric_dtype(series.dtype) or isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(str).to_numpy(dtype=object)
+    return series.map(str).to_numpy(dtype=object)
+
+
+def _lower(texts: np.ndarray) -> np.ndarray:
+    """str.lower() for every text, evaluated once per distinct text."""
+    codes, uniques = pd.factorize(texts)
+    return np.array([text.lower() for text in uniques] + [""], dtype=object)[codes]
+
+
+def _distinct(texts: np.ndarray, check) -> np.ndarray:
+    """check(text) for every row, evaluated once per distinct text."""
+    codes, uniques = pd.factorize(texts)
+    return np.array([check(text) for text in uniques], dtype=bool)[codes]
+
+
+def _blank(values: np.ndarray) -> np.ndarray:
+    """is_blank() for every value of an object array (NA values factorize to -1)."""
+    codes, uniques = pd.factorize(values)
+    blank = np.array([str(value).strip() == "" for value in uniques] + [True], dtype=bool)
+    return blank[codes]
+
+
+def _emit(found: list, mask: np.ndarray, rank: int, row_nums: list, code: str, field: str,
+          values: Optional[np.ndarray] = None):
+    """Append a fixed-message issue for every row in mask."""
+    message = ERROR_MESSAGES[code]
+    for pos in np.flatnonzero(mask):
+        found.append((pos, rank, ValidationIssue(
+            row=row_nums[pos], code=code, message=message, field=field,
+            value=values[pos] if values is not None else ""
+        )))
+
+
+def _negative_issues(df: pd.DataFrame, match_type: np.ndarray, row_nums: list) -> list:
+    """Isolation / Bleeder negative rules (validate_isolation_negative, validate_bleeder_negative)."""
+    found = []
+    isolation = _distinct(match_type, lambda mt: detect_negative_type(mt) == NegativeType.ISOLATION)
+    bleeder = _distinct(match_type, lambda mt: detect_negative_type(mt) == NegativeType.BLEEDER)
+    if not (isolation.any() or bleeder.any()):
+        return found
+    
+    ad_group_blank = _blank(_values(df, "Ad Group Name")) & _blank(_values(df, "Ad Group Id"))
+    
+    if isolation.any():
+        # ISO001: Ad Group must be blank
+        _emit(found, isolation & ~ad_group_blank, 0, row_nums, "ISO001", "Ad Group Name",
+              _text(df, "Ad Group Name"))
+        
+        # ISO002: Match Type validation
+        allowed = _distinct(match_type, lambda mt: mt in ["campaign negative exact", "campaign negative phrase"])
+        _emit(found, isolation & ~allowed, 1, row_nums, "ISO002", "Match Type", match_type)
+        
+        # ISO003: Status validation (State column wins over Status when present)
+        status = _lower(_text(df, "State" if "State" in df.columns else "Status"))
+        bad_status = _distinct(status, lambda st: bool(st) and st not in ["enabled", "deleted", ""])
+        _emit(found, isolation & bad_status, 2, row_nums, "ISO003", "State", status)
+        
+        # ISO004: Max Bid must be blank
+        bid_blank = _blank(_values(df, "Bid")) & _blank(_values(df, "Max Bid"))
+        bid_text = _text(df, "Bid" if "Bid" in df.columns else "Max Bid")
+        _emit(found, isolation & ~bid_blank, 3, row_nums, "ISO004", "Bid", bid_text)
+    
+    if bleeder.any():
+        # BLD001: Ad Group is required
+        _emit(found, bleeder & ad_group_blank, 0, row_nums, "BLD001", "Ad Group Name")
+        
+        # BLD002: Match Type should NOT have "campaign" prefix
+        has_campaign = _distinct(match_type, lambda mt: "campaign" in mt)
+        _emit(found, bleeder & has_campaign, 1, row_nums, "BLD002", "Match Type", match_type)
+    
+    return found
+
+
+def _parse_bid(text: str) -> Tuple[bool, float]:
+    """(parsed, value) for a bid cell's text, as validate_bid_update parses it."""
+    try:
+        return True, float(text.replace("$", "").replace(",", "").strip())
+    except (ValueError, TypeError):
+        return False, np.nan
+
+
+def _bid_issues(df: pd.DataFrame, export_type: str, currency: str, row_nums: list) -> list:
+    """Bid limit rule (validate_bid_update) for the rows validate_bulk_export checks."""
+    found = []
+    limits = get_currency_limits(currency)
+    bid, max_bid, new_bid = _values(df, "Bid"), _values(df, "Max Bid"), _values(df, "New Bid")
+    
+    # Rows checked: every row for bid exports, else rows with a truthy Bid / New Bid
+    has_bid = bid.astype(bool)
+    checked = np.ones(len(df), dtype=bool) if export_type == "bids" else has_bid | new_bid.astype(bool)
+    
+    # bid_val = row.get("Bid") or row.get("Max Bid") or row.get("New Bid")
+    bid_val = np.where(has_bid, bid, np.where(max_bid.astype(bool), max_bid, new_bid))
+    positions = np.flatnonzero(checked & ~np.asarray(pd.isna(bid_val), dtype=bool))
+    if not len(positions):
+        return found
+    
+    # Parse each distinct bid text once
+    codes, uniques = pd.factorize(pd.Series(bid_val[positions], dtype=object).map(str))
+    uniques = list(uniques)
+    parsed = [_parse_bid(text) for text in uniques]
+    blank = np.array([text.strip() == "" for text in uniques])[codes]
+    valid = np.array([ok for ok, _ in parsed])[codes]
+    value = np.array([v for _, v in parsed], dtype=float)[codes]
+    
+    # BID002: unparseable, below the currency minimum or above its maximum
+    with np.errstate(invalid="ignore"):
+        violating = ~blank & (~valid | (value < limits["min_bid"]) | (value > limits["max_bid"]))
+    
+    for i in np.flatnonzero(violating):
+        pos, text = positions[i], uniques[codes[i]]
+        if not valid[i]:
+            message = f"Invalid bid value: {text}"
+        elif value[i] < limits["min_bid"]:
+            message = f"Bid {float(value[i])} below minimum {limits['min_bid']} {currency}"
+        else:
+            message = f"Bid {float(value[i])} exceeds maximum {limits['max_bid']} {currency}"
+        found.append((pos, 4, ValidationIssue(
+            row=row_nums[pos], code="BID002", message=message, field="Bid",
+            value=text if not valid[i] else str(float(value[i]))
+        )))
+    
+    return found
+
+
+def _auto_campaign_issues(df: pd.DataFrame, match_type: np.ndarray, campaign_cache: Dict[str, str], row_nums: list) -> list:
+    """Positive keywords in Auto campaigns (validate_auto_campaign)."""
+    found = []
+    if not campaign_cache:
+        return found  # Every campaign defaults to Manual
+    
+    positive = _distinct(match_type, lambda mt: "negative" not in mt and mt in ["broad", "phrase", "exact"])
+    if not positive.any():
+        return found
+    names = _values(df, "Campaign Name", "")
+    is_auto = np.array([campaign_cache.get(name, "Manual").lower() == "auto" for name in names], dtype=bool)
+    _emit(found, is_auto & positive, 5, row_nums, "AUTO001", "Match Type", match_type)
+    return found
+
+
 # ==========================================
 # MAIN VALIDATION ORCHESTRATOR
 # ==========================================
@@ -409,6 +587,9 @@ def validate_bulk_export(
     """
     Comprehensive validation for bulk export files.
     
+    Rules are evaluated as column masks (see COLUMN RULES); issues are identical
+    to running the per-row validators above on every row, in row order.
+    
     Args:
         df: DataFrame to validate
         export_type: Type of export ("negatives", "bids", "harvest")
@@ -422,38 +603,26 @@ def validate_bulk_export(
         return df, ValidationResult()
     
     df = df.copy()
-    all_issues = []
     campaign_cache = campaign_cache or {}
     
-    for idx, row in df.iterrows():
-        row_dict = row.to_dict()
-        row_num = idx + 2  # Excel row number (header is row 1)
-        
-        # 1. Negative Keyword Validation
-        if export_type == "negatives":
-            match_type = str(row_dict.get("Match Type", "")).lower()
-            neg_type = detect_negative_type(match_type)
-            
-            if neg_type == NegativeType.ISOLATION:
-                issues = validate_isolation_negative(row_dict, row_num)
-            elif neg_type == NegativeType.BLEEDER:
-                issues = validate_bleeder_negative(row_dict, row_num)
-            else:
-                issues = []
-            
-            all_issues.extend(issues)
-        
-        # 2. Bid Validation
-        if export_type == "bids" or row_dict.get("Bid") or row_dict.get("New Bid"):
-            issues = validate_bid_update(row_dict, row_num, currency)
-            all_issues.extend(issues)
-        
-        # 3. Auto Campaign Restrictions
-        campaign_name = row_dict.get("Campaign Name", "")
-        campaign_type = campaign_cache.get(campaign_name, "Manual")
-        issues = validate_auto_campaign(row_dict, row_num, campaign_type)
-        all_issues.extend(issues)
+    view = _iterrows_view(df)
+    row_nums = (df.index + 2).tolist()  # Excel row number (header is row 1)
+    match_type = _lower(_text(view, "Match Type"))
+    
+    # (position, rule order, issue) from each column rule
+    found = []
+    
+    # 1. Negative Keyword Validation
+    if export_type == "negatives":
+        found.extend(_negative_issues(view, match_type, row_nums))
+    
+    # 2. Bid Validation
+    found.extend(_bid_issues(view, export_type, currency, row_nums))
+    
+    # 3. Auto Campaign Restrictions
+    found.extend(_auto_campaign_issues(view, match_type, campaign_cache, row_nums))
     
-    result = ValidationResult(issues=all_issues)
+    found.sort(key=lambda item: (item[0], item[1]))
+    result = ValidationResult(issues=[issue for _, _, issue in found])
     
     return df, result
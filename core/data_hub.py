@@ -8,17 +8,53 @@ Upload once, use everywhere.
 import streamlit as st
 import pandas as pd
 import numpy as np
+import hashlib
 import json
+import os
 from datetime import datetime
-from typing import Dict, Optional, Tuple
-from core.data_loader import load_uploaded_file, SmartMapper, safe_numeric
+from typing import Any, Callable, Dict, Optional, Tuple
+from core.data_loader import (
+    load_uploaded_file, SmartMapper, safe_numeric, classify_match_type,
+    compact_frame, expand_frame, frame_memory_mb, frame_fingerprint,
+)
 from core.db_manager import get_db_manager
-from core.mapping_engine import MappingEngine
+from core.mapping_engine import BulkIdIndex, MappingEngine
+from core.performance_calc import build_metrics_cube
+from core.query_cache import QueryCache
 from api.rainforest_client import ASINCache
 
+# Stage cache (optimizer prepare_data / calculate_account_benchmarks, metrics cubes), shared by sessions
+# in this process. Keyed by (dataset fingerprint, config hash) so a rerun never rehashes
+# the input frame; LRU-evicted to a memory budget.
+STAGE_CACHE_MAX_MB = int(os.environ.get('STAGE_CACHE_MAX_MB', '512'))
+STAGE_CACHE_TTL = int(os.environ.get('STAGE_CACHE_TTL', str(12 * 3600)))
+_stage_cache = QueryCache(ttl_seconds=STAGE_CACHE_TTL, max_bytes=STAGE_CACHE_MAX_MB * 1024 * 1024)
+
+
+def _detach(value: Any) -> Any:
+    """Copy of a cached stage result that callers may modify (frames copied, containers rebuilt)."""
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_detach(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _detach(v) for k, v in value.items()}
+    return value
+
+
 class DataHub:
     """Central data management system."""
     
+    # Held compact in session state (see compact_frame); readers get working frames
+    COMPACT_DATASETS = ('search_term_report', 'enriched_data')
+    
+    # Enrichment stages in order: (stage, source dataset, mapper, upstream stages whose columns it reads)
+    ENRICHMENT_STAGES = (
+        ('sku', 'advertised_product_report', MappingEngine.map_sku_from_apr, ()),
+        ('ids', 'bulk_id_mapping', MappingEngine.map_ids_from_bulk, ()),
+        ('category', 'category_mapping', MappingEngine.map_category, ('sku',)),
+    )
+    
     def __init__(self):
         """Initialize data hub with session state."""
         if 'unified_data' not in st.session_state:
@@ -43,12 +79,91 @@ class DataHub:
             }
     
     def get_data(self, data_type: str) -> Optional[pd.DataFrame]:
-        """Get specific dataset."""
-        return st.session_state.unified_data.get(data_type)
+        """
+        Get specific dataset.
+        
+        Compact datasets come back as an independent working frame (labels decoded,
+        strings shared with the stored categoricals), so callers may modify it freely.
+        """
+        df = st.session_state.unified_data.get(data_type)
+        if df is not None and data_type in self.COMPACT_DATASETS:
+            return expand_frame(df)
+        return df
     
     def get_enriched_data(self) -> Optional[pd.DataFrame]:
         """Get the fully merged/enriched dataset."""
-        return st.session_state.unified_data.get('enriched_data')
+        return self.get_data('enriched_data')
+    
+    def get_shared_frame(self, data_type: str) -> Optional[pd.DataFrame]:
+        """
+        The canonical stored frame, without a working copy.
+        
+        Read-only: label columns are categoricals and counts may be downcast.
+        Pass it to expand_frame before modifying it.
+        """
+        return st.session_state.unified_data.get(data_type)
+    
+    def _store(self, data_type: str, df: Optional[pd.DataFrame]):
+        """
+        Store a dataset in session state, compacting the large report frames, and
+        register its fingerprint (hashed once here, at upload / DB load).
+        """
+        if df is not None and data_type in self.COMPACT_DATASETS:
+            df = compact_frame(df)
+        st.session_state.unified_data[data_type] = df
+        if df is not None:
+            self.get_fingerprint(data_type)
+    
+    def get_memory_usage(self) -> Dict[str, Any]:
+        """
+        Per-session memory report: deep size of each hub dataset plus any other
+        DataFrames held in session state (e.g. optimizer results), in MB.
+        """
+        datasets = {}
+        for name, df in st.session_state.unified_data.items():
+            if isinstance(df, pd.DataFrame):
+                datasets[name] = {'rows': len(df), 'mb': round(frame_memory_mb(df), 2)}
+        bulk_index = st.session_state.unified_data.get('bulk_id_index')
+        if bulk_index is not None:
+            datasets['bulk_id_index'] = {'rows': len(bulk_index.bulk), 'mb': round(bulk_index.memory_mb(), 2)}
+        stages = st.session_state.unified_data.get('enrichment_stages', {})
+        if stages:
+            datasets['enrichment_stages'] = {
+                'rows': max(len(e['patch']) for e in stages.values()),
+                'mb': round(sum(frame_memory_mb(e['patch']) for e in stages.values()), 2),
+            }
+        
+        other_mb = 0.0
+        for key, value in st.session_state.items():
+            if key == 'unified_data':
+                continue
+            frames = value.values() if isinstance(value, dict) else [value]
+            other_mb += sum(frame_memory_mb(v) for v in frames if isinstance(v, pd.DataFrame))
+        
+        hub_mb = sum(d['mb'] for d in datasets.values())
+        return {
+            'datasets': datasets,
+            'hub_mb': round(hub_mb, 2),
+            'other_session_mb': round(other_mb, 2),
+            'total_mb': round(hub_mb + other_mb, 2),
+        }
+    
+    def get_bulk_index(self) -> Optional[BulkIdIndex]:
+        """
+        Prebuilt ID lookups for the loaded bulk file (built once per bulk upload).
+        
+        Accepted by MappingEngine.map_ids_from_bulk and optimizer.enrich_with_ids
+        in place of the bulk DataFrame.
+        """
+        bulk = self.get_shared_frame('bulk_id_mapping')
+        if bulk is None:
+            return None
+        fingerprint = self.get_fingerprint('bulk_id_mapping')
+        index = st.session_state.unified_data.get('bulk_id_index')
+        if index is None or index.fingerprint != fingerprint:
+            index = BulkIdIndex.of(bulk, fingerprint)
+            st.session_state.unified_data['bulk_id_index'] = index
+        return index
     
     def is_loaded(self, data_type: str) -> bool:
         """Check if a specific dataset is loaded."""
@@ -60,7 +175,7 @@ class DataHub:
     
     def upload_search_term_report(self, uploaded_file) -> Tuple[bool, str]:
         """Upload and validate search term report."""
-        df = load_uploaded_file(uploaded_file)
+        df = load_uploaded_file(uploaded_file, mapped_only=True)
         if df is None:
             return False, "Failed to load file"
         
@@ -74,31 +189,9 @@ class DataHub:
         # -----------------------------------------------------------
         # REFINED MATCH TYPE LOGIC (Fix for "OTHER" buckets)
         # -----------------------------------------------------------
-        # Add helper to infer match type from expression or targeting
-        def infer_mt(row):
-            curr = str(row.get('Match Type', '')).upper()
-            
-            # 1. Try TargetingExpression first (most accurate for PT)
-            expr = str(row.get('TargetingExpression', '')).lower()
-            if not expr or expr == 'nan':
-                # 2. Fallback to Targeting column
-                expr = str(row.get('Targeting', '')).lower()
-            
-            # Trust explicit strong types
-            if curr in ['EXACT', 'BROAD', 'PHRASE']:
-                return curr
-            
-            # Infer from Expression/Targeting
-            if 'asin=' in expr or (len(expr) == 10 and expr.startswith('b0')):
-                return 'PT'
-            if 'category=' in expr:
-                return 'CATEGORY'
-            if any(x in expr for x in ['close-match', 'loose-match', 'substitutes', 'complements', '*']):
-                return 'AUTO'
-            
-            return curr if curr and curr != 'NAN' else '-'
-
-        df_renamed['Match Type'] = df_renamed.apply(infer_mt, axis=1)
+        # Infer PT / CATEGORY / AUTO from TargetingExpression (or Targeting) once here;
+        # the categorical result is reused by the Performance Snapshot breakdown
+        df_renamed['Match Type'] = classify_match_type(df_renamed)
         # -----------------------------------------------------------
         
         # Validate critical columns
@@ -118,7 +211,7 @@ class DataHub:
                 df_renamed[col] = safe_numeric(df_renamed[col])
         
         # Store
-        st.session_state.unified_data['search_term_report'] = df_renamed
+        self._store('search_term_report', df_renamed)
         st.session_state.unified_data['upload_status']['search_term_report'] = True
         
         # Timestamp tracking (defensive check for existing sessions)
@@ -231,24 +324,20 @@ class DataHub:
             if not target_col:
                 return
 
-            count = 0
-            for _, row in df.iterrows():
-                val = str(row[target_col]).strip().upper()
-                
-                # Basic ASIN validation (starts with B, 10 chars)
-                if len(val) == 10 and val.startswith('B'):
-                    asin = val
-                else:
-                    continue
-                    
-                # Create a "dummy" but valid cache entry
-                # This makes the ASIN Mapper think we already fetched it
-                # We flag it as 'YOUR_PRODUCT' via brand/seller if needed, 
-                # but simply having it in cache prevents API call.
-                
-                cache_data = {
+            # Basic ASIN validation (starts with B, 10 chars)
+            vals = df[target_col].astype(str).str.strip().str.upper()
+            is_asin = (vals.str.len() == 10) & vals.str.startswith('B')
+            fallback = df[sku_col].map(lambda sku: f"Your Product ({sku})") if sku_col else pd.Series("Your Product (Unknown SKU)", index=df.index)
+            titles = df[title_col].astype(str).where(df[title_col].notna(), fallback) if title_col else fallback
+            
+            # Create a "dummy" but valid cache entry
+            # This makes the ASIN Mapper think we already fetched it
+            # We flag it as 'YOUR_PRODUCT' via brand/seller if needed, 
+            # but simply having it in cache prevents API call.
+            entries = [
+                (asin, {
                     'asin': asin,
-                    'title': str(row[title_col]) if title_col and pd.notna(row[title_col]) else f"Your Product ({row.get(sku_col, 'Unknown SKU')})",
+                    'title': title,
                     'brand': 'Your Brand', 
                     'seller': 'Your Seller ID',
                     'price': None,
@@ -260,13 +349,13 @@ class DataHub:
                     'product_url': f"https://www.amazon.ae/dp/{asin}",
                     'status': 'success',
                     'is_own_product': True # Custom flag we can check
-                }
-                
-                # Check if exists first to avoid overwriting rich API data with dummy data
-                # Only set if NOT exists
-                if not cache.get(asin):
-                    cache.set(asin, 'AE', cache_data)
-                    count += 1
+                })
+                for asin, title in zip(vals[is_asin], titles[is_asin])
+            ]
+            
+            # Only add ASINs NOT already cached, so rich API data is never overwritten
+            # with dummy data (one transaction for the whole catalog)
+            count = cache.set_many(entries, 'AE', overwrite=False)
             
             cache.close()
             if count > 0:
@@ -292,7 +381,7 @@ class DataHub:
         df_renamed = df.rename(columns={v: k for k, v in col_map.items()})
         
         # Store
-        st.session_state.unified_data['advertised_product_report'] = df_renamed
+        self._store('advertised_product_report', df_renamed)
         st.session_state.unified_data['upload_status']['advertised_product_report'] = True
         
         if 'upload_timestamps' not in st.session_state.unified_data:
@@ -356,7 +445,7 @@ class DataHub:
             return False, f"Could not find 'Campaign ID' column. Found: {list(df_renamed.columns)}"
 
         # Store
-        st.session_state.unified_data['bulk_id_mapping'] = df_renamed
+        self._store('bulk_id_mapping', df_renamed)
         st.session_state.unified_data['upload_status']['bulk_id_mapping'] = True
         
         if 'upload_timestamps' not in st.session_state.unified_data:
@@ -369,6 +458,8 @@ class DataHub:
              if client_id:
                  db = get_db_manager(st.session_state.get('test_mode', False))
                  db.save_bulk_mapping(df_renamed, client_id)
+                 # The persisted ID index belongs to the replaced mapping; rebuilt on next DB load
+                 BulkIdIndex.discard(client_id)
         except Exception as e:
              st.warning(f"Could not persist to DB: {e}")
         
@@ -390,7 +481,7 @@ class DataHub:
         # Flexible - just store whatever they upload
         # Expected: SKU, Category, Subcategory columns
         
-        st.session_state.unified_data['category_mapping'] = df
+        self._store('category_mapping', df)
         st.session_state.unified_data['upload_status']['category_mapping'] = True
         
         if 'upload_timestamps' not in st.session_state.unified_data:
@@ -417,45 +508,169 @@ class DataHub:
         return True, f"Loaded {len(df):,} rows, {skus} unique SKUs"
     
     def _enrich_data(self):
-        """Merge additional datasets into search term report using MappingEngine."""
-        st_report = self.get_data('search_term_report')
-        
-        if st_report is None:
+        """
+        Merge additional datasets into search term report using MappingEngine.
+        
+        Incremental: each stage (SKU, IDs, Category) caches the columns it adds or
+        changes, keyed by the fingerprints of its inputs. Only stages whose inputs
+        changed re-run (e.g. a bulk upload re-maps IDs but reuses SKU and Category);
+        the cached columns are patched onto the search term report.
+        """
+        # get_data hands back a fresh working frame, so no extra copy is needed
+        base = self.get_data('search_term_report')
+        
+        if base is None:
             return
+        
+        cache = st.session_state.unified_data.setdefault('enrichment_stages', {})
+        base_fp = self.get_fingerprint('search_term_report')
+        stage_keys = {}
+        ran, reused = [], []
+        
+        for name, source, mapper, upstream in self.ENRICHMENT_STAGES:
+            if self.get_shared_frame(source) is None:
+                cache.pop(name, None)
+                continue
+            key = hashlib.sha1(repr((
+                base_fp, self.get_fingerprint(source), [stage_keys.get(u) for u in upstream]
+            )).encode()).hexdigest()
+            stage_keys[name] = key
+            
+            if name in cache and cache[name]['key'] == key:
+                reused.append(name)
+                continue
+            
+            stage_input = self._apply_patches(base, [cache[u] for u in upstream if u in cache])
+            output, stats = mapper(stage_input, self._stage_source(source))
+            
+            if len(output) != len(stage_input):
+                # Duplicate lookup keys multiplied rows: columns can't be patched, map everything in one pass
+                print(f"Enrichment: {name} changed row count ({len(stage_input)} -> {len(output)}), running full pipeline")
+                cache.clear()
+                self._store('enriched_data', self._enrich_full(base))
+                return
             
-        enriched = st_report.copy()
-        
-        # =============================================
-        # 1. SKU from Advertised Product Report
-        # =============================================
-        apr = self.get_data('advertised_product_report')
-        if apr is not None:
-            enriched, sku_stats = MappingEngine.map_sku_from_apr(enriched, apr)
-            # Show stats in UI
-            if sku_stats['matched'] > 0:
-                pass # st.toast(f"✅ SKU Mapping: {sku_stats['matched']}/{sku_stats['total']} matched", icon="📦")
-        
-        # =============================================
-        # 2. IDs from Bulk File
-        # =============================================
-        bulk = self.get_data('bulk_id_mapping')
-        if bulk is not None:
-            enriched, id_stats = MappingEngine.map_ids_from_bulk(enriched, bulk)
-            # Show stats in UI
-            pass # st.toast(f"🔗 ID Mapping: Campaign={id_stats['campaign_id_matched']}, KW={id_stats['keyword_id_matched']}, PT={id_stats['targeting_id_matched']}", icon="🆔")
-        
-        # =============================================
-        # 3. Category from Category Mapping
-        # =============================================
-        category_map = self.get_data('category_mapping')
-        if category_map is not None:
-            enriched, cat_stats = MappingEngine.map_category(enriched, category_map)
-            # Show stats in UI
-            if cat_stats['matched'] > 0:
-                pass # st.toast(f"📊 Category Mapping: {cat_stats['matched']}/{cat_stats['total']} matched", icon="📁")
+            cache[name] = {
+                'key': key,
+                'patch': self._stage_patch(stage_input, output),
+                'reindexed': not output.index.equals(stage_input.index),
+                'stats': stats,
+            }
+            ran.append(name)
+        
+        enriched = self._apply_patches(base, [cache[name] for name in stage_keys])
+        if ran:
+            print(f"Enrichment: re-ran {', '.join(ran)}" + (f"; reused {', '.join(reused)}" if reused else ""))
         
         # Store enriched data
-        st.session_state.unified_data['enriched_data'] = enriched
+        self._store('enriched_data', enriched)
+    
+    def _enrich_full(self, enriched: pd.DataFrame) -> pd.DataFrame:
+        """Run every mapping stage in sequence over the whole frame (no stage cache)."""
+        for _, source, mapper, _ in self.ENRICHMENT_STAGES:
+            source_df = self._stage_source(source)
+            if source_df is not None:
+                enriched, _ = mapper(enriched, source_df)
+        return enriched
+    
+    def _stage_source(self, source: str):
+        """Mapper input for a source dataset (the bulk file goes in as its prebuilt index)."""
+        if source == 'bulk_id_mapping':
+            return self.get_bulk_index()
+        return self.get_data(source)
+    
+    @staticmethod
+    def _stage_patch(stage_input: pd.DataFrame, output: pd.DataFrame) -> pd.DataFrame:
+        """Columns a stage added or changed, positionally aligned (RangeIndex)."""
+        output = output.reset_index(drop=True)
+        before = stage_input.reset_index(drop=True)
+        changed = [
+            col for col in output.columns
+            if col not in before.columns or not output[col].equals(before[col])
+        ]
+        return output[changed]
+    
+    @staticmethod
+    def _apply_patches(base: pd.DataFrame, entries: list) -> pd.DataFrame:
+        """Base frame with stage patches applied in order (merge-style RangeIndex if any stage merged)."""
+        frame = base.copy(deep=False)
+        for entry in entries:
+            for col in entry['patch'].columns:
+                frame[col] = entry['patch'][col].set_axis(frame.index)
+        if any(entry['reindexed'] for entry in entries):
+            frame = frame.reset_index(drop=True)
+        return frame
+    
+    # ==========================================
+    # DATASET FINGERPRINTS & STAGE CACHE
+    # ==========================================
+    
+    def get_fingerprint(self, data_type: str) -> Optional[str]:
+        """
+        Stable ID of a stored dataset (content hash), from the session's registry.
+        
+        Registered when the dataset is stored; a frame placed in unified_data
+        directly is hashed on first request. The ID belongs to the stored object,
+        so replacing the dataset yields a new one.
+        """
+        df = st.session_state.unified_data.get(data_type)
+        if df is None:
+            return None
+        registry = st.session_state.unified_data.setdefault('fingerprints', {})
+        cached = registry.get(data_type)
+        if cached is None or cached[0] is not df:
+            cached = (df, frame_fingerprint(df))
+            registry[data_type] = cached
+        return cached[1]
+    
+    @staticmethod
+    def derive_fingerprint(parent: Optional[str], *params) -> Optional[str]:
+        """
+        ID for a frame derived deterministically from a registered dataset
+        (e.g. a date-filtered copy): the parent ID plus the derivation parameters.
+        """
+        if parent is None:
+            return None
+        return hashlib.sha1(repr((parent, params)).encode()).hexdigest()
+    
+    @staticmethod
+    def cached_stage(stage: str, fingerprint: Optional[str], config: dict, compute: Callable[[], Any]) -> Any:
+        """
+        Result of compute() for (stage, input fingerprint, config), via the stage cache.
+        
+        Without a fingerprint the stage just runs (the input frame is never hashed).
+        Callers get their own copy of cached frames.
+        """
+        if fingerprint is None:
+            return compute()
+        config_hash = hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+        key = f"{stage}:{config_hash}"
+        result = _stage_cache.get(key, namespace=fingerprint)
+        if result is None:
+            result = compute()
+            _stage_cache.set(key, result, namespace=fingerprint)
+        return _detach(result)
+    
+    def get_metrics_cube(self, data_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Metrics cube (totals, derived ratios, campaign / ad group / match type / date
+        rollups; see build_metrics_cube) of a stored dataset, via the stage cache.
+
+        Defaults to the enriched dataset, else the search term report. Built once per
+        dataset fingerprint from the shared frame, so pages read their headline
+        numbers without rescanning (or copying) the rows. None if nothing is loaded.
+        """
+        if data_type is None:
+            data_type = 'enriched_data' if self.get_shared_frame('enriched_data') is not None else 'search_term_report'
+        df = self.get_shared_frame(data_type)
+        if df is None:
+            return None
+        return self.cached_stage('metrics_cube', self.get_fingerprint(data_type), {}, lambda: build_metrics_cube(df))
+
+    @staticmethod
+    def stage_cache_stats() -> Dict[str, Any]:
+        """Hit/miss/eviction counters and size of the optimizer stage cache."""
+        return _stage_cache.stats()
     
     def clear_all(self):
         """Clear all uploaded data."""
@@ -479,10 +694,15 @@ class DataHub:
             }
         }
     
-    def load_from_database(self, account_id: str) -> bool:
-        """Load account's RECENT data (last 4 weeks) from database into session state."""
+    def load_from_database(self, account_id: str, db=None) -> bool:
+        """
+        Load account's RECENT data (last 4 weeks) from database into session state.
+        
+        Uses the session's DB manager unless an explicit one is passed (batch runs).
+        """
         try:
-            db = get_db_manager(st.session_state.get('test_mode', False))
+            if db is None:
+                db = get_db_manager(st.session_state.get('test_mode', False))
             
             # --- 1. Load TARGET STATS (Existing Logic) ---
             # Get last 4 weeks of data for accurate monthly baseline
@@ -500,13 +720,6 @@ class DataHub:
                 self.clear_all()
                 return False
             
-            df = db.get_target_stats_by_account(account_id, limit=100000)
-            df = df[df['start_date'].isin(recent_dates)].copy()
-            
-            if df.empty:
-                self.clear_all()
-                return False
-            
             # CRITICAL: Map database columns correctly
             # target_text → Targeting (for bid optimization)
             # customer_search_term → Customer Search Term (for harvest)
@@ -524,6 +737,18 @@ class DataHub:
                 'start_date': 'Date'
             }
             
+            # The 4 weeks are the newest, so the [oldest, newest] window holds exactly them;
+            # only the mapped columns are fetched (in table order)
+            df = db.get_target_stats_window(
+                account_id, recent_dates[-1], recent_dates[0],
+                columns=['start_date', 'campaign_name', 'ad_group_name', 'target_text', 'match_type',
+                         'spend', 'sales', 'clicks', 'impressions', 'orders', 'customer_search_term'],
+            )
+            
+            if df.empty:
+                self.clear_all()
+                return False
+            
             df_renamed = df.rename(columns=column_mapping)
             
             # ========================================================
@@ -560,7 +785,7 @@ class DataHub:
                     df_renamed['Customer Search Term'] = df_renamed['Targeting'].apply(extract_clean_cst)
             
 
-            st.session_state.unified_data['search_term_report'] = df_renamed
+            self._store('search_term_report', df_renamed)
             st.session_state.unified_data['upload_status']['search_term_report'] = True
             st.session_state.unified_data['upload_timestamps']['search_term_report'] = datetime.now()
             
@@ -571,15 +796,23 @@ class DataHub:
             # --- 2. Load BULK ID MAPPING (FIRST - before other mappings) ---
             bulk_map = db.get_bulk_mapping(account_id)
             if not bulk_map.empty:
-                 st.session_state.unified_data['bulk_id_mapping'] = bulk_map
+                 self._store('bulk_id_mapping', bulk_map)
                  st.session_state.unified_data['upload_status']['bulk_id_mapping'] = True
                  st.session_state.unified_data['upload_timestamps']['bulk_id_mapping'] = datetime.now()
+                 
+                 # Reuse the ID index persisted for this exact mapping, else build and persist it
+                 fingerprint = self.get_fingerprint('bulk_id_mapping')
+                 bulk_index = BulkIdIndex.load(account_id, bulk_map, fingerprint)
+                 if bulk_index is None:
+                     bulk_index = BulkIdIndex.of(bulk_map, fingerprint).build_all()
+                     bulk_index.save(account_id)
+                 st.session_state.unified_data['bulk_id_index'] = bulk_index
                  pass # st.toast(f"🔗 Loaded {len(bulk_map)} bulk ID mappings from DB", icon="🆔")
             
             # --- 3. Load ADVERTISED PRODUCT MAP ---
             adv_map = db.get_advertised_product_map(account_id)
             if not adv_map.empty:
-                 st.session_state.unified_data['advertised_product_report'] = adv_map
+                 self._store('advertised_product_report', adv_map)
                  st.session_state.unified_data['upload_status']['advertised_product_report'] = True
                  st.session_state.unified_data['upload_timestamps']['advertised_product_report'] = datetime.now()
                  pass # st.toast(f"📦 Loaded {len(adv_map)} advertised products from DB", icon="📦")
@@ -587,7 +820,7 @@ class DataHub:
             # --- 4. Load CATEGORY MAPPING ---
             cat_map = db.get_category_mappings(account_id)
             if not cat_map.empty:
-                 st.session_state.unified_data['category_mapping'] = cat_map
+                 self._store('category_mapping', cat_map)
                  st.session_state.unified_data['upload_status']['category_mapping'] = True
                  st.session_state.unified_data['upload_timestamps']['category_mapping'] = datetime.now()
                  pass # st.toast(f"📁 Loaded {len(cat_map)} category mappings from DB", icon="📁")
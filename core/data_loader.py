@@ -5,11 +5,48 @@ Centralized CSV/Excel reading and column mapping.
 All data ingestion goes through here.
 """
 
+import hashlib
+import importlib.util
+import io
+import os
+import numpy as np
 import pandas as pd
 import re
+from pathlib import Path
 from typing import Dict, Optional
 import streamlit as st
 
+# Per-user cache root for derived files (outside the working tree, so parsed
+# customer reports are never picked up by git)
+APP_CACHE_DIR = Path(os.getenv('XDG_CACHE_HOME') or Path.home() / ".cache") / "ppcsuite"
+
+# Parsed uploads are cached as Parquet keyed by the file's content hash, so
+# re-uploading the same bytes (e.g. after a session reset) skips Excel parsing.
+# UPLOAD_CACHE_DIR="" disables the cache.
+UPLOAD_CACHE_DIR = os.getenv('UPLOAD_CACHE_DIR', str(APP_CACHE_DIR / "upload_cache"))
+UPLOAD_CACHE_MAX_MB = float(os.getenv('UPLOAD_CACHE_MAX_MB', '512'))
+# Bump when parsing/projection changes so older cached copies are not reused
+UPLOAD_CACHE_VERSION = 2
+
+# Raw report columns read by name downstream although SmartMapper does not map them
+PASSTHROUGH_COLUMNS = ["Portfolio name", "Start Date", "End Date"]
+
+# Mapped columns holding labels/identifiers: parsed as strings so numeric-looking
+# search terms or SKUs don't come back as ints/floats
+TEXT_COLUMNS = [
+    "Campaign Name", "Ad Group Name", "Customer Search Term", "Targeting", "TargetingExpression",
+    "Match Type", "SKU", "ASIN", "Entity", "Portfolio name",
+]
+
+# Explicit match types trusted as-is at upload; other rows are classified from targeting text
+UPLOAD_TRUSTED_MATCH_TYPES = ('EXACT', 'BROAD', 'PHRASE')
+AUTO_TARGETING_MARKERS = ('close-match', 'loose-match', 'substitutes', 'complements', '*')
+
+# Session datasets are held compact: repeated labels as categoricals (one string
+# per distinct value instead of one per row) and whole-number counts downcast
+COMPACT_CATEGORY_COLUMNS = ["Campaign Name", "Ad Group Name", "Match Type", "Targeting"]
+COMPACT_COUNT_COLUMNS = ["Impressions", "Clicks", "Orders"]
+
 class SmartMapper:
     """Smart column mapper with alias support for Amazon PPC reports."""
     
@@ -96,12 +133,20 @@ class SmartMapper:
                 mapping[standard] = found
         return mapping
 
-def load_uploaded_file(uploaded_file) -> Optional[pd.DataFrame]:
+def load_uploaded_file(uploaded_file, mapped_only: bool = False) -> Optional[pd.DataFrame]:
     """
     Load uploaded CSV or Excel file into DataFrame.
     
+    Excel files are parsed with the calamine reader when python-calamine is
+    installed (several times faster than openpyxl). Parsed frames are cached
+    on disk as Parquet keyed by content hash, so a repeat upload of the same
+    bytes loads in milliseconds.
+    
     Args:
         uploaded_file: Streamlit UploadedFile object
+        mapped_only: Parse only columns SmartMapper maps (plus PASSTHROUGH_COLUMNS),
+            with label columns read as strings. The header is read first, so
+            unmapped columns are never converted. Used for report uploads.
         
     Returns:
         DataFrame or None if error
@@ -110,20 +155,173 @@ def load_uploaded_file(uploaded_file) -> Optional[pd.DataFrame]:
         return None
     
     try:
-        if uploaded_file.name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file, encoding='utf-8-sig')
+        data = _file_bytes(uploaded_file)
+        cache_key = f"{hashlib.sha256(data).hexdigest()}-v{UPLOAD_CACHE_VERSION}-{'mapped' if mapped_only else 'all'}"
+        
+        df = _upload_cache_get(cache_key)
+        if df is not None:
+            return df
+        
+        is_csv = uploaded_file.name.endswith('.csv')
+        if mapped_only:
+            header = _read_table(data, is_csv, nrows=0).columns
+            raw_names = {str(col).strip(): col for col in header}
+            keep = mapped_columns(list(raw_names))
+            df = _read_table(
+                data, is_csv,
+                usecols=[raw_names[col] for col in raw_names if col in keep],
+                dtype={raw_names[col]: str for col, std in keep.items() if std in TEXT_COLUMNS},
+            )
         else:
-            df = pd.read_excel(uploaded_file)
+            df = _read_table(data, is_csv)
         
         # Strip whitespace from column names
         df.columns = df.columns.str.strip()
         
+        _upload_cache_put(cache_key, df)
         return df
     
     except Exception as e:
         st.error(f"Error reading file: {str(e)}")
         return None
 
+def mapped_columns(columns) -> Dict[str, str]:
+    """Report column -> standard name, for SmartMapper-mapped and pass-through columns."""
+    col_map = SmartMapper.map_columns(pd.DataFrame(columns=list(columns)))
+    passthrough = {SmartMapper.normalize(c): c for c in PASSTHROUGH_COLUMNS}
+    keep_std = {col: std for std, col in col_map.items()}
+    for col in columns:
+        std = passthrough.get(SmartMapper.normalize(col))
+        if std and col not in keep_std:
+            keep_std[col] = std
+    return keep_std
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Memory-lean copy of a report frame for session storage.
+    
+    Label columns become categoricals and integral count columns the smallest
+    integer dtype. Currency metrics stay float64 (float32 would shift cents in
+    bid math). Original dtypes are kept in attrs so expand_frame can restore them.
+    """
+    compact = df.copy(deep=False)
+    restore = {}
+    for col in COMPACT_CATEGORY_COLUMNS:
+        if col in compact.columns and compact[col].dtype == object:
+            restore[col] = compact[col].dtype
+            compact[col] = compact[col].astype('category')
+    for col in COMPACT_COUNT_COLUMNS:
+        if col in compact.columns and pd.api.types.is_numeric_dtype(compact[col]) and not pd.api.types.is_bool_dtype(compact[col]):
+            values = compact[col]
+            if values.notna().all() and np.isfinite(values).all() and (values % 1 == 0).all():
+                restore[col] = values.dtype
+                compact[col] = pd.to_numeric(values, downcast='integer')
+    compact.attrs['compact_dtypes'] = restore
+    return compact
+
+def expand_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Independent working frame from a (possibly compact) session frame.
+    
+    Restores the dtypes compact_frame changed; decoded label columns point at the
+    categories' strings rather than duplicating them. Match Type stays categorical
+    as classified at upload. Plain frames are simply copied.
+    """
+    restore = df.attrs.get('compact_dtypes', {})
+    working = df.copy()
+    for col, dtype in restore.items():
+        if col in working.columns and col != 'Match Type':
+            working[col] = working[col].astype(dtype)
+    working.attrs = {}
+    return working
+
+def frame_memory_mb(df: Optional[pd.DataFrame]) -> float:
+    """Deep memory footprint of a frame in MB (0 for None)."""
+    if df is None:
+        return 0.0
+    return float(df.memory_usage(deep=True).sum()) / (1024 * 1024)
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a frame (values, index, column names and dtypes)."""
+    try:
+        hashed = pd.util.hash_pandas_object(df, index=True).values
+    except TypeError:
+        # Mixed/unhashable object cells: hash their string form instead
+        hashed = pd.util.hash_pandas_object(df.astype(str), index=True).values
+    digest = hashlib.sha1(hashed.tobytes())
+    digest.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    return digest.hexdigest()
+
+def _file_bytes(uploaded_file) -> bytes:
+    """Raw bytes of an UploadedFile / file-like object without consuming it."""
+    if hasattr(uploaded_file, 'getvalue'):
+        return uploaded_file.getvalue()
+    pos = uploaded_file.tell()
+    data = uploaded_file.read()
+    uploaded_file.seek(pos)
+    return data
+
+def _read_table(data: bytes, is_csv: bool, **kwargs) -> pd.DataFrame:
+    """CSV or first Excel sheet from raw bytes; kwargs go to the pandas reader."""
+    if is_csv:
+        return pd.read_csv(io.BytesIO(data), encoding='utf-8-sig', **kwargs)
+    return _read_excel_fast(data, **kwargs)
+
+def _read_excel_fast(data: bytes, **kwargs) -> pd.DataFrame:
+    """First sheet of an Excel file; calamine when available, else pandas' default engine."""
+    if importlib.util.find_spec("python_calamine") is not None:
+        try:
+            return pd.read_excel(io.BytesIO(data), engine="calamine", **kwargs)
+        except Exception as e:
+            print(f"Calamine could not parse upload, falling back to openpyxl: {e}")
+    return pd.read_excel(io.BytesIO(data), **kwargs)
+
+def _upload_cache_get(key: str) -> Optional[pd.DataFrame]:
+    if not UPLOAD_CACHE_DIR:
+        return None
+    path = Path(UPLOAD_CACHE_DIR) / f"{key}.parquet"
+    if not path.exists():
+        return None
+    try:
+        df = pd.read_parquet(path)
+        # Parquet nulls come back as None in object columns; Excel/CSV parsing gives NaN
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].where(df[col].notna(), float('nan'))
+        os.utime(path)  # LRU by mtime
+        return df
+    except Exception as e:
+        print(f"Upload cache read failed, re-parsing: {e}")
+        path.unlink(missing_ok=True)
+        return None
+
+def _upload_cache_put(key: str, df: pd.DataFrame):
+    """Store a parsed upload; frames Parquet cannot round-trip exactly are not cached."""
+    if not UPLOAD_CACHE_DIR:
+        return
+    cache_dir = Path(UPLOAD_CACHE_DIR)
+    path = cache_dir / f"{key}.parquet"
+    tmp = cache_dir / f".{key}.{os.getpid()}.tmp"
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(tmp, index=True)
+        # Mixed-type object columns etc. may come back with other dtypes: don't cache those
+        if not pd.read_parquet(tmp).dtypes.equals(df.dtypes):
+            tmp.unlink(missing_ok=True)
+            return
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"Upload cache write skipped: {e}")
+        tmp.unlink(missing_ok=True)
+        return
+    
+    # Evict least recently used copies beyond the size budget
+    files = sorted(cache_dir.glob("*.parquet"), key=lambda f: f.stat().st_mtime, reverse=True)
+    total = 0
+    for f in files:
+        total += f.stat().st_size
+        if total > UPLOAD_CACHE_MAX_MB * 1024 * 1024 and f != path:
+            f.unlink(missing_ok=True)
+
 def safe_numeric(series: pd.Series) -> pd.Series:
     """Convert series to numeric, handling currency symbols and errors."""
     return pd.to_numeric(
@@ -164,3 +362,66 @@ def is_asin(s: str) -> bool:
     if len(clean) == 10 and clean.startswith("B0") and clean.isalnum():
         return True
     return False
+
+def classify_match_type(
+    df: pd.DataFrame,
+    trusted: tuple = UPLOAD_TRUSTED_MATCH_TYPES,
+    use_expression: bool = True,
+    blank_values: tuple = ('', 'NAN'),
+    blank_label: str = '-',
+) -> pd.Series:
+    """
+    Vectorized match-type classification, returned as a categorical column.
+    
+    Trusted explicit types are kept (upper-cased). Other rows are inferred from the
+    targeting text (TargetingExpression, falling back to Targeting when blank):
+    ASIN targets -> PT, category= -> CATEGORY, auto targeting groups -> AUTO.
+    Anything left keeps its upper-cased Match Type, or blank_label when that is
+    one of blank_values. String checks run once per distinct value.
+    """
+    n = len(df)
+    if 'Match Type' in df.columns:
+        mt_codes, mt_values = _distinct_str(df['Match Type'])
+    else:
+        mt_codes, mt_values = np.zeros(n, dtype=np.intp), np.array([''], dtype=object)
+    mt_upper = pd.Series(mt_values, dtype=object).str.upper()
+    curr = mt_upper.to_numpy(dtype=object)[mt_codes]
+    is_trusted = mt_upper.isin(trusted).to_numpy()[mt_codes]
+    is_blank = mt_upper.isin(blank_values).to_numpy()[mt_codes]
+    
+    inferred = np.full(n, '', dtype=object)
+    if 'Targeting' in df.columns:
+        t_codes, t_values = _distinct_str(df['Targeting'])
+        inferred = _targeting_labels(t_values)[t_codes]
+    if use_expression and 'TargetingExpression' in df.columns:
+        e_codes, e_values = _distinct_str(df['TargetingExpression'])
+        e_lower = pd.Series(e_values, dtype=object).str.lower()
+        has_expr = (~e_lower.isin(['', 'nan'])).to_numpy()[e_codes]
+        inferred = np.where(has_expr, _targeting_labels(e_values)[e_codes], inferred)
+    
+    result = np.select(
+        [is_trusted, inferred != '', is_blank],
+        [curr, inferred, blank_label],
+        default=curr,
+    )
+    return pd.Series(pd.Categorical(result), index=df.index, name='Match Type')
+
+def _distinct_str(series: pd.Series):
+    """(codes, distinct values) of series rendered with str(); categoricals reuse their categories."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        values = np.append(series.cat.categories.astype(str).to_numpy(dtype=object), 'nan')
+        codes = series.cat.codes.to_numpy()
+        return np.where(codes < 0, len(values) - 1, codes), values
+    codes, values = pd.factorize(series.astype(str))
+    return codes, np.asarray(values, dtype=object)
+
+def _targeting_labels(values: np.ndarray) -> np.ndarray:
+    """PT / CATEGORY / AUTO (or '') for each distinct targeting text."""
+    text = pd.Series(values, dtype=object).str.lower()
+    is_pt = text.str.contains('asin=', regex=False) | (text.str.len().eq(10) & text.str.startswith('b0'))
+    is_auto = text.str.contains('|'.join(re.escape(m) for m in AUTO_TARGETING_MARKERS))
+    return np.select(
+        [is_pt.to_numpy(), text.str.contains('category=', regex=False).to_numpy(), is_auto.to_numpy()],
+        ['PT', 'CATEGORY', 'AUTO'],
+        default='',
+    ).astype(object)
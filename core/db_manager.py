@@ -13,6 +13,10 @@ from contextlib import contextmanager
 import pandas as pd
 import uuid
 import os
+import threading
+import weakref
+
+from core.query_cache import invalidates_cache
 
 # Load environment variables from .env file
 try:
@@ -24,6 +28,297 @@ except ImportError:
     pass  # dotenv not installed, rely on system env vars
 
 
+# ==========================================
+# NORMALIZED KEY INDEXES (case-insensitive joins)
+# ==========================================
+# Impact/dashboard queries join and group on LOWER(...) keys; these expression
+# indexes serve them directly. Queries must spell the expressions exactly as here.
+NORMALIZED_KEY_INDEXES = [
+    ("idx_target_stats_target_norm",
+     "target_stats(client_id, start_date, LOWER(target_text), LOWER(campaign_name))"),
+    ("idx_target_stats_campaign_norm",
+     "target_stats(client_id, start_date, LOWER(campaign_name), LOWER(ad_group_name))"),
+    ("idx_actions_log_type_norm",
+     "actions_log(client_id, LOWER(action_type), action_date)"),
+    ("idx_actions_log_target_norm",
+     "actions_log(client_id, LOWER(target_text), LOWER(campaign_name), LOWER(ad_group_name))"),
+]
+
+# ==========================================
+# ACTIONS LOG ROWS (shared by the SQLite and Postgres batch loggers)
+# ==========================================
+ACTION_LOG_COLUMNS = (
+    'action_date', 'client_id', 'batch_id', 'entity_name', 'action_type', 'old_value', 'new_value',
+    'reason', 'campaign_name', 'ad_group_name', 'target_text', 'match_type',
+    'winner_source_campaign', 'new_campaign_name', 'before_match_type', 'after_match_type',
+)
+
+
+def build_action_log_rows(actions: List[Dict[str, Any]], client_id: str, batch_id: str, date_str: str) -> List[tuple]:
+    """
+    actions_log row tuples (ACTION_LOG_COLUMNS order) for one batch.
+    
+    Duplicates of the unique key (client_id, action_date, target_text, action_type,
+    campaign_name) within the batch are rejected: the last action for a key wins,
+    as it would with row-by-row upserts. Keys containing NULL never conflict in SQL
+    and are kept as-is.
+    """
+    rows = {}
+    for i, action in enumerate(actions):
+        get = action.get
+        target_text, action_type, campaign_name = get('target_text', ''), get('action_type', 'UNKNOWN'), get('campaign_name', '')
+        key = (target_text, action_type, campaign_name)
+        if None in key:
+            key = i
+        rows.pop(key, None)
+        rows[key] = (
+            date_str,
+            client_id,
+            batch_id,
+            get('entity_name', ''),
+            action_type,
+            str(get('old_value', '')),
+            str(get('new_value', '')),
+            get('reason', ''),
+            campaign_name,
+            get('ad_group_name', ''),
+            target_text,
+            get('match_type', ''),
+            get('winner_source_campaign'),
+            get('new_campaign_name'),
+            get('before_match_type'),
+            get('after_match_type'),
+        )
+    if len(rows) < len(actions):
+        print(f"actions_log: rejected {len(actions) - len(rows):,} duplicate action(s) within batch {batch_id}")
+    return list(rows.values())
+
+
+# Columns get_target_stats_window may project (also guards the SELECT list)
+TARGET_STATS_COLUMNS = (
+    'id', 'client_id', 'start_date', 'campaign_name', 'ad_group_name', 'target_text', 'match_type',
+    'spend', 'sales', 'clicks', 'impressions', 'created_at', 'updated_at', 'orders', 'customer_search_term',
+)
+
+# Rows per fetchmany() batch for windowed target_stats reads
+TARGET_STATS_FETCH_ROWS = 20000
+
+
+def fetch_frame(cursor, columns: List[str], chunk_size: int) -> pd.DataFrame:
+    """
+    Drain an executed cursor into a DataFrame, one frame per fetchmany() chunk.
+
+    Only one chunk of row tuples is alive at a time (shared by the SQLite and
+    Postgres window reads). Chunks infer dtypes on their own, and a chunk whose
+    column is all NULL comes back as object: in a numeric column such chunks
+    become NaN, as a single from_records over all rows would give.
+    """
+    frames = []
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        frames.append(pd.DataFrame.from_records(chunk, columns=columns, coerce_float=True))
+    if not frames:
+        return pd.DataFrame.from_records([], columns=columns, coerce_float=True)
+    if len(frames) == 1:
+        return frames[0]
+
+    for col in columns:
+        null_chunks = [frame for frame in frames if frame[col].isna().all()]
+        valued = [frame[col].dtype for frame in frames if not frame[col].isna().all()]
+        if null_chunks and valued and object not in valued:
+            for frame in null_chunks:
+                frame[col] = float('nan')
+    return pd.concat(frames, ignore_index=True)
+
+# Impact queries (kept at module level so tests can EXPLAIN them)
+IMPACT_DATES_QUERY = """
+    SELECT DISTINCT start_date 
+    FROM target_stats 
+    WHERE client_id = ?
+    ORDER BY start_date DESC
+    LIMIT 2
+"""
+
+IMPACT_ACTIONS_QUERY = """
+    SELECT 
+        a.id, a.action_date, a.action_type, a.target_text, a.campaign_name,
+        a.ad_group_name, a.old_value, a.new_value, a.reason,
+        a.winner_source_campaign, a.new_campaign_name
+    FROM actions_log a
+    WHERE a.client_id = ?
+    AND LOWER(a.action_type) NOT IN ('hold', 'monitor', 'flagged')
+    ORDER BY a.action_date DESC
+"""
+
+IMPACT_TARGET_STATS_QUERY = """
+    SELECT LOWER(target_text) as target_lower, LOWER(campaign_name) as campaign_lower,
+           SUM(spend) as spend, SUM(sales) as sales
+    FROM target_stats WHERE client_id = ? AND start_date = ?
+    GROUP BY LOWER(target_text), LOWER(campaign_name)
+"""
+
+IMPACT_CAMPAIGN_STATS_QUERY = """
+    SELECT LOWER(campaign_name) as campaign_lower, SUM(spend) as spend, SUM(sales) as sales
+    FROM target_stats WHERE client_id = ? AND start_date = ?
+    GROUP BY LOWER(campaign_name)
+"""
+
+
+# ==========================================
+# PERFORMANCE: Per-thread SQLite connection pool
+# ==========================================
+class SQLiteConnectionPool:
+    """
+    Long-lived, per-thread SQLite connections for one database file.
+    
+    Each thread reuses its own connection (sqlite3 connections must not be shared
+    concurrently), so pages that run dozens of small queries skip connect/close
+    and keep a warm page cache and prepared-statement cache. Connections run in
+    WAL mode so readers are never blocked by an ingest; the read-only pool opens
+    connections with mode=ro for analytics pages.
+    
+    A connection lives as long as its thread: it is closed when the thread object
+    is collected, and connections of threads that have ended are closed whenever
+    another thread connects. Streamlit runs each rerun on a new thread, so the
+    pool never holds more than one connection per live thread (plus the last
+    finished one).
+    """
+    
+    # Tuning (per connection)
+    CACHE_SIZE_KB = 64 * 1024          # PRAGMA cache_size (negative = KiB)
+    MMAP_SIZE = 256 * 1024 * 1024      # PRAGMA mmap_size
+    BUSY_TIMEOUT_MS = 5000
+    CACHED_STATEMENTS = 256            # sqlite3 prepared-statement cache
+    
+    def __init__(self, db_path: Path, read_only: bool = False):
+        self.db_path = Path(db_path)
+        self.read_only = read_only
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Thread ident -> (pid, weak ref to the thread, its connection)
+        self._connections: Dict[int, tuple] = {}
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self.read_only:
+            conn = sqlite3.connect(
+                f"file:{self.db_path.resolve().as_posix()}?mode=ro", uri=True,
+                check_same_thread=False, cached_statements=self.CACHED_STATEMENTS,
+                timeout=self.BUSY_TIMEOUT_MS / 1000
+            )
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn = sqlite3.connect(
+                str(self.db_path), check_same_thread=False,
+                cached_statements=self.CACHED_STATEMENTS,
+                timeout=self.BUSY_TIMEOUT_MS / 1000
+            )
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{self.CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {self.MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.row_factory = sqlite3.Row  # Enable dict-like row access
+        self._register(conn)
+        return conn
+    
+    def _register(self, conn: sqlite3.Connection):
+        """Track conn as this thread's connection; close those of threads that have ended."""
+        thread = threading.current_thread()
+        pid = os.getpid()
+        with self._lock:
+            ended = [ident for ident, (owner_pid, ref, _) in self._connections.items()
+                     if ident == thread.ident or owner_pid != pid or not self._alive(ref)]
+            released = [self._connections.pop(ident) for ident in ended]
+            self._connections[thread.ident] = (pid, weakref.ref(thread), conn)
+        weakref.finalize(thread, self._release, thread.ident, pid, conn)
+        for owner_pid, _, old in released:
+            if owner_pid == pid:  # Connections inherited across a fork are dropped, not closed
+                self._close(old)
+    
+    def _release(self, ident: int, pid: int, conn: sqlite3.Connection):
+        """Close a finished thread's connection (its ident may already belong to a newer thread)."""
+        with self._lock:
+            entry = self._connections.get(ident)
+            if entry is not None and entry[2] is conn:
+                del self._connections[ident]
+        if pid == os.getpid():
+            self._close(conn)
+    
+    @staticmethod
+    def _alive(ref: weakref.ref) -> bool:
+        thread = ref()
+        return thread is not None and thread.is_alive()
+    
+    @staticmethod
+    def _close(conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    
+    def open_connections(self) -> int:
+        """Number of connections the pool currently holds open."""
+        with self._lock:
+            return len(self._connections)
+    
+    def _thread_connection(self) -> sqlite3.Connection:
+        """This thread's connection, reopened after close() or a fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            try:
+                conn.total_changes  # Raises if the connection was closed
+                return conn
+            except sqlite3.ProgrammingError:
+                pass
+        conn = self._connect()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self._local.depth = 0
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """
+        Borrow this thread's connection. Commits/rolls back at the outermost
+        level only, so nested use on one thread shares a single transaction.
+        """
+        conn = self._thread_connection()
+        self._local.depth += 1
+        try:
+            yield conn
+            if self._local.depth == 1 and conn.in_transaction:
+                conn.commit()
+        except Exception:
+            if self._local.depth == 1 and conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth -= 1
+    
+    def close_all(self):
+        """Close every connection this pool opened (threads reconnect on next use)."""
+        with self._lock:
+            connections, self._connections = self._connections, {}
+        for _, _, conn in connections.values():
+            self._close(conn)
+
+
+_POOLS: Dict[tuple, SQLiteConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_connection_pool(db_path: Path, read_only: bool = False) -> SQLiteConnectionPool:
+    """Process-wide pool per (database file, mode), shared by all DatabaseManager instances."""
+    key = (str(Path(db_path).resolve()), read_only)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = SQLiteConnectionPool(db_path, read_only=read_only)
+        return pool
+
+
 class DatabaseManager:
     """
     SQLite database manager with upsert support.
@@ -45,6 +340,10 @@ class DatabaseManager:
         # Ensure parent directory exists
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         
+        # Pooled per-thread connections (shared by every manager on this file)
+        self._pool = get_connection_pool(self.db_path)
+        self._read_pool = get_connection_pool(self.db_path, read_only=True)
+        
         # Initialize schema
         self._init_schema()
     
@@ -55,17 +354,19 @@ class DatabaseManager:
     
     @contextmanager
     def _get_connection(self):
-        """Context manager for safe database connections."""
-        conn = sqlite3.connect(str(self.db_path))
-        conn.row_factory = sqlite3.Row  # Enable dict-like row access
-        try:
+        """Context manager for safe database connections (pooled, per-thread)."""
+        with self._pool.connection() as conn:
+            yield conn
+    
+    @contextmanager
+    def _get_read_connection(self):
+        """
+        Read-only pooled connection for analytics queries.
+        
+        WAL lets these read a consistent snapshot while an ingest is writing.
+        """
+        with self._read_pool.connection() as conn:
             yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
     
     def _init_schema(self):
         """Create tables if they don't exist."""
@@ -161,6 +462,24 @@ class DatabaseManager:
                 ON actions_log(client_id, action_date)
             """)
             
+            # MIGRATION: Columns the write/impact queries rely on (added to the
+            # Postgres schema by migrations; older SQLite files may lack them)
+            for table, column in [
+                ('target_stats', 'customer_search_term'),
+                ('actions_log', 'winner_source_campaign'),
+                ('actions_log', 'new_campaign_name'),
+                ('actions_log', 'before_match_type'),
+                ('actions_log', 'after_match_type'),
+            ]:
+                existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+            
+            # MIGRATION: Expression indexes for normalized (LOWER) join keys.
+            # CREATE INDEX covers existing rows, so no separate backfill is needed.
+            for index_name, index_def in NORMALIZED_KEY_INDEXES:
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {index_def}")
+            
             # ==========================================
             # MAPPING TABLES (Persistence)
             # ==========================================
@@ -211,6 +530,13 @@ class DatabaseManager:
                     cursor.execute(f"SELECT {col_name} FROM bulk_mappings LIMIT 1")
                 except sqlite3.OperationalError:
                     cursor.execute(f"ALTER TABLE bulk_mappings ADD COLUMN {col_name} TEXT")
+            
+            # MIGRATION: Bid columns written by save_bulk_mapping / read by get_bulk_mapping
+            for col_name in ['ad_group_default_bid', 'keyword_bid']:
+                try:
+                    cursor.execute(f"SELECT {col_name} FROM bulk_mappings LIMIT 1")
+                except sqlite3.OperationalError:
+                    cursor.execute(f"ALTER TABLE bulk_mappings ADD COLUMN {col_name} REAL")
 
             # ==========================================
             # ACCOUNTS TABLE (Multi-Account Support)
@@ -255,6 +581,7 @@ class DatabaseManager:
     # UPSERT OPERATIONS
     # ==========================================
     
+    @invalidates_cache('client_id')
     def save_weekly_stats(
         self, 
         client_id: str, 
@@ -295,6 +622,7 @@ class DatabaseManager:
             
             return cursor.lastrowid
     
+    @invalidates_cache('records')
     def save_weekly_stats_batch(self, records: List[Dict[str, Any]]) -> int:
         """
         Batch save multiple weekly stats records.
@@ -339,6 +667,7 @@ class DatabaseManager:
             
             return len(records)
 
+    @invalidates_cache('client_id', 'records')
     def save_target_stats_batch(self, records: List[Dict[str, Any]]) -> int:
         """
         Batch save target/keyword performance stats.
@@ -410,7 +739,7 @@ class DatabaseManager:
     def get_target_stats_by_account(self, account_id: str, limit: int = 50000) -> pd.DataFrame:
         """Get target stats for an account as DataFrame."""
         import pandas as pd
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             query = """
                 SELECT * FROM target_stats 
                 WHERE client_id = ? 
@@ -420,13 +749,43 @@ class DatabaseManager:
             df = pd.read_sql_query(query, conn, params=(account_id, limit))
             return df
             
+    def get_target_stats_window(
+        self,
+        account_id: str,
+        start_date: Union[date, str],
+        end_date: Union[date, str],
+        columns: Optional[List[str]] = None,
+        chunk_size: int = TARGET_STATS_FETCH_ROWS
+    ) -> pd.DataFrame:
+        """
+        Target stats for an account with start_date in [start_date, end_date].
+        
+        Only the requested columns are selected (all when None), newest week first.
+        Rows are fetched and framed in chunk_size batches, so no row cap is needed.
+        """
+        columns = list(columns or TARGET_STATS_COLUMNS)
+        unknown = set(columns) - set(TARGET_STATS_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown target_stats columns: {sorted(unknown)}")
+        start_date = start_date.isoformat() if isinstance(start_date, date) else start_date
+        end_date = end_date.isoformat() if isinstance(end_date, date) else end_date
+        
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # Plain tuples: no per-row sqlite3.Row objects
+            cursor.execute(f"""
+                SELECT {', '.join(columns)} FROM target_stats
+                WHERE client_id = ? AND start_date >= ? AND start_date <= ?
+                ORDER BY start_date DESC
+            """, (account_id, start_date, end_date))
+            return fetch_frame(cursor, columns, chunk_size)
+    
     def get_target_stats_df(self, client_id: str = 'default_client') -> pd.DataFrame:
         """
         Retrieve ALL target stats for a client as DataFrame (not just latest week).
         Used by Account Overview to display full historical data.
         """
-        conn = sqlite3.connect(str(self.db_path))
-        try:
+        with self._get_read_connection() as conn:
             query = """
                 SELECT 
                     start_date as Date,
@@ -450,8 +809,6 @@ class DatabaseManager:
                 df['Date'] = pd.to_datetime(df['Date'])
                 
             return df
-        finally:
-            conn.close()
     
     def get_stats_by_date_range(
         self, 
@@ -467,7 +824,7 @@ class DatabaseManager:
             end_date: Range end date
             client_id: Optional client filter
         """
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             
             if client_id:
@@ -496,6 +853,7 @@ class DatabaseManager:
     # DELETE OPERATIONS
     # ==========================================
     
+    @invalidates_cache('client_id')
     def delete_stats_by_client(self, client_id: str) -> int:
         """Delete all stats and actions for a specific client."""
         with self._get_connection() as conn:
@@ -511,6 +869,7 @@ class DatabaseManager:
             
             return rows
     
+    @invalidates_cache(all_namespaces=True)
     def clear_all_stats(self) -> int:
         """Clear all weekly stats (use with caution!)."""
         with self._get_connection() as conn:
@@ -535,6 +894,7 @@ class DatabaseManager:
     # ACCOUNT HEALTH METRICS OPERATIONS
     # ==========================================
     
+    @invalidates_cache('client_id')
     def save_account_health(self, client_id: str, metrics: Dict[str, Any]) -> bool:
         """
         Save or update account health metrics.
@@ -620,6 +980,7 @@ class DatabaseManager:
     # TARGET STATS OPERATIONS
     # ==========================================
     
+    @invalidates_cache('client_id', 'records')
     def save_target_stats_batch(self, df: pd.DataFrame, client_id: str, start_date: Union[date, str] = None) -> int:
         """
         Save granular target-level performance stats from Search Term Report.
@@ -838,6 +1199,7 @@ class DatabaseManager:
     # MAPPING PERSISTENCE OPERATIONS
     # ==========================================
 
+    @invalidates_cache('client_id')
     def save_category_mapping(self, df: pd.DataFrame, client_id: str):
         """Save category mapping to database."""
         if df is None or df.empty:
@@ -871,12 +1233,10 @@ class DatabaseManager:
 
     def get_category_mappings(self, client_id: str) -> pd.DataFrame:
         """Get category map for client."""
-        conn = sqlite3.connect(str(self.db_path))
-        try:
+        with self._get_read_connection() as conn:
             return pd.read_sql("SELECT sku as SKU, category as Category, sub_category as 'Sub-Category' FROM category_mappings WHERE client_id = ?", conn, params=(client_id,))
-        finally:
-            conn.close()
 
+    @invalidates_cache('client_id')
     def save_advertised_product_map(self, df: pd.DataFrame, client_id: str):
         """Save advertised product report cache."""
         if df is None or df.empty:
@@ -912,12 +1272,10 @@ class DatabaseManager:
 
     def get_advertised_product_map(self, client_id: str) -> pd.DataFrame:
         """Get advertised product cache."""
-        conn = sqlite3.connect(str(self.db_path))
-        try:
+        with self._get_read_connection() as conn:
             return pd.read_sql("SELECT campaign_name as 'Campaign Name', ad_group_name as 'Ad Group Name', sku as SKU, asin as ASIN FROM advertised_product_cache WHERE client_id = ?", conn, params=(client_id,))
-        finally:
-            conn.close()
 
+    @invalidates_cache('client_id')
     def save_bulk_mapping(self, df: pd.DataFrame, client_id: str):
         """Save bulk ID mapping to database, including bid data."""
         if df is None or df.empty:
@@ -995,8 +1353,7 @@ class DatabaseManager:
 
     def get_bulk_mapping(self, client_id: str) -> pd.DataFrame:
         """Get bulk mapping from database, including bid data."""
-        conn = sqlite3.connect(str(self.db_path))
-        try:
+        with self._get_read_connection() as conn:
             return pd.read_sql("""
                 SELECT 
                     campaign_name as 'Campaign Name', 
@@ -1014,8 +1371,6 @@ class DatabaseManager:
                 FROM bulk_mappings 
                 WHERE client_id = ?
             """, conn, params=(client_id,))
-        finally:
-            conn.close()
     
     def get_all_clients(self) -> List[str]:
         """Get list of all client IDs with data."""
@@ -1031,6 +1386,7 @@ class DatabaseManager:
     # ACTIONS LOG OPERATIONS
     # ==========================================
     
+    @invalidates_cache('client_id')
     def log_action_batch(self, actions: List[Dict[str, Any]], client_id: str, batch_id: Optional[str] = None, action_date: Optional[str] = None) -> int:
         """
         Bulk insert actions into the actions log.
@@ -1044,7 +1400,7 @@ class DatabaseManager:
             action_date: Report date for time-lag matching (uses current time if not provided)
             
         Returns:
-            Number of actions logged
+            Number of actions logged (after dropping in-batch duplicates)
         """
         if not actions:
             return 0
@@ -1059,36 +1415,16 @@ class DatabaseManager:
         else:
             date_str = datetime.now().isoformat()
         
+        rows = build_action_log_rows(actions, client_id, batch_id, date_str)
+        
+        # One executemany in a single transaction (no per-action round trip)
         with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            for action in actions:
-                cursor.execute("""
-                    INSERT OR REPLACE INTO actions_log 
-                    (action_date, client_id, batch_id, entity_name, action_type, old_value, new_value, 
-                     reason, campaign_name, ad_group_name, target_text, match_type,
-                     winner_source_campaign, new_campaign_name, before_match_type, after_match_type)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    date_str,
-                    client_id,
-                    batch_id,
-                    action.get('entity_name', ''),
-                    action.get('action_type', 'UNKNOWN'),
-                    str(action.get('old_value', '')),
-                    str(action.get('new_value', '')),
-                    action.get('reason', ''),
-                    action.get('campaign_name', ''),
-                    action.get('ad_group_name', ''),
-                    action.get('target_text', ''),
-                    action.get('match_type', ''),
-                    action.get('winner_source_campaign'),  # New field
-                    action.get('new_campaign_name'),  # New field
-                    action.get('before_match_type'),  # New field
-                    action.get('after_match_type')  # New field
-                ))
+            conn.executemany(f"""
+                INSERT OR REPLACE INTO actions_log ({', '.join(ACTION_LOG_COLUMNS)})
+                VALUES ({', '.join('?' * len(ACTION_LOG_COLUMNS))})
+            """, rows)
             
-            return len(actions)
+            return len(rows)
     
     def get_actions_by_batch(self, batch_id: str) -> List[Dict[str, Any]]:
         """Get all actions for a specific batch."""
@@ -1151,16 +1487,9 @@ class DatabaseManager:
         - BID_CHANGE → Use observed data (unpredictable)
         - PAUSE → After = $0
         """
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             # Get the 2 most recent upload dates
-            dates_query = """
-                SELECT DISTINCT start_date 
-                FROM target_stats 
-                WHERE client_id = ?
-                ORDER BY start_date DESC
-                LIMIT 2
-            """
-            dates_df = pd.read_sql_query(dates_query, conn, params=(client_id,))
+            dates_df = pd.read_sql_query(IMPACT_DATES_QUERY, conn, params=(client_id,))
             
             if len(dates_df) < 2:
                 return pd.DataFrame()
@@ -1169,49 +1498,21 @@ class DatabaseManager:
             before_upload_date = dates_df.iloc[1]['start_date']
             
             # Get all creditable actions
-            actions_query = """
-                SELECT 
-                    a.id, a.action_date, a.action_type, a.target_text, a.campaign_name,
-                    a.ad_group_name, a.old_value, a.new_value, a.reason,
-                    a.winner_source_campaign, a.new_campaign_name
-                FROM actions_log a
-                WHERE a.client_id = ?
-                AND LOWER(a.action_type) NOT IN ('hold', 'monitor', 'flagged')
-                ORDER BY a.action_date DESC
-            """
-            actions_df = pd.read_sql_query(actions_query, conn, params=(client_id,))
+            actions_df = pd.read_sql_query(IMPACT_ACTIONS_QUERY, conn, params=(client_id,))
             
             if actions_df.empty:
                 return pd.DataFrame()
             
             # Get target-level stats for BEFORE period
-            before_target_df = pd.read_sql_query("""
-                SELECT LOWER(target_text) as target_lower, LOWER(campaign_name) as campaign_lower,
-                       SUM(spend) as spend, SUM(sales) as sales
-                FROM target_stats WHERE client_id = ? AND start_date = ?
-                GROUP BY LOWER(target_text), LOWER(campaign_name)
-            """, conn, params=(client_id, before_upload_date))
+            before_target_df = pd.read_sql_query(IMPACT_TARGET_STATS_QUERY, conn, params=(client_id, before_upload_date))
             
             # Get target-level stats for AFTER period
-            after_target_df = pd.read_sql_query("""
-                SELECT LOWER(target_text) as target_lower, LOWER(campaign_name) as campaign_lower,
-                       SUM(spend) as spend, SUM(sales) as sales
-                FROM target_stats WHERE client_id = ? AND start_date = ?
-                GROUP BY LOWER(target_text), LOWER(campaign_name)
-            """, conn, params=(client_id, after_upload_date))
+            after_target_df = pd.read_sql_query(IMPACT_TARGET_STATS_QUERY, conn, params=(client_id, after_upload_date))
             
             # Get campaign-level stats (fallback)
-            before_campaign_df = pd.read_sql_query("""
-                SELECT LOWER(campaign_name) as campaign_lower, SUM(spend) as spend, SUM(sales) as sales
-                FROM target_stats WHERE client_id = ? AND start_date = ?
-                GROUP BY LOWER(campaign_name)
-            """, conn, params=(client_id, before_upload_date))
-            
-            after_campaign_df = pd.read_sql_query("""
-                SELECT LOWER(campaign_name) as campaign_lower, SUM(spend) as spend, SUM(sales) as sales
-                FROM target_stats WHERE client_id = ? AND start_date = ?
-                GROUP BY LOWER(campaign_name)
-            """, conn, params=(client_id, after_upload_date))
+            before_campaign_df = pd.read_sql_query(IMPACT_CAMPAIGN_STATS_QUERY, conn, params=(client_id, before_upload_date))
+            
+            after_campaign_df = pd.read_sql_query(IMPACT_CAMPAIGN_STATS_QUERY, conn, params=(client_id, after_upload_date))
         
         # Create lookup dicts
         before_target_lookup = {(row['target_lower'], row['campaign_lower']): row for _, row in before_target_df.iterrows()}
@@ -1485,6 +1786,7 @@ class DatabaseManager:
     # ACCOUNT MANAGEMENT OPERATIONS
     # ==========================================
     
+    @invalidates_cache('account_id', global_scope=True)
     def create_account(self, account_id: str, account_name: str, account_type: str = 'brand', metadata: dict = None) -> bool:
         """Create a new account."""
         import json
@@ -1524,6 +1826,7 @@ class DatabaseManager:
                 return result
             return None
     
+    @invalidates_cache('account_id', global_scope=True)
     def delete_account(self, account_id: str) -> int:
         """Delete account and ALL associated data (weekly_stats, target_stats, actions_log)."""
         with self._get_connection() as conn:
@@ -1537,6 +1840,7 @@ class DatabaseManager:
             
             return cursor.rowcount
     
+    @invalidates_cache('from_account', 'to_account')
     def reassign_data(self, from_account: str, to_account: str, date_range: tuple) -> int:
         """Move data between accounts for a date range."""
         start_date, end_date = date_range
@@ -1582,6 +1886,7 @@ class DatabaseManager:
     # DATA MIGRATION UTILITIES
     # =========================================
     
+    @invalidates_cache(all_namespaces=True)
     def migrate_bid_action_types(self) -> Dict[str, Any]:
         """
         Migrate legacy BID_UPDATE action types to BID_CHANGE for consistency.
@@ -9,10 +9,46 @@ Centralized data enrichment logic for:
 All matching uses normalized keys (case-insensitive, alphanumeric-only).
 """
 
+import os
 import pandas as pd
 import numpy as np
 import re
-from typing import Optional, Tuple
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from core.data_loader import APP_CACHE_DIR, frame_fingerprint
+
+# Bulk ID indexes are cached by bulk-file fingerprint (in-process LRU) and, for
+# accounts loaded from the database, persisted under the per-user cache root
+# (never the working tree: load() unpickles whatever is there).
+# BULK_INDEX_DIR="" disables persistence.
+BULK_INDEX_DIR = os.getenv('BULK_INDEX_DIR', str(APP_CACHE_DIR / "bulk_index"))
+# Bump when lookup construction changes so persisted indexes are rebuilt
+BULK_INDEX_VERSION = 1
+_BULK_INDEX_CACHE: "OrderedDict[str, BulkIdIndex]" = OrderedDict()
+_BULK_INDEX_CACHE_MAX = 4
+_BULK_INDEX_CACHE_LOCK = threading.Lock()
+
+
+def _map_distinct(series: pd.Series, transform) -> pd.Series:
+    """Apply a vectorized string transform once per distinct str() value."""
+    codes, uniques = pd.factorize(series.astype(str))
+    cleaned = transform(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    return pd.Series(cleaned[codes], index=series.index, name=series.name, dtype=object)
+
+
+def _coalesce_suffixed(df: pd.DataFrame, col: str, suffix: str) -> pd.DataFrame:
+    """Fold a merge's '<col><suffix>' column into col (existing values win)."""
+    suffixed = f'{col}{suffix}'
+    if suffixed in df.columns:
+        if col not in df.columns:
+            df[col] = df[suffixed]
+        else:
+            df[col] = df[col].fillna(df[suffixed])
+        df.drop(columns=[suffixed], inplace=True, errors='ignore')
+    return df
 
 
 class MappingEngine:
@@ -24,16 +60,33 @@ class MappingEngine:
     @staticmethod
     def normalize(series: pd.Series) -> pd.Series:
         """Normalize a Series for robust matching (lowercase, alphanumeric only)."""
-        return series.astype(str).str.lower().str.replace(r'[^a-z0-9]', '', regex=True).str.strip()
+        return _map_distinct(series, lambda s: s.str.lower().str.replace(r'[^a-z0-9]', '', regex=True).str.strip())
     
     @staticmethod
     def normalize_targeting(series: pd.Series) -> pd.Series:
         """Normalize targeting expressions (remove 'asin=', 'category=', quotes)."""
-        s = series.astype(str).str.lower().str.strip()
-        s = s.str.replace(r'asin\s*=\s*', '', regex=True)
-        s = s.str.replace(r'category\s*=\s*', '', regex=True)
-        s = s.str.replace(r'["\']', '', regex=True)
-        return s.str.strip()
+        def clean(s):
+            s = s.str.lower().str.strip()
+            s = s.str.replace(r'asin\s*=\s*', '', regex=True)
+            s = s.str.replace(r'category\s*=\s*', '', regex=True)
+            s = s.str.replace(r'["\']', '', regex=True)
+            return s.str.strip()
+        return _map_distinct(series, clean)
+    
+    @staticmethod
+    def normalize_for_mapping(series: pd.Series) -> pd.Series:
+        """
+        Normalize and strip prefixes for robust matching (optimizer ID resolution).
+        e.g., 'asin="B0123"' -> 'b0123', 'category="123"' -> '123'
+        """
+        def clean(s):
+            s = s.str.strip().str.lower()
+            # Remove common prefixes and quotes
+            s = s.str.replace(r'^(asin|category|asin-expanded|keyword-group)=', '', regex=True)
+            s = s.str.replace(r'^"', '', regex=True).str.replace(r'"$', '', regex=True)
+            # Final alphanumeric cleanup
+            return s.str.replace(r'[^a-z0-9]', '', regex=True)
+        return _map_distinct(series, clean)
     
     # =========================================================================
     # METHOD 1: Map SKU from Advertised Product Report
@@ -106,23 +159,26 @@ class MappingEngine:
     # METHOD 2: Map IDs from Bulk Upload File
     # =========================================================================
     @staticmethod
-    def map_ids_from_bulk(df: pd.DataFrame, bulk: pd.DataFrame) -> Tuple[pd.DataFrame, dict]:
+    def map_ids_from_bulk(df: pd.DataFrame, bulk) -> Tuple[pd.DataFrame, dict]:
         """
         Maps CampaignId, AdGroupId, KeywordId, TargetingId from Bulk file.
         
         Args:
             df: Search Term Report DataFrame
-            bulk: Bulk Upload File DataFrame
+            bulk: Bulk Upload File DataFrame, or its prebuilt BulkIdIndex
             
         Returns:
             Tuple of (enriched DataFrame, stats dict)
         """
         stats = {'method': 'bulk', 'campaign_id_matched': 0, 'keyword_id_matched': 0, 
-                 'targeting_id_matched': 0, 'total': len(df)}
+                 'targeting_id_matched': 0, 'total': len(df) if df is not None else 0}
         
         if bulk is None or df is None:
             return df, stats
-            
+        
+        # Bulk-side keys and lookups are prebuilt once per bulk file
+        index = BulkIdIndex.of(bulk)
+        bulk = index.bulk
         enriched = df.copy()
         
         # ========== PHASE 1: Campaign & AdGroup IDs ===========
@@ -130,25 +186,14 @@ class MappingEngine:
             if 'CampaignId' in bulk.columns:
                 # Normalize keys
                 enriched['_camp_norm'] = MappingEngine.normalize(enriched['Campaign Name'])
-                
-                bulk_norm = bulk.copy()
-                bulk_norm['_camp_norm'] = MappingEngine.normalize(bulk_norm['Campaign Name'])
-                
-                # Prepare merge columns
-                merge_cols = ['_camp_norm', 'CampaignId']
                 on_keys = ['_camp_norm']
                 
                 if 'Ad Group Name' in enriched.columns and 'Ad Group Name' in bulk.columns and 'AdGroupId' in bulk.columns:
                     enriched['_ag_norm'] = MappingEngine.normalize(enriched['Ad Group Name'])
-                    bulk_norm['_ag_norm'] = MappingEngine.normalize(bulk_norm['Ad Group Name'])
-                    merge_cols.extend(['_ag_norm', 'AdGroupId'])
                     on_keys.append('_ag_norm')
                 
-                # Dedupe and merge - CRITICAL: Use groupby().first() to enforce 1-to-1 mapping
-                # drop_duplicates() alone keeps duplicates if IDs differ for same name
-                # Fix: Exclude keys from value selection to avoid 'already exists' error on reset_index
-                val_cols = [c for c in merge_cols if c not in on_keys]
-                id_lookup = bulk_norm.groupby(on_keys)[val_cols].first().reset_index()
+                # 1-to-1 lookup (groupby().first() on the normalized keys)
+                id_lookup = index.table('campaign_adgroup_ids' if len(on_keys) == 2 else 'campaign_ids')
                 enriched = enriched.merge(id_lookup, on=on_keys, how='left')
                 
                 # Stats
@@ -160,156 +205,59 @@ class MappingEngine:
         
         # ========== PHASE 2: Keyword & Targeting IDs ===========
         if 'Targeting' in enriched.columns:
-            # Detect keyword column in bulk (try multiple names)
-            kw_col = next((c for c in ['Keyword Text', 'Customer Search Term', 'keyword_text', 'Keyword'] if c in bulk.columns), None)
-            pt_col = next((c for c in ['Product Targeting Expression', 'TargetingExpression', 'targeting_expression'] if c in bulk.columns), None)
-            
-            # Detect ID columns - TRY BOTH FORMATS (with and without spaces)
-            kwid_col = next((c for c in ['Keyword ID', 'KeywordId', 'keyword_id', 'Keyword Id'] if c in bulk.columns), None)
-            ptid_col = next((c for c in ['Product Targeting ID', 'TargetingId', 'targeting_id', 'Product Targeting Id'] if c in bulk.columns), None)
-            
             # Prepare enriched normalized keys
             enriched['_camp_norm'] = MappingEngine.normalize(enriched['Campaign Name'])
             enriched['_ag_norm'] = MappingEngine.normalize(enriched['Ad Group Name'])
             enriched['_target_norm'] = MappingEngine.normalize_targeting(enriched['Targeting'])
             
             # ----- Keyword ID -----
-            if kw_col and kwid_col:
-                # Filter bulk to only keyword rows (non-empty keyword text)
-                kw_lookup = bulk[bulk[kw_col].notna() & (bulk[kw_col].astype(str).str.strip() != '')].copy()
-                
-                if not kw_lookup.empty:
-                    kw_lookup = kw_lookup[['Campaign Name', 'Ad Group Name', kw_col, kwid_col]].copy()
-                    
-                    # Detect match type if available
-                    if 'Match Type' in kw_lookup.columns:
-                        kw_lookup['_match_type'] = kw_lookup['Match Type'].str.lower()
-                    else:
-                        kw_lookup['_match_type'] = 'unknown'
-                    
-                    kw_lookup['_camp_norm'] = MappingEngine.normalize(kw_lookup['Campaign Name'])
-                    kw_lookup['_ag_norm'] = MappingEngine.normalize(kw_lookup['Ad Group Name'])
-                    kw_lookup['_target_norm'] = MappingEngine.normalize_targeting(kw_lookup[kw_col])
-                    
-                    # CRITICAL: Standardize to 'KeywordId' (no space) for internal use
-                    kw_lookup = kw_lookup.rename(columns={kwid_col: 'KeywordId'})
-                    
-                    # Split into exact vs non-exact
-                    exact_kw = kw_lookup[kw_lookup['_match_type'] == 'exact'].copy()
-                    nonexact_kw = kw_lookup[kw_lookup['_match_type'] != 'exact'].copy()
-                    
-                    # For EXACT keywords: Match on Campaign + Ad Group + Targeting (strict)
-                    if not exact_kw.empty:
-                        # CRITICAL: Enforce uniqueness on join keys
-                        exact_kw = exact_kw.groupby(['_camp_norm', '_ag_norm', '_target_norm'])['KeywordId'].first().reset_index()
-                        enriched = enriched.merge(exact_kw, on=['_camp_norm', '_ag_norm', '_target_norm'], how='left', suffixes=('', '_exact'))
-                        
-                        if 'KeywordId_exact' in enriched.columns:
-                            if 'KeywordId' not in enriched.columns:
-                                enriched['KeywordId'] = enriched['KeywordId_exact']
-                            else:
-                                enriched['KeywordId'] = enriched['KeywordId'].fillna(enriched['KeywordId_exact'])
-                            enriched.drop(columns=['KeywordId_exact'], inplace=True, errors='ignore')
-                    
-                    # For BROAD/PHRASE/AUTO: Match on Campaign + Ad Group only (loose)
-                    if not nonexact_kw.empty:
-                        # Group by campaign + ad group and take first KeywordId (representative)
-                        nonexact_agg = nonexact_kw.groupby(['_camp_norm', '_ag_norm'])['KeywordId'].first().reset_index()
-                        enriched = enriched.merge(nonexact_agg, on=['_camp_norm', '_ag_norm'], how='left', suffixes=('', '_nonexact'))
-                        
-                        if 'KeywordId_nonexact' in enriched.columns:
-                            if 'KeywordId' not in enriched.columns:
-                                enriched['KeywordId'] = enriched['KeywordId_nonexact']
-                            else:
-                                enriched['KeywordId'] = enriched['KeywordId'].fillna(enriched['KeywordId_nonexact'])
-                            enriched.drop(columns=['KeywordId_nonexact'], inplace=True, errors='ignore')
-                    
-                    stats['keyword_id_matched'] = enriched['KeywordId'].notna().sum()
+            # EXACT keywords match on Campaign + Ad Group + Targeting (strict);
+            # BROAD/PHRASE/AUTO on Campaign + Ad Group only (loose)
+            exact_kw = index.table('keyword_exact')
+            nonexact_kw = index.table('keyword_loose')
+            for lookup, keys, suffix in [
+                (exact_kw, ['_camp_norm', '_ag_norm', '_target_norm'], '_exact'),
+                (nonexact_kw, ['_camp_norm', '_ag_norm'], '_nonexact'),
+            ]:
+                if lookup is None:
+                    continue
+                enriched = enriched.merge(lookup, on=keys, how='left', suffixes=('', suffix))
+                enriched = _coalesce_suffixed(enriched, 'KeywordId', suffix)
+            if exact_kw is not None or nonexact_kw is not None:
+                stats['keyword_id_matched'] = enriched['KeywordId'].notna().sum()
             
             # ----- Targeting ID -----
-            if pt_col and ptid_col:
-                pt_lookup = bulk[bulk[pt_col].notna() & (bulk[pt_col].astype(str).str.strip() != '')].copy()
-                
-                if not pt_lookup.empty:
-                    pt_lookup = pt_lookup[['Campaign Name', 'Ad Group Name', pt_col, ptid_col]].copy()
-                    pt_lookup['_camp_norm'] = MappingEngine.normalize(pt_lookup['Campaign Name'])
-                    pt_lookup['_ag_norm'] = MappingEngine.normalize(pt_lookup['Ad Group Name'])
-                    pt_lookup['_target_norm'] = MappingEngine.normalize_targeting(pt_lookup[pt_col])
-                    
-                    # CRITICAL: Standardize to 'TargetingId' (no space) for internal use
-                    pt_lookup = pt_lookup.rename(columns={ptid_col: 'TargetingId'})
-                    
-                    # Check if it's auto targeting (close-match, loose-match, etc.)
-                    pt_lookup['_is_auto'] = pt_lookup['_target_norm'].str.contains('closematch|loosematch|substitutes|complements', regex=True)
-                    
-                    # Split: Auto PT vs ASIN/Category PT
-                    auto_pt = pt_lookup[pt_lookup['_is_auto']].copy()
-                    specific_pt = pt_lookup[~pt_lookup['_is_auto']].copy()
-                    
-                    # For ASIN/Category PT: Strict match on targeting expression
-                    if not specific_pt.empty:
-                        # CRITICAL: Enforce uniqueness on join keys
-                        specific_pt = specific_pt.groupby(['_camp_norm', '_ag_norm', '_target_norm'])['TargetingId'].first().reset_index()
-                        enriched = enriched.merge(specific_pt, on=['_camp_norm', '_ag_norm', '_target_norm'], how='left', suffixes=('', '_spec'))
-                        
-                        if 'TargetingId_spec' in enriched.columns:
-                            if 'TargetingId' not in enriched.columns:
-                                enriched['TargetingId'] = enriched['TargetingId_spec']
-                            else:
-                                enriched['TargetingId'] = enriched['TargetingId'].fillna(enriched['TargetingId_spec'])
-                            enriched.drop(columns=['TargetingId_spec'], inplace=True, errors='ignore')
-                    
-                    # For Auto PT: Match on campaign + ad group only
-                    if not auto_pt.empty:
-                        auto_agg = auto_pt.groupby(['_camp_norm', '_ag_norm'])['TargetingId'].first().reset_index()
-                        enriched = enriched.merge(auto_agg, on=['_camp_norm', '_ag_norm'], how='left', suffixes=('', '_auto'))
-                        
-                        if 'TargetingId_auto' in enriched.columns:
-                            if 'TargetingId' not in enriched.columns:
-                                enriched['TargetingId'] = enriched['TargetingId_auto']
-                            else:
-                                enriched['TargetingId'] = enriched['TargetingId'].fillna(enriched['TargetingId_auto'])
-                            enriched.drop(columns=['TargetingId_auto'], inplace=True, errors='ignore')
-                        
-                    stats['targeting_id_matched'] = enriched['TargetingId'].notna().sum()
+            # ASIN/Category PT match strictly on the expression; auto PT on Campaign + Ad Group
+            specific_pt = index.table('pt_specific')
+            auto_pt = index.table('pt_auto')
+            for lookup, keys, suffix in [
+                (specific_pt, ['_camp_norm', '_ag_norm', '_target_norm'], '_spec'),
+                (auto_pt, ['_camp_norm', '_ag_norm'], '_auto'),
+            ]:
+                if lookup is None:
+                    continue
+                enriched = enriched.merge(lookup, on=keys, how='left', suffixes=('', suffix))
+                enriched = _coalesce_suffixed(enriched, 'TargetingId', suffix)
+            if specific_pt is not None or auto_pt is not None:
+                stats['targeting_id_matched'] = enriched['TargetingId'].notna().sum()
             
             # Cleanup
             enriched.drop(columns=['_camp_norm', '_ag_norm', '_target_norm'], inplace=True, errors='ignore')
         
         # ========== PHASE 3: Bid Columns ===========
         # Map Ad Group Default Bid and Keyword Bid from bulk file
-        if 'Ad Group Default Bid' in bulk.columns or 'Bid' in bulk.columns:
+        bid_lookup = index.table('bids')
+        if bid_lookup is not None:
             # Normalize keys for matching
             enriched['_camp_norm'] = MappingEngine.normalize(enriched['Campaign Name'])
             enriched['_ag_norm'] = MappingEngine.normalize(enriched['Ad Group Name'])
             
-            bulk_norm = bulk.copy()
-            bulk_norm['_camp_norm'] = MappingEngine.normalize(bulk_norm['Campaign Name'])
-            bulk_norm['_ag_norm'] = MappingEngine.normalize(bulk_norm['Ad Group Name'])
-            
-            # Build bid lookup: Campaign + Ad Group -> Bid values
-            bid_cols = ['_camp_norm', '_ag_norm']
-            if 'Ad Group Default Bid' in bulk.columns:
-                bid_cols.append('Ad Group Default Bid')
-            if 'Bid' in bulk.columns:
-                bid_cols.append('Bid')
-            
-            # Aggregate: take mean of available bids per Campaign + Ad Group
-            agg_dict = {col: 'mean' for col in bid_cols if col not in ['_camp_norm', '_ag_norm']}
-            bid_lookup = bulk_norm[bid_cols].groupby(['_camp_norm', '_ag_norm']).agg(agg_dict).reset_index()
-            
-            # Merge bid data
+            # Merge bid data (mean of available bids per Campaign + Ad Group)
             enriched = enriched.merge(bid_lookup, on=['_camp_norm', '_ag_norm'], how='left', suffixes=('', '_bulk'))
             
             # Handle suffix conflicts
             for col in ['Ad Group Default Bid', 'Bid']:
-                bulk_col = f'{col}_bulk'
-                if bulk_col in enriched.columns:
-                    if col not in enriched.columns:
-                        enriched[col] = enriched[bulk_col]
-                    else:
-                        enriched[col] = enriched[col].fillna(enriched[bulk_col])
-                    enriched.drop(columns=[bulk_col], inplace=True, errors='ignore')
+                enriched = _coalesce_suffixed(enriched, col, '_bulk')
             
             # Stats
             if 'Ad Group Default Bid' in enriched.columns:
@@ -401,4 +349,265 @@ class MappingEngine:
         # Cleanup
         enriched.drop(columns=['_sku_norm'], inplace=True, errors='ignore')
         
-        return enriched, stats
\ No newline at end of file
+        return enriched, stats
+
+
+# =========================================================================
+# BULK ID INDEX
+# =========================================================================
+class BulkIdIndex:
+    """
+    Pre-normalized lookup tables over one bulk file.
+    
+    Holds the normalized campaign / ad group / keyword / PT keys and the
+    deduplicated ID (and bid) lookups that MappingEngine.map_ids_from_bulk and
+    optimizer.enrich_with_ids merge against, so the bulk sheet is normalized once
+    per upload rather than on every call. Tables are built on first use.
+    """
+    
+    def __init__(self, bulk: pd.DataFrame, fingerprint: Optional[str] = None):
+        self.bulk = bulk
+        self.fingerprint = fingerprint or frame_fingerprint(bulk)
+        self._tables: Dict[str, Optional[pd.DataFrame]] = {}
+    
+    @property
+    def empty(self) -> bool:
+        return self.bulk.empty
+    
+    @classmethod
+    def of(cls, bulk, fingerprint: Optional[str] = None) -> "BulkIdIndex":
+        """The index for a bulk frame (reused by fingerprint), or the index itself."""
+        if isinstance(bulk, cls):
+            return bulk
+        fingerprint = fingerprint or frame_fingerprint(bulk)
+        with _BULK_INDEX_CACHE_LOCK:
+            index = _BULK_INDEX_CACHE.get(fingerprint)
+            if index is not None:
+                _BULK_INDEX_CACHE.move_to_end(fingerprint)
+                return index
+        
+        index = cls(bulk, fingerprint)
+        with _BULK_INDEX_CACHE_LOCK:
+            _BULK_INDEX_CACHE[fingerprint] = index
+            while len(_BULK_INDEX_CACHE) > _BULK_INDEX_CACHE_MAX:
+                _BULK_INDEX_CACHE.popitem(last=False)
+        return index
+    
+    def table(self, name: str) -> Optional[pd.DataFrame]:
+        """A lookup table by name; None when the bulk file can't provide it."""
+        if name not in self._tables:
+            self._tables.update(self._BUILDERS[name](self))
+        return self._tables[name]
+    
+    def build_all(self) -> "BulkIdIndex":
+        for name in self._BUILDERS:
+            self.table(name)
+        return self
+    
+    def memory_mb(self) -> float:
+        """Deep size of the built lookup tables."""
+        return float(sum(t.memory_usage(deep=True).sum() for t in self._tables.values() if t is not None) / 1024**2)
+    
+    # -------------------------------------------------------------------------
+    # Persistence (per account, under BULK_INDEX_DIR)
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def _path(client_id: str) -> Optional[Path]:
+        if not BULK_INDEX_DIR:
+            return None
+        safe_id = re.sub(r'[^A-Za-z0-9_.-]', '_', str(client_id))
+        return Path(BULK_INDEX_DIR) / f"{safe_id}.pkl"
+    
+    def save(self, client_id: str):
+        """Persist all lookup tables for an account (best effort)."""
+        path = self._path(client_id)
+        if path is None:
+            return
+        try:
+            self.build_all()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix('.tmp')
+            pd.to_pickle({'version': BULK_INDEX_VERSION, 'fingerprint': self.fingerprint, 'tables': self._tables}, tmp)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"Failed to persist bulk ID index: {e}")
+    
+    @classmethod
+    def load(cls, client_id: str, bulk: pd.DataFrame, fingerprint: Optional[str] = None) -> Optional["BulkIdIndex"]:
+        """Persisted index for an account if it was built from this exact bulk frame."""
+        path = cls._path(client_id)
+        if path is None or not path.exists():
+            return None
+        try:
+            saved = pd.read_pickle(path)
+            fingerprint = fingerprint or frame_fingerprint(bulk)
+            if saved.get('version') != BULK_INDEX_VERSION or saved.get('fingerprint') != fingerprint:
+                return None
+            index = cls(bulk, fingerprint)
+            index._tables = saved['tables']
+            return index
+        except Exception as e:
+            print(f"Failed to load bulk ID index: {e}")
+            return None
+    
+    @classmethod
+    def discard(cls, client_id: str):
+        """Drop an account's persisted index (its bulk mapping was replaced)."""
+        path = cls._path(client_id)
+        if path is not None:
+            path.unlink(missing_ok=True)
+    
+    # -------------------------------------------------------------------------
+    # MappingEngine.map_ids_from_bulk lookups (MappingEngine.normalize keys)
+    # -------------------------------------------------------------------------
+    def _build_engine_keys(self):
+        keys = pd.DataFrame(index=self.bulk.index)
+        for col, key in [('Campaign Name', '_camp_norm'), ('Ad Group Name', '_ag_norm')]:
+            if col in self.bulk.columns:
+                keys[key] = MappingEngine.normalize(self.bulk[col])
+        return {'engine_keys': keys}
+    
+    def _build_campaign_ids(self):
+        bulk, keys = self.bulk, self.table('engine_keys')
+        tables = {'campaign_ids': None, 'campaign_adgroup_ids': None}
+        if 'Campaign Name' not in bulk.columns or 'CampaignId' not in bulk.columns:
+            return tables
+        # CRITICAL: groupby().first() enforces a 1-to-1 mapping (drop_duplicates keeps
+        # duplicates when IDs differ for the same name)
+        camp = keys[['_camp_norm']].assign(CampaignId=bulk['CampaignId'].to_numpy())
+        tables['campaign_ids'] = camp.groupby(['_camp_norm'])[['CampaignId']].first().reset_index()
+        if 'Ad Group Name' in bulk.columns and 'AdGroupId' in bulk.columns:
+            both = keys[['_camp_norm', '_ag_norm']].assign(CampaignId=bulk['CampaignId'].to_numpy(), AdGroupId=bulk['AdGroupId'].to_numpy())
+            tables['campaign_adgroup_ids'] = both.groupby(['_camp_norm', '_ag_norm'])[['CampaignId', 'AdGroupId']].first().reset_index()
+        return tables
+    
+    def _build_keyword_ids(self):
+        bulk = self.bulk
+        tables = {'keyword_exact': None, 'keyword_loose': None}
+        # Detect keyword text / ID columns in bulk (try multiple names, with and without spaces)
+        kw_col = next((c for c in ['Keyword Text', 'Customer Search Term', 'keyword_text', 'Keyword'] if c in bulk.columns), None)
+        kwid_col = next((c for c in ['Keyword ID', 'KeywordId', 'keyword_id', 'Keyword Id'] if c in bulk.columns), None)
+        if not (kw_col and kwid_col) or 'Campaign Name' not in bulk.columns or 'Ad Group Name' not in bulk.columns:
+            return tables
+        
+        # Filter bulk to only keyword rows (non-empty keyword text)
+        is_kw = (bulk[kw_col].notna() & (bulk[kw_col].astype(str).str.strip() != '')).to_numpy()
+        if not is_kw.any():
+            return tables
+        kw_lookup = bulk.loc[is_kw, ['Campaign Name', 'Ad Group Name', kw_col, kwid_col]].copy()
+        
+        # Detect match type if available
+        if 'Match Type' in kw_lookup.columns:
+            kw_lookup['_match_type'] = kw_lookup['Match Type'].str.lower()
+        else:
+            kw_lookup['_match_type'] = 'unknown'
+        
+        keys = self.table('engine_keys')
+        kw_lookup['_camp_norm'] = keys['_camp_norm'].to_numpy()[is_kw]
+        kw_lookup['_ag_norm'] = keys['_ag_norm'].to_numpy()[is_kw]
+        kw_lookup['_target_norm'] = MappingEngine.normalize_targeting(kw_lookup[kw_col])
+        
+        # CRITICAL: Standardize to 'KeywordId' (no space) for internal use
+        kw_lookup = kw_lookup.rename(columns={kwid_col: 'KeywordId'})
+        
+        exact_kw = kw_lookup[kw_lookup['_match_type'] == 'exact']
+        nonexact_kw = kw_lookup[kw_lookup['_match_type'] != 'exact']
+        if not exact_kw.empty:
+            # CRITICAL: Enforce uniqueness on join keys
+            tables['keyword_exact'] = exact_kw.groupby(['_camp_norm', '_ag_norm', '_target_norm'])['KeywordId'].first().reset_index()
+        if not nonexact_kw.empty:
+            # Group by campaign + ad group and take first KeywordId (representative)
+            tables['keyword_loose'] = nonexact_kw.groupby(['_camp_norm', '_ag_norm'])['KeywordId'].first().reset_index()
+        return tables
+    
+    def _build_pt_ids(self):
+        bulk = self.bulk
+        tables = {'pt_specific': None, 'pt_auto': None}
+        pt_col = next((c for c in ['Product Targeting Expression', 'TargetingExpression', 'targeting_expression'] if c in bulk.columns), None)
+        ptid_col = next((c for c in ['Product Targeting ID', 'TargetingId', 'targeting_id', 'Product Targeting Id'] if c in bulk.columns), None)
+        if not (pt_col and ptid_col) or 'Campaign Name' not in bulk.columns or 'Ad Group Name' not in bulk.columns:
+            return tables
+        
+        is_pt = (bulk[pt_col].notna() & (bulk[pt_col].astype(str).str.strip() != '')).to_numpy()
+        if not is_pt.any():
+            return tables
+        pt_lookup = bulk.loc[is_pt, ['Campaign Name', 'Ad Group Name', pt_col, ptid_col]].copy()
+        keys = self.table('engine_keys')
+        pt_lookup['_camp_norm'] = keys['_camp_norm'].to_numpy()[is_pt]
+        pt_lookup['_ag_norm'] = keys['_ag_norm'].to_numpy()[is_pt]
+        pt_lookup['_target_norm'] = MappingEngine.normalize_targeting(pt_lookup[pt_col])
+        
+        # CRITICAL: Standardize to 'TargetingId' (no space) for internal use
+        pt_lookup = pt_lookup.rename(columns={ptid_col: 'TargetingId'})
+        
+        # Split: Auto PT (close-match, loose-match, etc.) vs ASIN/Category PT
+        is_auto = pt_lookup['_target_norm'].str.contains('closematch|loosematch|substitutes|complements', regex=True)
+        auto_pt = pt_lookup[is_auto]
+        specific_pt = pt_lookup[~is_auto]
+        if not specific_pt.empty:
+            tables['pt_specific'] = specific_pt.groupby(['_camp_norm', '_ag_norm', '_target_norm'])['TargetingId'].first().reset_index()
+        if not auto_pt.empty:
+            tables['pt_auto'] = auto_pt.groupby(['_camp_norm', '_ag_norm'])['TargetingId'].first().reset_index()
+        return tables
+    
+    def _build_bids(self):
+        bulk = self.bulk
+        bid_cols = [c for c in ['Ad Group Default Bid', 'Bid'] if c in bulk.columns]
+        if not bid_cols or 'Campaign Name' not in bulk.columns or 'Ad Group Name' not in bulk.columns:
+            return {'bids': None}
+        # Aggregate: take mean of available bids per Campaign + Ad Group
+        keyed = self.table('engine_keys')[['_camp_norm', '_ag_norm']].assign(**{col: bulk[col].to_numpy() for col in bid_cols})
+        return {'bids': keyed.groupby(['_camp_norm', '_ag_norm']).agg({col: 'mean' for col in bid_cols}).reset_index()}
+    
+    # -------------------------------------------------------------------------
+    # optimizer.enrich_with_ids lookups (MappingEngine.normalize_for_mapping keys)
+    # -------------------------------------------------------------------------
+    def _build_mapping_keys(self):
+        bulk = self.bulk
+        keys = pd.DataFrame(index=bulk.index)
+        if 'Campaign Name' in bulk.columns:
+            keys['_camp_norm'] = MappingEngine.normalize_for_mapping(bulk['Campaign Name'])
+            keys['_ag_norm'] = MappingEngine.normalize_for_mapping(bulk.get('Ad Group Name', pd.Series([''] * len(bulk))))
+        return {'mapping_keys': keys}
+    
+    def _build_mapping_ids(self):
+        bulk, keys = self.bulk, self.table('mapping_keys')
+        tables = {'mapping_keywords': None, 'mapping_pt': None, 'mapping_fallback': None}
+        if '_camp_norm' not in keys.columns or not {'CampaignId', 'AdGroupId'} <= set(bulk.columns):
+            return tables
+        keyed = keys.assign(CampaignId=bulk['CampaignId'].to_numpy(), AdGroupId=bulk['AdGroupId'].to_numpy())
+        
+        # Precise Match 1: Keywords
+        kw_col = next((c for c in ['Customer Search Term', 'Keyword Text', 'keyword_text'] if c in bulk.columns), None)
+        if kw_col and 'KeywordId' in bulk.columns:
+            ids = bulk['KeywordId']
+            valid = ids.notna() & (ids != "") & (ids != "nan")
+            kw = keyed.assign(_target_norm=MappingEngine.normalize_for_mapping(bulk[kw_col]).to_numpy(), KeywordId=ids.to_numpy())[valid.to_numpy()]
+            tables['mapping_keywords'] = kw[['_camp_norm', '_ag_norm', '_target_norm', 'KeywordId', 'CampaignId', 'AdGroupId']].drop_duplicates()
+        
+        # Precise Match 2: Product Targeting
+        pt_col = next((c for c in ['TargetingExpression', 'Product Targeting Expression', 'targeting_expression'] if c in bulk.columns), None)
+        if pt_col and 'TargetingId' in bulk.columns:
+            ids = bulk['TargetingId']
+            valid = ids.notna() & (ids != "") & (ids != "nan")
+            pt = keyed.assign(_target_norm=MappingEngine.normalize_for_mapping(bulk[pt_col]).to_numpy(), TargetingId=ids.to_numpy())[valid.to_numpy()]
+            tables['mapping_pt'] = pt[['_camp_norm', '_ag_norm', '_target_norm', 'TargetingId', 'CampaignId', 'AdGroupId']].drop_duplicates()
+        
+        # Fallback: Campaign/Ad Group IDs
+        tables['mapping_fallback'] = keyed.groupby(['_camp_norm', '_ag_norm'])[['CampaignId', 'AdGroupId']].first().reset_index()
+        return tables
+    
+    _BUILDERS = {
+        'engine_keys': _build_engine_keys,
+        'campaign_ids': _build_campaign_ids,
+        'campaign_adgroup_ids': _build_campaign_ids,
+        'keyword_exact': _build_keyword_ids,
+        'keyword_loose': _build_keyword_ids,
+        'pt_specific': _build_pt_ids,
+        'pt_auto': _build_pt_ids,
+        'bids': _build_bids,
+        'mapping_keys': _build_mapping_keys,
+        'mapping_keywords': _build_mapping_ids,
+        'mapping_pt': _build_mapping_ids,
+        'mapping_fallback': _build_mapping_ids,
+    }
@@ -2,12 +2,31 @@
 Performance Metrics Calculation
 
 All ROAS, ACOS, CTR, CVR, weekly normalization logic lives here.
+
+The metrics cube (build_metrics_cube) is the shared kernel behind the pages'
+headline numbers: totals, derived ratios and the campaign / ad group / match
+type / date rollups of a report, computed in one pass. DataHub caches one cube
+per dataset fingerprint (DataHub.get_metrics_cube).
 """
 
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Any, Dict, Optional, Tuple
+
+# Additive columns summed by the cube (missing columns count as 0)
+METRIC_VOLUMES = ('Spend', 'Sales', 'Orders', 'Clicks', 'Impressions')
+
+# Rollup name -> grouping columns (rollups whose columns are missing are skipped)
+CUBE_ROLLUPS = {
+    'campaign': ('Campaign Name',),
+    'ad_group': ('Campaign Name', 'Ad Group Name'),
+    'match_type': ('Match Type',),
+    'date': ('Date',),
+}
+
+# Columns the date rollup reads, first present wins (rolled up as 'Date')
+CUBE_DATE_COLUMNS = ('Date', 'Start Date', 'date')
 
 def detect_date_range(df: pd.DataFrame, col_map: dict = None) -> dict:
     """
@@ -130,53 +149,146 @@ def calculate_metrics(df: pd.DataFrame, col_map: dict) -> pd.DataFrame:
     Returns:
         DataFrame with calculated metrics added
     """
-    result = df.copy()
+    return add_rate_metrics(
+        df.copy(),
+        spend=col_map.get('Spend'),
+        sales=col_map.get('Sales'),
+        clicks=col_map.get('Clicks'),
+        orders=col_map.get('Orders'),
+        impressions=col_map.get('Impressions'),
+    )
+
+
+def add_rate_metrics(frame: pd.DataFrame, spend: Optional[str] = 'Spend', sales: Optional[str] = 'Sales',
+                     clicks: Optional[str] = 'Clicks', orders: Optional[str] = 'Orders',
+                     impressions: Optional[str] = 'Impressions') -> pd.DataFrame:
+    """
+    Add ROAS, ACOS, CTR, CVR and CPC columns (in place) from the given volume
+    columns; a ratio whose inputs are unmapped (None) or missing is skipped, a zero denominator gives 0.
+    Percentages (ACOS, CTR, CVR) are x100. Works on row-level and rolled-up frames.
+    """
+    cols = set(frame.columns)
+    if spend in cols and sales in cols:
+        frame['ROAS'] = np.where(frame[spend] > 0, frame[sales] / frame[spend], 0)
+        frame['ACOS'] = np.where(frame[sales] > 0, (frame[spend] / frame[sales]) * 100, 0)
+    if clicks in cols and impressions in cols:
+        frame['CTR'] = np.where(frame[impressions] > 0, (frame[clicks] / frame[impressions]) * 100, 0)
+    if orders in cols and clicks in cols:
+        frame['CVR'] = np.where(frame[clicks] > 0, (frame[orders] / frame[clicks]) * 100, 0)
+    if spend in cols and clicks in cols:
+        frame['CPC'] = np.where(frame[clicks] > 0, frame[spend] / frame[clicks], 0)
+    return frame
+
+def summarize_totals(spend: float, sales: float, orders: float, clicks: float, impressions: float) -> Dict[str, float]:
+    """Totals plus the weighted ratios (ROAS, ACOS %, CTR %, CVR %, CPC) derived from them."""
+    return {
+        'spend': spend,
+        'sales': sales,
+        'orders': orders,
+        'clicks': clicks,
+        'impressions': impressions,
+        'roas': sales / spend if spend > 0 else 0,
+        'acos': (spend / sales * 100) if sales > 0 else 0,
+        'ctr': (clicks / impressions * 100) if impressions > 0 else 0,
+        'cvr': (orders / clicks * 100) if clicks > 0 else 0,
+        'cpc': spend / clicks if clicks > 0 else 0,
+    }
+
+def _group_codes(series: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (codes, sorted unique keys) of a grouping column, -1 for missing keys.
+    Categoricals are recoded from their categories, without decoding the rows.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = np.asarray(series.cat.categories, dtype=object)
+        order = np.argsort(categories, kind='stable')
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        raw = series.cat.codes.to_numpy()
+        return np.where(raw >= 0, rank[raw], -1), categories[order]
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes, np.asarray(uniques)
+
+def _rollup(key_series: list, names: Tuple[str, ...], volumes: np.ndarray) -> pd.DataFrame:
+    """Sums of each volume per key combination (sorted, missing keys dropped, like groupby) plus rates."""
+    codes, keys = _group_codes(key_series[0])
+    key_values = [keys]
+    for series in key_series[1:]:
+        inner, inner_keys = _group_codes(series)
+        valid = (codes >= 0) & (inner >= 0)
+        combined = np.where(valid, codes * len(inner_keys) + inner, -1)
+        codes, pairs = pd.factorize(combined, sort=True)
+        if len(pairs) and pairs[0] == -1:
+            codes, pairs = codes - 1, pairs[1:]
+        key_values = [values[pairs // len(inner_keys)] for values in key_values] + [inner_keys[pairs % len(inner_keys)]]
     
-    # Extract column names
-    spend_col = col_map.get('Spend')
-    sales_col = col_map.get('Sales')
-    clicks_col = col_map.get('Clicks')
-    orders_col = col_map.get('Orders')
-    impr_col = col_map.get('Impressions')
+    valid = codes >= 0
+    groups = len(key_values[0])
+    counts = np.bincount(codes[valid], minlength=groups)
+    observed = counts > 0
+    rollup = pd.DataFrame({name: values[observed] for name, values in zip(names, key_values)})
+    for i, col in enumerate(METRIC_VOLUMES):
+        rollup[col] = np.bincount(codes[valid], weights=volumes[i][valid], minlength=groups)[observed]
+    return add_rate_metrics(rollup)
+
+def build_metrics_cube(df: pd.DataFrame, rollups: Optional[Dict[str, Tuple[str, ...]]] = None) -> Dict[str, Any]:
+    """
+    Totals, derived metrics and the common rollups of a performance frame, in one pass.
     
-    # Calculate ROAS
-    if spend_col and sales_col:
-        result['ROAS'] = np.where(
-            result[spend_col] > 0,
-            result[sales_col] / result[spend_col],
-            0
-        )
+    The volume columns are coerced to numbers once (unparseable cells count as 0)
+    and every rollup is a bincount over the same arrays. Accepts compact session
+    frames (categorical labels) without expanding them.
     
-    # Calculate ACOS
-    if spend_col and sales_col:
-        result['ACOS'] = np.where(
-            result[sales_col] > 0,
-            (result[spend_col] / result[sales_col]) * 100,
-            0
-        )
+    Args:
+        df: Performance frame (standard column names)
+        rollups: Rollup name -> grouping columns (default CUBE_ROLLUPS; {} for totals only)
     
-    # Calculate CTR
-    if clicks_col and impr_col:
-        result['CTR'] = np.where(
-            result[impr_col] > 0,
-            (result[clicks_col] / result[impr_col]) * 100,
-            0
-        )
+    Returns:
+        dict with:
+            rows: row count
+            totals: summarize_totals of the whole frame
+            converting_spend: spend on rows with orders (with sales when there is no Orders column)
+            zero_order_spend: spend on rows with Orders == 0
+            rollups: {name: frame} for each rollup whose columns are present -
+                grouping columns, METRIC_VOLUMES sums and add_rate_metrics ratios,
+                sorted by key with missing keys dropped (as df.groupby(...).sum())
+    """
+    volumes = np.zeros((len(METRIC_VOLUMES), len(df)))
+    for i, col in enumerate(METRIC_VOLUMES):
+        if col in df.columns:
+            values = df[col]
+            if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+                values = pd.to_numeric(values, errors='coerce')
+            volumes[i] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    spend, sales, orders = volumes[0], volumes[1], volumes[2]
     
-    # Calculate CVR
-    if orders_col and clicks_col:
-        result['CVR'] = np.where(
-            result[clicks_col] > 0,
-            (result[orders_col] / result[clicks_col]) * 100,
-            0
-        )
+    # Row masks before missing values become 0 (a missing Orders cell is neither 0 nor > 0)
+    if 'Orders' in df.columns:
+        converting = orders > 0
+    elif 'Sales' in df.columns:
+        converting = sales > 0
+    else:
+        converting = np.zeros(len(df), dtype=bool)
+    zero_orders = (orders == 0) if 'Orders' in df.columns else np.zeros(len(df), dtype=bool)
+    volumes[np.isnan(volumes)] = 0.0
     
-    # Calculate CPC
-    if spend_col and clicks_col:
-        result['CPC'] = np.where(
-            result[clicks_col] > 0,
-            result[spend_col] / result[clicks_col],
-            0
-        )
+    frames = {}
+    date_col = next((c for c in CUBE_DATE_COLUMNS if c in df.columns), None)
+    for name, keys in (CUBE_ROLLUPS if rollups is None else rollups).items():
+        if keys == ('Date',):
+            if date_col is None:
+                continue
+            dates = df[date_col]
+            if not pd.api.types.is_datetime64_any_dtype(dates):
+                dates = pd.to_datetime(dates, errors='coerce')
+            frames[name] = _rollup([dates], keys, volumes)
+        elif all(k in df.columns for k in keys):
+            frames[name] = _rollup([df[k] for k in keys], keys, volumes)
     
-    return result
+    return {
+        'rows': len(df),
+        'totals': summarize_totals(*(float(v.sum()) for v in volumes)),
+        'converting_spend': float(spend[converting].sum()),
+        'zero_order_spend': float(spend[zero_orders].sum()),
+        'rollups': frames,
+    }
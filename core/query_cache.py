@@ -0,0 +1,402 @@
+"""
+Shared Query Cache
+
+LRU + TTL cache for database query results, shared by PostgresManager and
+DatabaseManager. Entries live in per-client namespaces so a write for one
+account invalidates only that account's cached results.
+
+Optional SQLite tier (set QUERY_CACHE_PATH) lets several Streamlit worker
+processes on the same host share warm results and invalidations.
+
+Config (environment):
+    QUERY_CACHE_TTL       Seconds before an entry expires (default 60)
+    QUERY_CACHE_MAX_MB    Memory budget for the in-process tier (default 256)
+    QUERY_CACHE_PATH      SQLite file for the shared tier (default: disabled)
+    QUERY_CACHE_DISK_MB   Size budget for the shared tier (default 1024)
+"""
+
+import functools
+import inspect
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+# Namespace for results that are not scoped to one client (e.g. account lists)
+GLOBAL_NAMESPACE = '__global__'
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate in-memory size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, tuple):
+        return sum(_estimate_size(v) for v in value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class QueryCache:
+    """
+    Size-bounded LRU + TTL cache with per-client namespaces.
+
+    Memory tier: OrderedDict in LRU order, evicted by a byte budget.
+    Disk tier (optional): SQLite file shared between processes. Each namespace
+    has a generation counter there; invalidate() bumps it so in-memory entries
+    cached by other processes are rejected on their next read.
+
+    Readers take generation(namespace) before a miss and hand it to set(): a
+    result computed across an invalidation is then dropped instead of cached
+    under the post-write generation.
+    """
+
+    def __init__(self, ttl_seconds: int = 60, max_bytes: int = 256 * 1024 * 1024,
+                 disk_path: Optional[str] = None, max_disk_bytes: int = 1024 * 1024 * 1024):
+        self._ttl = ttl_seconds
+        self._max_bytes = max_bytes
+        self._max_disk_bytes = max_disk_bytes
+        self._lock = threading.RLock()
+        # (namespace, key) -> (value, created_at, size, generation)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, float, int, int]]" = OrderedDict()
+        self._bytes = 0
+        # In-process generation per namespace; clear() bumps the epoch
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._stats = {
+            'hits': 0, 'misses': 0, 'disk_hits': 0,
+            'evictions': 0, 'expirations': 0, 'invalidations': 0, 'stale_sets': 0,
+        }
+
+        self._disk_path = None
+        if disk_path:
+            self._disk_path = Path(disk_path)
+            try:
+                self._init_disk()
+            except sqlite3.Error as e:
+                print(f"Query cache disk tier disabled ({self._disk_path}): {e}")
+                self._disk_path = None
+
+    # ==========================================
+    # PUBLIC API
+    # ==========================================
+    def get(self, key: str, namespace: str = GLOBAL_NAMESPACE) -> Optional[Any]:
+        """Return a cached value, or None on miss / expiry / invalidation."""
+        entry_key = (namespace, key)
+        now = time.time()
+        generation = self._disk_generation(namespace)
+
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                value, created_at, _size, entry_generation = entry
+                if now - created_at >= self._ttl:
+                    self._drop(entry_key)
+                    self._stats['expirations'] += 1
+                elif generation is not None and entry_generation != generation:
+                    # Invalidated by another process
+                    self._drop(entry_key)
+                else:
+                    self._entries.move_to_end(entry_key)
+                    self._stats['hits'] += 1
+                    return value
+
+        if generation is not None:
+            found = self._disk_get(namespace, key, generation, now)
+            if found is not None:
+                value, created_at = found
+                with self._lock:
+                    self._stats['hits'] += 1
+                    self._stats['disk_hits'] += 1
+                    self._store(entry_key, value, created_at, generation)
+                return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def generation(self, namespace: str = GLOBAL_NAMESPACE) -> Tuple[int, int, Optional[int]]:
+        """
+        Snapshot of a namespace's generation, taken before reading the database.
+
+        Pass it to set() so a result read before a concurrent write is not
+        cached after that write has invalidated the namespace.
+        """
+        disk_generation = self._disk_generation(namespace)
+        with self._lock:
+            return self._epoch, self._generations.get(namespace, 0), disk_generation
+
+    def set(self, key: str, value: Any, namespace: str = GLOBAL_NAMESPACE,
+            generation: Optional[Tuple[int, int, Optional[int]]] = None):
+        """
+        Cache a value under namespace/key.
+
+        Args:
+            generation: Token from generation() taken before the value was read.
+                If the namespace was invalidated since, the value is not stored.
+        """
+        now = time.time()
+        if generation is None:
+            disk_generation = self._disk_generation(namespace)
+        else:
+            disk_generation = generation[2]
+            if disk_generation is not None and self._disk_generation(namespace) != disk_generation:
+                with self._lock:
+                    self._stats['stale_sets'] += 1
+                return
+        with self._lock:
+            if generation is not None and generation[:2] != (self._epoch, self._generations.get(namespace, 0)):
+                self._stats['stale_sets'] += 1
+                return
+            self._store((namespace, key), value, now, disk_generation or 0)
+        if disk_generation is not None:
+            # Tagged with the generation read before the query: an invalidation
+            # racing this write leaves the entry unreadable
+            self._disk_set(namespace, key, value, now, disk_generation)
+
+    def invalidate(self, namespace: str):
+        """Drop every entry in a namespace (call after writing that client's data)."""
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] == namespace]:
+                self._drop(entry_key)
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            self._stats['invalidations'] += 1
+        self._disk_invalidate(namespace)
+
+    def clear(self):
+        """Drop everything, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._epoch += 1
+        if self._disk_path is not None:
+            try:
+                with self._disk_connection() as conn:
+                    conn.execute("DELETE FROM cache_entries")
+                    conn.execute("UPDATE cache_generations SET generation = generation + 1")
+            except sqlite3.Error as e:
+                print(f"Query cache disk clear failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters plus current size."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self._max_bytes,
+                'disk_tier': str(self._disk_path) if self._disk_path else None,
+            }
+
+    # ==========================================
+    # MEMORY TIER
+    # ==========================================
+    def _store(self, entry_key: Tuple[str, str], value: Any, created_at: float, generation: int):
+        """Insert into the LRU and evict down to the memory budget (lock held)."""
+        size = _estimate_size(value)
+        if entry_key in self._entries:
+            self._drop(entry_key)
+        if size > self._max_bytes:
+            return  # Larger than the whole budget: never cache in memory
+        self._entries[entry_key] = (value, created_at, size, generation)
+        self._bytes += size
+        while self._bytes > self._max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._stats['evictions'] += 1
+
+    def _drop(self, entry_key: Tuple[str, str]):
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    # ==========================================
+    # DISK TIER (SQLite, shared across processes)
+    # ==========================================
+    @contextmanager
+    def _disk_connection(self):
+        """Short-lived connection to the shared tier (commit on success, always close)."""
+        conn = sqlite3.connect(str(self._disk_path), timeout=5)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _init_disk(self):
+        self._disk_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._disk_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    generation INTEGER NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_created ON cache_entries(created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_generations (
+                    namespace TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL
+                )
+            """)
+
+    def _disk_generation(self, namespace: str) -> Optional[int]:
+        """Current generation of a namespace, or None when the disk tier is off/unavailable."""
+        if self._disk_path is None:
+            return None
+        try:
+            with self._disk_connection() as conn:
+                row = conn.execute(
+                    "SELECT generation FROM cache_generations WHERE namespace = ?", (namespace,)
+                ).fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error as e:
+            print(f"Query cache disk read failed: {e}")
+            return None
+
+    def _disk_get(self, namespace: str, key: str, generation: int, now: float) -> Optional[Tuple[Any, float]]:
+        try:
+            with self._disk_connection() as conn:
+                row = conn.execute(
+                    "SELECT value, created_at, generation FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                ).fetchone()
+                if row is None:
+                    return None
+                blob, created_at, entry_generation = row
+                if now - created_at >= self._ttl or entry_generation != generation:
+                    conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+                    return None
+            return pickle.loads(blob), created_at
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError) as e:
+            print(f"Query cache disk read failed: {e}")
+            return None
+
+    def _disk_set(self, namespace: str, key: str, value: Any, now: float, generation: int):
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return  # Unpicklable values stay memory-only
+        if len(blob) > self._max_disk_bytes:
+            return
+        try:
+            with self._disk_connection() as conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, created_at, generation)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (namespace, key, sqlite3.Binary(blob), len(blob), now, generation))
+                # Expire, then evict oldest entries down to the disk budget
+                conn.execute("DELETE FROM cache_entries WHERE created_at <= ?", (now - self._ttl,))
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+                if total > self._max_disk_bytes:
+                    evicted = 0
+                    for ns, k, size in conn.execute(
+                        "SELECT namespace, key, size FROM cache_entries ORDER BY created_at"
+                    ).fetchall():
+                        if total <= self._max_disk_bytes:
+                            break
+                        conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (ns, k))
+                        total -= size
+                        evicted += 1
+                    with self._lock:
+                        self._stats['evictions'] += evicted
+        except sqlite3.Error as e:
+            print(f"Query cache disk write failed: {e}")
+
+    def _disk_invalidate(self, namespace: str):
+        if self._disk_path is None:
+            return
+        try:
+            with self._disk_connection() as conn:
+                conn.execute("""
+                    INSERT INTO cache_generations (namespace, generation) VALUES (?, 1)
+                    ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1
+                """, (namespace,))
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+        except sqlite3.Error as e:
+            print(f"Query cache disk invalidation failed: {e}")
+
+
+# ==========================================
+# GLOBAL INSTANCE
+# ==========================================
+query_cache = QueryCache(
+    ttl_seconds=int(os.getenv('QUERY_CACHE_TTL', '60')),
+    max_bytes=int(float(os.getenv('QUERY_CACHE_MAX_MB', '256')) * 1024 * 1024),
+    disk_path=os.getenv('QUERY_CACHE_PATH') or None,
+    max_disk_bytes=int(float(os.getenv('QUERY_CACHE_DISK_MB', '1024')) * 1024 * 1024),
+)
+
+
+def invalidate_client(*client_ids: Optional[str]):
+    """
+    Write hook: drop cached results for the given clients.
+
+    Pass GLOBAL_NAMESPACE as well when the write changes client-independent
+    results (e.g. the account list).
+    """
+    for client_id in client_ids:
+        if client_id:
+            query_cache.invalidate(str(client_id))
+
+
+def invalidates_cache(*client_args: str, global_scope: bool = False, all_namespaces: bool = False):
+    """
+    Decorator for write methods: invalidate the affected namespaces after the call.
+
+    Runs after the wrapped method returns, i.e. after its connection context has
+    committed, so a concurrent reader cannot re-cache pre-write results.
+
+    Args:
+        client_args: Names of arguments holding client ids. A list of record dicts
+            is also accepted (their 'client_id' keys are used).
+        global_scope: Also invalidate GLOBAL_NAMESPACE (account list changes).
+        all_namespaces: Drop the whole cache (writes not scoped to a client).
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if all_namespaces:
+                    query_cache.clear()
+                else:
+                    bound = signature.bind_partial(*args, **kwargs)
+                    clients = []
+                    for name in client_args:
+                        value = bound.arguments.get(name)
+                        if isinstance(value, (list, tuple)):
+                            clients.extend(r.get('client_id') for r in value if isinstance(r, dict))
+                        else:
+                            clients.append(value)
+                    if global_scope:
+                        clients.append(GLOBAL_NAMESPACE)
+                    invalidate_client(*dict.fromkeys(clients))
+        return wrapper
+    return decorator
@@ -11,7 +11,7 @@ import re
 from typing import Dict, Any
 from features._base import BaseFeature
 from core.data_loader import SmartMapper, load_uploaded_file, safe_numeric
-from api.rainforest_client import RainforestClient
+from api.rainforest_client import ASINCache, RainforestClient
 from utils.validators import validate_search_term_report
 from ui.components import metric_card
 
@@ -309,9 +309,8 @@ class ASINMapperModule(BaseFeature):
             
             if st.button("🗑️ Force Refresh / Clear Cache", key="clear_cache_btn", type="secondary", use_container_width=True):
                 try:
-                    import os, time
-                    if os.path.exists("data/asin_cache.db"):
-                        os.remove("data/asin_cache.db")
+                    import time
+                    if ASINCache.clear("data/asin_cache.db"):
                         st.toast("Cache cleared! fetching fresh data...", icon="🧹")
                         time.sleep(1)
                     else:
@@ -340,10 +339,15 @@ class ASINMapperModule(BaseFeature):
                     client = RainforestClient(api_key)
                     asin_details = []
                     progress = st.progress(0)
-                    total = len(high_priority)
                     
-                    for i, (idx, row) in enumerate(high_priority.iterrows()):
-                        details = client.lookup_asin(row['asin'])
+                    # Cache hits resolve up front; misses are fetched concurrently
+                    lookups = client.batch_lookup(
+                        high_priority['asin'].tolist(),
+                        progress_callback=lambda done, total: progress.progress(done / total),
+                    )
+                    client.close()
+                    
+                    for details, (idx, row) in zip(lookups, high_priority.iterrows()):
                         
                         # DEBUG: Show what API returned
                         print(f"API Response for {row['asin']}: status={details.get('status', 'unknown')}, brand={details.get('brand', 'MISSING')}, title={details.get('title', 'MISSING')[:50] if details.get('title') else 'MISSING'}")
@@ -362,7 +366,6 @@ class ASINMapperModule(BaseFeature):
                             details['AdGroupId'] = row['AdGroupId']
                         
                         asin_details.append(details)
-                        progress.progress((i + 1) / total)
                     
                     details_df = pd.DataFrame(asin_details)
                     
@@ -1,10 +1,47 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import copy
+import hashlib
 import json
-import requests
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional, Tuple
 from core.db_manager import get_db_manager
+from core.data_hub import DataHub
+from core.data_loader import expand_frame, frame_fingerprint
+from core.performance_calc import CUBE_ROLLUPS, build_metrics_cube
+from api.llm_gateway import OPENAI_CHAT_URL, get_gateway
+
+# Knowledge graph sections and the inputs each depends on. A section is reused until
+# one of its inputs changes: a new optimizer run leaves the dataset-only sections alone.
+# Database-backed parts (realized impact) are not session inputs and are read live.
+KNOWLEDGE_SECTIONS: Dict[str, Tuple[str, ...]] = {
+    "dataset_overview": ("dataset",),
+    "account_health": ("dataset", "optimizer", "target_roas"),
+    "campaign_portfolio": ("dataset",),
+    "term_analysis": ("dataset", "optimizer"),
+    "strategic_insights": ("dataset", "optimizer", "target_roas"),
+    "patterns_detected": ("dataset",),
+    "cross_references": ("dataset",),
+    "optimization_impact": ("dataset", "optimizer"),
+}
+# Optimizer result columns the knowledge graph reads (fingerprinted once per results object)
+_KNOWLEDGE_RESULT_COLUMNS = {
+    'harvest': ['Customer Search Term', 'Spend', 'Sales', 'Orders', 'CPC'],
+    'neg_kw': ['Term', 'Spend'],
+    'neg_pt': ['Term', 'Spend'],
+    'direct_bids': ['KeywordId', 'TargetingId', 'New Bid', 'Cost Per Click (CPC)', 'CPC', 'Clicks', 'Reason'],
+    'agg_bids': ['New Bid', 'Cost Per Click (CPC)', 'CPC', 'Clicks'],
+}
+# Built sections by input fingerprints (in-process LRU shared by sessions)
+_KNOWLEDGE_CACHE: "OrderedDict[str, Any]" = OrderedDict()
+_KNOWLEDGE_CACHE_MAX = 128
+_KNOWLEDGE_LOCK = threading.Lock()
+# Background builds in progress, by the keys of the sections they build
+_KNOWLEDGE_BUILDS: Dict[Tuple[str, ...], threading.Thread] = {}
+# Metrics cube rollups the sections read (totals are always included)
+_KNOWLEDGE_CUBE_ROLLUPS = {'campaign': CUBE_ROLLUPS['campaign']}
 
 
 class AssistantModule:
@@ -243,22 +280,22 @@ If Auto outperforms Manual: Discovery is working - harvest more aggressively
     # KNOWLEDGE GRAPH CONSTRUCTION
     # =========================================================================
     
-    def _construct_granular_dataset(self) -> pd.DataFrame:
+    def _construct_granular_dataset(self, inputs: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
         """
         Stitch together all dataframes (STR, Harvest, Negatives, Bids) into a single 
         granular 'Master Dataset' for the AI Analyst.
+        
+        inputs: snapshot from _knowledge_inputs (read from the session when omitted).
         """
-        # 1. Get Base Data from DataHub
-        str_df = None
-        if 'unified_data' in st.session_state and st.session_state.unified_data.get('search_term_report') is not None:
-            str_df = st.session_state.unified_data['search_term_report']
-        elif 'data' in st.session_state and 'search_term_report' in st.session_state['data']:
-            str_df = st.session_state['data']['search_term_report']
+        inputs = inputs or self._knowledge_inputs()
+        
+        # 1. Get Base Data from DataHub (shared compact frame; expanded once below)
+        str_df = inputs['str_df']
              
         if str_df is None:
             return pd.DataFrame()
              
-        master = str_df.copy()
+        master = expand_frame(str_df)
         
         # Standardize term column
         if 'Customer Search Term' not in master.columns and 'Search Term' in master.columns:
@@ -299,7 +336,7 @@ If Auto outperforms Manual: Discovery is working - harvest more aggressively
                 pass  # If date filtering fails, use full dataset
         
         # 2. Get Optimizer Results (if available)
-        opt_res = st.session_state.get('optimizer_results') or st.session_state.get('latest_optimizer_run')
+        opt_res = inputs['opt_res']
         
         if opt_res:
             # A. Merge Harvest Decisions
@@ -347,35 +384,57 @@ If Auto outperforms Manual: Discovery is working - harvest more aggressively
             
         return master
 
-    def _build_knowledge_graph(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _build_knowledge_graph(self, df: pd.DataFrame, inputs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Build a comprehensive Knowledge Graph for deep AI analysis.
         This is NOT just data - it's pre-computed insights and relationships.
+        
+        Uncached; get_knowledge_graph reuses sections whose inputs are unchanged.
         """
         if df.empty:
             return {"error": "No data loaded"}
         
-        knowledge = {
-            "dataset_overview": self._compute_dataset_overview(df),
-            "account_health": self._compute_account_health(df),
-            "campaign_portfolio": self._analyze_campaign_portfolio(df),
-            "term_analysis": self._analyze_terms(df),
-            "strategic_insights": self._compute_strategic_insights(df),
-            "patterns_detected": self._detect_patterns(df),
-            "cross_references": self._build_cross_references(df),
-            "optimization_impact": self._compute_optimization_impact(df),  # NEW: Financial impact summary
-            "module_context": self._gather_module_context(),
-            "data_status": self._summarize_data_status()
-        }
+        inputs = inputs or self._knowledge_inputs()
+        cube = build_metrics_cube(df, _KNOWLEDGE_CUBE_ROLLUPS)
+        knowledge = {name: self._compute_section(name, df, inputs, cube) for name in KNOWLEDGE_SECTIONS}
+        knowledge["optimization_impact"]["realized_impact_30d"] = self._compute_realized_impact(inputs['client_id'])
+        knowledge["module_context"] = self._gather_module_context()
+        knowledge["data_status"] = self._summarize_data_status()
         
         return knowledge
-
-    def _compute_dataset_overview(self, df: pd.DataFrame) -> Dict[str, Any]:
+    
+    def _compute_section(self, name: str, df: pd.DataFrame, inputs: Dict[str, Any],
+                         cube: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        One knowledge graph section from the granular dataset (no session access).
+        
+        cube: metrics cube of df (build_metrics_cube), shared by the sections of one build.
+        """
+        if name == "dataset_overview":
+            return self._compute_dataset_overview(df, cube)
+        if name == "account_health":
+            return self._compute_account_health(df, inputs['target_roas'], cube)
+        if name == "campaign_portfolio":
+            return self._analyze_campaign_portfolio(df, cube)
+        if name == "term_analysis":
+            return self._analyze_terms(df)
+        if name == "strategic_insights":
+            return self._compute_strategic_insights(df, inputs['target_roas'])
+        if name == "patterns_detected":
+            return self._detect_patterns(df)
+        if name == "cross_references":
+            return self._build_cross_references(df)
+        if name == "optimization_impact":
+            return self._compute_optimization_impact(df, inputs)  # Financial impact summary
+        raise KeyError(name)
+
+    def _compute_dataset_overview(self, df: pd.DataFrame, cube: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Compute high-level dataset statistics."""
-        total_spend = df['Spend'].sum()
-        total_sales = df['Sales'].sum()
-        total_orders = df['Orders'].sum()
-        total_clicks = df['Clicks'].sum()
+        totals = (cube or build_metrics_cube(df, {}))['totals']
+        total_spend = totals['spend']
+        total_sales = totals['sales']
+        total_orders = totals['orders']
+        total_clicks = totals['clicks']
         
         return {
             "total_search_terms": df['Customer Search Term'].nunique(),
@@ -390,18 +449,21 @@ If Auto outperforms Manual: Discovery is working - harvest more aggressively
             "global_acos": round((total_spend / total_sales * 100), 2) if total_sales > 0 else 0
         }
 
-    def _compute_account_health(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _compute_account_health(self, df: pd.DataFrame, target_roas: Optional[float] = None,
+                                cube: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Compute account health score and breakdown."""
-        total_spend = df['Spend'].sum()
-        total_sales = df['Sales'].sum()
-        roas = total_sales / total_spend if total_spend > 0 else 0
+        cube = cube or build_metrics_cube(df, {})
+        total_spend = cube['totals']['spend']
+        total_sales = cube['totals']['sales']
+        roas = cube['totals']['roas']
         
         # Calculate waste (spend on 0-order terms)
-        wasted_spend = df[df['Orders'] == 0]['Spend'].sum()
+        wasted_spend = cube['zero_order_spend']
         waste_ratio = wasted_spend / total_spend if total_spend > 0 else 0
         
         # ROAS Score (Uses dynamic Target ROAS)
-        target_roas = st.session_state.get('opt_target_roas', 3.0)
+        if target_roas is None:
+            target_roas = st.session_state.get('opt_target_roas', 3.0)
         roas_score = min(100, (roas / target_roas) * 100)
         waste_score = max(0, 100 - (waste_ratio * 200))  # 50% waste = 0 score
         
@@ -439,22 +501,14 @@ If Auto outperforms Manual: Discovery is working - harvest more aggressively
             }
         }
 
-    def _analyze_campaign_portfolio(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_campaign_portfolio(self, df: pd.DataFrame, cube: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Segment campaigns into winners, losers, emerging, stalled."""
         if 'Campaign Name' not in df.columns:
             return {}
         
-        camp_stats = df.groupby('Campaign Name').agg({
-            'Spend': 'sum',
-            'Sales': 'sum',
-            'Orders': 'sum',
-            'Clicks': 'sum',
-            'Impressions': 'sum'
-        }).reset_index()
-        
-        camp_stats['ROAS'] = camp_stats['Sales'] / camp_stats['Spend']
-        camp_stats['ROAS'] = camp_stats['ROAS'].replace([np.inf, -np.inf], 0).fillna(0)
-        camp_stats['CVR'] = np.where(camp_stats['Clicks'] > 0, camp_stats['Orders'] / camp_stats['Clicks'] * 100, 0)
+        # Campaign rollup (sums, ROAS, CVR %) from the metrics cube
+        cube = cube or build_metrics_cube(df, _KNOWLEDGE_CUBE_ROLLUPS)
+        camp_stats = cube['rollups']['campaign'].copy()
         
         total_spend = camp_stats['Spend'].sum()
         camp_stats['Spend_Share'] = camp_stats['Spend'] / total_spend * 100 if total_spend > 0 else 0
@@ -567,7 +621,7 @@ If Auto outperforms Manual: Discovery is working - harvest more aggressively
             "scalable_opportunities": [format_term(r) for _, r in scalable.iterrows()]
         }
 
-    def _compute_strategic_insights(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _compute_strategic_insights(self, df: pd.DataFrame, target_roas: Optional[float] = None) -> List[Dict[str, Any]]:
         """
         Pre-compute strategic insights that the AI should reference.
         These are NOT summaries - they are STRATEGIC OBSERVATIONS.
@@ -595,7 +649,7 @@ If Auto outperforms Manual: Discovery is working - harvest more aggressively
             insights.append(high_spend_zero)
         
         # Insight 5: Untapped Scalers
-        scalers = self._find_untapped_scalers(df)
+        scalers = self._find_untapped_scalers(df, target_roas)
         if scalers:
             insights.append(scalers)
         
@@ -672,10 +726,7 @@ If Auto outperforms Manual: Discovery is working - harvest more aggressively
             return None
         
         # Categorize match types
-        def categorize_match(row):
-            mt = str(row.get('Match Type', '')).lower()
-            targeting = str(row.get('Targeting', '')).lower()
-            
+        def categorize_match(mt, targeting):
             if 'exact' in mt:
                 return 'EXACT'
             elif 'phrase' in mt:
@@ -691,10 +742,16 @@ If Auto outperforms Manual: Discovery is working - harvest more aggressively
             else:
                 return 'OTHER'
         
-        df_match = df.copy()
-        df_match['Match_Category'] = df_match.apply(categorize_match, axis=1)
+        # Categorize each distinct (match type, targeting) pair once
+        pairs = pd.DataFrame({
+            'mt': df['Match Type'].astype(str).str.lower(),
+            'targeting': df['Targeting'].astype(str).str.lower() if 'Targeting' in df.columns else '',
+        })
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(pairs))
+        categories = np.array([categorize_match(mt, t) for mt, t in uniques], dtype=object)
+        match_category = pd.Series(categories[codes], index=df.index, name='Match_Category')
         
-        match_stats = df_match.groupby('Match_Category').agg({
+        match_stats = df.groupby(match_category).agg({
             'Spend': 'sum',
             'Sales': 'sum',
             'Clicks': 'sum',
@@ -756,7 +813,7 @@ If Auto outperforms Manual: Discovery is working - harvest more aggressively
             "action": "Immediate negative addition. Investigate WHY clicks don't convert (competitor? price? listing?)"
         }
 
-    def _find_untapped_scalers(self, df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    def _find_untapped_scalers(self, df: pd.DataFrame, target_roas: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """Find high-performing terms that could be scaled."""
         term_agg = df.groupby('Customer Search Term').agg({
             'Spend': 'sum',
@@ -769,7 +826,8 @@ If Auto outperforms Manual: Discovery is working - harvest more aggressively
         term_agg['ROAS'] = term_agg['ROAS'].replace([np.inf, -np.inf], 0).fillna(0)
         
         # High ROAS vs Target (Top 20%) but low spend
-        target_roas = st.session_state.get('opt_target_roas', 3.0)
+        if target_roas is None:
+            target_roas = st.session_state.get('opt_target_roas', 3.0)
         spend_median = term_agg['Spend'].median()
         scalers = term_agg[(term_agg['ROAS'] > target_roas * 1.2) & (term_agg['Spend'] < spend_median) & (term_agg['Orders'] >= 2)]
         
@@ -995,32 +1053,43 @@ PLATFORM METHODOLOGY & ENGINE LOGIC (UPDATED DEC 25, 2025)
    - Used to prove engine ROI.
 """
 
-    def _compute_optimization_impact(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _compute_realized_impact(self, client_id: Optional[str]) -> Optional[Dict[str, Any]]:
         """
-        Calculate the financial impact of optimization recommendations.
-        Merges PROJECETD impact (from current recommendations) with REALIZED impact (from DB).
+        REALIZED impact of actions taken in the last 30 days (from DB).
+        
+        Read on every turn rather than cached with the knowledge graph: the query
+        cache expires it and drops it when the client's actions or stats change.
         """
-        # 1. Fetch Realized Impact (DB)
-        realized_impact = None
+        if client_id is None:
+            return None
         try:
-            if 'client_id' in st.session_state:
-                client_id = st.session_state['client_id']
-                impact_df = get_db_manager().get_action_impact(client_id, window_days=30)
-                if not impact_df.empty:
-                    # Filter active
-                    active_mask = (impact_df['before_spend'].fillna(0) + impact_df['after_spend'].fillna(0)) > 0
-                    active_df = impact_df[active_mask].copy()
-                    if not active_df.empty:
-                        realized_impact = {
-                            "incremental_revenue": round(active_df['impact_score'].sum(), 2),
-                            "action_count": int(len(active_df)),
-                            "description": "Actual realized revenue lift from actions taken in the last 30 days"
-                        }
+            impact_df = get_db_manager().get_action_impact(client_id, window_days=30)
+            if impact_df.empty:
+                return None
+            # Filter active
+            active_mask = (impact_df['before_spend'].fillna(0) + impact_df['after_spend'].fillna(0)) > 0
+            active_df = impact_df[active_mask]
+            if active_df.empty:
+                return None
+            return {
+                "incremental_revenue": round(active_df['impact_score'].sum(), 2),
+                "action_count": int(len(active_df)),
+                "description": "Actual realized revenue lift from actions taken in the last 30 days"
+            }
         except Exception:
-            pass
+            return None
 
-        # 2. Projected Impact Loop Restoration
-        opt_res = st.session_state.get('optimizer_results') or st.session_state.get('latest_optimizer_run')
+    def _compute_optimization_impact(self, df: pd.DataFrame, inputs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Calculate the financial impact of optimization recommendations.
+        PROJECTED impact only (from current recommendations); callers fill in
+        'realized_impact_30d' with _compute_realized_impact.
+        """
+        inputs = inputs or self._knowledge_inputs()
+        realized_impact = None
+
+        # Projected Impact Loop Restoration
+        opt_res = inputs['opt_res']
         
         if not opt_res:
             return {"status": "Optimizer not run yet", "realized_impact_30d": realized_impact}
@@ -1304,6 +1373,155 @@ PLATFORM METHODOLOGY & ENGINE LOGIC (UPDATED DEC 25, 2025)
         
         return status
 
+    # =========================================================================
+    # KNOWLEDGE GRAPH CACHE
+    # =========================================================================
+
+    def _knowledge_inputs(self) -> Dict[str, Any]:
+        """
+        Snapshot of the session inputs the knowledge graph is built from, with
+        their fingerprints. Read on the script thread; builds only use the snapshot.
+        """
+        str_df, dataset_fp = None, None
+        if 'unified_data' in st.session_state and st.session_state.unified_data.get('search_term_report') is not None:
+            str_df = st.session_state.unified_data['search_term_report']
+            dataset_fp = DataHub().get_fingerprint('search_term_report')
+        elif 'data' in st.session_state and 'search_term_report' in st.session_state['data']:
+            str_df = st.session_state['data']['search_term_report']  # Legacy path: never cached
+        
+        opt_res = st.session_state.get('optimizer_results') or st.session_state.get('latest_optimizer_run')
+        target_roas = st.session_state.get('opt_target_roas', 3.0)
+        client_id = st.session_state.get('client_id')
+        return {
+            'str_df': str_df,
+            'opt_res': opt_res,
+            'target_roas': target_roas,
+            'client_id': client_id,
+            'fingerprints': {
+                'dataset': dataset_fp,
+                'optimizer': self._results_fingerprint(opt_res),
+                'target_roas': repr(target_roas),
+            },
+        }
+    
+    @staticmethod
+    def _results_fingerprint(opt_res: Optional[Dict[str, Any]]) -> str:
+        """Fingerprint of the optimizer result columns the graph reads, memoized per results object."""
+        if not opt_res:
+            return 'none'
+        memo = st.session_state.get('_knowledge_results_fp')
+        if memo is None or memo[0] is not opt_res:
+            parts = []
+            for name, columns in _KNOWLEDGE_RESULT_COLUMNS.items():
+                frame = opt_res.get(name)
+                if isinstance(frame, pd.DataFrame):
+                    read = frame[[c for c in columns if c in frame.columns]]
+                    parts.append((len(frame), list(read.columns), frame_fingerprint(read)))
+                else:
+                    parts.append(None)
+            memo = (opt_res, hashlib.sha1(repr(parts).encode()).hexdigest())
+            st.session_state['_knowledge_results_fp'] = memo
+        return memo[1]
+    
+    @staticmethod
+    def _section_keys(fingerprints: Dict[str, Optional[str]]) -> Optional[Dict[str, str]]:
+        """Cache key per section from its inputs' fingerprints (None when the dataset has no ID)."""
+        if fingerprints['dataset'] is None:
+            return None
+        return {
+            name: hashlib.sha1(repr((name, [fingerprints[d] for d in deps])).encode()).hexdigest()
+            for name, deps in KNOWLEDGE_SECTIONS.items()
+        }
+    
+    @staticmethod
+    def _cached_sections(keys: Dict[str, str]) -> Dict[str, Any]:
+        """Sections already built for these keys."""
+        with _KNOWLEDGE_LOCK:
+            found = {}
+            for name, key in keys.items():
+                if key in _KNOWLEDGE_CACHE:
+                    _KNOWLEDGE_CACHE.move_to_end(key)
+                    found[name] = _KNOWLEDGE_CACHE[key]
+            return found
+    
+    def _build_sections(self, inputs: Dict[str, Any], keys: Dict[str, str]) -> Dict[str, Any]:
+        """Build and cache the missing sections (one granular dataset for all of them)."""
+        missing = [name for name in keys if name not in self._cached_sections(keys)]
+        if not missing:
+            return {}
+        df = self._construct_granular_dataset(inputs)
+        cube = build_metrics_cube(df, _KNOWLEDGE_CUBE_ROLLUPS) if not df.empty else None
+        built = {name: (self._compute_section(name, df, inputs, cube) if not df.empty else None) for name in missing}
+        with _KNOWLEDGE_LOCK:
+            for name, value in built.items():
+                _KNOWLEDGE_CACHE[keys[name]] = value
+            while len(_KNOWLEDGE_CACHE) > _KNOWLEDGE_CACHE_MAX:
+                _KNOWLEDGE_CACHE.popitem(last=False)
+        return built
+    
+    def warm_knowledge_graph(self) -> bool:
+        """
+        Start building stale sections in the background (after an upload or
+        optimizer run) so the next chat turn finds them cached. Returns True if
+        a build was started.
+        """
+        inputs = self._knowledge_inputs()
+        keys = self._section_keys(inputs['fingerprints'])
+        if keys is None or len(self._cached_sections(keys)) == len(keys):
+            return False
+        
+        build_id = tuple(sorted(keys.values()))
+        with _KNOWLEDGE_LOCK:
+            running = _KNOWLEDGE_BUILDS.get(build_id)
+            if running is not None and running.is_alive():
+                return False
+            
+            def build():
+                try:
+                    self._build_sections(inputs, keys)
+                except Exception as e:
+                    print(f"Knowledge graph: background build failed: {e}")
+                finally:
+                    with _KNOWLEDGE_LOCK:
+                        _KNOWLEDGE_BUILDS.pop(build_id, None)
+            
+            thread = threading.Thread(target=build, name='knowledge-graph', daemon=True)
+            _KNOWLEDGE_BUILDS[build_id] = thread
+        thread.start()
+        return True
+    
+    def get_knowledge_graph(self) -> Optional[Dict[str, Any]]:
+        """
+        The knowledge graph for the current session data, or None when no usable
+        search term data is loaded.
+        
+        Sections come from the cache when their inputs are unchanged; a background
+        build for the same inputs is waited on rather than repeated. Module context
+        and data status are always read live.
+        """
+        inputs = self._knowledge_inputs()
+        keys = self._section_keys(inputs['fingerprints'])
+        if keys is None:
+            df = self._construct_granular_dataset(inputs)
+            return None if df.empty else self._build_knowledge_graph(df, inputs)
+        
+        with _KNOWLEDGE_LOCK:
+            running = _KNOWLEDGE_BUILDS.get(tuple(sorted(keys.values())))
+        if running is not None:
+            running.join()
+        
+        sections = self._cached_sections(keys)
+        if len(sections) < len(keys):
+            sections.update(self._build_sections(inputs, keys))
+        if sections["dataset_overview"] is None:
+            return None
+        
+        knowledge = {name: copy.deepcopy(sections[name]) for name in KNOWLEDGE_SECTIONS}
+        knowledge["optimization_impact"]["realized_impact_30d"] = self._compute_realized_impact(inputs['client_id'])
+        knowledge["module_context"] = self._gather_module_context()
+        knowledge["data_status"] = self._summarize_data_status()
+        return knowledge
+
     # =========================================================================
     # CONTEXT FORMATTING
     # =========================================================================
@@ -1313,15 +1531,13 @@ PLATFORM METHODOLOGY & ENGINE LOGIC (UPDATED DEC 25, 2025)
         Build the comprehensive context for the AI.
         Returns a JSON-formatted knowledge graph.
         """
-        df = self._construct_granular_dataset()
+        knowledge = self.get_knowledge_graph()
         
-        if df.empty:
+        if knowledge is None:
             return json.dumps({
                 "error": "No data loaded yet. Please upload a Search Term Report in the Data Hub."
             }, indent=2)
         
-        knowledge = self._build_knowledge_graph(df)
-        
         # Format as JSON for better LLM parsing
         return json.dumps(knowledge, indent=2, default=str)
 
@@ -1330,7 +1546,7 @@ PLATFORM METHODOLOGY & ENGINE LOGIC (UPDATED DEC 25, 2025)
     # =========================================================================
 
     def _call_llm(self, messages):
-        """Calls OpenAI API using the requests library."""
+        """Calls OpenAI API through the shared LLM gateway (cached, pooled, coalesced)."""
         api_key = st.secrets.get("OPENAI_API_KEY")
         if not api_key:
             return "⚠️ OpenAI API Key not found in secrets. Please configure it."
@@ -1348,9 +1564,8 @@ PLATFORM METHODOLOGY & ENGINE LOGIC (UPDATED DEC 25, 2025)
         }
         
         try:
-            response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload, timeout=60)
-            response.raise_for_status()
-            return response.json()['choices'][0]['message']['content']
+            response = get_gateway().call(OPENAI_CHAT_URL, headers, payload, timeout=60)
+            return response['choices'][0]['message']['content']
         except Exception as e:
             return f"❌ Error communicating with AI: {str(e)}"
 
@@ -1442,8 +1657,8 @@ PLATFORM METHODOLOGY & ENGINE LOGIC (UPDATED DEC 25, 2025)
         """
         import base64
         
-        # Build context
-        data_context = self._get_context()
+        # Knowledge graph is built in the background and only read when a question is asked
+        self.warm_knowledge_graph()
         
         # Initialize chat history
         if "messages" not in st.session_state:
@@ -1474,6 +1689,7 @@ PLATFORM METHODOLOGY & ENGINE LOGIC (UPDATED DEC 25, 2025)
 
                 with st.chat_message("assistant"):
                     with st.spinner("Analyzing your data..."):
+                        data_context = self._get_context()
                         full_messages = [
                             {"role": "system", "content": self.system_prompt},
                             {"role": "system", "content": f"KNOWLEDGE GRAPH (Your complete dataset analysis):\n{data_context}"}
@@ -1548,19 +1764,16 @@ def get_dynamic_key_insights() -> list:
             except Exception as e:
                 # If optimizer data is corrupted, try to rebuild
                 assistant = AssistantModule()
-                df = assistant._construct_granular_dataset()
-                if df.empty:
+                knowledge = assistant.get_knowledge_graph()
+                if knowledge is None:
                     return _get_insights_from_database()
-                knowledge = assistant._build_knowledge_graph(df)
         else:
-            # No optimizer results - try to build from raw data
+            # No optimizer results - build from raw data (cached knowledge graph)
             assistant = AssistantModule()
-            df = assistant._construct_granular_dataset()
+            knowledge = assistant.get_knowledge_graph()
             
-            if df.empty:
+            if knowledge is None:
                 return _get_insights_from_database()
-            
-            knowledge = assistant._build_knowledge_graph(df)
         
         if "error" in knowledge or not knowledge:
             return _get_insights_from_database()
@@ -0,0 +1,373 @@
+"""
+Batch Optimizer - Headless Multi-Account Runner
+
+Runs the optimizer pipeline (prepare_data -> benchmarks -> harvest -> negatives
+-> bids -> heatmap -> simulation) for many accounts outside Streamlit, one
+account per task in a process pool:
+- Loads each account from the DB manager (same 4-week window + enrichment as the UI)
+- Writes the results workbook and bulk upload files per account
+- Logs actions through log_action_batch (same action dicts as the UI)
+- Records per-stage timings and peak memory per account
+
+Workers are recycled after each account (max_tasks_per_child) and can be capped
+with an address-space limit, so one oversized account fails alone with a
+MemoryError instead of taking the machine down.
+
+Usage:
+    python -m features.batch_optimizer --all --workers 4
+    python -m features.batch_optimizer ACCOUNT_A ACCOUNT_B --output-dir exports/monday
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+# Keep BLAS single-threaded in workers; the pool provides the parallelism
+_WORKER_ENV = {
+    "OMP_NUM_THREADS": "1",
+    "OPENBLAS_NUM_THREADS": "1",
+    "MKL_NUM_THREADS": "1",
+}
+
+# Results workbook sheets (results key -> sheet name)
+RESULT_SHEETS = {
+    "harvest": "Harvest",
+    "neg_kw": "Negative Keywords",
+    "neg_pt": "Negative PT",
+    "bids_exact": "Bids Exact",
+    "bids_pt": "Bids PT",
+    "bids_agg": "Bids Aggregated",
+    "bids_auto": "Bids Auto",
+    "heatmap": "Heatmap",
+}
+
+
+# ==========================================
+# WORKER
+# ==========================================
+
+def _init_worker(memory_limit_mb: Optional[int]):
+    """Pool initializer: apply the per-worker address-space cap."""
+    if not memory_limit_mb:
+        return
+    try:
+        import resource
+        limit = int(memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        print(f"Batch worker {os.getpid()}: memory limit not applied ({e})")
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KB on Linux, bytes on macOS
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        return None
+
+
+def _open_db(task: dict):
+    """DB manager for a worker: explicit SQLite path, else the standard factory."""
+    if task.get("db_path"):
+        from core.db_manager import DatabaseManager
+        return DatabaseManager(Path(task["db_path"]))
+    from core.db_manager import get_db_manager
+    return get_db_manager(task.get("test_mode", False))
+
+
+def _excel_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """Stringify object cells Excel can't hold (e.g. recommendation objects)."""
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        values = df[col]
+        if not values.map(lambda v: v is None or isinstance(v, (str, int, float, bool))).all():
+            df[col] = values.map(lambda v: v if v is None or isinstance(v, (str, int, float, bool)) else str(v))
+    return df
+
+
+def write_account_outputs(results: dict, account_dir: Path) -> List[str]:
+    """Write the results workbook and bulk upload files for one account."""
+    from features.bulk_export import generate_negatives_bulk, generate_bids_bulk
+    from utils.formatters import dataframe_to_excel
+
+    account_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+
+    # 1. Results workbook (one sheet per result table + simulation)
+    results_path = account_dir / "optimizer_results.xlsx"
+    with pd.ExcelWriter(results_path, engine="xlsxwriter") as writer:
+        for key, sheet in RESULT_SHEETS.items():
+            table = results.get(key)
+            if isinstance(table, pd.DataFrame) and not table.empty:
+                _excel_safe(table).to_excel(writer, sheet_name=sheet, index=False)
+        simulation = results.get("simulation") or {}
+        if simulation.get("scenarios"):
+            pd.DataFrame(simulation["scenarios"]).T.to_excel(writer, sheet_name="Simulation")
+        if isinstance(simulation.get("sensitivity"), pd.DataFrame) and not simulation["sensitivity"].empty:
+            simulation["sensitivity"].to_excel(writer, sheet_name="Sensitivity", index=False)
+        if not writer.sheets:
+            pd.DataFrame({"Status": ["No recommendations"]}).to_excel(writer, sheet_name="Summary", index=False)
+    written.append(results_path.name)
+
+    # 2. Bulk files (same files as the Downloads tab)
+    neg_kw = results.get("neg_kw", pd.DataFrame())
+    neg_pt = results.get("neg_pt", pd.DataFrame())
+    if not neg_kw.empty or not neg_pt.empty:
+        kw_bulk, _ = generate_negatives_bulk(neg_kw, neg_pt)
+        if not kw_bulk.empty:
+            (account_dir / "negative_keywords.xlsx").write_bytes(dataframe_to_excel(kw_bulk))
+            written.append("negative_keywords.xlsx")
+
+    all_bids = pd.concat([results.get("direct_bids", pd.DataFrame()), results.get("agg_bids", pd.DataFrame())], ignore_index=True)
+    if not all_bids.empty:
+        bid_bulk, _ = generate_bids_bulk(all_bids)
+        if not bid_bulk.empty:
+            (account_dir / "bid_optimizations.xlsx").write_bytes(dataframe_to_excel(bid_bulk))
+            written.append("bid_optimizations.xlsx")
+
+    harvest = results.get("harvest", pd.DataFrame())
+    if not harvest.empty:
+        (account_dir / "harvest_candidates.xlsx").write_bytes(dataframe_to_excel(_excel_safe(harvest)))
+        written.append("harvest_candidates.xlsx")
+
+    return written
+
+
+def optimize_account(task: dict) -> Dict[str, Any]:
+    """
+    Run the optimizer for one account (executes inside a pool worker).
+
+    Returns a small, picklable summary; results stay on disk, not in the parent.
+    """
+    import streamlit as st
+    from core.data_hub import DataHub
+    from features.optimizer import DEFAULT_CONFIG, run_optimization, build_optimization_actions
+
+    account_id = task["account_id"]
+    summary = {"account_id": account_id, "status": "ok", "rows": 0, "actions_logged": 0, "error": None}
+    timings = {}
+    started = time.perf_counter()
+    hub = DataHub()
+
+    try:
+        db = _open_db(task)
+        st.session_state["test_mode"] = task.get("test_mode", False)
+        # Session-only inputs must not leak between accounts in a reused worker
+        st.session_state.pop("latest_asin_analysis", None)
+        st.session_state.pop("last_stats_save", None)
+
+        t0 = time.perf_counter()
+        loaded = hub.load_from_database(account_id, db=db)
+        timings["load"] = time.perf_counter() - t0
+        if not loaded:
+            summary["status"] = "no_data"
+            return summary
+
+        df = hub.get_enriched_data()
+        if df is None:
+            df = hub.get_data("search_term_report")
+        summary["rows"] = len(df)
+
+        config = DEFAULT_CONFIG.copy()
+        config.update(task.get("config") or {})
+        results = run_optimization(df, config, timings)
+        del df
+
+        t0 = time.perf_counter()
+        summary["files"] = write_account_outputs(results, Path(task["output_dir"]) / str(account_id))
+        timings["write"] = time.perf_counter() - t0
+
+        summary.update({
+            "harvest": len(results["harvest"]),
+            "negatives": len(results["neg_kw"]) + len(results["neg_pt"]),
+            "bid_changes": len(results["direct_bids"]) + len(results["agg_bids"]),
+        })
+
+        if task.get("log_actions", True):
+            t0 = time.perf_counter()
+            actions = build_optimization_actions(results)
+            report_date = st.session_state.get("last_stats_save", {}).get("start_date") or datetime.now().strftime("%Y-%m-%d")
+            batch_id = str(uuid.uuid4())[:8]
+            summary["actions_logged"] = db.log_action_batch(actions, account_id, batch_id, report_date) if actions else 0
+            summary["batch_id"] = batch_id
+            timings["log_actions"] = time.perf_counter() - t0
+
+        del results
+    except MemoryError:
+        summary["status"] = "error"
+        summary["error"] = "MemoryError: account exceeded the worker memory limit"
+    except Exception as e:
+        summary["status"] = "error"
+        summary["error"] = f"{type(e).__name__}: {e}"
+        print(f"Batch optimizer: account {account_id} failed\n{traceback.format_exc()}")
+    finally:
+        hub.clear_all()
+        gc.collect()
+        timings["total"] = time.perf_counter() - started
+        summary["timings"] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+        summary["peak_rss_mb"] = _peak_rss_mb()
+        summary["pid"] = os.getpid()
+
+    return summary
+
+
+# ==========================================
+# BATCH DRIVER
+# ==========================================
+
+def run_batch(
+    account_ids: List[str],
+    output_dir,
+    config: Optional[dict] = None,
+    workers: Optional[int] = None,
+    test_mode: bool = False,
+    db_path: Optional[str] = None,
+    log_actions: bool = True,
+    max_tasks_per_child: int = 1,
+    memory_limit_mb: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Optimize many accounts in a process pool.
+
+    Args:
+        account_ids: Accounts (client_ids) to optimize
+        output_dir: Root folder; each account writes to output_dir/<account_id>/
+        config: Overrides applied on top of DEFAULT_CONFIG
+        workers: Pool size (default: min(4, CPUs, accounts))
+        test_mode: Use the test database (ignored when db_path is set)
+        db_path: Explicit SQLite database file
+        log_actions: Log optimizer actions to actions_log
+        max_tasks_per_child: Accounts per worker before it is replaced (frees memory)
+        memory_limit_mb: Per-worker address-space cap (POSIX only)
+
+    Returns:
+        Summary DataFrame (one row per account), also saved as batch_summary.csv
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if not account_ids:
+        return pd.DataFrame()
+
+    workers = workers or min(4, os.cpu_count() or 1, len(account_ids))
+    for key, value in _WORKER_ENV.items():
+        os.environ.setdefault(key, value)
+
+    tasks = [{
+        "account_id": account_id,
+        "output_dir": str(output_dir),
+        "config": config or {},
+        "test_mode": test_mode,
+        "db_path": str(db_path) if db_path else None,
+        "log_actions": log_actions,
+    } for account_id in account_ids]
+
+    print(f"Batch optimizer: {len(tasks)} accounts, {workers} workers -> {output_dir}")
+    started = time.perf_counter()
+    summaries = []
+
+    # spawn: workers start clean (no inherited Streamlit/DB state), required for max_tasks_per_child
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(memory_limit_mb,),
+        max_tasks_per_child=max_tasks_per_child,
+    ) as pool:
+        futures = {pool.submit(optimize_account, task): task["account_id"] for task in tasks}
+        for future in as_completed(futures):
+            account_id = futures[future]
+            try:
+                summary = future.result()
+            except BrokenProcessPool as e:
+                summary = {"account_id": account_id, "status": "error", "error": f"Worker died: {e}", "timings": {}}
+            except Exception as e:
+                # e.g. MemoryError while the worker was still importing
+                summary = {"account_id": account_id, "status": "error", "error": f"{type(e).__name__}: {e}", "timings": {}}
+            summaries.append(summary)
+            total = summary.get("timings", {}).get("total", 0.0)
+            detail = summary.get("error") or f"{summary.get('rows', 0):,} rows, {summary.get('actions_logged', 0)} actions"
+            print(f"  [{len(summaries)}/{len(tasks)}] {account_id}: {summary['status']} in {total:.1f}s ({detail})")
+
+    elapsed = time.perf_counter() - started
+    summary_df = _summary_frame(summaries, account_ids)
+    summary_df.to_csv(output_dir / "batch_summary.csv", index=False)
+
+    ok = int((summary_df["status"] == "ok").sum())
+    print(f"Batch optimizer: {ok}/{len(tasks)} accounts optimized in {elapsed:.1f}s")
+    return summary_df
+
+
+def _summary_frame(summaries: List[dict], account_ids: List[str]) -> pd.DataFrame:
+    """Flatten worker summaries (timings -> t_<stage> columns) in input order."""
+    rows = []
+    for summary in summaries:
+        row = {k: v for k, v in summary.items() if k not in ("timings", "files")}
+        row["files"] = ";".join(summary.get("files", []))
+        for stage, seconds in summary.get("timings", {}).items():
+            row[f"t_{stage}"] = seconds
+        rows.append(row)
+    order = {account_id: i for i, account_id in enumerate(account_ids)}
+    return pd.DataFrame(rows).sort_values("account_id", key=lambda s: s.map(order)).reset_index(drop=True)
+
+
+def _all_account_ids(test_mode: bool, db_path: Optional[str]) -> List[str]:
+    db = _open_db({"test_mode": test_mode, "db_path": db_path})
+    return [row[0] for row in db.get_all_accounts()]
+
+
+# ==========================================
+# CLI
+# ==========================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the PPC optimizer headless for many accounts.")
+    parser.add_argument("accounts", nargs="*", help="Account IDs to optimize")
+    parser.add_argument("--all", action="store_true", help="Optimize every account in the database")
+    parser.add_argument("--output-dir", default=None, help="Output folder (default: exports/batch_<timestamp>)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: min(4, CPUs))")
+    parser.add_argument("--config", default=None, help="JSON file with optimizer config overrides")
+    parser.add_argument("--db-path", default=None, help="SQLite database file (default: DATABASE_URL / data/ppc_live.db)")
+    parser.add_argument("--test-mode", action="store_true", help="Use the test database")
+    parser.add_argument("--no-log", action="store_true", help="Do not write actions to actions_log")
+    parser.add_argument("--memory-limit-mb", type=int, default=None, help="Per-worker memory cap in MB")
+    parser.add_argument("--max-tasks-per-child", type=int, default=1, help="Accounts per worker before recycling it")
+    args = parser.parse_args(argv)
+
+    account_ids = list(args.accounts)
+    if args.all:
+        account_ids += [a for a in _all_account_ids(args.test_mode, args.db_path) if a not in account_ids]
+    if not account_ids:
+        parser.error("no accounts given (pass account IDs or --all)")
+
+    config = None
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+
+    output_dir = args.output_dir or Path("exports") / f"batch_{datetime.now():%Y%m%d_%H%M%S}"
+    summary = run_batch(
+        account_ids, output_dir, config=config, workers=args.workers,
+        test_mode=args.test_mode, db_path=args.db_path, log_actions=not args.no_log,
+        max_tasks_per_child=args.max_tasks_per_child, memory_limit_mb=args.memory_limit_mb,
+    )
+    return 0 if (summary["status"] != "error").all() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
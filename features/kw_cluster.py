@@ -5,16 +5,140 @@ Uses semantic clustering + Claude API to analyze search terms
 and provide actionable strategic recommendations.
 """
 
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from threadpoolctl import threadpool_limits
 from features._base import BaseFeature
 from core.data_loader import SmartMapper, load_uploaded_file, safe_numeric
 from api.anthropic_client import AnthropicClient
 
+# Candidate K values are fitted in parallel (one thread per K, each fit single-threaded).
+# The limit is OpenMP's, set inside each worker: that setting is per thread, so the rest
+# of the process keeps its thread pools (KMeans already pins BLAS to 1 during its fit).
+CLUSTER_WORKERS = int(os.getenv('CLUSTER_WORKERS', str(os.cpu_count() or 1)))
+# From this many unique terms, fit MiniBatchKMeans instead of full-batch KMeans(n_init=10)
+MINIBATCH_MIN_TERMS = 10_000
+# Silhouette is O(n^2): above this many terms, score a label-stratified sample of this size
+SILHOUETTE_SAMPLE_SIZE = 4_000
+# Fitted clusterings by dataset fingerprint (in-process LRU), so re-running is instant
+_CLUSTER_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_CLUSTER_CACHE_MAX = 8
+_CLUSTER_CACHE_LOCK = threading.Lock()
+
+
+# ==========================================
+# CLUSTERING ENGINE
+# ==========================================
+
+def _fit_labels(tfidf_matrix, k: int, threads: Optional[int] = None) -> np.ndarray:
+    """
+    Cluster labels for K: full-batch KMeans on small inputs, MiniBatchKMeans on large ones.
+    
+    threads: OpenMP threads for this fit (None = default); limits only the calling thread.
+    """
+    if tfidf_matrix.shape[0] >= MINIBATCH_MIN_TERMS:
+        model = MiniBatchKMeans(n_clusters=k, random_state=42, n_init=3, batch_size=4096)
+    else:
+        model = KMeans(n_clusters=k, random_state=42, n_init=10)
+    with threadpool_limits(limits=threads, user_api='openmp'):
+        return model.fit_predict(tfidf_matrix)
+
+
+def _stratified_sample(labels: np.ndarray, size: int, seed: int = 42) -> np.ndarray:
+    """
+    Sorted row positions of a ~size sample, allocated to clusters in proportion
+    to their size (at least 2 per cluster, so each contributes a silhouette).
+    """
+    counts = np.bincount(labels)
+    quota = np.minimum(counts, np.maximum(2, np.round(counts * size / len(labels)).astype(int)))
+    order = np.random.default_rng(seed).permutation(len(labels))
+    grouped = order[np.argsort(labels[order], kind='stable')]  # by cluster, random order within
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(len(labels)) - np.repeat(starts, counts)
+    return np.sort(grouped[rank < np.repeat(quota, counts)])
+
+
+def _score_k(tfidf_matrix, k: int, threads: Optional[int] = None):
+    """(labels, silhouette score) for K; the score uses a stratified sample on large inputs."""
+    labels = _fit_labels(tfidf_matrix, k, threads)
+    if tfidf_matrix.shape[0] > SILHOUETTE_SAMPLE_SIZE:
+        sample = _stratified_sample(labels, SILHOUETTE_SAMPLE_SIZE)
+        matrix, sample_labels = tfidf_matrix[sample], labels[sample]
+    else:
+        matrix, sample_labels = tfidf_matrix, labels
+    if len(np.unique(sample_labels)) < 2:
+        return labels, -1.0
+    return labels, silhouette_score(matrix, sample_labels)
+
+
+def cluster_search_terms(search_terms: np.ndarray, fingerprint: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Semantic clustering of unique search terms (TF-IDF + K-means, K by silhouette).
+    
+    Returns vectorizer (fitted), labels (aligned with search_terms), n_clusters and
+    the tested K range. With a fingerprint (the DataHub ID of the source dataset,
+    derived for the term column), the result is cached in-process.
+    """
+    if fingerprint is not None:
+        with _CLUSTER_CACHE_LOCK:
+            cached = _CLUSTER_CACHE.get(fingerprint)
+            if cached is not None:
+                _CLUSTER_CACHE.move_to_end(fingerprint)
+                return cached
+    
+    # TF-IDF vectorization
+    vectorizer = TfidfVectorizer(
+        max_features=150,
+        ngram_range=(1, 2),
+        min_df=1,
+        max_df=0.9
+    )
+    tfidf_matrix = vectorizer.fit_transform(search_terms)
+    
+    # Determine optimal number of clusters (natural clustering)
+    min_clusters = 3
+    max_clusters = min(35, len(search_terms) // 10)  # At least 10 terms per cluster
+    
+    if max_clusters <= min_clusters:
+        k_range = None
+        n_clusters = min_clusters
+        cluster_labels = _fit_labels(tfidf_matrix, n_clusters)
+    else:
+        # Try different K values (up to 10) in parallel; keep the best fit's labels
+        k_range = range(min_clusters, min(max_clusters + 1, min_clusters + 10))
+        workers = max(1, min(CLUSTER_WORKERS, len(k_range)))
+        threads = 1 if workers > 1 else None
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kw_cluster') as executor:
+            fits = list(executor.map(lambda k: _score_k(tfidf_matrix, k, threads), k_range))
+        scores = [score for _, score in fits]
+        best_idx = scores.index(max(scores))
+        n_clusters = list(k_range)[best_idx]
+        cluster_labels = fits[best_idx][0]
+    
+    result = {
+        'vectorizer': vectorizer,
+        'labels': cluster_labels,
+        'n_clusters': n_clusters,
+        'k_range': k_range,
+    }
+    if fingerprint is not None:
+        with _CLUSTER_CACHE_LOCK:
+            _CLUSTER_CACHE[fingerprint] = result
+            while len(_CLUSTER_CACHE) > _CLUSTER_CACHE_MAX:
+                _CLUSTER_CACHE.popitem(last=False)
+    return result
+
+
 class AIInsightsModule(BaseFeature):
     """AI-Powered Campaign Insights using semantic clustering."""
     
@@ -49,6 +173,7 @@ class AIInsightsModule(BaseFeature):
         if hub.is_loaded('search_term_report'):
             st.success("✅ Using data from Data Hub")
             self.data = hub.get_enriched_data()
+            self.data_fingerprint = hub.get_fingerprint('enriched_data')
         
         st.markdown("""
         <div class="tab-description">
@@ -74,6 +199,7 @@ class AIInsightsModule(BaseFeature):
             
             if uploaded:
                 self.data = load_uploaded_file(uploaded)
+                self.data_fingerprint = None
                 if self.data is not None:
                     st.success(f"✅ Loaded {len(self.data):,} search terms")
                     
@@ -85,7 +211,7 @@ class AIInsightsModule(BaseFeature):
                 
             if st.button("🚀 Run Cluster Analysis", type="primary", use_container_width=True):
                 with st.spinner("Analyzing semantic patterns..."):
-                    results = self.analyze(self.data)
+                    results = self.analyze(self.data, getattr(self, 'data_fingerprint', None))
                     
                     # Persist for AI Assistant
                     st.session_state['latest_ai_insights'] = results
@@ -127,8 +253,12 @@ class AIInsightsModule(BaseFeature):
         
         return True, ""
     
-    def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
-        """Perform semantic clustering and AI analysis."""
+    def analyze(self, data: pd.DataFrame, fingerprint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Perform semantic clustering and AI analysis.
+        
+        fingerprint: DataHub ID of data; the clustering is then reused across runs.
+        """
         # Check if columns already in standard format (from Data Hub)
         if 'Customer Search Term' in data.columns:
             # Already renamed - use directly
@@ -152,45 +282,13 @@ class AIInsightsModule(BaseFeature):
         search_terms = data[term_col].dropna().unique()
         
         with st.spinner("Clustering search terms..."):
-            # TF-IDF vectorization
-            vectorizer = TfidfVectorizer(
-                max_features=150,
-                ngram_range=(1, 2),
-                min_df=1,
-                max_df=0.9
-            )
-            
-            tfidf_matrix = vectorizer.fit_transform(search_terms)
-            
-            # Determine optimal number of clusters (natural clustering)
-            # Use elbow method with silhouette score
-            from sklearn.metrics import silhouette_score
-            
-            min_clusters = 3
-            max_clusters = min(35, len(search_terms) // 10)  # At least 10 terms per cluster
-            
-            if max_clusters <= min_clusters:
-                n_clusters = min_clusters
-            else:
-                # Try different K values and find optimal
-                silhouette_scores = []
-                K_range = range(min_clusters, min(max_clusters + 1, min_clusters + 10))  # Test up to 10 values
-                
-                for k in K_range:
-                    kmeans_test = KMeans(n_clusters=k, random_state=42, n_init=10)
-                    labels = kmeans_test.fit_predict(tfidf_matrix)
-                    score = silhouette_score(tfidf_matrix, labels)
-                    silhouette_scores.append(score)
-                
-                # Pick K with highest silhouette score
-                best_idx = silhouette_scores.index(max(silhouette_scores))
-                n_clusters = list(K_range)[best_idx]
-                
-                st.info(f"🎯 Optimal clusters detected: {n_clusters} (tested {min_clusters}-{max(K_range)})")
-            
-            # Final clustering with optimal K
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-            cluster_labels = kmeans.fit_predict(tfidf_matrix)
+            from core.data_hub import DataHub
+            clustering = cluster_search_terms(search_terms, DataHub.derive_fingerprint(fingerprint, 'kw_cluster', term_col))
+            n_clusters = clustering['n_clusters']
+            cluster_labels = clustering['labels']
+            K_range = clustering['k_range']
+            if K_range is not None:
+                st.info(f"🎯 Optimal clusters detected: {n_clusters} (tested {min(K_range)}-{max(K_range)})")
         
         # Map clusters back to data
         term_to_cluster = dict(zip(search_terms, cluster_labels))
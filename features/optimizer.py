@@ -27,11 +27,14 @@ from features.bulk_export import (
 import streamlit as st
 import pandas as pd
 import numpy as np
+import re
 from io import BytesIO
 from typing import Dict, Any, Tuple, Optional, Set, List
 from features._base import BaseFeature
 from core.data_hub import DataHub
-from core.data_loader import safe_numeric, is_asin
+from core.data_loader import safe_numeric, is_asin, expand_frame
+from core.mapping_engine import BulkIdIndex, MappingEngine
+from core.performance_calc import build_metrics_cube
 from utils.formatters import format_currency, dataframe_to_excel
 from utils.matchers import ExactMatcher
 from ui.components import metric_card
@@ -108,6 +111,9 @@ DEFAULT_CONFIG = {
     "BUCKET_MEDIAN_FLOOR_MULTIPLIER": 0.5,  # Bucket median must be >= 50% of target ROAS
 }
 
+# Sensitivity sweep: multipliers applied to every recommended bid change
+SENSITIVITY_MULTIPLIERS = [0.7, 0.8, 0.9, 1.0, 1.1, 1.2, 1.3]
+
 # Elasticity scenarios for simulation
 ELASTICITY_SCENARIOS = {
     'conservative': {
@@ -135,13 +141,20 @@ ELASTICITY_SCENARIOS = {
 # DATA PREPARATION
 # ==========================================
 
-@st.cache_data(show_spinner=False)
-def prepare_data(df: pd.DataFrame, config: dict) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+def prepare_data(df: pd.DataFrame, config: dict, fingerprint: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     """
     Validate and prepare data for optimization.
     Returns prepared DataFrame and date_info dict.
+    
+    fingerprint: DataHub ID of df (get_fingerprint / derive_fingerprint). When given,
+    the result comes from the stage cache keyed by (fingerprint, config); df is never hashed.
     """
-    df = df.copy()
+    return DataHub.cached_stage('prepare_data', fingerprint, config, lambda: _prepare_data(df, config))
+
+
+def _prepare_data(df: pd.DataFrame, config: dict) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """prepare_data body (uncached)."""
+    df = expand_frame(df)
     # Ensure numeric columns
     for col in ["Impressions", "Clicks", "Spend", "Sales", "Orders"]:
         if col not in df.columns:
@@ -165,7 +178,7 @@ def prepare_data(df: pd.DataFrame, config: dict) -> Tuple[pd.DataFrame, Dict[str
     # Ensure Match Type exists
     if "Match Type" not in df.columns:
         df["Match Type"] = "broad"
-    df["Match Type"] = df["Match Type"].fillna("broad").astype(str)
+    df["Match Type"] = df["Match Type"].astype(object).fillna("broad").astype(str)
     
     # Targeting column normalization
     if "Targeting" not in df.columns:
@@ -277,8 +290,7 @@ def detect_date_range(df: pd.DataFrame) -> dict:
         return {"weeks": 1.0, "label": "Period Unknown", "days": 7, "start_date": None, "end_date": None}
 
 
-@st.cache_data(show_spinner=False)
-def calculate_account_benchmarks(df: pd.DataFrame, config: dict) -> dict:
+def calculate_account_benchmarks(df: pd.DataFrame, config: dict, fingerprint: Optional[str] = None) -> dict:
     """
     Calculate account-level CVR benchmarks for dynamic thresholds.
     
@@ -288,7 +300,16 @@ def calculate_account_benchmarks(df: pd.DataFrame, config: dict) -> dict:
         - soft_threshold: Clicks threshold for soft negative
         - hard_stop_threshold: Clicks threshold for hard stop
         - harvest_min_orders: Dynamic min orders for harvest based on CVR
+    
+    fingerprint: DataHub ID of the data df was prepared from (see prepare_data);
+    enables the stage cache.
     """
+    return DataHub.cached_stage('account_benchmarks', fingerprint, config,
+                                lambda: _calculate_account_benchmarks(df, config))
+
+
+def _calculate_account_benchmarks(df: pd.DataFrame, config: dict) -> dict:
+    """calculate_account_benchmarks body (uncached)."""
     # Calculate account-level CVR
     total_clicks = df['Clicks'].sum()
     total_orders = df['Orders'].sum()
@@ -536,15 +557,15 @@ def identify_harvest_candidates(
         for _, r in candidates.head(5).iterrows():
             print(f"  - '{r['Customer Search Term']}': {r['Clicks']} clicks, {r['Orders']} orders, ${r['Sales']:.2f} sales")
     
-    # Dedupe against existing exact keywords
-    survivors = []
-    deduped = []
-    for _, row in candidates.iterrows():
-        matched, match_info = matcher.find_match(row["Customer Search Term"], config["DEDUPE_SIMILARITY"])
-        if not matched:
-            survivors.append(row)
-        else:
-            deduped.append((row["Customer Search Term"], match_info))
+    # Dedupe against existing exact keywords (single batched lookup)
+    matches = matcher.find_matches(candidates["Customer Search Term"].tolist(), config["DEDUPE_SIMILARITY"])
+    is_new = pd.Series([not matched for matched, _ in matches], index=candidates.index, dtype=bool)
+    survivors = candidates[is_new]
+    deduped = [
+        (term, match_info)
+        for term, (matched, match_info) in zip(candidates["Customer Search Term"], matches)
+        if matched
+    ]
     
     print(f"\\nDedupe results:")
     print(f"  - Survivors (new harvest): {len(survivors)}")
@@ -555,7 +576,7 @@ def identify_harvest_candidates(
             print(f"    '{term}' matched to: {match}")
     print(f"=== END HARVEST DEBUG ===\\n")
     
-    survivors_df = pd.DataFrame(survivors)
+    survivors_df = survivors.copy()
     
     if not survivors_df.empty:
         # Apply launch multiplier (2x by default) to ensure new harvest keywords can compete
@@ -570,29 +591,24 @@ def identify_harvest_candidates(
 # NEGATIVE DETECTION
 # ==========================================
 
-def enrich_with_ids(df: pd.DataFrame, bulk: pd.DataFrame) -> pd.DataFrame:
+def enrich_with_ids(df: pd.DataFrame, bulk) -> pd.DataFrame:
     """
     Unified high-precision ID mapping helper.
     Matches by Campaign, Ad Group, and Targeting Text (Keyword/PT).
     Synchronizes OptimizationRecommendation objects.
+    
+    bulk may be the bulk DataFrame or its prebuilt BulkIdIndex (DataHub.get_bulk_index()).
     """
     if df.empty or bulk is None or bulk.empty:
         return df
-        
-    def normalize_for_mapping(series):
-        """
-        Normalize and strip prefixes for robust matching.
-        e.g., 'asin="B0123"' -> 'b0123', 'category="123"' -> '123'
-        """
-        s = series.astype(str).str.strip().str.lower()
-        # Remove common prefixes and quotes
-        s = s.str.replace(r'^(asin|category|asin-expanded|keyword-group)=', '', regex=True)
-        s = s.str.replace(r'^"', '', regex=True).str.replace(r'"$', '', regex=True)
-        # Final alphanumeric cleanup
-        return s.str.replace(r'[^a-z0-9]', '', regex=True)
+    
+    # Bulk-side keys and lookups are prebuilt once per bulk file
+    index = BulkIdIndex.of(bulk)
+    if index.table('mapping_fallback') is None:
+        return df
+    normalize_for_mapping = MappingEngine.normalize_for_mapping
     
     df = df.copy()
-    bulk = bulk.copy()
     
     # Normalize for mapping
     df['_camp_norm'] = normalize_for_mapping(df['Campaign Name'])
@@ -607,30 +623,21 @@ def enrich_with_ids(df: pd.DataFrame, bulk: pd.DataFrame) -> pd.DataFrame:
     target_col = 'Term' if 'Term' in df.columns else 'Targeting'
     df['_target_norm'] = normalize_for_mapping(df[target_col])
     
-    bulk['_camp_norm'] = normalize_for_mapping(bulk['Campaign Name'])
-    bulk['_ag_norm'] = normalize_for_mapping(bulk.get('Ad Group Name', pd.Series([''] * len(bulk))))
-    
     # Precise Match 1: Keywords
-    kw_col = next((c for c in ['Customer Search Term', 'Keyword Text', 'keyword_text'] if c in bulk.columns), None)
-    if kw_col:
-        bulk['_kw_norm'] = normalize_for_mapping(bulk[kw_col])
-        kw_lookup = bulk[bulk['KeywordId'].notna() & (bulk['KeywordId'] != "") & (bulk['KeywordId'] != "nan")][['_camp_norm', '_ag_norm', '_kw_norm', 'KeywordId', 'CampaignId', 'AdGroupId']].drop_duplicates()
-        
+    kw_lookup = index.table('mapping_keywords')
+    if kw_lookup is not None:
         df = df.merge(
-            kw_lookup.rename(columns={'_kw_norm': '_target_norm'}),
+            kw_lookup,
             on=['_camp_norm', '_ag_norm', '_target_norm'],
             how='left',
             suffixes=('', '_bulk_kw')
         )
         
     # Precise Match 2: Product Targeting
-    pt_col = next((c for c in ['TargetingExpression', 'Product Targeting Expression', 'targeting_expression'] if c in bulk.columns), None)
-    if pt_col:
-        bulk['_pt_norm'] = normalize_for_mapping(bulk[pt_col])
-        pt_lookup = bulk[bulk['TargetingId'].notna() & (bulk['TargetingId'] != "") & (bulk['TargetingId'] != "nan")][['_camp_norm', '_ag_norm', '_pt_norm', 'TargetingId', 'CampaignId', 'AdGroupId']].drop_duplicates()
-        
+    pt_lookup = index.table('mapping_pt')
+    if pt_lookup is not None:
         df = df.merge(
-            pt_lookup.rename(columns={'_pt_norm': '_target_norm'}),
+            pt_lookup,
             on=['_camp_norm', '_ag_norm', '_target_norm'],
             how='left',
             suffixes=('', '_bulk_pt')
@@ -654,7 +661,7 @@ def enrich_with_ids(df: pd.DataFrame, bulk: pd.DataFrame) -> pd.DataFrame:
     # Fallback: Campaign/Ad Group IDs if still missing
     missing_basics = df.get('CampaignId', pd.Series([np.nan]*len(df))).isna() | df.get('AdGroupId', pd.Series([np.nan]*len(df))).isna()
     if missing_basics.any():
-        fallback_lookup = bulk.groupby(['_camp_norm', '_ag_norm'])[['CampaignId', 'AdGroupId']].first().reset_index()
+        fallback_lookup = index.table('mapping_fallback')
         df = df.merge(fallback_lookup, on=['_camp_norm', '_ag_norm'], how='left', suffixes=('', '_fallback'))
         
         df['CampaignId'] = df.get('CampaignId', pd.Series([np.nan]*len(df))).fillna(df.get('CampaignId_fallback', pd.Series([np.nan]*len(df))))
@@ -921,7 +928,7 @@ def identify_negative_candidates(
     # CRITICAL: Map KeywordId and TargetingId for negatives
     # Negatives are at campaign+adgroup+term level, so we need to look up IDs
     # FINAL ENRICHMENT: Map IDs from Bulk for export
-    neg_df = enrich_with_ids(neg_df, DataHub().get_data('bulk_id_mapping'))
+    neg_df = enrich_with_ids(neg_df, DataHub().get_bulk_index())
     
     # Split into keywords vs product targets
     neg_kw = neg_df[~neg_df["Is_ASIN"]].copy()
@@ -943,6 +950,104 @@ def identify_negative_candidates(
 # BID OPTIMIZATION (vNext)
 # ==========================================
 
+# Bucket detection rules (shared by the columnar classifier)
+AUTO_TARGETING_TYPES = ['close-match', 'loose-match', 'substitutes', 'complements', 'auto']
+PT_EXPRESSION_RE = re.compile(r'asin(?:-expanded)?=')
+CATEGORY_EXPRESSION_RE = re.compile(r'^category.*=', re.DOTALL)
+
+
+def _factorize_normalized(df: pd.DataFrame, col: str, lower: bool = True) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Factorize str(value).strip() (and .lower()) for a column.
+    
+    String normalization runs once per distinct value instead of once per row;
+    returns (codes, normalized uniques) so callers can broadcast with uniques[codes].
+    A missing column behaves like an all-empty column (row.get(col, "")).
+    """
+    if col not in df.columns:
+        return np.zeros(len(df), dtype=np.intp), pd.Index([""], dtype=object)
+    codes, uniques = pd.factorize(df[col].astype(str))
+    uniques = pd.Index(uniques, dtype=object).str.strip()
+    return codes, uniques.str.lower() if lower else uniques
+
+
+def classify_bid_buckets(
+    df: pd.DataFrame,
+    harvested_terms: Set[str] = None,
+    negative_terms: Set[Tuple[str, str, str]] = None
+) -> Dict[str, pd.Series]:
+    """
+    Columnar bucket classification for calculate_bid_optimizations.
+    
+    Computes the global exclusion mask (harvested terms + campaign/ad group negatives,
+    checked against both Customer Search Term and Targeting) and the five mutually
+    exclusive bid buckets in one pass over normalized string columns.
+    
+    Returns dict of boolean Series aligned to df.index:
+        excluded, exact, pt, broad_phrase, auto, category
+    Bucket masks only cover non-excluded rows.
+    """
+    harvested_terms = harvested_terms or set()
+    negative_terms = negative_terms or set()
+    
+    cst_codes, cst_uniq = _factorize_normalized(df, "Customer Search Term")
+    tgt_codes, tgt_uniq = _factorize_normalized(df, "Targeting")
+    
+    # 1. Exclusions: harvested terms in either column
+    excluded = cst_uniq.isin(harvested_terms)[cst_codes] | tgt_uniq.isin(harvested_terms)[tgt_codes]
+    
+    # ...or a (campaign, ad group, term) negative. Only string triples can match.
+    neg_keys = [k for k in negative_terms if len(k) == 3 and all(isinstance(v, str) for v in k)]
+    if neg_keys:
+        neg_index = pd.MultiIndex.from_tuples(neg_keys)
+        neg_term_set = set(neg_index.get_level_values(2))
+        camp_codes, camp_uniq = _factorize_normalized(df, "Campaign Name", lower=False)
+        ag_codes, ag_uniq = _factorize_normalized(df, "Ad Group Name", lower=False)
+        for codes, uniq in [(cst_codes, cst_uniq), (tgt_codes, tgt_uniq)]:
+            # Only rows whose term appears in some negative key need the full tuple check
+            candidates = np.flatnonzero(uniq.isin(neg_term_set)[codes] & ~excluded)
+            if len(candidates):
+                keys = pd.MultiIndex.from_arrays([
+                    camp_uniq.values[camp_codes[candidates]],
+                    ag_uniq.values[ag_codes[candidates]],
+                    uniq.values[codes[candidates]],
+                ])
+                excluded[candidates[keys.isin(neg_index)]] = True
+    
+    # 2. Targeting shape detection (per distinct targeting value)
+    # Bare ASIN check mirrors data_loader.is_asin (10 alnum chars starting with B0)
+    tgt_upper = tgt_uniq.str.upper()
+    is_bare_asin = (tgt_upper.str.len() == 10) & tgt_upper.str.startswith("B0") & tgt_upper.str.isalnum()
+    pt_targeting = (tgt_uniq.str.contains(PT_EXPRESSION_RE) | is_bare_asin)[tgt_codes]
+    category_targeting = tgt_uniq.str.contains(CATEGORY_EXPRESSION_RE)[tgt_codes]
+    auto_targeting = tgt_uniq.isin(AUTO_TARGETING_TYPES)[tgt_codes]
+    
+    # Match Type flags (NaN / non-string values never match, as with .str.lower())
+    mt_codes, mt_uniq = pd.factorize(df["Match Type"])
+    mt_lower = pd.Index(mt_uniq, dtype=object).str.lower()
+    valid_mt = mt_codes >= 0
+    mt_auto = np.where(valid_mt, mt_lower.isin(["auto", "-"])[mt_codes], False)
+    mt_exact = np.where(valid_mt, (mt_lower == "exact")[mt_codes], False)
+    mt_broad_phrase = np.where(valid_mt, mt_lower.isin(["broad", "phrase"])[mt_codes], False)
+    
+    # 3. Mutually exclusive buckets (Auto > PT > Category > Exact / Broad-Phrase)
+    auto = (auto_targeting | mt_auto) & ~pt_targeting & ~category_targeting
+    pt = pt_targeting & ~auto
+    category = category_targeting & ~auto & ~pt
+    manual = ~pt & ~category & ~auto
+    keep = ~excluded
+    
+    masks = {
+        "excluded": excluded,
+        "exact": mt_exact & manual & keep,
+        "pt": pt & keep,
+        "broad_phrase": mt_broad_phrase & manual & keep,
+        "auto": auto & keep,
+        "category": category & keep,
+    }
+    return {name: pd.Series(mask, index=df.index) for name, mask in masks.items()}
+
+
 def calculate_bid_optimizations(
     df: pd.DataFrame, 
     config: dict, 
@@ -964,31 +1069,9 @@ def calculate_bid_optimizations(
     harvested_terms = harvested_terms or set()
     negative_terms = negative_terms or set()
     
-    # 1. Global Exclusions
-    def is_excluded(row):
-        # Get both Customer Search Term AND Targeting values
-        cst = str(row.get("Customer Search Term", "")).strip().lower()
-        targeting = str(row.get("Targeting", "")).strip().lower()
-        
-        # Check Harvest - if EITHER column matches harvested terms, exclude
-        if cst in harvested_terms or targeting in harvested_terms:
-            return True
-            
-        # Check Negatives (Campaign, AdGroup, Term)
-        camp = str(row.get("Campaign Name", "")).strip()
-        ag = str(row.get("Ad Group Name", "")).strip()
-        
-        # Check against both CST and Targeting
-        neg_key_cst = (camp, ag, cst)
-        neg_key_targeting = (camp, ag, targeting)
-        if neg_key_cst in negative_terms or neg_key_targeting in negative_terms:
-            return True
-            
-        return False
-        
-    # Apply Exclusion Filter
-    mask_excluded = df.apply(is_excluded, axis=1)
-    df_clean = df[~mask_excluded].copy()
+    # 1. Global exclusions + bucket assignment (single columnar pass)
+    masks = classify_bid_buckets(df, harvested_terms, negative_terms)
+    df_clean = df[~masks["excluded"]].copy()
     
     if df_clean.empty:
         empty = pd.DataFrame(columns=["Campaign Name", "Ad Group Name", "Targeting", "Match Type", "Current Bid", "New Bid"])
@@ -1025,86 +1108,28 @@ def calculate_bid_optimizations(
             universal_median_roas = config.get("TARGET_ROAS", 2.5)
             print(f"⚠️ Insufficient data, using TARGET_ROAS: {universal_median_roas:.2f}x")
     
-    # 2. Define bucket detection helpers
-    AUTO_TYPES = {'close-match', 'loose-match', 'substitutes', 'complements', 'auto'}
-    
-    def is_auto_or_category(targeting_val):
-        t = str(targeting_val).lower().strip()
-        if t.startswith("category=") or "category" in t:
-            return True
-        if t in AUTO_TYPES:
-            return True
-        return False
-    
-    def is_pt_targeting(targeting_val):
-        t = str(targeting_val).lower().strip()
-        if "asin=" in t or "asin-expanded=" in t:
-            return True
-        if is_asin(t) and not t.startswith("category"):
-            return True
-        return False
-    
-    def is_category_targeting(targeting_val):
-        t = str(targeting_val).lower().strip()
-        return t.startswith("category=") or (t.startswith("category") and "=" in t)
-    
-    # 3. Build mutually exclusive bucket masks
-    # CRITICAL: Auto bucket should ONLY include genuine auto targeting types (close-match, loose-match, etc.)
-    # NOT asin-expanded or category targets, even if match_type is "auto" or "-"
-    
-    # First identify PT and Category targets (takes precedence)
-    mask_pt_targeting = df_clean["Targeting"].apply(is_pt_targeting)
-    mask_category_targeting = df_clean["Targeting"].apply(is_category_targeting)
-    
-    # Auto bucket: targeting type is in AUTO_TYPES AND NOT a PT/Category target
-    mask_auto_by_targeting = df_clean["Targeting"].apply(lambda x: str(x).lower().strip() in AUTO_TYPES)
-    mask_auto_by_matchtype = df_clean["Match Type"].str.lower().isin(["auto", "-"])
-    mask_auto = (mask_auto_by_targeting | mask_auto_by_matchtype) & (~mask_pt_targeting) & (~mask_category_targeting)
-    
-    # PT bucket: PT targeting AND not auto
-    mask_pt = mask_pt_targeting & (~mask_auto)
-    
-    # Category bucket: Category targeting AND not auto/PT
-    mask_category = mask_category_targeting & (~mask_auto) & (~mask_pt)
-    
-    # Exact bucket: Match Type is exact AND not PT/Category/Auto
-    mask_exact = (
-        (df_clean["Match Type"].str.lower() == "exact") & 
-        (~mask_pt) & 
-        (~mask_category) &
-        (~mask_auto)
-    )
-    
-    # Broad/Phrase bucket: Match Type is broad/phrase AND not PT/Category/Auto
-    mask_broad_phrase = (
-        df_clean["Match Type"].str.lower().isin(["broad", "phrase"]) & 
-        (~mask_pt) & 
-        (~mask_category) &
-        (~mask_auto)
-    )
-    
-    # 4. Process each bucket
-    bids_exact = _process_bucket(df_clean[mask_exact], config, 
+    # 2. Process each bucket
+    bids_exact = _process_bucket(df[masks["exact"]], config, 
                                   min_clicks=config.get("MIN_CLICKS_EXACT", 5), 
                                   bucket_name="Exact",
                                   universal_median_roas=universal_median_roas)
     
-    bids_pt = _process_bucket(df_clean[mask_pt], config, 
+    bids_pt = _process_bucket(df[masks["pt"]], config, 
                                min_clicks=config.get("MIN_CLICKS_PT", 5), 
                                bucket_name="Product Targeting",
                                universal_median_roas=universal_median_roas)
     
-    bids_agg = _process_bucket(df_clean[mask_broad_phrase], config, 
+    bids_agg = _process_bucket(df[masks["broad_phrase"]], config, 
                                 min_clicks=config.get("MIN_CLICKS_BROAD", 10), 
                                 bucket_name="Broad/Phrase",
                                 universal_median_roas=universal_median_roas)
     
-    bids_auto = _process_bucket(df_clean[mask_auto], config, 
+    bids_auto = _process_bucket(df[masks["auto"]], config, 
                                  min_clicks=config.get("MIN_CLICKS_AUTO", 10), 
                                  bucket_name="Auto",
                                  universal_median_roas=universal_median_roas)
     
-    bids_category = _process_bucket(df_clean[mask_category], config, 
+    bids_category = _process_bucket(df[masks["category"]], config, 
                                      min_clicks=config.get("MIN_CLICKS_CATEGORY", 10), 
                                      bucket_name="Category",
                                      universal_median_roas=universal_median_roas)
@@ -1113,7 +1138,7 @@ def calculate_bid_optimizations(
     bids_auto_combined = pd.concat([bids_auto, bids_category], ignore_index=True) if not bids_category.empty else bids_auto
     
     # FINAL ENRICHMENT: Ensure IDs are present for Bulk Export
-    bulk = DataHub().get_data('bulk_id_mapping')
+    bulk = DataHub().get_bulk_index()
     
     bids_exact = enrich_with_ids(bids_exact, bulk)
     bids_pt = enrich_with_ids(bids_pt, bulk)
@@ -1327,6 +1352,48 @@ def _classify_and_bid(roas: float, median_roas: float, base_bid: float, alpha: f
 # HEATMAP WITH ACTION TRACKING
 # ==========================================
 
+def _ad_group_keyed(frame: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """
+    Recommendation rows that can match a heatmap cell, with an "Ad Group Name" column.
+    A frame without ad groups matches only the "" ad group (as comparing to a "" default did).
+    """
+    if frame is None or frame.empty or "Campaign Name" not in frame.columns:
+        return None
+    if "Ad Group Name" not in frame.columns:
+        frame = frame.assign(**{"Ad Group Name": ""})
+    return frame
+
+
+def _count_on_grid(keyed: Optional[pd.DataFrame], grid: pd.MultiIndex) -> np.ndarray:
+    """Row count per (Campaign Name, Ad Group Name) cell of the heatmap grid."""
+    if keyed is None or keyed.empty:
+        return np.zeros(len(grid), dtype=np.int64)
+    counts = keyed.groupby(["Campaign Name", "Ad Group Name"], observed=True).size()
+    return counts.reindex(grid, fill_value=0).to_numpy(dtype=np.int64)
+
+
+def _reason_summary_on_grid(sources: List[Optional[pd.DataFrame]], grid: pd.MultiIndex) -> np.ndarray:
+    """Top 3 (sorted) distinct reasons per heatmap cell, "..." when more; "" when none."""
+    parts = [
+        keyed[["Campaign Name", "Ad Group Name", "Reason"]].dropna(subset=["Reason"])
+        for keyed in sources if keyed is not None and "Reason" in keyed.columns
+    ]
+    if not parts:
+        return np.full(len(grid), "", dtype=object)
+    reasons = pd.concat(parts, ignore_index=True)
+    reasons["Reason"] = reasons["Reason"].astype(str)
+    reasons = reasons[reasons["Reason"] != ""].drop_duplicates()
+    if reasons.empty:
+        return np.full(len(grid), "", dtype=object)
+    
+    reasons = reasons.sort_values("Reason", kind="stable")
+    by_cell = reasons.groupby(["Campaign Name", "Ad Group Name"], observed=True, sort=False)["Reason"]
+    top3 = reasons[by_cell.cumcount() < 3].groupby(["Campaign Name", "Ad Group Name"], observed=True)["Reason"].agg("; ".join)
+    more = by_cell.size() > 3
+    summary = top3 + np.where(more.reindex(top3.index, fill_value=False), "...", "")
+    return summary.reindex(grid, fill_value="").to_numpy(dtype=object)
+
+
 def create_heatmap(
     df: pd.DataFrame,
     config: dict,
@@ -1350,89 +1417,67 @@ def create_heatmap(
     grouped["ROAS"] = np.where(grouped["Spend"] > 0, grouped["Sales"] / grouped["Spend"], 0)
     grouped["ACoS"] = np.where(grouped["Sales"] > 0, grouped["Spend"] / grouped["Sales"] * 100, 999)
     
-    grouped["Harvest_Count"] = 0
-    grouped["Negative_Count"] = 0
+    all_bids = pd.concat([direct_bids, agg_bids]) if not direct_bids.empty or not agg_bids.empty else pd.DataFrame()
+    negatives_df = pd.concat([neg_kw, neg_pt]) if not neg_kw.empty or not neg_pt.empty else pd.DataFrame()
+    
+    # Recommendations are aggregated per (campaign, ad group) once and aligned to the grid,
+    # instead of filtering every recommendation frame for every ad group
+    grid = pd.MultiIndex.from_frame(grouped[["Campaign Name", "Ad Group Name"]])
+    h_keyed = _ad_group_keyed(harvest_df)
+    n_keyed = _ad_group_keyed(negatives_df)
+    b_keyed = _ad_group_keyed(all_bids)
+    
+    grouped["Harvest_Count"] = _count_on_grid(h_keyed, grid)
+    grouped["Negative_Count"] = _count_on_grid(n_keyed, grid)
     grouped["Bid_Increase_Count"] = 0
     grouped["Bid_Decrease_Count"] = 0
-    grouped["Actions_Taken"] = ""
+    reason_sources = [h_keyed, n_keyed]
+    
+    if b_keyed is not None and "New Bid" in b_keyed.columns:
+        cur_bids = b_keyed.get("Current Bid", b_keyed.get("CPC", 0))
+        grouped["Bid_Increase_Count"] = _count_on_grid(b_keyed[b_keyed["New Bid"] > cur_bids], grid)
+        grouped["Bid_Decrease_Count"] = _count_on_grid(b_keyed[b_keyed["New Bid"] < cur_bids], grid)
+        reason_sources.append(b_keyed)
+    
+    # Actions text: one part per non-zero count, joined with " | "
+    actions = pd.Series("", index=grouped.index, dtype=object)
+    for col, prefix, suffix in [("Harvest_Count", "💎 ", " harvests"), ("Negative_Count", "🛑 ", " negatives"),
+                                ("Bid_Increase_Count", "⬆️ ", " increases"), ("Bid_Decrease_Count", "⬇️ ", " decreases")]:
+        part = prefix + grouped[col].astype(str) + suffix
+        actions = actions.where(grouped[col] <= 0, np.where(actions == "", part, actions + " | " + part))
+    has_actions = actions != ""
+    
+    low_volume = grouped["Clicks"] < config.get("MIN_CLICKS_EXACT", 5)
+    grouped["Actions_Taken"] = np.select(
+        [has_actions, low_volume],
+        [actions, "⏸️ Hold (Low volume)"],
+        "✅ No action needed"
+    )
     
-    all_bids = pd.concat([direct_bids, agg_bids]) if not direct_bids.empty or not agg_bids.empty else pd.DataFrame()
-    negatives_df = pd.concat([neg_kw, neg_pt]) if not neg_kw.empty or not neg_pt.empty else pd.DataFrame()
-
-    for idx, row in grouped.iterrows():
-        camp, ag = row["Campaign Name"], row["Ad Group Name"]
-        
-        # Safely filter dataframes even if empty or missing columns
-        h_match = pd.DataFrame()
-        if not harvest_df.empty and "Campaign Name" in harvest_df.columns:
-            h_match = harvest_df[(harvest_df["Campaign Name"] == camp) & (harvest_df.get("Ad Group Name", "") == ag)]
-            
-        n_match = pd.DataFrame()
-        if not negatives_df.empty and "Campaign Name" in negatives_df.columns:
-            n_match = negatives_df[(negatives_df["Campaign Name"] == camp) & (negatives_df.get("Ad Group Name", "") == ag)]
-            
-        b_match = pd.DataFrame()
-        if not all_bids.empty and "Campaign Name" in all_bids.columns:
-            b_match = all_bids[(all_bids["Campaign Name"] == camp) & (all_bids.get("Ad Group Name", "") == ag)]
-        
-        grouped.at[idx, "Harvest_Count"] = len(h_match)
-        grouped.at[idx, "Negative_Count"] = len(n_match)
-        
-        # Collect reasons for Actions
-        reasons = []
-        if not h_match.empty and "Reason" in h_match.columns:
-            reasons.extend(h_match["Reason"].dropna().astype(str).unique().tolist())
-            
-        if not n_match.empty and "Reason" in n_match.columns:
-            reasons.extend(n_match["Reason"].dropna().astype(str).unique().tolist())
-            
-        if not b_match.empty and "New Bid" in b_match.columns:
-            cur_bids = b_match.get("Current Bid", b_match.get("CPC", 0))
-            grouped.at[idx, "Bid_Increase_Count"] = (b_match["New Bid"] > cur_bids).sum()
-            grouped.at[idx, "Bid_Decrease_Count"] = (b_match["New Bid"] < cur_bids).sum()
-            
-            if "Reason" in b_match.columns:
-                reasons.extend(b_match["Reason"].dropna().astype(str).unique().tolist())
-            
-        actions = []
-        if grouped.at[idx, "Harvest_Count"] > 0: actions.append(f"💎 {int(grouped.at[idx, 'Harvest_Count'])} harvests")
-        if grouped.at[idx, "Negative_Count"] > 0: actions.append(f"🛑 {int(grouped.at[idx, 'Negative_Count'])} negatives")
-        if grouped.at[idx, "Bid_Increase_Count"] > 0: actions.append(f"⬆️ {int(grouped.at[idx, 'Bid_Increase_Count'])} increases")
-        if grouped.at[idx, "Bid_Decrease_Count"] > 0: actions.append(f"⬇️ {int(grouped.at[idx, 'Bid_Decrease_Count'])} decreases")
-        
-        if actions:
-            grouped.at[idx, "Actions_Taken"] = " | ".join(actions)
-            # Summarize reasons (top 3 unique)
-            unique_reasons = sorted(list(set([r for r in reasons if r])))
-            if unique_reasons:
-                grouped.at[idx, "Reason_Summary"] = "; ".join(unique_reasons[:3]) + ("..." if len(unique_reasons) > 3 else "")
-            else:
-                grouped.at[idx, "Reason_Summary"] = "Multiple actions"
-        elif row["Clicks"] < config.get("MIN_CLICKS_EXACT", 5):
-            grouped.at[idx, "Actions_Taken"] = "⏸️ Hold (Low volume)"
-            grouped.at[idx, "Reason_Summary"] = "Low data volume"
-        else:
-            grouped.at[idx, "Actions_Taken"] = "✅ No action needed"
-            
-            # Provide more specific status based on performance
-            if row["Sales"] == 0 and row["Spend"] > 10:
-                grouped.at[idx, "Reason_Summary"] = "Zero Sales (Monitoring)"
-            elif row["ROAS"] < config.get("TARGET_ROAS", 2.5) * 0.8:
-                grouped.at[idx, "Reason_Summary"] = "Low Efficiency (Monitoring)"
-            else:
-                grouped.at[idx, "Reason_Summary"] = "Stable Performance"
-
-    # Priority Scoring
-    def score(val, series, high_is_better=True):
+    # Reason_Summary: top reasons when actions were taken, otherwise a monitoring status
+    # (column only exists for a non-empty grid)
+    if not grouped.empty:
+        reason_summary = _reason_summary_on_grid(reason_sources, grid)
+        grouped["Reason_Summary"] = np.select(
+            [has_actions & (reason_summary != ""), has_actions, low_volume,
+             (grouped["Sales"] == 0) & (grouped["Spend"] > 10),
+             grouped["ROAS"] < config.get("TARGET_ROAS", 2.5) * 0.8],
+            [reason_summary, "Multiple actions", "Low data volume",
+             "Zero Sales (Monitoring)", "Low Efficiency (Monitoring)"],
+            "Stable Performance"
+        ).astype(object)
+
+    # Priority Scoring (tercile cut points are per metric, so score whole columns at once)
+    def score(series, high_is_better=True):
         valid = series[series > 0]
-        if len(valid) < 2: return 1
+        if len(valid) < 2: return np.ones(len(series), dtype=np.int64)
         p33, p67 = valid.quantile(0.33), valid.quantile(0.67)
-        return (2 if val >= p67 else 1 if val >= p33 else 0) if high_is_better else (2 if val <= p33 else 1 if val <= p67 else 0)
+        if high_is_better:
+            return np.select([series >= p67, series >= p33], [2, 1], 0)
+        return np.select([series <= p33, series <= p67], [2, 1], 0)
 
-    grouped["Overall_Score"] = (grouped.apply(lambda r: score(r["CTR"], grouped["CTR"]), axis=1) + 
-                                grouped.apply(lambda r: score(r["CVR"], grouped["CVR"]), axis=1) + 
-                                grouped.apply(lambda r: score(r["ROAS"], grouped["ROAS"]), axis=1) + 
-                                grouped.apply(lambda r: score(r["ACoS"], grouped["ACoS"], False), axis=1)) / 4
+    grouped["Overall_Score"] = (score(grouped["CTR"]) + score(grouped["CVR"]) +
+                                score(grouped["ROAS"]) + score(grouped["ACoS"], False)) / 4
     
     grouped["Priority"] = grouped["Overall_Score"].apply(lambda x: "🔴 High" if x < 0.7 else ("🟡 Medium" if x < 1.3 else "🟢 Good"))
     return grouped.sort_values("Overall_Score")
@@ -1447,11 +1492,15 @@ def run_simulation(
     agg_bids: pd.DataFrame,
     harvest_df: pd.DataFrame,
     config: dict,
-    date_info: dict
+    date_info: dict,
+    sensitivity_multipliers: List[float] = None
 ) -> dict:
     """
     Simulate the impact of proposed bid changes on future performance.
     Uses elasticity model with scenario analysis.
+    
+    All scenarios and sensitivity points are forecast in one matrix pass, so a
+    finer sweep (sensitivity_multipliers) costs little extra.
     """
     num_weeks = date_info.get("weeks", 1.0)
     
@@ -1492,17 +1541,20 @@ def run_simulation(
         hold_count = hold_mask.sum()
         actual_changes = (~hold_mask).sum()
     
-    # Run scenarios
+    # Run scenarios + sensitivity sweep as one forecast matrix (columns = scenario, bid scale)
+    multipliers = sensitivity_multipliers or SENSITIVITY_MULTIPLIERS
+    columns = [(elasticity, 1.0) for elasticity in ELASTICITY_SCENARIOS.values()]
+    columns += [(ELASTICITY_SCENARIOS["expected"], mult) for mult in multipliers]
+    forecasts = _forecast_matrix(_prepare_forecast_inputs(all_bids, harvest_df, current_raw, config), columns, current_raw)
+    
     scenarios = {}
-    for name, elasticity in ELASTICITY_SCENARIOS.items():
-        forecast_raw = _forecast_scenario(all_bids, harvest_df, elasticity, current_raw, config)
-        forecast = _normalize_to_weekly(forecast_raw, num_weeks)
-        scenarios[name] = forecast
+    for name, forecast_raw in zip(ELASTICITY_SCENARIOS, forecasts):
+        scenarios[name] = _normalize_to_weekly(forecast_raw, num_weeks)
     
     scenarios["current"] = current
     
     # Calculate sensitivity
-    sensitivity_df = _calculate_sensitivity(all_bids, harvest_df, ELASTICITY_SCENARIOS["expected"], current_raw, config, num_weeks)
+    sensitivity_df = _sensitivity_frame(multipliers, forecasts[len(ELASTICITY_SCENARIOS):], num_weeks)
     
     # Analyze risks
     risk_analysis = _analyze_risks(all_bids)
@@ -1521,12 +1573,13 @@ def run_simulation(
     }
 
 def _calculate_baseline(df: pd.DataFrame) -> dict:
-    """Calculate current performance baseline."""
-    total_clicks = df["Clicks"].sum()
-    total_spend = df["Spend"].sum()
-    total_sales = df["Sales"].sum()
-    total_orders = df["Orders"].sum()
-    total_impressions = df["Impressions"].sum() if "Impressions" in df.columns else 0
+    """Calculate current performance baseline (totals from the shared metrics kernel)."""
+    totals = build_metrics_cube(df, rollups={})["totals"]
+    total_clicks = totals["clicks"]
+    total_spend = totals["spend"]
+    total_sales = totals["sales"]
+    total_orders = totals["orders"]
+    total_impressions = totals["impressions"]
     
     return {
         "clicks": total_clicks,
@@ -1559,104 +1612,154 @@ def _normalize_to_weekly(metrics: dict, num_weeks: float) -> dict:
         "ctr": metrics.get("ctr", 0)
     }
 
-def _forecast_scenario(
-    bid_changes: pd.DataFrame,
-    harvest_df: pd.DataFrame,
-    elasticity: dict,
-    baseline: dict,
-    config: dict
-) -> dict:
-    """Forecast performance for a single scenario."""
-    forecasted_changes = []
-    
-    # Part 1: Process bid changes
-    if not bid_changes.empty:
-        for _, row in bid_changes.iterrows():
-            bid_change_pct = row.get("Bid_Change_Pct", 0)
-            reason = str(row.get("Reason", "")).lower()
-            
-            # Skip holds
-            if "hold" in reason or abs(bid_change_pct) < 0.005:
-                continue
-            
-            current_clicks = float(row.get("Clicks", 0) or 0)
-            current_spend = float(row.get("Spend", 0) or 0)
-            current_orders = float(row.get("Orders", 0) or 0)
-            current_sales = float(row.get("Sales", 0) or 0)
-            current_cpc = float(row.get("CPC", 0) or row.get("Cost Per Click (CPC)", 0) or 0)
-            
-            if current_clicks == 0 and current_cpc == 0:
-                continue
-            
-            current_cvr = current_orders / current_clicks if current_clicks > 0 else 0
-            current_aov = current_sales / current_orders if current_orders > 0 else 0
-            
-            if current_aov == 0 and baseline["orders"] > 0:
-                current_aov = baseline["sales"] / baseline["orders"]
-            
-            # Apply elasticity
-            new_cpc = current_cpc * (1 + elasticity["cpc"] * bid_change_pct)
-            new_clicks = current_clicks * (1 + elasticity["clicks"] * bid_change_pct)
-            new_cvr = current_cvr * (1 + elasticity["cvr"] * bid_change_pct)
-            
-            new_orders = new_clicks * new_cvr
-            new_sales = new_orders * current_aov
-            new_spend = new_clicks * new_cpc
-            
-            forecasted_changes.append({
-                "delta_clicks": new_clicks - current_clicks,
-                "delta_spend": new_spend - current_spend,
-                "delta_sales": new_sales - current_sales,
-                "delta_orders": new_orders - current_orders
-            })
+def _or_zero(frame: pd.DataFrame, col: str) -> np.ndarray:
+    """float(row.get(col, 0) or 0) for every row of frame, as a float array."""
+    if col not in frame.columns:
+        return np.zeros(len(frame))
+    values = frame[col]
+    if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        arr = values.to_numpy(dtype=float, na_value=np.nan)
+        return np.where(arr == 0, 0.0, arr)
+    return np.array([float(v or 0) for v in values], dtype=float)
+
+
+def _prepare_forecast_inputs(bid_changes: pd.DataFrame, harvest_df: pd.DataFrame, baseline: dict, config: dict) -> dict:
+    """
+    Column arrays for the forecast engine.
     
-    # Part 2: Process harvest campaigns
-    if not harvest_df.empty:
-        efficiency = config.get("HARVEST_EFFICIENCY_MULTIPLIER", 1.15)
+    Bid rows keep everything that does not depend on the scenario (eligibility,
+    current CPC/CVR/AOV); harvest deltas do not depend on elasticity at all, so
+    they are computed once here.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Part 1: bid changes
+        if bid_changes is not None and not bid_changes.empty:
+            pct = (bid_changes["Bid_Change_Pct"].to_numpy(dtype=float, na_value=np.nan)
+                   if "Bid_Change_Pct" in bid_changes.columns else np.zeros(len(bid_changes)))
+            reasons = bid_changes["Reason"].astype(str) if "Reason" in bid_changes.columns else pd.Series("", index=bid_changes.index)
+            is_hold = reasons.str.lower().str.contains("hold", regex=False).to_numpy(dtype=bool)
+            
+            clicks = _or_zero(bid_changes, "Clicks")
+            spend = _or_zero(bid_changes, "Spend")
+            orders = _or_zero(bid_changes, "Orders")
+            sales = _or_zero(bid_changes, "Sales")
+            cpc = _or_zero(bid_changes, "CPC")
+            cpc = np.where(cpc != 0, cpc, _or_zero(bid_changes, "Cost Per Click (CPC)"))
+            
+            cvr = np.where(clicks > 0, orders / clicks, 0.0)
+            aov = np.where(orders > 0, sales / orders, 0.0)
+            if baseline["orders"] > 0:
+                aov = np.where(aov == 0, baseline["sales"] / baseline["orders"], aov)
+            
+            bids = {
+                "pct": pct, "eligible": ~is_hold & ~((clicks == 0) & (cpc == 0)),
+                "clicks": clicks, "spend": spend, "orders": orders, "sales": sales,
+                "cpc": cpc, "cvr": cvr, "aov": aov,
+            }
+        else:
+            bids = None
         
-        for _, row in harvest_df.iterrows():
-            base_clicks = float(row.get("Clicks", 0) or 0)
-            base_spend = float(row.get("Spend", 0) or 0)
-            base_orders = float(row.get("Orders", 0) or 0)
-            base_sales = float(row.get("Sales", 0) or 0)
-            base_cpc = float(row.get("CPC", 0) or 0)
+        # Part 2: harvest campaigns (same traffic, better efficiency)
+        harvest = None
+        if harvest_df is not None and not harvest_df.empty:
+            efficiency = config.get("HARVEST_EFFICIENCY_MULTIPLIER", 1.15)
+            launch_mult = config.get("HARVEST_LAUNCH_MULTIPLIER", 2.0)
             
-            if base_clicks < 5:
-                continue
+            base_clicks = _or_zero(harvest_df, "Clicks")
+            base_spend = _or_zero(harvest_df, "Spend")
+            base_orders = _or_zero(harvest_df, "Orders")
+            base_sales = _or_zero(harvest_df, "Sales")
+            base_cpc = _or_zero(harvest_df, "CPC")
             
             # Use launch multiplier (2x) for harvest bids
-            launch_mult = config.get("HARVEST_LAUNCH_MULTIPLIER", 2.0)
-            new_bid = float(row.get("New Bid", base_cpc * launch_mult) or base_cpc * launch_mult)
-            base_cvr = base_orders / base_clicks if base_clicks > 0 else 0
-            base_aov = base_sales / base_orders if base_orders > 0 else 0
+            new_bid = _or_zero(harvest_df, "New Bid")
+            new_bid = np.where(new_bid != 0, new_bid, base_cpc * launch_mult)
+            base_cvr = np.where(base_clicks > 0, base_orders / base_clicks, 0.0)
+            base_aov = np.where(base_orders > 0, base_sales / base_orders, 0.0)
             
-            # Harvest: same traffic, better efficiency
             fore_clicks = base_clicks
             fore_cpc = new_bid * 0.95
             fore_cvr = base_cvr * efficiency
-            
             fore_orders = fore_clicks * fore_cvr
             fore_sales = fore_orders * base_aov
             fore_spend = fore_clicks * fore_cpc
             
-            forecasted_changes.append({
-                "delta_clicks": fore_clicks - base_clicks,
-                "delta_spend": fore_spend - base_spend,
-                "delta_sales": fore_sales - base_sales,
-                "delta_orders": fore_orders - base_orders
-            })
-    
-    # Aggregate changes
-    if not forecasted_changes:
-        return baseline.copy()
+            keep = ~(base_clicks < 5)
+            harvest = {
+                "count": int(keep.sum()),
+                "clicks": (fore_clicks - base_clicks)[keep],
+                "spend": (fore_spend - base_spend)[keep],
+                "sales": (fore_sales - base_sales)[keep],
+                "orders": (fore_orders - base_orders)[keep],
+            }
     
-    total_delta = {
-        "clicks": sum(fc["delta_clicks"] for fc in forecasted_changes),
-        "spend": sum(fc["delta_spend"] for fc in forecasted_changes),
-        "sales": sum(fc["delta_sales"] for fc in forecasted_changes),
-        "orders": sum(fc["delta_orders"] for fc in forecasted_changes)
-    }
+    return {"bids": bids, "harvest": harvest}
+
+
+def _forecast_matrix(inputs: dict, columns: List[Tuple[dict, float]], baseline: dict, max_cells: int = 4_000_000) -> List[dict]:
+    """
+    Forecast every (elasticity, bid scale) column at once as a rows x columns matrix.
     
+    Deltas are accumulated with a sequential cumulative sum in row order (bids,
+    then harvests), the same order and rounding as summing row by row, so each
+    column reproduces the single-scenario forecast exactly. Columns are processed
+    in blocks of at most max_cells matrix cells to bound memory on long sweeps.
+    """
+    n_cols = len(columns)
+    totals = {metric: np.zeros(n_cols) for metric in ("clicks", "spend", "sales", "orders")}
+    contributions = np.zeros(n_cols, dtype=np.int64)
+    bids, harvest = inputs["bids"], inputs["harvest"]
+    
+    if bids is not None and len(bids["pct"]):
+        n_rows = len(bids["pct"])
+        block = max(1, max_cells // n_rows)
+        col = lambda key: bids[key][:, None]
+        for start in range(0, n_cols, block):
+            cols = columns[start:start + block]
+            scale = np.array([mult for _, mult in cols])
+            e_cpc = np.array([e["cpc"] for e, _ in cols])
+            e_clicks = np.array([e["clicks"] for e, _ in cols])
+            e_cvr = np.array([e["cvr"] for e, _ in cols])
+            
+            with np.errstate(invalid="ignore", over="ignore"):
+                pct = col("pct") * scale
+                # Skip holds and negligible changes
+                valid = col("eligible") & ~(np.abs(pct) < 0.005)
+                
+                # Apply elasticity
+                new_cpc = col("cpc") * (1 + e_cpc * pct)
+                new_clicks = col("clicks") * (1 + e_clicks * pct)
+                new_cvr = col("cvr") * (1 + e_cvr * pct)
+                
+                new_orders = new_clicks * new_cvr
+                new_sales = new_orders * col("aov")
+                new_spend = new_clicks * new_cpc
+                
+                deltas = {
+                    "clicks": new_clicks - col("clicks"),
+                    "spend": new_spend - col("spend"),
+                    "sales": new_sales - col("sales"),
+                    "orders": new_orders - col("orders"),
+                }
+            for metric, delta in deltas.items():
+                totals[metric][start:start + block] = np.cumsum(np.where(valid, delta, 0.0), axis=0)[-1]
+            contributions[start:start + block] = valid.sum(axis=0)
+    
+    if harvest is not None and harvest["count"]:
+        # Harvest deltas are scenario-independent: continue each column's running sum with them
+        for metric in totals:
+            running = np.vstack([totals[metric][None, :], np.broadcast_to(harvest[metric][:, None], (harvest["count"], n_cols))])
+            totals[metric] = np.cumsum(running, axis=0)[-1]
+        contributions += harvest["count"]
+    
+    return [
+        _apply_forecast_deltas(baseline, {metric: totals[metric][i] for metric in totals}) if contributions[i] else baseline.copy()
+        for i in range(n_cols)
+    ]
+
+
+def _apply_forecast_deltas(baseline: dict, total_delta: dict) -> dict:
+    """Forecast metrics from the baseline plus aggregated deltas."""
     new_clicks = max(0, baseline["clicks"] + total_delta["clicks"])
     new_spend = max(0, baseline["spend"] + total_delta["spend"])
     new_sales = max(0, baseline["sales"] + total_delta["sales"])
@@ -1675,32 +1778,26 @@ def _forecast_scenario(
         "ctr": baseline.get("ctr", 0)
     }
 
-def _calculate_sensitivity(
+
+def _forecast_scenario(
     bid_changes: pd.DataFrame,
     harvest_df: pd.DataFrame,
     elasticity: dict,
     baseline: dict,
-    config: dict,
-    num_weeks: float
-) -> pd.DataFrame:
-    """Calculate sensitivity analysis at different bid adjustment levels."""
-    adjustments = ["-30%", "-20%", "-10%", "+0%", "+10%", "+20%", "+30%"]
-    multipliers = [0.7, 0.8, 0.9, 1.0, 1.1, 1.2, 1.3]
-    
+    config: dict
+) -> dict:
+    """Forecast performance for a single scenario."""
+    inputs = _prepare_forecast_inputs(bid_changes, harvest_df, baseline, config)
+    return _forecast_matrix(inputs, [(elasticity, 1.0)], baseline)[0]
+
+
+def _sensitivity_frame(multipliers: List[float], forecasts: List[dict], num_weeks: float) -> pd.DataFrame:
+    """Sensitivity table rows (weekly) for forecasts at each bid adjustment multiplier."""
     results = []
-    for adj, mult in zip(adjustments, multipliers):
-        # Scale bid changes
-        if not bid_changes.empty:
-            scaled_bids = bid_changes.copy()
-            scaled_bids["Bid_Change_Pct"] = scaled_bids["Bid_Change_Pct"] * mult
-        else:
-            scaled_bids = pd.DataFrame()
-        
-        forecast = _forecast_scenario(scaled_bids, harvest_df, elasticity, baseline, config)
+    for mult, forecast in zip(multipliers, forecasts):
         normalized = _normalize_to_weekly(forecast, num_weeks)
-        
         results.append({
-            "Bid_Adjustment": adj,
+            "Bid_Adjustment": f"{round((mult - 1) * 100):+d}%",
             "Spend": normalized["spend"],
             "Sales": normalized["sales"],
             "ROAS": normalized["roas"],
@@ -1710,20 +1807,43 @@ def _calculate_sensitivity(
     
     return pd.DataFrame(results)
 
+
+def _calculate_sensitivity(
+    bid_changes: pd.DataFrame,
+    harvest_df: pd.DataFrame,
+    elasticity: dict,
+    baseline: dict,
+    config: dict,
+    num_weeks: float,
+    multipliers: List[float] = None
+) -> pd.DataFrame:
+    """Calculate sensitivity analysis at different bid adjustment levels."""
+    multipliers = multipliers or SENSITIVITY_MULTIPLIERS
+    inputs = _prepare_forecast_inputs(bid_changes, harvest_df, baseline, config)
+    forecasts = _forecast_matrix(inputs, [(elasticity, mult) for mult in multipliers], baseline)
+    return _sensitivity_frame(multipliers, forecasts, num_weeks)
+
 def _analyze_risks(bid_changes: pd.DataFrame) -> dict:
     """Analyze risks in proposed bid changes."""
     if bid_changes.empty:
         return {"summary": {"high_risk_count": 0, "medium_risk_count": 0, "low_risk_count": 0}, "high_risk": []}
     
-    high_risk = []
-    medium_risk = 0
-    low_risk = 0
+    # Classify all rows at once; only high-risk rows are listed individually
+    reasons = bid_changes["Reason"].astype(str) if "Reason" in bid_changes.columns else pd.Series("", index=bid_changes.index)
+    active = ~reasons.str.lower().str.contains("hold", regex=False).to_numpy(dtype=bool)
+    bid_change = (bid_changes["Bid_Change_Pct"].to_numpy(dtype=float, na_value=np.nan)
+                  if "Bid_Change_Pct" in bid_changes.columns else np.zeros(len(bid_changes)))
+    clicks = (bid_changes["Clicks"].to_numpy(dtype=float, na_value=np.nan)
+              if "Clicks" in bid_changes.columns else np.zeros(len(bid_changes)))
     
-    for _, row in bid_changes.iterrows():
-        reason = str(row.get("Reason", "")).lower()
-        if "hold" in reason:
-            continue
-        
+    with np.errstate(invalid="ignore"):
+        n_factors = (np.abs(bid_change) > 0.25).astype(int) + (clicks < 10).astype(int)
+        is_high = active & ((n_factors >= 2) | (np.abs(bid_change) > 0.40))
+    medium_risk = int((active & ~is_high & (n_factors == 1)).sum())
+    low_risk = int((active & ~is_high & (n_factors == 0)).sum())
+    
+    high_risk = []
+    for _, row in bid_changes[is_high].iterrows():
         bid_change = row.get("Bid_Change_Pct", 0)
         clicks = row.get("Clicks", 0)
         
@@ -1737,19 +1857,13 @@ def _analyze_risks(bid_changes: pd.DataFrame) -> dict:
         if clicks < 10:
             risk_factors.append(f"Low data ({clicks} clicks)")
         
-        # Classify
-        if len(risk_factors) >= 2 or abs(bid_change) > 0.40:
-            high_risk.append({
-                "keyword": row.get("Targeting", row.get("Customer Search Term", "")),
-                "campaign": row.get("Campaign Name", ""),
-                "bid_change": f"{bid_change*100:+.0f}%",
-                "current_bid": row.get("CPC", row.get("Cost Per Click (CPC)", 0)),
-                "factors": ", ".join(risk_factors)
-            })
-        elif len(risk_factors) == 1:
-            medium_risk += 1
-        else:
-            low_risk += 1
+        high_risk.append({
+            "keyword": row.get("Targeting", row.get("Customer Search Term", "")),
+            "campaign": row.get("Campaign Name", ""),
+            "bid_change": f"{bid_change*100:+.0f}%",
+            "current_bid": row.get("CPC", row.get("Cost Per Click (CPC)", 0)),
+            "factors": ", ".join(risk_factors)
+        })
     
     return {
         "summary": {
@@ -1760,118 +1874,184 @@ def _analyze_risks(bid_changes: pd.DataFrame) -> dict:
         "high_risk": high_risk
     }
 
-# NOTE: EXPORT_COLUMNS, generate_negatives_bulk, generate_bids_bulk, generate_harvest_bulk
-# are imported from features/bulk_export.py at the top of this file
+# ==========================================
+# PIPELINE
+# ==========================================
 
-def _log_optimization_events(results: dict, client_id: str, report_date: str):
+def run_optimization(df: pd.DataFrame, config: dict, timings: Optional[Dict[str, float]] = None,
+                     fingerprint: Optional[str] = None) -> dict:
     """
-    Standardizes and logs optimization actions (bids, negatives, harvests).
+    Run the full optimizer pipeline on a prepared search term report.
     
-    If user has already accepted actions this session (optimizer_actions_accepted=True),
-    writes directly to DB and shows undo toast.
-    Otherwise, stores in session state for confirmation when leaving optimizer tab.
+    Shared by OptimizerModule (session UI) and features/batch_optimizer.py (headless).
+    If a timings dict is passed, per-stage wall times (seconds) are recorded in it.
+    Pass df's DataHub fingerprint to serve prepare_data / benchmarks from the stage cache.
     """
-    from core.db_manager import get_db_manager
-    import uuid
-    import streamlit as st
     import time
     
-    batch_id = str(uuid.uuid4())[:8]
-    actions_to_log = []
+    if timings is None:
+        timings = {}
+    clock = time.perf_counter()
+    
+    def lap(stage):
+        nonlocal clock
+        now = time.perf_counter()
+        timings[stage] = timings.get(stage, 0.0) + (now - clock)
+        clock = now
+    
+    df, date_info = prepare_data(df, config, fingerprint)
+    lap("prepare_data")
+    benchmarks = calculate_account_benchmarks(df, config, fingerprint)
+    universal_median = benchmarks.get('universal_median_roas', config.get("TARGET_ROAS", 2.5))
+    lap("benchmarks")
+    
+    matcher = ExactMatcher(df)
+    
+    harvest = identify_harvest_candidates(df, config, matcher, benchmarks)
+    lap("harvest")
+    neg_kw, neg_pt, your_products = identify_negative_candidates(df, config, harvest, benchmarks)
+    lap("negatives")
+    
+    neg_set = set(zip(neg_kw["Campaign Name"], neg_kw["Ad Group Name"], neg_kw["Term"].str.lower()))
+    bids_ex, bids_pt, bids_agg, bids_auto = calculate_bid_optimizations(df, config, set(harvest["Customer Search Term"].str.lower()), neg_set, universal_median)
+    lap("bids")
+    
+    heatmap = create_heatmap(df, config, harvest, neg_kw, neg_pt, pd.concat([bids_ex, bids_pt]), pd.concat([bids_agg, bids_auto]))
+    lap("heatmap")
+    
+    results = {
+        "df": df, "date_info": date_info, "harvest": harvest, "neg_kw": neg_kw, "neg_pt": neg_pt,
+        "your_products_review": your_products, 
+        "bids_exact": bids_ex, "bids_pt": bids_pt, "bids_agg": bids_agg, "bids_auto": bids_auto,
+        "direct_bids": pd.concat([bids_ex, bids_pt]),
+        "agg_bids": pd.concat([bids_agg, bids_auto]), "heatmap": heatmap,
+        "simulation": run_simulation(df, pd.concat([bids_ex, bids_pt]), pd.concat([bids_agg, bids_auto]), harvest, config, date_info)
+    }
+    lap("simulation")
+    return results
 
-    # 1. Process Negative Keywords
-    for _, row in results.get('neg_kw', pd.DataFrame()).iterrows():
-        actions_to_log.append({
-            'entity_name': 'Keyword',
-            'action_type': 'NEGATIVE',
-            'old_value': 'ENABLED',
-            'new_value': 'PAUSED',
-            'reason': row.get('Reason', 'Low efficiency / Waste'),
-            'campaign_name': row.get('Campaign Name', ''),
-            'ad_group_name': row.get('Ad Group Name', ''),
-            'target_text': row.get('Term', ''),
-            'match_type': row.get('Match Type', 'NEGATIVE')
-        })
 
-    # 2. Process Negative Product Targets (ASINs)
-    for _, row in results.get('neg_pt', pd.DataFrame()).iterrows():
-        actions_to_log.append({
-            'entity_name': 'ASIN',
+# NOTE: EXPORT_COLUMNS, generate_negatives_bulk, generate_bids_bulk, generate_harvest_bulk
+# are imported from features/bulk_export.py at the top of this file
+
+def _action_column(df: pd.DataFrame, col: str, default: Any) -> pd.Series:
+    """df[col] by position, or the default for every row when the column is missing (row.get semantics)."""
+    if col in df.columns:
+        return df[col].reset_index(drop=True)
+    return pd.Series([default] * len(df), dtype=object)
+
+
+def _frame_actions(fields: Dict[str, Any], n_rows: int) -> List[Dict[str, Any]]:
+    """Zip per-field columns (Series) and constants into n_rows action dicts."""
+    keys = list(fields)
+    columns = [v.tolist() if isinstance(v, pd.Series) else [v] * n_rows for v in fields.values()]
+    return [dict(zip(keys, values)) for values in zip(*columns)]
+
+
+def build_optimization_actions(results: dict) -> List[Dict[str, Any]]:
+    """
+    Standardize optimizer results (negatives, bids, harvests) into action dicts
+    for log_action_batch, deduplicated on the actions_log unique key.
+    
+    Built column-wise from each results frame (no iterrows); values match the
+    previous per-row build, including missing-column defaults.
+    """
+    sections = []
+
+    # 1. Negative Keywords / 2. Negative Product Targets (ASINs)
+    for key, entity, match_type in (('neg_kw', 'Keyword', None), ('neg_pt', 'ASIN', 'TARGETING_EXPRESSION')):
+        df = results.get(key, pd.DataFrame())
+        sections.append((df, {
+            'entity_name': entity,
             'action_type': 'NEGATIVE',
             'old_value': 'ENABLED',
             'new_value': 'PAUSED',
-            'reason': row.get('Reason', 'Low efficiency / Waste'),
-            'campaign_name': row.get('Campaign Name', ''),
-            'ad_group_name': row.get('Ad Group Name', ''),
-            'target_text': row.get('Term', ''),
-            'match_type': 'TARGETING_EXPRESSION'
-        })
-
-    # 3. Process Bid Optimizations (Combined)
-    bid_dfs = [
-        results.get('bids_exact', pd.DataFrame()),
-        results.get('bids_pt', pd.DataFrame()),
-        results.get('bids_agg', pd.DataFrame()),
-        results.get('bids_auto', pd.DataFrame())
-    ]
-    for b_df in bid_dfs:
-        if b_df.empty: continue
-        for _, row in b_df.iterrows():
-            actions_to_log.append({
-                'entity_name': 'Target',
-                'action_type': 'BID_CHANGE',
-                'old_value': str(row.get('Current Bid', '')),
-                'new_value': str(row.get('New Bid', '')),
-                'reason': row.get('Reason', 'Portfolio Optimization'),
-                'campaign_name': row.get('Campaign Name', ''),
-                'ad_group_name': row.get('Ad Group Name', ''),
-                'target_text': row.get('Targeting', ''),
-                'match_type': row.get('Match Type', '')
-            })
+            'reason': _action_column(df, 'Reason', 'Low efficiency / Waste'),
+            'campaign_name': _action_column(df, 'Campaign Name', ''),
+            'ad_group_name': _action_column(df, 'Ad Group Name', ''),
+            'target_text': _action_column(df, 'Term', ''),
+            'match_type': match_type or _action_column(df, 'Match Type', 'NEGATIVE')
+        }))
+
+    # 3. Bid Optimizations (Combined)
+    for key in ('bids_exact', 'bids_pt', 'bids_agg', 'bids_auto'):
+        df = results.get(key, pd.DataFrame())
+        if df.empty: continue
+        sections.append((df, {
+            'entity_name': 'Target',
+            'action_type': 'BID_CHANGE',
+            'old_value': _action_column(df, 'Current Bid', '').astype(str),
+            'new_value': _action_column(df, 'New Bid', '').astype(str),
+            'reason': _action_column(df, 'Reason', 'Portfolio Optimization'),
+            'campaign_name': _action_column(df, 'Campaign Name', ''),
+            'ad_group_name': _action_column(df, 'Ad Group Name', ''),
+            'target_text': _action_column(df, 'Targeting', ''),
+            'match_type': _action_column(df, 'Match Type', '')
+        }))
+
+    # 4. Harvests - WITH WINNER SOURCE TRACKING
+    df = results.get('harvest', pd.DataFrame())
+    winner_campaign = _action_column(df, 'Campaign Name', '')
+    # New campaign name: source campaign when it is set (truthy), else a generic harvest campaign
+    has_winner = winner_campaign.to_numpy(dtype=object).astype(bool)
+    new_campaign = pd.Series(np.where(has_winner, 'Harvest_Exact_' + winner_campaign.astype(str),
+                                      'Harvest_Exact_Campaign'), dtype=object)
+    sections.append((df, {
+        'entity_name': 'Keyword',
+        'action_type': 'HARVEST',
+        'old_value': 'DISCOVERY',
+        'new_value': 'PROMOTED',
+        'reason': 'Conv: ' + _action_column(df, 'Orders', 0).astype(str) + ' orders',
+        'campaign_name': winner_campaign,  # Source campaign
+        'ad_group_name': _action_column(df, 'Ad Group Name', ''),
+        'target_text': _action_column(df, 'Customer Search Term', ''),
+        'match_type': 'EXACT',
+        # NEW FIELDS FOR IMPACT ANALYSIS:
+        'winner_source_campaign': winner_campaign,  # Which campaign won
+        'new_campaign_name': new_campaign,  # Where it's being moved
+        'before_match_type': _action_column(df, 'Match Type', 'broad'),  # Original match type
+        'after_match_type': 'exact'  # Harvested to exact
+    }))
 
-    # 4. Process Harvests - WITH WINNER SOURCE TRACKING
-    for _, row in results.get('harvest', pd.DataFrame()).iterrows():
-        # Determine winner source campaign and new campaign name
-        winner_campaign = row.get('Campaign Name', '')
-        search_term = row.get('Customer Search Term', '')
-        
-        # Generate new campaign name (you can customize this logic)
-        new_campaign = f"Harvest_Exact_{winner_campaign}" if winner_campaign else "Harvest_Exact_Campaign"
-        
-        actions_to_log.append({
-            'entity_name': 'Keyword',
-            'action_type': 'HARVEST',
-            'old_value': 'DISCOVERY',
-            'new_value': 'PROMOTED',
-            'reason': f"Conv: {row.get('Orders', 0)} orders",
-            'campaign_name': winner_campaign,  # Source campaign
-            'ad_group_name': row.get('Ad Group Name', ''),
-            'target_text': search_term,
-            'match_type': 'EXACT',
-            # NEW FIELDS FOR IMPACT ANALYSIS:
-            'winner_source_campaign': winner_campaign,  # Which campaign won
-            'new_campaign_name': new_campaign,  # Where it's being moved
-            'before_match_type': row.get('Match Type', 'broad'),  # Original match type
-            'after_match_type': 'exact'  # Harvested to exact
-        })
+    actions_to_log = []
+    key_parts = []
+    for df, fields in sections:
+        actions_to_log.extend(_frame_actions(fields, len(df)))
+        key_parts.append(pd.DataFrame({
+            'target_text': fields['target_text'],
+            'action_type': fields['action_type'],
+            'campaign_name': fields['campaign_name'],
+        }, index=range(len(df))))
 
+    if not actions_to_log:
+        return []
 
     # === DEDUPLICATE ACTIONS ===
     # Remove duplicates that would violate the unique constraint:
     # (client_id, action_date, target_text, action_type, campaign_name)
     # Keep the last occurrence (most recent values for the same target)
-    seen_keys = {}
-    for i, action in enumerate(actions_to_log):
-        key = (
-            action.get('target_text', '').lower().strip(),
-            action.get('action_type', ''),
-            action.get('campaign_name', '').strip()
-        )
-        seen_keys[key] = i  # Overwrite with latest index
+    keys = pd.concat(key_parts, ignore_index=True)
+    keys['target_text'] = keys['target_text'].str.lower().str.strip()
+    keys['campaign_name'] = keys['campaign_name'].str.strip()
+    keep = ~keys.duplicated(keep='last').to_numpy()
+    return [a for a, k in zip(actions_to_log, keep) if k]
+
+
+def _log_optimization_events(results: dict, client_id: str, report_date: str):
+    """
+    Standardizes and logs optimization actions (bids, negatives, harvests).
+    
+    If user has already accepted actions this session (optimizer_actions_accepted=True),
+    writes directly to DB and shows undo toast.
+    Otherwise, stores in session state for confirmation when leaving optimizer tab.
+    """
+    from core.db_manager import get_db_manager
+    import uuid
+    import streamlit as st
+    import time
     
-    # Build deduplicated list (keeping only the last occurrence of each key)
-    unique_indices = set(seen_keys.values())
-    actions_to_log = [a for i, a in enumerate(actions_to_log) if i in unique_indices]
+    batch_id = str(uuid.uuid4())[:8]
+    actions_to_log = build_optimization_actions(results)
 
     if not actions_to_log:
         return 0
@@ -1943,14 +2123,15 @@ class OptimizerModule(BaseFeature):
             st.warning("⚠️ Please upload a Search Term Report first.")
             return
         
-        df = hub.get_enriched_data() or hub.get_data("search_term_report")
+        data_type = "enriched_data" if hub.get_shared_frame("enriched_data") is not None else "search_term_report"
+        df = hub.get_data(data_type)
         self._render_sidebar()
         
         # Share config globally
         st.session_state['optimizer_config'] = self.config
         
         if st.session_state.get("run_optimizer"):
-            self._run_analysis(df)
+            self._run_analysis(df, hub.get_fingerprint(data_type))
             st.session_state["run_optimizer"] = False
             self._display_results()
         elif 'optimizer_results' in st.session_state:
@@ -2443,29 +2624,8 @@ class OptimizerModule(BaseFeature):
         
         return health_metrics
 
-    def _run_analysis(self, df):
-        df, date_info = prepare_data(df, self.config)
-        benchmarks = calculate_account_benchmarks(df, self.config)
-        universal_median = benchmarks.get('universal_median_roas', self.config.get("TARGET_ROAS", 2.5))
-        
-        matcher = ExactMatcher(df)
-        
-        harvest = identify_harvest_candidates(df, self.config, matcher, benchmarks)
-        neg_kw, neg_pt, your_products = identify_negative_candidates(df, self.config, harvest, benchmarks)
-        
-        neg_set = set(zip(neg_kw["Campaign Name"], neg_kw["Ad Group Name"], neg_kw["Term"].str.lower()))
-        bids_ex, bids_pt, bids_agg, bids_auto = calculate_bid_optimizations(df, self.config, set(harvest["Customer Search Term"].str.lower()), neg_set, universal_median)
-        
-        heatmap = create_heatmap(df, self.config, harvest, neg_kw, neg_pt, pd.concat([bids_ex, bids_pt]), pd.concat([bids_agg, bids_auto]))
-        
-        self.results = {
-            "df": df, "date_info": date_info, "harvest": harvest, "neg_kw": neg_kw, "neg_pt": neg_pt,
-            "your_products_review": your_products, 
-            "bids_exact": bids_ex, "bids_pt": bids_pt, "bids_agg": bids_agg, "bids_auto": bids_auto,
-            "direct_bids": pd.concat([bids_ex, bids_pt]),
-            "agg_bids": pd.concat([bids_agg, bids_auto]), "heatmap": heatmap,
-            "simulation": run_simulation(df, pd.concat([bids_ex, bids_pt]), pd.concat([bids_agg, bids_auto]), harvest, self.config, date_info)
-        }
+    def _run_analysis(self, df, fingerprint: Optional[str] = None):
+        self.results = run_optimization(df, self.config, fingerprint=fingerprint)
         st.session_state['optimizer_results'] = self.results
 
     def _display_dashboard_v2(self, results):
@@ -13,10 +13,11 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from features._base import BaseFeature
 from core.data_hub import DataHub
-from core.data_loader import SmartMapper, safe_numeric
+from core.data_loader import SmartMapper, safe_numeric, classify_match_type, expand_frame
+from core.performance_calc import CUBE_ROLLUPS, METRIC_VOLUMES, add_rate_metrics, build_metrics_cube, summarize_totals
 
 class PerformanceSnapshotModule(BaseFeature):
     """Performance Snapshot Dashboard."""
@@ -360,7 +361,7 @@ class PerformanceSnapshotModule(BaseFeature):
 
     def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
         """Prepare data for visualization."""
-        df = data.copy()
+        df = expand_frame(data)
         
         # Ensure numeric
         numeric_cols = ['Spend', 'Sales', 'Impressions', 'Clicks', 'Orders']
@@ -371,11 +372,7 @@ class PerformanceSnapshotModule(BaseFeature):
                 df[col] = 0.0
                 
         # Create derived metrics
-        df['ROAS'] = np.where(df['Spend'] > 0, df['Sales'] / df['Spend'], 0)
-        df['CPC'] = np.where(df['Clicks'] > 0, df['Spend'] / df['Clicks'], 0)
-        df['CTR'] = np.where(df['Impressions'] > 0, df['Clicks'] / df['Impressions'] * 100, 0)
-        df['CVR'] = np.where(df['Clicks'] > 0, df['Orders'] / df['Clicks'] * 100, 0)
-        df['ACOS'] = np.where(df['Sales'] > 0, df['Spend'] / df['Sales'] * 100, 0)
+        add_rate_metrics(df)
         
         # Handle Date for Trends
         # Try to find a date column
@@ -403,54 +400,41 @@ class PerformanceSnapshotModule(BaseFeature):
         # ---------------------------------------------------------
         # Unified Match Type Logic
         # ---------------------------------------------------------
-        # Create a new column 'Refined Match Type'
-        # Start with original Match Type
-        df['Refined Match Type'] = df['Match Type'].fillna('-').astype(str)
-
-        # Helper to classify based on Targeting
-        def refine_match_type(row):
-            mt = str(row['Refined Match Type']).upper()
-            # Check Targeting AND TargetingExpression if available
-            targeting = str(row.get('Targeting', '')).lower()
-            # If Targeting starts with 'asin=' or 'category=', use that
-            
-            # 1. Trust Strong Types
-            if mt in ['EXACT', 'BROAD', 'PHRASE', 'PT', 'CATEGORY', 'AUTO']:
-                return mt
-            
-            # 2. Heuristics on Targeting Text
-            if 'asin=' in targeting or (len(targeting) == 10 and targeting.startswith('b0')):
-                return 'PT'
-            if 'category=' in targeting:
-                return 'CATEGORY'
-            
-            # 3. Auto targeting keywords
-            auto_keywords = ['close-match', 'loose-match', 'substitutes', 'complements', '*']
-            if any(k in targeting for k in auto_keywords):
-                return 'AUTO'
-            
-            # 4. Fallback
-            return 'OTHER' if mt in ['-', 'NAN', 'NONE'] else mt
-
-        # Apply refinement
-        # Ensure Targeting column exists
+        # 'Refined Match Type': trust strong types (including the PT / CATEGORY / AUTO
+        # already inferred at upload), classify the rest from Targeting, blanks -> OTHER
         if 'Targeting' in df.columns and not df.empty:
-            df['Refined Match Type'] = df.apply(refine_match_type, axis=1)
+            df['Refined Match Type'] = classify_match_type(
+                df,
+                trusted=('EXACT', 'BROAD', 'PHRASE', 'PT', 'CATEGORY', 'AUTO'),
+                use_expression=False,
+                blank_values=('-', 'NAN', 'NONE'),
+                blank_label='OTHER',
+            )
+        else:
+            df['Refined Match Type'] = df['Match Type'].astype(object).fillna('-').astype(str)
         
+        # Totals and campaign / daily rollups of the filtered frame, shared by the dashboard sections
         return {
             'data': df,
-            'date_col': date_col
+            'date_col': date_col,
+            'cube': build_metrics_cube(df, {name: CUBE_ROLLUPS[name] for name in ('campaign', 'date')}),
         }
 
-    def _calculate_comparison_metrics(self, df: pd.DataFrame, days: int = 7) -> Dict[str, Any]:
-        """Calculate metrics for the latest N days vs. the previous N days."""
+    def _calculate_comparison_metrics(self, df: pd.DataFrame, days: int = 7, cube: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Calculate metrics for the latest N days vs. the previous N days.
+        
+        Periods are summed from the daily rollup of the metrics cube (cube of df from analyze).
+        """
         if df.empty or 'Date' not in df.columns:
             return {}
 
-        df['Date_Parsed'] = pd.to_datetime(df['Date'], errors='coerce')
-        max_date = df['Date_Parsed'].max()
-        if pd.isna(max_date):
+        if cube is None:
+            cube = build_metrics_cube(df, {'date': CUBE_ROLLUPS['date']})
+        daily = cube['rollups'].get('date')
+        if daily is None or daily.empty:
             return {}
+        max_date = daily['Date'].max()
 
         # Define Periods
         period_end = max_date
@@ -458,23 +442,17 @@ class PerformanceSnapshotModule(BaseFeature):
         prev_period_end = period_start - pd.Timedelta(days=1)
         prev_period_start = prev_period_end - pd.Timedelta(days=days-1)
 
-        # Current Period Data
-        curr_df = df[(df['Date_Parsed'] >= period_start) & (df['Date_Parsed'] <= period_end)]
-        # Previous Period Data
-        prev_df = df[(df['Date_Parsed'] >= prev_period_start) & (df['Date_Parsed'] <= prev_period_end)]
+        # Current Period Days
+        curr_days = (daily['Date'] >= period_start) & (daily['Date'] <= period_end)
+        # Previous Period Days
+        prev_days = (daily['Date'] >= prev_period_start) & (daily['Date'] <= prev_period_end)
 
-        def get_kpis(data_df):
-            spend = data_df['Spend'].sum()
-            sales = data_df['Sales'].sum()
-            orders = data_df['Orders'].sum()
-            clicks = data_df['Clicks'].sum() if 'Clicks' in data_df.columns else 0
-            roas = sales / spend if spend > 0 else 0
-            acos = (spend / sales * 100) if sales > 0 else 0
-            cvr = (orders / clicks * 100) if clicks > 0 else 0
-            return {'spend': spend, 'sales': sales, 'orders': orders, 'roas': roas, 'acos': acos, 'cvr': cvr}
+        def get_kpis(in_period):
+            period = summarize_totals(*(daily.loc[in_period, col].sum() for col in METRIC_VOLUMES))
+            return {key: period[key] for key in ('spend', 'sales', 'orders', 'roas', 'acos', 'cvr')}
 
-        curr_stats = get_kpis(curr_df)
-        prev_stats = get_kpis(prev_df)
+        curr_stats = get_kpis(curr_days)
+        prev_stats = get_kpis(prev_days)
 
         deltas = {}
         for key in curr_stats:
@@ -494,6 +472,7 @@ class PerformanceSnapshotModule(BaseFeature):
         """Display the dashboard."""
         df = results['data']
         date_col = results['date_col']
+        cube = results.get('cube') or build_metrics_cube(df, {name: CUBE_ROLLUPS[name] for name in ('campaign', 'date')})
         
         # ==========================================
         # 1. Executive Dashboard (KPI Cards with Trends)
@@ -503,21 +482,20 @@ class PerformanceSnapshotModule(BaseFeature):
         # Comparison Period from unified bar
         comp_days = st.session_state.get('overview_comp_days', 7)
         
-        deltas = self._calculate_comparison_metrics(df, comp_days)
-        
-        # Calculate Totals
-        total_spend = df['Spend'].sum()
-        total_sales = df['Sales'].sum()
-        total_orders = df['Orders'].sum()
-        total_clicks = df['Clicks'].sum()
-        total_impr = df['Impressions'].sum()
-        
-        # Weighted Averages
-        total_roas = total_sales / total_spend if total_spend > 0 else 0
-        total_acos = (total_spend / total_sales * 100) if total_sales > 0 else 0
-        total_ctr = (total_clicks / total_impr * 100) if total_impr > 0 else 0
-        total_cpc = total_spend / total_clicks if total_clicks > 0 else 0
-        total_cvr = (total_orders / total_clicks * 100) if total_clicks > 0 else 0
+        deltas = self._calculate_comparison_metrics(df, comp_days, cube)
+        
+        # Totals and weighted averages (metrics cube)
+        totals = cube['totals']
+        total_spend = totals['spend']
+        total_sales = totals['sales']
+        total_orders = totals['orders']
+        total_clicks = totals['clicks']
+        total_impr = totals['impressions']
+        total_roas = totals['roas']
+        total_acos = totals['acos']
+        total_ctr = totals['ctr']
+        total_cpc = totals['cpc']
+        total_cvr = totals['cvr']
         
         # Layout metrics with HTML
         from ui.components import metric_card
@@ -558,8 +536,8 @@ class PerformanceSnapshotModule(BaseFeature):
                 metric_bar = c2.selectbox("Bar Metric", ["Sales", "Spend", "Orders", "Clicks", "Impressions"], index=0)
                 metric_line = c3.selectbox("Line Metric", ["ACOS", "ROAS", "CPC", "CTR", "CVR"], index=0)
                 
-                # Resample Data based on selection
-                trend_df = df.set_index('Date').sort_index()
+                # Resample the daily rollup based on selection
+                trend_df = cube['rollups']['date'].set_index('Date')
                 
                 # Resampling Rules: W=Weekly, M=Monthly, Q=Quarterly, Y=Yearly
                 if time_frame == "Weekly":
@@ -577,11 +555,7 @@ class PerformanceSnapshotModule(BaseFeature):
                 }).reset_index()
                 
                 # Recalculate rates
-                resampled['ROAS'] = np.where(resampled['Spend'] > 0, resampled['Sales'] / resampled['Spend'], 0)
-                resampled['ACOS'] = np.where(resampled['Sales'] > 0, resampled['Spend'] / resampled['Sales'] * 100, 0)
-                resampled['CPC'] = np.where(resampled['Clicks'] > 0, resampled['Spend'] / resampled['Clicks'], 0)
-                resampled['CTR'] = np.where(resampled['Impressions'] > 0, resampled['Clicks'] / resampled['Impressions'] * 100, 0)
-                resampled['CVR'] = np.where(resampled['Clicks'] > 0, resampled['Orders'] / resampled['Clicks'] * 100, 0)
+                add_rate_metrics(resampled)
                 
                 # Plot Trend
                 fig = go.Figure()
@@ -639,33 +613,15 @@ class PerformanceSnapshotModule(BaseFeature):
                 st.markdown(f"**Campaign Performance Quadrants**")
                 
                 # Determine Data Source for Bubble Chart (Prioritize Uploaded File for "Current Snapshot")
-                bubble_df = df
-                from core.data_hub import DataHub
+                # Campaign rollup (sums, ROAS, CVR %) from the uploaded dataset's cached metrics cube
+                bubble_cube = cube
                 hub = DataHub()
                 if hub.is_loaded('search_term_report'):
-                     uploaded = hub.get_enriched_data()
-                     if uploaded is None:
-                         uploaded = hub.get_data('search_term_report')
-                     
-                     if uploaded is not None:
-                         bubble_df = uploaded.copy()
-                         # Ensure numeric for aggregation
-                         params = ['Spend', 'Sales', 'Orders', 'Clicks']
-                         for p in params:
-                             if p in bubble_df.columns:
-                                 bubble_df[p] = pd.to_numeric(bubble_df[p], errors='coerce').fillna(0)
-                
-                # Group by Campaign
-                camp_agg = bubble_df.groupby('Campaign Name').agg({
-                    'Sales': 'sum', 
-                    'Spend': 'sum',
-                    'Orders': 'sum',
-                    'Clicks': 'sum'
-                }).reset_index()
+                     uploaded_cube = hub.get_metrics_cube()
+                     if uploaded_cube is not None and 'campaign' in uploaded_cube['rollups']:
+                         bubble_cube = uploaded_cube
                 
-                # Calc Metrics
-                camp_agg['ROAS'] = np.where(camp_agg['Spend'] > 0, camp_agg['Sales'] / camp_agg['Spend'], 0)
-                camp_agg['CVR'] = np.where(camp_agg['Clicks'] > 0, camp_agg['Orders'] / camp_agg['Clicks'] * 100, 0)
+                camp_agg = bubble_cube['rollups']['campaign']
                 
                 # Calculate Medians
                 median_cvr = camp_agg['CVR'].median()
@@ -832,14 +788,13 @@ class PerformanceSnapshotModule(BaseFeature):
             'Clicks': 'sum', 'Impressions': 'sum'
         }
         
-        grouped = df.groupby(group_col).agg(agg_cols).reset_index()
+        if view_by == "Campaign Name" and 'campaign' in cube['rollups']:
+            grouped = cube['rollups']['campaign']  # Whole report, no drill-down filter
+        else:
+            grouped = df.groupby(group_col, observed=True).agg(agg_cols).reset_index()
         
         # Calc Metrics
-        grouped['ACOS'] = np.where(grouped['Sales'] > 0, grouped['Spend'] / grouped['Sales'] * 100, 0)
-        grouped['ROAS'] = np.where(grouped['Spend'] > 0, grouped['Sales'] / grouped['Spend'], 0)
-        grouped['CTR'] = np.where(grouped['Impressions'] > 0, grouped['Clicks'] / grouped['Impressions'] * 100, 0)
-        grouped['CVR'] = np.where(grouped['Clicks'] > 0, grouped['Orders'] / grouped['Clicks'] * 100, 0)
-        grouped['CPC'] = np.where(grouped['Clicks'] > 0, grouped['Spend'] / grouped['Clicks'], 0)
+        grouped = add_rate_metrics(grouped)[[group_col, *agg_cols, 'ACOS', 'ROAS', 'CTR', 'CVR', 'CPC']]
         
         # Sort by Spend desc
         grouped = grouped.sort_values('Spend', ascending=False)
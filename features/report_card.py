@@ -9,6 +9,8 @@ from typing import Optional
 # Core imports
 from features._base import BaseFeature
 from core.data_hub import DataHub
+from core.performance_calc import build_metrics_cube
+from api.llm_gateway import OPENAI_CHAT_URL, LLMAPIError, get_gateway
 from ui.components import metric_card
 from utils.formatters import format_currency, format_percentage
 
@@ -59,7 +61,7 @@ class ReportCardModule(BaseFeature):
         
     def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
         """Analyze data and compute metrics."""
-        return self._compute_metrics(data)
+        return self._compute_metrics(data, getattr(self, 'metrics_cube', None))
 
     def display_results(self, metrics: Dict[str, Any]):
         """Render the Report Card view."""
@@ -92,6 +94,7 @@ class ReportCardModule(BaseFeature):
             return
 
         self.data = df
+        self.metrics_cube = hub.get_metrics_cube()  # Cached per dataset; totals without a rescan
         
         # Now we can just call the manual steps or rely on BaseFeature's orchestration logic if we copied it.
         # However, to be safe and simple, I will just call the methods directly as my original run did, 
@@ -107,28 +110,24 @@ class ReportCardModule(BaseFeature):
         self.display_results(metrics)
         
     
-    def _compute_metrics(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Compute all report card metrics from data."""
-        
-        # 1. Performance Health
-        total_spend = df['Spend'].sum()
-        total_sales = df['Sales'].sum()
-        actual_roas = total_spend / total_sales if total_sales > 0 else 0
-        # Invert for ROAS (Sales/Spend) as commonly used in Amazon PPC, user code used Spend/Sales? 
-        # Wait, usually ROAS = Sales / Spend. ACOS = Spend / Sales.
-        # User's previous code: "actual_roas = total_sales / total_spend if total_spend > 0 else 0"
-        # Let's stick to standard ROAS = Sales/Spend.
-        actual_roas = total_sales / total_spend if total_spend > 0 else 0
+    def _compute_metrics(self, df: pd.DataFrame, cube: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Compute all report card metrics from data.
+        
+        cube: metrics cube of df (DataHub.get_metrics_cube); built from df when omitted.
+        """
+        if cube is None:
+            cube = build_metrics_cube(df, rollups={})
+        
+        # 1. Performance Health (ROAS = Sales / Spend)
+        total_spend = cube['totals']['spend']
+        total_sales = cube['totals']['sales']
+        actual_roas = cube['totals']['roas']
         
         target_roas = st.session_state.get('target_roas', 3.0) # Default target
         
-        # Spend Quality (Spend on terms with > 0 orders)
-        if 'Orders' in df.columns:
-            converting_spend = df[df['Orders'] > 0]['Spend'].sum()
-        elif 'Sales' in df.columns:
-            converting_spend = df[df['Sales'] > 0]['Spend'].sum()
-        else:
-            converting_spend = 0
+        # Spend Quality (Spend on terms with > 0 orders, or > 0 sales without an Orders column)
+        converting_spend = cube['converting_spend']
             
         spend_quality_score = (converting_spend / total_spend * 100) if total_spend > 0 else 0
         
@@ -334,24 +333,7 @@ class ReportCardModule(BaseFeature):
         # Mid = 0.8 * Target <= ROAS <= 1.2 * Target
         # High = ROAS > 1.2 * Target
         
-        def classify_spend(row):
-            s = row['Spend']
-            r = row['Sales'] / s if s > 0 else 0
-            if r == 0 or r < (target_roas * 0.8):
-                return 'Low'
-            elif r >= (target_roas * 0.8) and r <= (target_roas * 1.2):
-                return 'Mid'
-            else:
-                return 'High'
-        
-        # Apply classification
-        # We need a copy to not mutate original df
-        temp_df = df.copy()
-        if 'Spend' in temp_df.columns and 'Sales' in temp_df.columns:
-            temp_df['Bucket'] = temp_df.apply(classify_spend, axis=1)
-            bucket_spend = temp_df.groupby('Bucket')['Spend'].sum().to_dict()
-        else:
-            bucket_spend = {'Low': 0, 'Mid': 0, 'High': 0}
+        bucket_spend = self._bucket_spend(df, target_roas)
 
         low_spend = bucket_spend.get('Low', 0)
         mid_spend = bucket_spend.get('Mid', 0)
@@ -443,6 +425,24 @@ class ReportCardModule(BaseFeature):
         }
 
 
+    @staticmethod
+    def _bucket_spend(df: pd.DataFrame, target_roas: float) -> Dict[str, float]:
+        """
+        Spend per ROAS bucket (Low / Mid / High vs target), classified column-wise.
+        
+        Row ROAS is 0 without spend; a NaN ROAS falls through to High. Only buckets
+        with rows are returned.
+        """
+        if 'Spend' not in df.columns or 'Sales' not in df.columns:
+            return {'Low': 0, 'Mid': 0, 'High': 0}
+        spend = df['Spend'].to_numpy(dtype=float, na_value=np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            row_roas = np.where(spend > 0, df['Sales'].to_numpy(dtype=float, na_value=np.nan) / spend, 0)
+        low = (row_roas == 0) | (row_roas < target_roas * 0.8)
+        mid = ~low & (row_roas >= target_roas * 0.8) & (row_roas <= target_roas * 1.2)
+        buckets = {'Low': low, 'Mid': mid, 'High': ~low & ~mid}
+        return {name: df['Spend'][mask].sum() for name, mask in buckets.items() if mask.any()}
+
     def _create_gauge(self, value: float, title: str, min_val=0, max_val=100, suffix="%", target_val=None) -> Any:
         import plotly.graph_objects as go
         
@@ -809,9 +809,6 @@ class ReportCardModule(BaseFeature):
         Strictly summarizes metrics. DOES NOT execute tools.
         """
         try:
-            import requests
-            import json
-            
             # Fetch API Key
             api_key = None
             if hasattr(st, "secrets"):
@@ -868,18 +865,12 @@ class ReportCardModule(BaseFeature):
                 "Authorization": f"Bearer {api_key}" 
             }
             
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return response.json()['choices'][0]['message']['content']
-            else:
-                return f"⚠️ AI Error: {response.status_code} - {response.text}"
+            # Unchanged metrics are answered from the gateway's response cache
+            response = get_gateway().call(OPENAI_CHAT_URL, headers, payload, timeout=30)
+            return response['choices'][0]['message']['content']
                 
+        except LLMAPIError as e:
+            return f"⚠️ AI Error: {e.status_code} - {e.text}"
         except Exception as e:
             return f"⚠️ Could not generate insight: {str(e)}"
 
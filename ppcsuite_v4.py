@@ -186,21 +186,24 @@ def run_consolidated_optimizer():
     
     # FIXED: Use ONLY the freshly uploaded STR from current session
     # This ensures we optimize the specific time period uploaded, not historical DB data
-    df_raw = hub.get_data("search_term_report")
-    if df_raw is None or df_raw.empty:
+    # Canonical (read-only) hub frame: this page only selects rows and columns;
+    # prepare_data makes the one working copy the optimizer modifies
+    df = hub.get_shared_frame("search_term_report")
+    if df is None or df.empty:
         st.error("❌ No Search Term Report data found in session.")
         return
     
-    # Work with a copy to avoid modifying Hub data in-place
-    df = df_raw.copy()
+    # DataHub ID of the frame being analysed (keys the optimizer stage cache; None = uncached)
+    data_fp = hub.get_fingerprint("search_term_report")
     
     
     # Apply enrichment (IDs, SKUs) to the fresh data WITHOUT mixing with DB historical data
     # This adds CampaignId, AdGroupId, SKU, etc. from bulk/APR files
-    enriched = hub.get_enriched_data()
+    enriched = hub.get_shared_frame("enriched_data")
     if enriched is not None and len(enriched) == len(df):
         # Use enriched version if it matches the upload size (no extra rows from DB)
-        df = enriched.copy()
+        df = enriched
+        data_fp = hub.get_fingerprint("enriched_data")
 
     # =====================================================
     # DB INTEGRATION: Allow extending window with historical data
@@ -238,6 +241,7 @@ def run_consolidated_optimizer():
                         
                         # Drop duplicates (keep newest/session data which might have more recent metrics)
                         df = combined.drop_duplicates(subset=['Date', 'Campaign Name', 'Ad Group Name', 'Targeting'], keep='first')
+                        data_fp = None  # DB history is not a registered dataset
                         st.success(f"✅ Merged {len(db_df)} historical records from database.")
     
     # =====================================================
@@ -252,10 +256,10 @@ def run_consolidated_optimizer():
     
     if date_col:
         from datetime import datetime, timedelta
-        df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
+        dates = pd.to_datetime(df[date_col], errors='coerce')
         
-        min_date = df[date_col].min()
-        max_date = df[date_col].max()
+        min_date = dates.min()
+        max_date = dates.max()
         
         if include_db:
             # If DB included, allow full range selection
@@ -293,23 +297,23 @@ def run_consolidated_optimizer():
                                           max_value=s_max,
                                           key="opt_date_end")
         
-        # Filter data to selected range
-        mask = (df[date_col].dt.date >= start_date) & (df[date_col].dt.date <= end_date)
-        df = df[mask].copy()
+        # Filter data to selected range (take copies only the selected rows of the
+        # compact frame; its parsed dates replace the raw column)
+        rows = ((dates.dt.date >= start_date) & (dates.dt.date <= end_date)).to_numpy().nonzero()[0]
+        df = df.take(rows)
+        df[date_col] = dates.to_numpy()[rows]
+        data_fp = DataHub.derive_fingerprint(data_fp, date_col, start_date, end_date)
         days_selected = (end_date - start_date).days + 1
         st.caption(f"📆 Analyzing **{days_selected} days** ({start_date.strftime('%b %d')} - {end_date.strftime('%b %d')}) | {len(df):,} rows")
         
     # Helper to calculate summary metrics early for Header
     if "Spend" in df.columns and "Sales" in df.columns:
-        # CLEANUP: Ensure numeric types for calculation
-        df["Spend"] = safe_numeric(df["Spend"])
-        df["Sales"] = safe_numeric(df["Sales"])
-        
+        # CLEANUP: Ensure numeric types for calculation (prepare_data converts the columns)
         from ui.components import metric_card
         
         c1, c2, c3, c4 = st.columns(4)
-        total_spend = df["Spend"].sum()
-        total_sales = df["Sales"].sum()
+        total_spend = safe_numeric(df["Spend"]).sum()
+        total_sales = safe_numeric(df["Sales"]).sum()
         roas = total_sales / total_spend if total_spend > 0 else 0
         acos = (total_spend / total_sales * 100) if total_sales > 0 else 0
         
@@ -414,10 +418,10 @@ def run_consolidated_optimizer():
     # 2. Main Logic Trigger
     with st.spinner("Running Optimization Engine..."):
         # A. Prepare Data & Run Core Logic
-        df_prep, date_info = prepare_data(df, opt.config)
+        df_prep, date_info = prepare_data(df, opt.config, data_fp)
         
         # Consolidation Fix: Calculate benchmarks ONCE and pass them down
-        benchmarks = calculate_account_benchmarks(df_prep, opt.config)
+        benchmarks = calculate_account_benchmarks(df_prep, opt.config, data_fp)
         universal_median = benchmarks.get('universal_median_roas', opt.config.get("TARGET_ROAS", 2.5))
         
         matcher = ExactMatcher(df_prep)
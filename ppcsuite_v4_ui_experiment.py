@@ -213,6 +213,8 @@ def run_consolidated_optimizer():
     
     # Work with a copy to avoid modifying Hub data in-place
     df = df_raw.copy()
+    # DataHub ID of the frame being analysed (keys the optimizer stage cache; None = uncached)
+    data_fp = hub.get_fingerprint("search_term_report")
     
     # Show which data we're using
     upload_ts = st.session_state.unified_data.get('upload_timestamps', {}).get('search_term_report')
@@ -224,6 +226,7 @@ def run_consolidated_optimizer():
     if enriched is not None and len(enriched) == len(df):
         # Use enriched version if it matches the upload size (no extra rows from DB)
         df = enriched.copy()
+        data_fp = hub.get_fingerprint("enriched_data")
 
     # =====================================================
     # DB INTEGRATION: Allow extending window with historical data
@@ -261,6 +264,7 @@ def run_consolidated_optimizer():
                         
                         # Drop duplicates (keep newest/session data which might have more recent metrics)
                         df = combined.drop_duplicates(subset=['Date', 'Campaign Name', 'Ad Group Name', 'Targeting'], keep='first')
+                        data_fp = None  # DB history is not a registered dataset
                         st.success(f"✅ Merged {len(db_df)} historical records from database.")
     
     # =====================================================
@@ -321,6 +325,7 @@ def run_consolidated_optimizer():
         # Filter data to selected range
         mask = (df[date_col].dt.date >= start_date) & (df[date_col].dt.date <= end_date)
         df = df[mask].copy()
+        data_fp = DataHub.derive_fingerprint(data_fp, date_col, start_date, end_date)
         days_selected = (end_date - start_date).days + 1
         
         # Baseline metrics calculation
@@ -590,10 +595,10 @@ def run_consolidated_optimizer():
     # 2. Main Logic Trigger
     with st.spinner("Running Optimization Engine..."):
         # A. Prepare Data & Run Core Logic
-        df_prep, date_info = prepare_data(df, opt.config)
+        df_prep, date_info = prepare_data(df, opt.config, data_fp)
         
         # Consolidation Fix: Calculate benchmarks ONCE and pass them down
-        benchmarks = calculate_account_benchmarks(df_prep, opt.config)
+        benchmarks = calculate_account_benchmarks(df_prep, opt.config, data_fp)
         universal_median = benchmarks.get('universal_median_roas', opt.config.get("TARGET_ROAS", 2.5))
         
         matcher = ExactMatcher(df_prep)
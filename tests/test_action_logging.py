@@ -0,0 +1,129 @@
+"""
+Action Logging Tests
+
+build_optimization_actions builds action dicts column-wise (missing columns
+take the old row.get defaults) and keeps the last action per (target, type,
+campaign). log_action_batch writes a batch with one executemany: duplicate
+keys within the batch are last-wins like row-by-row upserts, keys holding a
+NULL never conflict in SQL and are all kept, and the return value counts the
+rows actually written.
+"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.db_manager import DatabaseManager
+from features.optimizer import build_optimization_actions
+
+NEGATIVE = {'entity_name': 'Keyword', 'action_type': 'NEGATIVE', 'old_value': 'ENABLED', 'new_value': 'PAUSED'}
+BID = {'entity_name': 'Target', 'action_type': 'BID_CHANGE'}
+HARVEST = {'entity_name': 'Keyword', 'action_type': 'HARVEST', 'old_value': 'DISCOVERY', 'new_value': 'PROMOTED',
+           'match_type': 'EXACT', 'after_match_type': 'exact'}
+
+
+def results():
+    return {
+        'neg_kw': pd.DataFrame({'Campaign Name': ['C1', 'C1'], 'Ad Group Name': ['A1', 'A1'],
+                                'Term': ['bad term', 'waste']}),
+        'neg_pt': pd.DataFrame({'Campaign Name': ['C2'], 'Ad Group Name': ['A2'], 'Term': ['asin="B0X"'],
+                                'Reason': ['Isolation negative']}),
+        'bids_exact': pd.DataFrame({'Campaign Name': ['C1', 'C1'], 'Ad Group Name': ['A1', 'A1'],
+                                    'Targeting': ['kw one', 'kw two'], 'Match Type': ['exact', 'exact'],
+                                    'Current Bid': [1.0, 0.5], 'New Bid': [1.2, 0.4], 'Reason': ['Scale up', 'Reduce']}),
+        'bids_pt': pd.DataFrame(),
+        # Same key as "kw one" after lower/strip: replaces it
+        'bids_agg': pd.DataFrame({'Campaign Name': ['C1 '], 'Ad Group Name': ['A1'], 'Targeting': [' KW ONE '],
+                                  'Current Bid': [1.2], 'New Bid': [0.9]}),
+        'harvest': pd.DataFrame({'Campaign Name': ['C3', ''], 'Ad Group Name': ['A3', 'A4'],
+                                 'Customer Search Term': ['new term', 'term two'], 'Orders': [4, 2],
+                                 'Match Type': ['broad', 'phrase']}),
+    }
+
+
+class TestBuildOptimizationActions(unittest.TestCase):
+
+    def test_actions(self):
+        self.assertEqual(build_optimization_actions(results()), [
+            {**NEGATIVE, 'reason': 'Low efficiency / Waste', 'campaign_name': 'C1', 'ad_group_name': 'A1',
+             'target_text': 'bad term', 'match_type': 'NEGATIVE'},
+            {**NEGATIVE, 'reason': 'Low efficiency / Waste', 'campaign_name': 'C1', 'ad_group_name': 'A1',
+             'target_text': 'waste', 'match_type': 'NEGATIVE'},
+            {**NEGATIVE, 'entity_name': 'ASIN', 'reason': 'Isolation negative', 'campaign_name': 'C2',
+             'ad_group_name': 'A2', 'target_text': 'asin="B0X"', 'match_type': 'TARGETING_EXPRESSION'},
+            {**BID, 'old_value': '0.5', 'new_value': '0.4', 'reason': 'Reduce', 'campaign_name': 'C1',
+             'ad_group_name': 'A1', 'target_text': 'kw two', 'match_type': 'exact'},
+            {**BID, 'old_value': '1.2', 'new_value': '0.9', 'reason': 'Portfolio Optimization', 'campaign_name': 'C1 ',
+             'ad_group_name': 'A1', 'target_text': ' KW ONE ', 'match_type': ''},
+            {**HARVEST, 'reason': 'Conv: 4 orders', 'campaign_name': 'C3', 'ad_group_name': 'A3',
+             'target_text': 'new term', 'winner_source_campaign': 'C3', 'new_campaign_name': 'Harvest_Exact_C3',
+             'before_match_type': 'broad'},
+            {**HARVEST, 'reason': 'Conv: 2 orders', 'campaign_name': '', 'ad_group_name': 'A4',
+             'target_text': 'term two', 'winner_source_campaign': '', 'new_campaign_name': 'Harvest_Exact_Campaign',
+             'before_match_type': 'phrase'},
+        ])
+
+    def test_no_results(self):
+        self.assertEqual(build_optimization_actions({}), [])
+
+
+class TestLogActionBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_action_logging_')
+        self.db = DatabaseManager(Path(self.tmpdir) / 'actions.db')
+
+    def tearDown(self):
+        self.db._pool.close_all()
+        self.db._read_pool.close_all()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def logged(self, batch_id):
+        rows = self.db.get_actions_by_batch(batch_id)
+        return sorted(((r['target_text'], r['action_type'], r['campaign_name'], r['new_value']) for r in rows),
+                      key=str)
+
+    def test_duplicate_and_null_keys(self):
+        actions = [
+            {**BID, 'target_text': 'kw', 'campaign_name': 'C1', 'new_value': 1.1},
+            {**BID, 'target_text': 'kw', 'campaign_name': 'C1', 'new_value': 1.3},
+            {**NEGATIVE, 'target_text': 'kw', 'campaign_name': 'C1'},
+            {**BID, 'target_text': None, 'campaign_name': 'C1', 'new_value': 2.0},
+            {**BID, 'target_text': None, 'campaign_name': 'C1', 'new_value': 2.5},
+            {**BID, 'target_text': 'kw', 'campaign_name': None, 'new_value': 3.0},
+        ]
+
+        self.assertEqual(self.db.log_action_batch(actions, 'acct', 'b1', '2025-07-01'), 5)
+        self.assertEqual(self.logged('b1'), sorted([
+            ('kw', 'BID_CHANGE', 'C1', '1.3'),
+            ('kw', 'NEGATIVE', 'C1', 'PAUSED'),
+            (None, 'BID_CHANGE', 'C1', '2.0'),
+            (None, 'BID_CHANGE', 'C1', '2.5'),
+            ('kw', 'BID_CHANGE', None, '3.0'),
+        ], key=str))
+
+        # Re-logging the same date replaces the keyed rows; NULL-key rows are added again
+        self.assertEqual(self.db.log_action_batch(actions, 'acct', 'b2', '2025-07-01'), 5)
+        self.assertEqual(len(self.logged('b1')), 3)
+        self.assertEqual(len(self.logged('b2')), 5)
+
+    def test_optimizer_actions_round_trip(self):
+        actions = build_optimization_actions(results())
+        self.assertEqual(self.db.log_action_batch(actions, 'acct', 'b1', '2025-07-01T10:00:00'), len(actions))
+
+        rows = self.db.get_actions_by_batch('b1')
+        self.assertEqual({r['action_date'] for r in rows}, {'2025-07-01'})
+        harvest = next(r for r in rows if r['target_text'] == 'new term')
+        self.assertEqual((harvest['new_campaign_name'], harvest['before_match_type'], harvest['after_match_type']),
+                         ('Harvest_Exact_C3', 'broad', 'exact'))
+        self.assertEqual(self.db.log_action_batch([], 'acct'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+ASIN Cache Population Tests
+
+DataHub._populate_asin_cache writes own-product placeholders with one
+INSERT OR IGNORE transaction instead of a get/set per row. As before, real
+API entries must survive, expired entries must be replaced, the first row of
+a repeated ASIN wins, and a repeat upload changes nothing.
+"""
+
+import json
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.rainforest_client import ASINCache
+from core.data_hub import DataHub
+
+
+def catalog():
+    return pd.DataFrame({
+        'SKU': ['SKU-1', 'SKU-2', 'SKU-3', 'SKU-4', 'SKU-5', 'SKU-6', 'SKU-7'],
+        'ASIN': ['b0aaaaaaa1', ' B0AAAAAAA1 ', 'B0KEEP0001', 'B0STALE001', 'NOT-AN-ASIN', 'A012345678', None],
+        'Product Name': ['Mug', 'Mug (duplicate)', 'Placeholder', None, 'Skipped', 'Skipped', 'Skipped'],
+    })
+
+
+class TestPopulateAsinCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_asin_cache_')
+        self.db_path = str(Path(self.tmpdir) / 'asin_cache.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE asin_lookups (asin TEXT, marketplace TEXT, data TEXT, lookup_date TIMESTAMP, '
+                     'PRIMARY KEY (asin, marketplace))')
+        conn.executemany('INSERT INTO asin_lookups VALUES (?, ?, ?, ?)', [
+            ('B0KEEP0001', 'AE', json.dumps({'asin': 'B0KEEP0001', 'title': 'From API', 'status': 'success'}),
+             datetime.now().isoformat(' ')),
+            ('B0STALE001', 'AE', json.dumps({'asin': 'B0STALE001', 'title': 'Stale'}),
+             (datetime.now() - timedelta(days=45)).isoformat(' ')),
+        ])
+        conn.commit()
+        conn.close()
+        patcher = patch('core.data_hub.ASINCache', partial(ASINCache, self.db_path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def rows(self):
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute('SELECT asin, marketplace, data, lookup_date FROM asin_lookups ORDER BY asin').fetchall()
+        conn.close()
+        return rows
+
+    def test_placeholders_never_replace_live_entries(self):
+        DataHub()._populate_asin_cache(catalog())
+
+        rows = self.rows()
+        self.assertEqual([(asin, mp) for asin, mp, _, _ in rows],
+                         [('B0AAAAAAA1', 'AE'), ('B0KEEP0001', 'AE'), ('B0STALE001', 'AE')])
+        data = {asin: json.loads(text) for asin, _, text, _ in rows}
+        self.assertEqual(data['B0KEEP0001']['title'], 'From API')
+        self.assertEqual(data['B0AAAAAAA1']['title'], 'Mug')
+        self.assertEqual(data['B0STALE001']['title'], 'Your Product (SKU-4)')
+        self.assertEqual(data['B0AAAAAAA1'], {
+            'asin': 'B0AAAAAAA1', 'title': 'Mug', 'brand': 'Your Brand', 'seller': 'Your Seller ID',
+            'price': None, 'currency': 'AED', 'rating': None, 'reviews_count': None,
+            'category': 'Advertised Product', 'availability': 'In Stock',
+            'product_url': 'https://www.amazon.ae/dp/B0AAAAAAA1', 'status': 'success', 'is_own_product': True,
+        })
+
+        # Repeat upload: every ASIN is already cached
+        DataHub()._populate_asin_cache(catalog())
+        self.assertEqual(self.rows(), rows)
+
+        cache = ASINCache(self.db_path)
+        self.addCleanup(cache.close)
+        self.assertEqual(set(cache.get_many(['b0aaaaaaa1', 'B0KEEP0001', 'B0STALE001', 'B0MISSING1'])),
+                         {'B0AAAAAAA1', 'B0KEEP0001', 'B0STALE001'})
+
+
+if __name__ == '__main__':
+    unittest.main()
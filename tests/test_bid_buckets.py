@@ -0,0 +1,75 @@
+"""
+Bid Bucket Classification Tests
+
+classify_bid_buckets must keep the row-wise rules of calculate_bid_optimizations:
+harvested terms and (campaign, ad group, term) negatives excluded on either
+Customer Search Term or Targeting, then Auto > PT > Category > Exact /
+Broad-Phrase, with case and surrounding whitespace ignored.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from features.optimizer import classify_bid_buckets
+
+BUCKETS = ["exact", "pt", "broad_phrase", "auto", "category"]
+
+# (Campaign, Ad Group, Customer Search Term, Targeting, Match Type, expected bucket)
+ROWS = [
+    ("C1", "AG1", "water bottle", "water bottle", "exact", "exact"),
+    ("C1", "AG1", "water bottle", " Water Bottle ", "EXACT", "exact"),
+    ("C1", "AG2", "kids cup", "kids cup", "broad", "broad_phrase"),
+    ("C1", "AG2", "steel cup", "steel cup", "Phrase", "broad_phrase"),
+    ("C2", "AG1", "b0abcdefgh", 'asin="B0ABCDEFGH"', "PT", "pt"),
+    ("C2", "AG1", "b0abcdefgh", 'asin-expanded="B0ABCDEFGH"', "-", "pt"),
+    ("C2", "AG1", "b0abcdefgh", "b0abcdefgh", "exact", "pt"),
+    ("C2", "AG2", "toy set", 'category="toys"', "CATEGORY", "category"),
+    ("C3", "AG1", "cup", "close-match", "auto", "auto"),
+    ("C3", "AG1", "cup", " Loose-Match ", "broad", "auto"),
+    ("C3", "AG1", "cup", "insulated cup", "-", "auto"),
+    ("C1", "AG1", "Harvest Me", "something else", "exact", "excluded"),
+    ("C1", "AG1", "x", "harvest me", "broad", "excluded"),
+    ("C1", "AG3", "neg kw", "neg kw", "exact", "excluded"),
+    ("C4", "AG3", "neg kw", "neg kw", "exact", "exact"),
+    ("C1", "AG1", "no match type", "no match type", np.nan, None),
+    ("C1", "AG1", "painting", "painting", "unknown", None),
+]
+
+
+def report():
+    df = pd.DataFrame(ROWS, columns=["Campaign Name", "Ad Group Name", "Customer Search Term",
+                                     "Targeting", "Match Type", "expected"])
+    df.index = df.index * 10 + 5  # Masks must align to a non-default index
+    return df
+
+
+class TestClassifyBidBuckets(unittest.TestCase):
+
+    def test_buckets_per_row(self):
+        df = report()
+        masks = classify_bid_buckets(df.drop(columns="expected"), {"harvest me"}, {("C1", "AG3", "neg kw")})
+
+        for name, mask in masks.items():
+            self.assertTrue(mask.index.equals(df.index), name)
+        got = []
+        for idx in df.index:
+            hits = [b for b in BUCKETS if masks[b][idx]]
+            self.assertLessEqual(len(hits), 1, f"row {idx} in several buckets: {hits}")
+            got.append("excluded" if masks["excluded"][idx] else (hits[0] if hits else None))
+        self.assertEqual(got, df["expected"].tolist())
+
+    def test_no_exclusions(self):
+        df = report().drop(columns="expected")
+        masks = classify_bid_buckets(df)
+        self.assertFalse(masks["excluded"].any())
+        self.assertEqual(int(masks["exact"].sum()), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
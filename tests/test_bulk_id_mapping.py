@@ -0,0 +1,112 @@
+"""
+Bulk ID Mapping Tests
+
+MappingEngine.map_ids_from_bulk and optimizer.enrich_with_ids resolve IDs
+through a prebuilt BulkIdIndex instead of re-normalizing the bulk sheet per
+call. The resolved IDs, bids and match stats must stay those of the former
+per-call helpers (checked on this fixture before they were removed).
+"""
+
+import contextlib
+import io
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.mapping_engine import BulkIdIndex, MappingEngine
+from features.optimizer import enrich_with_ids
+
+NA = np.nan
+
+
+def bulk():
+    return pd.DataFrame({
+        'Campaign Name': ['Brand - SP'] * 4 + ['PT Camp'] * 2 + ['Auto Camp'] * 2,
+        'Ad Group Name': ['Exact AG', 'Exact AG', 'Broad AG', 'Broad AG', 'PT AG', 'PT AG', 'Auto AG', 'Auto AG'],
+        'CampaignId': ['100'] * 4 + ['200'] * 2 + ['300'] * 2,
+        'AdGroupId': ['500', '500', '501', '501', '600', '600', '700', '700'],
+        'Customer Search Term': ['Water Bottle', 'kids cup', 'cups', 'mugs', None, None, None, None],
+        'KeywordId': ['K1', 'K2', 'K3', 'K4', None, None, None, None],
+        'Match Type': ['Exact', 'exact', 'broad', 'phrase', None, None, None, None],
+        'TargetingExpression': [None] * 4 + ['asin="B0ABCDEFGH"', 'category="Toys"', 'close-match', 'loose-match'],
+        'TargetingId': [None] * 4 + ['T1', 'T2', 'T3', 'T4'],
+        'Ad Group Default Bid': [1.0, 1.0, 0.6, 0.6, 0.9, 0.9, 0.5, 0.5],
+        'Bid': [1.5, 0.5, 0.8, NA, NA, NA, NA, NA],
+    })
+
+
+def report():
+    return pd.DataFrame({
+        'Campaign Name': ['Brand - SP', 'brand-sp', 'Brand - SP', 'PT Camp', 'PT Camp', 'Auto Camp', 'Auto Camp', 'Unknown'],
+        'Ad Group Name': ['Exact AG', 'exact ag', 'Broad AG', 'PT AG', 'PT AG', 'Auto AG', 'Auto AG', 'AG'],
+        'Targeting': ['water bottle', 'KIDS CUP', 'cups broad thing', 'asin="b0abcdefgh"', 'category="toys"',
+                      'close-match', 'loose-match', 'foo'],
+        'Spend': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0],
+    })
+
+
+CAMPAIGN_IDS = ['100', '100', '100', '200', '200', '300', '300', NA]
+AD_GROUP_IDS = ['500', '500', '501', '600', '600', '700', '700', NA]
+TARGETING_IDS = [NA, NA, NA, 'T1', 'T2', 'T3', 'T4', NA]
+
+
+def quiet(fn, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+class TestMapIdsFromBulk(unittest.TestCase):
+
+    def test_resolved_ids_and_stats(self):
+        mapped, stats = quiet(MappingEngine.map_ids_from_bulk, report(), BulkIdIndex(bulk()))
+
+        expected = report().assign(
+            CampaignId=pd.Series(CAMPAIGN_IDS, dtype=object),
+            AdGroupId=pd.Series(AD_GROUP_IDS, dtype=object),
+            # Match Type is not carried into the keyword lookup, so keyword IDs
+            # resolve per ad group (first keyword), as they always have
+            KeywordId=pd.Series(['K1', 'K1', 'K3', NA, NA, NA, NA, NA], dtype=object),
+            TargetingId=pd.Series(TARGETING_IDS, dtype=object),
+            # Ad group means
+            **{'Ad Group Default Bid': [1.0, 1.0, 0.6, 0.9, 0.9, 0.5, 0.5, NA],
+               'Bid': [1.0, 1.0, 0.8, NA, NA, NA, NA, NA]},
+        )
+        pd.testing.assert_frame_equal(mapped, expected)
+        self.assertEqual(stats, {
+            'method': 'bulk', 'campaign_id_matched': 7, 'keyword_id_matched': 3, 'targeting_id_matched': 4,
+            'total': 8, 'default_bid_matched': 7, 'bid_matched': 3,
+        })
+
+
+class TestEnrichWithIds(unittest.TestCase):
+
+    def frame(self):
+        return report()[['Campaign Name', 'Ad Group Name', 'Targeting']].rename(columns={'Targeting': 'Term'})
+
+    def test_exact_target_ids(self):
+        expected = self.frame().assign(
+            KeywordId=pd.Series(['K1', 'K2', NA, NA, NA, NA, NA, NA], dtype=object),
+            TargetingId=pd.Series(TARGETING_IDS, dtype=object),
+            CampaignId=pd.Series(CAMPAIGN_IDS, dtype=object),
+            AdGroupId=pd.Series(AD_GROUP_IDS, dtype=object),
+        )
+        index = BulkIdIndex(bulk())
+        pd.testing.assert_frame_equal(quiet(enrich_with_ids, self.frame(), index), expected)
+        # A raw bulk frame gives the same result as a prebuilt index
+        pd.testing.assert_frame_equal(quiet(enrich_with_ids, self.frame(), bulk()), expected)
+
+    def test_fills_existing_id_columns(self):
+        enriched = quiet(enrich_with_ids, self.frame().assign(CampaignId=None), BulkIdIndex(bulk()))
+        self.assertEqual(list(enriched.columns),
+                         ['Campaign Name', 'Ad Group Name', 'Term', 'CampaignId', 'KeywordId', 'TargetingId', 'AdGroupId'])
+        pd.testing.assert_series_equal(enriched['CampaignId'], pd.Series(CAMPAIGN_IDS, dtype=object, name='CampaignId'))
+        pd.testing.assert_series_equal(enriched['AdGroupId'], pd.Series(AD_GROUP_IDS, dtype=object, name='AdGroupId'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Bulk ID Index Persistence Tests
+
+A persisted BulkIdIndex may only be reused for the exact bulk mapping (and
+index version) it was built from, and replacing an account's bulk mapping
+must drop it, or stale IDs would be served.
+"""
+
+import io
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.data_loader as data_loader
+import core.mapping_engine as mapping_engine
+from core.data_hub import DataHub
+from core.db_manager import DatabaseManager
+from core.mapping_engine import BulkIdIndex
+
+
+def bulk(campaign_id='111'):
+    return pd.DataFrame({
+        'Campaign Name': ['Brand Exact', 'Brand Exact', 'Auto'],
+        'CampaignId': [campaign_id, campaign_id, '222'],
+        'Ad Group Name': ['AG1', 'AG1', 'AG2'],
+        'AdGroupId': ['10', '10', '20'],
+        'Customer Search Term': ['shoes', 'boots', None],
+        'KeywordId': ['k1', 'k2', None],
+        'Match Type': ['exact', 'exact', None],
+    })
+
+
+class TestBulkIndexPersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_bulk_index_')
+        patcher = patch.object(mapping_engine, 'BULK_INDEX_DIR', str(Path(self.tmpdir) / 'bulk_index'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_round_trip(self):
+        frame = bulk()
+        saved = BulkIdIndex(frame).build_all()
+        saved.save('acct/1')
+        self.assertTrue((Path(self.tmpdir) / 'bulk_index' / 'acct_1.pkl').exists())
+
+        loaded = BulkIdIndex.load('acct/1', frame)
+        self.assertIsNotNone(loaded)
+        self.assertEqual(loaded.fingerprint, saved.fingerprint)
+        self.assertEqual(set(loaded._tables), set(saved._tables))
+        for name, table in saved._tables.items():
+            if table is not None:
+                pd.testing.assert_frame_equal(loaded.table(name), table)
+
+    def test_rejects_other_mapping_or_version(self):
+        BulkIdIndex(bulk()).save('acct')
+        self.assertIsNone(BulkIdIndex.load('acct', bulk(campaign_id='999')))
+        self.assertIsNone(BulkIdIndex.load('acct', bulk(), fingerprint='other'))
+        with patch.object(mapping_engine, 'BULK_INDEX_VERSION', mapping_engine.BULK_INDEX_VERSION + 1):
+            self.assertIsNone(BulkIdIndex.load('acct', bulk()))
+        self.assertIsNotNone(BulkIdIndex.load('acct', bulk()))
+        self.assertIsNone(BulkIdIndex.load('other_acct', bulk()))
+
+    def test_disabled_persistence(self):
+        with patch.object(mapping_engine, 'BULK_INDEX_DIR', ''):
+            BulkIdIndex(bulk()).save('acct')
+            self.assertIsNone(BulkIdIndex.load('acct', bulk()))
+        self.assertFalse((Path(self.tmpdir) / 'bulk_index').exists())
+
+    def test_upload_discards_persisted_index(self):
+        BulkIdIndex(bulk()).save('acct')
+        db = DatabaseManager(Path(self.tmpdir) / 'hub.db')
+        self.addCleanup(db._read_pool.close_all)
+        self.addCleanup(db._pool.close_all)
+
+        upload = io.BytesIO(bulk(campaign_id='999').to_csv(index=False).encode())
+        upload.name = 'bulk.csv'
+        st.session_state.clear()
+        st.session_state['active_account_id'] = 'acct'
+        with patch.object(data_loader, 'UPLOAD_CACHE_DIR', ''), \
+                patch('core.data_hub.get_db_manager', return_value=db):
+            ok, message = DataHub().upload_bulk_id_mapping(upload)
+
+        self.assertTrue(ok, message)
+        self.assertFalse((Path(self.tmpdir) / 'bulk_index' / 'acct.pkl').exists())
+        self.assertIsNone(BulkIdIndex.load('acct', bulk()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Bulk Export Validation Tests
+
+validate_bulk_export evaluates its rules column-wise; the issues (code, message,
+row, field, value and order) must match running the per-row validators on each
+row, including blank / NaN cells, missing columns and a non-default index.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.bulk_validation import (
+    validate_auto_campaign,
+    validate_bid_update,
+    validate_bleeder_negative,
+    validate_bulk_export,
+    validate_isolation_negative,
+)
+
+
+def issues(issue_list):
+    return [(i.code, i.message, i.severity, i.row, i.field, i.value) for i in issue_list]
+
+
+class TestValidateBulkExport(unittest.TestCase):
+
+    def test_negative_rules(self):
+        df = pd.DataFrame({
+            'Campaign Name': ['C1', 'C1', 'C2', 'C2', 'C3'],
+            'Ad Group Name': ['AG', '', np.nan, '  ', 'AG'],
+            'Match Type': ['Campaign Negative Exact', ' campaign negative phrase', 'negative exact',
+                           'Negative Phrase', 'exact'],
+            'State': ['paused', np.nan, 'enabled', 'enabled', 'enabled'],
+            'Bid': ['', 0.5, np.nan, '', 1.0],
+        })
+        _, result = validate_bulk_export(df, export_type='negatives', currency='USD')
+        rows = df.to_dict('records')
+
+        expected = (validate_isolation_negative(rows[0], 2) + validate_isolation_negative(rows[1], 3)
+                    + validate_bleeder_negative(rows[2], 4) + validate_bid_update(rows[2], 4)
+                    + validate_bleeder_negative(rows[3], 5)
+                    + validate_bid_update(rows[4], 6))
+        self.assertEqual(issues(result.issues), issues(expected))
+        self.assertEqual([i.code for i in result.issues], ['ISO001', 'ISO003', 'ISO002', 'ISO003', 'ISO004', 'BLD001', 'BLD001'])
+        # NaN State reads as 'nan' (flagged), a padded match type fails the exact-value check
+        self.assertEqual(result.issues[3].value, 'nan')
+        self.assertEqual(result.issues[2].value, ' campaign negative phrase')
+
+    def test_bid_rules_and_row_numbers(self):
+        df = pd.DataFrame({
+            'Campaign Name': ['Auto C', 'Manual C', 'Auto C', 'Manual C', 'Manual C'],
+            'Match Type': ['exact', 'broad', 'negative exact', '', 'phrase'],
+            'Bid': [0.05, '$4,250.00', 'n/a', 0, np.nan],
+            'New Bid': [None, None, None, 0.01, 3.0],
+        }, index=[10, 11, 12, 13, 14])
+        cache = {'Auto C': 'Auto', 'Manual C': 'Manual'}
+        _, result = validate_bulk_export(df, export_type='bids', currency='AED', campaign_cache=cache)
+
+        expected = []
+        for idx, row in df.iterrows():
+            expected += validate_bid_update(row.to_dict(), idx + 2, 'AED')
+            expected += validate_auto_campaign(row.to_dict(), idx + 2, cache.get(row['Campaign Name'], 'Manual'))
+        self.assertEqual(issues(result.issues), issues(expected))
+        self.assertEqual([(i.row, i.code) for i in result.issues],
+                         [(12, 'BID002'), (12, 'AUTO001'), (13, 'BID002'), (14, 'BID002'), (15, 'BID002')])
+        self.assertEqual(result.issues[0].message, 'Bid 0.05 below minimum 0.1 AED')
+        self.assertEqual(result.issues[2].message, 'Bid 4250.0 exceeds maximum 3500.0 AED')
+        self.assertEqual(result.issues[3].message, 'Invalid bid value: n/a')
+        # Bid 0 is falsy, so New Bid is validated; a NaN Bid is truthy but blank, so nothing is
+        self.assertEqual(result.issues[4].message, 'Bid 0.01 below minimum 0.1 AED')
+
+    def test_non_bid_export_only_checks_rows_with_bids(self):
+        df = pd.DataFrame({'Match Type': ['exact', 'exact', 'exact'], 'Bid': ['', 0, 0.001]})
+        _, result = validate_bulk_export(df, export_type='harvest', currency='USD')
+        self.assertEqual([(i.row, i.code) for i in result.issues], [(4, 'BID002')])
+
+    def test_empty_and_missing_columns(self):
+        empty = pd.DataFrame(columns=['Match Type'])
+        self.assertIs(validate_bulk_export(empty)[0], empty)
+        _, result = validate_bulk_export(pd.DataFrame({'Keyword Text': ['a', 'b']}), export_type='bids')
+        self.assertEqual(result.issues, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+SQLite Connection Pool Tests
+
+Connections are per thread and must not outlive their thread: Streamlit runs
+every rerun on a new thread, so many short-lived threads may not pile up open
+connections (each holding file descriptors, page cache and an mmap). Pooling
+keeps the old connect-per-query contract (commit on exit, rollback on error,
+Row access), and WAL readers see a snapshot instead of waiting on an ingest.
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.db_manager import DatabaseManager
+
+THREADS = 300
+
+
+def open_fds() -> int:
+    return len(os.listdir('/proc/self/fd'))
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_connection_pool_')
+        self.db = DatabaseManager(Path(self.tmpdir) / 'pool.db')
+
+    def tearDown(self):
+        self.db._pool.close_all()
+        self.db._read_pool.close_all()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def run_threads(self, seen):
+        def rerun():
+            with self.db._get_connection() as conn:
+                conn.execute("SELECT COUNT(*) FROM target_stats").fetchone()
+                seen.append(conn)
+            with self.db._read_pool.connection() as conn:
+                conn.execute("SELECT COUNT(*) FROM actions_log").fetchone()
+                seen.append(conn)
+
+        for _ in range(THREADS):
+            thread = threading.Thread(target=rerun)
+            thread.start()
+            thread.join()
+
+    def test_short_lived_threads_do_not_accumulate_connections(self):
+        seen = []
+        fds_before = open_fds() if os.path.isdir('/proc/self/fd') else None
+        self.run_threads(seen)
+
+        self.assertEqual(len(seen), 2 * THREADS)
+        for pool in (self.db._pool, self.db._read_pool):
+            self.assertLessEqual(pool.open_connections(), 2)
+
+        closed = 0
+        for conn in seen:
+            try:
+                conn.total_changes
+            except sqlite3.ProgrammingError:
+                closed += 1
+        self.assertGreaterEqual(closed, 2 * THREADS - 4)
+        if fds_before is not None:
+            self.assertLess(open_fds() - fds_before, 20)
+
+    def test_live_thread_keeps_its_connection(self):
+        with self.db._get_connection() as first:
+            pass
+        self.run_threads([])
+        with self.db._get_connection() as again:
+            self.assertIs(again, first)
+            again.execute("SELECT 1").fetchone()
+
+    def test_keeps_connect_per_query_semantics(self):
+        insert = ("INSERT INTO actions_log (action_date, client_id, batch_id, action_type, target_text) "
+                  "VALUES ('2024-11-05', 'c1', 'b', 'BID_CHANGE', ?)")
+        with self.db._get_connection() as conn:
+            conn.execute(insert, ('kept',))
+        with self.assertRaises(ValueError):
+            with self.db._get_connection() as conn:
+                conn.execute(insert, ('rolled back',))
+                raise ValueError('boom')
+
+        with self.db._get_connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        with self.db._get_read_connection() as conn:
+            rows = conn.execute("SELECT target_text FROM actions_log").fetchall()
+            self.assertEqual([row['target_text'] for row in rows], ['kept'])
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute(insert, ('read only',))
+
+    def test_reads_not_blocked_by_open_write(self):
+        writing, release = threading.Event(), threading.Event()
+
+        def ingest():
+            with self.db._get_connection() as conn:
+                conn.execute("INSERT INTO actions_log (action_date, client_id, batch_id, action_type) "
+                             "VALUES ('2024-11-05', 'c1', 'b', 'BID_CHANGE')")
+                writing.set()
+                release.wait(5)
+
+        writer = threading.Thread(target=ingest)
+        writer.start()
+        try:
+            self.assertTrue(writing.wait(5))
+            with self.db._get_read_connection() as conn:
+                # Snapshot read: the uncommitted row is not visible, and the read does not wait
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM actions_log").fetchone()[0], 0)
+        finally:
+            release.set()
+            writer.join()
+        with self.db._get_read_connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM actions_log").fetchone()[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Incremental Enrichment Tests
+
+DataHub._enrich_data caches each mapping stage (SKU, IDs, Category) by the
+fingerprints of its inputs and only re-runs stages whose input changed. After
+any re-upload the enriched frame must equal running every stage in sequence.
+"""
+
+import contextlib
+import io
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.mapping_engine as mapping_engine
+from core.data_hub import DataHub
+
+
+def search_terms():
+    return pd.DataFrame({
+        'Campaign Name': ['Brand', 'Brand', 'Auto', 'Other'],
+        'Ad Group Name': ['AG1', 'AG2', 'AG3', 'AG4'],
+        'Customer Search Term': ['mug', 'cup', 'b0abcdefgh', 'kettle'],
+        'Targeting': ['mug', 'cup', 'close-match', 'kettle'],
+        'Match Type': ['EXACT', 'BROAD', 'AUTO', 'EXACT'],
+        'Spend': [1.0, 2.0, 3.0, 4.0],
+        'Sales': [5.0, 0.0, 6.0, 0.0],
+        'Clicks': [2, 3, 4, 5],
+        'Impressions': [20, 30, 40, 50],
+        'Orders': [1, 0, 1, 0],
+    })
+
+
+def advertised_products():
+    return pd.DataFrame({
+        'Campaign Name': ['brand ', 'Brand', 'Auto'],
+        'Ad Group Name': ['ag1', 'AG2', 'AG3'],
+        'SKU': ['SKU-1', 'SKU-2', 'SKU-3'],
+        'ASIN': ['B000000001', 'B000000002', 'B000000003'],
+    })
+
+
+def bulk():
+    return pd.DataFrame({
+        'Campaign Name': ['Brand', 'Brand', 'Auto'],
+        'Ad Group Name': ['AG1', 'AG2', 'AG3'],
+        'CampaignId': ['100', '100', '200'],
+        'AdGroupId': ['10', '11', '20'],
+        'Customer Search Term': ['mug', 'cup', None],
+        'KeywordId': ['K1', 'K2', None],
+        'TargetingExpression': [None, None, 'close-match'],
+        'TargetingId': [None, None, 'T1'],
+    })
+
+
+def categories():
+    return pd.DataFrame({'SKU': ['SKU-1', 'SKU-2', 'SKU-3'], 'Category': ['Drinkware', 'Drinkware', 'Kitchen'],
+                         'Sub-Category': ['Mugs', 'Cups', 'General']})
+
+
+class TestIncrementalEnrichment(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(mapping_engine, 'BULK_INDEX_DIR', '')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        st.session_state.clear()
+        self.hub = DataHub()
+        for name, frame in (('search_term_report', search_terms()), ('advertised_product_report', advertised_products()),
+                            ('bulk_id_mapping', bulk()), ('category_mapping', categories())):
+            self.hub._store(name, frame)
+
+    def enrich(self):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.hub._enrich_data()
+        return out.getvalue()
+
+    def full(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.hub._enrich_full(self.hub.get_data('search_term_report'))
+
+    def stored_full(self):
+        # Stored the same way _enrich_data stores its result
+        self.hub._store('full_enrichment_check', self.full())
+        return self.hub.get_data('full_enrichment_check')
+
+    def test_first_run_matches_full_pipeline(self):
+        self.assertIn('re-ran sku, ids, category', self.enrich())
+        enriched = self.hub.get_enriched_data()
+        pd.testing.assert_frame_equal(enriched, self.stored_full())
+        self.assertEqual(enriched['SKU_advertised'].tolist()[:3], ['SKU-1', 'SKU-2', 'SKU-3'])
+        self.assertTrue(pd.isna(enriched['SKU_advertised'].iloc[3]))
+        self.assertEqual(enriched['Category'].tolist()[:3], ['Drinkware', 'Drinkware', 'Kitchen'])
+        self.assertEqual(enriched['CampaignId'].tolist()[:3], ['100', '100', '200'])
+
+    def test_reupload_reruns_only_changed_stage(self):
+        self.enrich()
+        self.assertEqual(self.enrich(), '')  # Nothing changed: every stage reused
+
+        changed = bulk()
+        changed.loc[1, 'CampaignId'] = '101'
+        self.hub._store('bulk_id_mapping', changed)
+        self.assertIn('re-ran ids; reused sku, category', self.enrich())
+        enriched = self.hub.get_enriched_data()
+        pd.testing.assert_frame_equal(enriched, self.stored_full())
+        self.assertEqual(enriched['CampaignId'].tolist()[:3], ['100', '101', '200'])
+
+        changed = categories()
+        changed.loc[2, 'Category'] = 'Appliances'
+        self.hub._store('category_mapping', changed)
+        self.assertIn('re-ran category; reused sku, ids', self.enrich())
+        enriched = self.hub.get_enriched_data()
+        pd.testing.assert_frame_equal(enriched, self.stored_full())
+        self.assertEqual(enriched['Category'].tolist()[2], 'Appliances')
+
+        # A new advertised product report invalidates the category stage built on it
+        self.hub._store('advertised_product_report', advertised_products().iloc[:2])
+        self.assertIn('re-ran sku, category; reused ids', self.enrich())
+        pd.testing.assert_frame_equal(self.hub.get_enriched_data(), self.stored_full())
+
+
+if __name__ == '__main__':
+    unittest.main()
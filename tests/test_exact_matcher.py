@@ -0,0 +1,83 @@
+"""
+ExactMatcher Tests
+
+find_matches prunes candidates by length and character-count bounds before
+scoring; decisions and scores must equal scoring every exact keyword that
+shares a token with the term (difflib ratio, best score at/above threshold).
+"""
+
+import difflib
+import sys
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.matchers import ExactMatcher, _normalize
+
+KEYWORDS = [
+    "water bottle for kids", "kids water bottle", "steel water bottle", "bottle",
+    "toy set for girls", "toy set for boys", "painting set", "Insulated Cup!", "cup",
+]
+TERMS = [
+    "water bottle for kids",    # exact
+    "WATER BOTTLE FOR KIDS",    # exact after normalization
+    "water bottles for kids",   # near duplicate
+    "toy sets for girls",       # near duplicate
+    "insulated cups",           # punctuation stripped on the keyword side
+    "kids",                     # shares a token, too short to pass
+    "garden hose",              # no shared token
+    "",                         # empty
+    "cup",
+]
+
+
+def reference(keywords, term, threshold):
+    """Best difflib ratio over keywords sharing a token with the term."""
+    norm = _normalize(term)
+    if not norm:
+        return None, 0.0
+    if norm in keywords:
+        return norm, 1.0
+    tokens = set(norm.split())
+    scores = [difflib.SequenceMatcher(None, norm, kw).ratio() for kw in keywords if tokens & set(kw.split())]
+    best = max(scores, default=0.0)
+    return (True, best) if best >= threshold else (None, 0.0)
+
+
+class TestExactMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "Customer Search Term": KEYWORDS + ["broad only term"],
+            "Match Type": ["exact"] * 5 + ["EXACT"] * 4 + ["broad"],
+        })
+
+    def test_matches_reference_scoring(self):
+        matcher = ExactMatcher(self.df)
+        self.assertNotIn("broad only term", matcher.exact_keywords)
+        for threshold in (0.85, 0.9, 0.5):
+            results = matcher.find_matches(TERMS, threshold)
+            self.assertEqual(len(results), len(TERMS))
+            for term, (match, score) in zip(TERMS, results):
+                expected_match, expected_score = reference(matcher.exact_keywords, term, threshold)
+                with self.subTest(term=term, threshold=threshold):
+                    self.assertEqual(match is None, expected_match is None)
+                    self.assertAlmostEqual(score, expected_score, places=12)
+                    if match is not None:
+                        self.assertIn(match, matcher.exact_keywords)
+                    self.assertEqual(matcher.find_match(term, threshold), (match, score))
+
+    def test_known_decisions(self):
+        results = dict(zip(TERMS, ExactMatcher(self.df).find_matches(TERMS, 0.9)))
+        self.assertEqual(results["WATER BOTTLE FOR KIDS"], ("water bottle for kids", 1.0))
+        self.assertEqual(results["water bottles for kids"][0], "water bottle for kids")
+        self.assertEqual(results["insulated cups"][0], "insulated cup")
+        self.assertEqual(results["garden hose"], (None, 0.0))
+        self.assertEqual(results[""], (None, 0.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Optimizer Heatmap Tests
+
+create_heatmap counts recommendations per (campaign, ad group) with grouped
+aggregation; the counts, action labels, reason summaries and priority must
+stay those of the former per-ad-group filtering loop.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from features.optimizer import DEFAULT_CONFIG, create_heatmap
+
+
+def account():
+    df = pd.DataFrame({
+        "Campaign Name": ["C1", "C1", "C1", "C2", "C2", "C3", "C3"],
+        "Ad Group Name": ["AG1", "AG1", "AG2", "AG1", "AG3", "AG1", "AG1"],
+        "Clicks": [10, 5, 2, 20, 30, 8, 0],
+        "Spend": [5.0, 2.5, 1.0, 15.0, 12.0, 4.0, 0.0],
+        "Sales_Attributed": [30.0, 0.0, 0.0, 0.0, 20.0, 40.0, 0.0],
+        "Orders_Attributed": [2, 0, 0, 0, 1, 3, 0],
+        "Impressions": [1000, 400, 100, 900, 3000, 200, 50],
+    })
+    harvest = pd.DataFrame({"Campaign Name": ["C1", "C1"], "Ad Group Name": ["AG1", "AG1"],
+                            "Term": ["a", "b"], "Reason": ["High CVR harvest", None]})
+    neg_kw = pd.DataFrame({"Campaign Name": ["C1", "C2"], "Ad Group Name": ["AG1", "AG1"],
+                           "Term": ["x", "y"], "Reason": ["Bleeder", "Hard stop: 0 orders"]})
+    # No ad group column: never matched to an ad group
+    neg_pt = pd.DataFrame({"Campaign Name": ["C2"], "Term": ["asin"], "Reason": ["Isolation negative"]})
+    direct_bids = pd.DataFrame({
+        "Campaign Name": ["C1", "C1", "C3"], "Ad Group Name": ["AG1", "AG1", "AG1"], "Term": ["p", "q", "r"],
+        "Reason": ["Scale up: ROAS above target", "Reduce: ROAS below target", "Scale up: ROAS above target"],
+        "Current Bid": [1.0, 1.0, 0.5], "New Bid": [1.2, 0.8, 0.5],
+    })
+    # Compared against Current Bid (NaN here) once mixed with direct bids, as before
+    agg_bids = pd.DataFrame({"Campaign Name": ["C3"], "Ad Group Name": ["AG1"], "Term": ["s"],
+                             "Reason": [""], "CPC": [0.4], "New Bid": [0.6]})
+    return df, harvest, neg_kw, neg_pt, direct_bids, agg_bids
+
+
+# (campaign, ad group, harvests, negatives, increases, decreases, actions, reason summary, score, priority)
+EXPECTED = [
+    ("C1", "AG2", 0, 0, 0, 0, "⏸️ Hold (Low volume)", "Low data volume", 0.25, "🔴 High"),
+    ("C2", "AG3", 0, 0, 0, 0, "✅ No action needed", "Low Efficiency (Monitoring)", 0.25, "🔴 High"),
+    ("C2", "AG1", 0, 1, 0, 0, "🛑 1 negatives", "Hard stop: 0 orders", 0.5, "🔴 High"),
+    ("C1", "AG1", 2, 1, 1, 1, "💎 2 harvests | 🛑 1 negatives | ⬆️ 1 increases | ⬇️ 1 decreases",
+     "Bleeder; High CVR harvest; Reduce: ROAS below target...", 1.0, "🟡 Medium"),
+    ("C3", "AG1", 0, 0, 0, 0, "✅ No action needed", "Stable Performance", 2.0, "🟢 Good"),
+]
+COLUMNS = ["Campaign Name", "Ad Group Name", "Harvest_Count", "Negative_Count", "Bid_Increase_Count",
+           "Bid_Decrease_Count", "Actions_Taken", "Reason_Summary", "Overall_Score", "Priority"]
+
+
+class TestCreateHeatmap(unittest.TestCase):
+
+    def test_actions_per_ad_group(self):
+        df, *recs = account()
+        heatmap = create_heatmap(df, DEFAULT_CONFIG, *recs)
+
+        self.assertEqual([tuple(row) for row in heatmap[COLUMNS].itertuples(index=False)], EXPECTED)
+        self.assertEqual(heatmap.index.tolist(), [1, 3, 2, 0, 4])
+        for col in COLUMNS[2:6]:
+            self.assertEqual(heatmap[col].dtype, "int64", col)
+        c1 = heatmap.set_index(["Campaign Name", "Ad Group Name"]).loc[("C1", "AG1")]
+        self.assertEqual((c1["Clicks"], c1["Spend"], c1["Sales"], c1["Orders"]), (15, 7.5, 30.0, 2))
+        self.assertAlmostEqual(c1["ROAS"], 4.0)
+        self.assertAlmostEqual(c1["ACoS"], 25.0)
+
+    def test_without_recommendations(self):
+        df = account()[0]
+        empty = pd.DataFrame()
+        heatmap = create_heatmap(df, DEFAULT_CONFIG, empty, empty, empty, empty, empty)
+
+        self.assertFalse(heatmap[COLUMNS[2:6]].any().any())
+        self.assertEqual(heatmap["Reason_Summary"].tolist(), [
+            "Low data volume", "Low Efficiency (Monitoring)", "Zero Sales (Monitoring)",
+            "Stable Performance", "Stable Performance",
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Assistant Knowledge Graph Cache Tests
+
+AssistantModule caches knowledge graph sections by the fingerprints of the
+inputs each depends on (dataset, optimizer results, target ROAS). After an
+upload, an optimizer run or a target ROAS change, the graph served from the
+cache (warmed in the background or built on the chat turn) must equal a full
+rebuild, and only the sections depending on the changed input are rebuilt.
+"""
+
+import contextlib
+import io
+import json
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.data_hub import DataHub
+from core.data_loader import classify_match_type
+from features.assistant import _KNOWLEDGE_BUILDS, _KNOWLEDGE_CACHE, AssistantModule
+from features.optimizer import DEFAULT_CONFIG, run_optimization
+
+
+def report(n_rows: int = 400, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    camp = rng.integers(0, 8, size=n_rows)
+    tgt = rng.integers(0, 60, size=n_rows)
+    match = rng.choice(['EXACT', 'BROAD', 'PHRASE', '-'], size=n_rows)
+    clicks = rng.poisson(3, size=n_rows).astype(float)
+    df = pd.DataFrame({
+        'Campaign Name': [f'Campaign {c} - SP - Manual' for c in camp],
+        'Ad Group Name': [f'Ad Group {c % 3}' for c in camp],
+        'Targeting': [f'keyword {t}' if m != '-' else ['close-match', 'loose-match', 'substitutes'][t % 3]
+                      for t, m in zip(tgt, match)],
+        'Customer Search Term': [f'search term {i % 120}' for i in range(n_rows)],
+        'Match Type': match,
+        'Impressions': rng.integers(0, 5000, size=n_rows).astype(float),
+        'Clicks': clicks,
+        'Spend': np.round(clicks * rng.gamma(2.0, 0.4, size=n_rows), 2),
+        'Sales': np.round(rng.gamma(1.0, 8.0, size=n_rows) * (rng.random(n_rows) < 0.3), 2),
+        'Orders': rng.poisson(0.3, size=n_rows).astype(float),
+        'Date': pd.Timestamp('2024-10-01') + pd.to_timedelta(rng.integers(0, 28, size=n_rows), unit='D'),
+    })
+    df['Match Type'] = classify_match_type(df)
+    return df
+
+
+def as_json(graph):
+    return json.dumps(graph, default=str)
+
+
+class TestKnowledgeGraphCache(unittest.TestCase):
+
+    def setUp(self):
+        st.session_state.clear()
+        _KNOWLEDGE_CACHE.clear()
+        self.report = report()
+        DataHub()._store('search_term_report', self.report)
+        self.assistant = AssistantModule()
+
+    def full_rebuild(self):
+        return self.assistant._build_knowledge_graph(self.assistant._construct_granular_dataset())
+
+    def warm(self):
+        started = self.assistant.warm_knowledge_graph()
+        for thread in list(_KNOWLEDGE_BUILDS.values()):
+            thread.join()
+        return started
+
+    def test_cached_graph_matches_full_rebuild(self):
+        self.assertTrue(self.warm())
+        cached = self.assistant.get_knowledge_graph()
+        self.assertEqual(cached['dataset_overview']['total_search_terms'], 120)
+        self.assertEqual(as_json(cached), as_json(self.full_rebuild()))
+        self.assertEqual(len(_KNOWLEDGE_CACHE), 8)
+        self.assertFalse(self.warm())  # Nothing stale
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            st.session_state['optimizer_results'] = run_optimization(self.report, DEFAULT_CONFIG)
+        self.assertTrue(self.warm())
+        self.assertEqual(as_json(self.assistant.get_knowledge_graph()), as_json(self.full_rebuild()))
+        # dataset_overview, campaign_portfolio, patterns_detected and cross_references are reused
+        self.assertEqual(len(_KNOWLEDGE_CACHE), 12)
+
+        # Built on the chat turn itself when nothing warmed it
+        st.session_state['opt_target_roas'] = 4.0
+        self.assertEqual(as_json(self.assistant.get_knowledge_graph()), as_json(self.full_rebuild()))
+        self.assertEqual(len(_KNOWLEDGE_CACHE), 14)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Search Term Clustering Tests
+
+cluster_search_terms scores candidate K in parallel (one OpenMP thread per
+worker) and samples the silhouette only on large inputs; below the sample size
+it must pick the same K and labels as scoring each K in turn with KMeans and
+the full silhouette. The silhouette sample must cover every cluster.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import features.kw_cluster as kw_cluster
+from features.kw_cluster import _stratified_sample, cluster_search_terms
+
+
+def terms(n_terms: int, seed: int = 31) -> np.ndarray:
+    """Unique search terms: 2-3 words from one of 6 themes plus a number."""
+    rng = np.random.default_rng(seed)
+    themes = [[f't{t}w{w}' for w in range(6)] for t in range(6)]
+    out = set()
+    while len(out) < n_terms:
+        words = list(rng.choice(themes[rng.integers(6)], size=rng.integers(2, 4), replace=False))
+        out.add(' '.join(words + [str(rng.integers(1000))]))
+    return np.array(sorted(out), dtype=object)
+
+
+def sequential_choice(tfidf_matrix, k_range):
+    """Best K by full silhouette, scoring one K at a time."""
+    scores, fits = [], []
+    for k in k_range:
+        labels = KMeans(n_clusters=k, random_state=42, n_init=10).fit_predict(tfidf_matrix)
+        fits.append(labels)
+        scores.append(silhouette_score(tfidf_matrix, labels))
+    best = scores.index(max(scores))
+    return list(k_range)[best], fits[best]
+
+
+class TestClusterSearchTerms(unittest.TestCase):
+
+    def test_parallel_scoring_matches_sequential(self):
+        search_terms = terms(150)
+        with patch.object(kw_cluster, 'CLUSTER_WORKERS', 4):
+            result = cluster_search_terms(search_terms)
+
+        self.assertEqual(result['k_range'], range(3, 13))
+        tfidf_matrix = result['vectorizer'].transform(search_terms)
+        k, labels = sequential_choice(tfidf_matrix, result['k_range'])
+        self.assertEqual(result['n_clusters'], k)
+        np.testing.assert_array_equal(result['labels'], labels)
+
+        with patch.object(kw_cluster, 'CLUSTER_WORKERS', 1):
+            single = cluster_search_terms(search_terms)
+        self.assertEqual(single['n_clusters'], k)
+        np.testing.assert_array_equal(single['labels'], labels)
+
+    def test_few_terms_use_min_clusters(self):
+        result = cluster_search_terms(terms(30))
+        self.assertIsNone(result['k_range'])
+        self.assertEqual(result['n_clusters'], 3)
+        self.assertEqual(len(result['labels']), 30)
+
+    def test_fingerprint_cache(self):
+        search_terms = terms(40)
+        first = cluster_search_terms(search_terms, fingerprint='test_kw_cluster:40')
+        self.assertIs(cluster_search_terms(search_terms, fingerprint='test_kw_cluster:40'), first)
+        self.assertIsNot(cluster_search_terms(search_terms), first)
+
+
+class TestStratifiedSample(unittest.TestCase):
+
+    def test_sample_covers_every_cluster(self):
+        labels = np.repeat([0, 1, 2, 3], [500, 300, 195, 5])
+        np.random.default_rng(1).shuffle(labels)
+        sample = _stratified_sample(labels, 100)
+
+        self.assertTrue((np.diff(sample) > 0).all())
+        counts = np.bincount(labels[sample], minlength=4)
+        self.assertEqual(counts.tolist(), [50, 30, 20, 2])
+        np.testing.assert_array_equal(_stratified_sample(labels, 100), sample)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+LLM Gateway Tests
+
+Runs the gateway against a local fake of the Anthropic / OpenAI endpoints:
+responses are cached on disk by model + normalized prompt (with TTL), identical
+in-flight requests share one API call, errors are never cached, and every call
+is accounted (source, latency, tokens).
+"""
+
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.anthropic_client import AnthropicClient
+from api.llm_gateway import LLMAPIError, LLMGateway
+
+LATENCY = 0.2
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Anthropic-style /v1/messages and OpenAI-style /chat endpoints; a prompt of 'fail' returns 500."""
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with server.lock:
+            server.requests.append(payload)
+        time.sleep(LATENCY)
+        prompt = payload['messages'][-1]['content']
+        if prompt == 'fail':
+            status, body = 500, {'error': 'overloaded'}
+        elif self.path.startswith('/v1/messages'):
+            status, body = 200, {'content': [{'type': 'text', 'text': f"echo: {prompt} ({payload.get('system', '')})"}],
+                                 'usage': {'input_tokens': 12, 'output_tokens': 5}}
+        else:
+            status, body = 200, {'choices': [{'message': {'content': f'echo: {prompt}'}}],
+                                 'usage': {'prompt_tokens': 30, 'completion_tokens': 7}}
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestLLMGateway(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeLLMHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.requests = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.tmpdir = tempfile.mkdtemp(prefix='test_llm_gateway_')
+        self.cache_path = str(Path(self.tmpdir) / 'llm_cache.db')
+        self.gateway = LLMGateway(cache_path=self.cache_path)
+
+    def tearDown(self):
+        self.gateway.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def chat(self, prompt, model='gpt-4o', gateway=None):
+        payload = {'model': model, 'messages': [{'role': 'user', 'content': prompt}], 'temperature': 0.4}
+        response = (gateway or self.gateway).call(f'{self.base}/chat', {}, payload)
+        return response['choices'][0]['message']['content']
+
+    def test_cached_on_disk_by_model_and_normalized_prompt(self):
+        self.assertEqual(self.chat('ROAS is 2.1'), 'echo: ROAS is 2.1')
+        self.assertEqual(self.chat('  ROAS is\n      2.1 '), 'echo: ROAS is 2.1')
+        self.assertEqual(len(self.server.requests), 1)
+        self.chat('ROAS is 2.1', model='gpt-4o-mini')
+        self.assertEqual(len(self.server.requests), 2)
+
+        # A new gateway (e.g. after a restart) reads the same cache file
+        restarted = LLMGateway(cache_path=self.cache_path)
+        self.assertEqual(self.chat('ROAS is 2.1', gateway=restarted), 'echo: ROAS is 2.1')
+        self.assertEqual(len(self.server.requests), 2)
+        restarted.close()
+
+        # Expired entries are ignored and purged
+        expired = LLMGateway(cache_path=self.cache_path, ttl_seconds=0)
+        self.chat('ROAS is 2.1', gateway=expired)
+        self.assertEqual(len(self.server.requests), 3)
+        expired.close()
+
+        stats = self.gateway.stats()
+        self.assertEqual((stats['calls'], stats['api_requests'], stats['cache_hits']), (3, 2, 1))
+        self.assertEqual((stats['input_tokens'], stats['output_tokens']), (60, 14))
+        self.assertGreaterEqual(stats['mean_api_latency_ms'], LATENCY * 1000)
+        self.assertEqual([c['source'] for c in self.gateway.recent_calls()], ['api', 'cache', 'api'])
+
+    def test_same_response_as_direct_post(self):
+        payload = {'model': 'gpt-4o', 'messages': [{'role': 'system', 'content': 'You are Zenny.'},
+                                                   {'role': 'user', 'content': 'ROAS: 3.10'}]}
+        direct = requests.post(f'{self.base}/chat', headers={}, json=payload, timeout=30)
+        direct.raise_for_status()
+        self.assertEqual(self.gateway.call(f'{self.base}/chat', {}, payload), direct.json())
+        self.assertEqual(self.gateway.call(f'{self.base}/chat', {}, payload), direct.json())  # From cache
+        self.assertEqual(self.server.requests, [payload, payload])
+
+    def test_identical_in_flight_requests_are_coalesced(self):
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            answers = list(executor.map(lambda i: self.chat('top waste?' if i < 5 else 'other'), range(6)))
+        self.assertEqual(answers, ['echo: top waste?'] * 5 + ['echo: other'])
+        self.assertEqual(len(self.server.requests), 2)
+        stats = self.gateway.stats()
+        self.assertEqual(stats['api_requests'] + stats['coalesced'] + stats['cache_hits'], 6)
+        self.assertGreaterEqual(stats['coalesced'], 1)
+
+    def test_errors_are_raised_and_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(LLMAPIError) as ctx:
+                self.chat('fail')
+            self.assertEqual(ctx.exception.status_code, 500)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.gateway.stats()['errors'], 2)
+
+    def test_anthropic_client_goes_through_gateway(self):
+        client = AnthropicClient('key', base_url=f'{self.base}/v1/messages', gateway=self.gateway)
+        self.assertEqual(client.generate_response('Be brief.', 'Why is ROAS low?'), 'echo: Why is ROAS low? (Be brief.)')
+        client.generate_response('Be brief.', 'Why is ROAS low?')
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.server.requests[0]['system'], 'Be brief.')
+        with self.assertRaisesRegex(Exception, 'Failed to call Claude API: API error: 500'):
+            client._call_api('fail')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Match Type Classification Tests
+
+classify_match_type replaces the row-wise upload (infer_mt) and Performance
+Snapshot (refine_match_type) helpers; labels must stay row-for-row the same,
+including on the categorical column an upload leaves behind.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.data_loader import classify_match_type
+
+# Performance Snapshot settings (trusts PT/CATEGORY/AUTO, ignores TargetingExpression)
+SNAPSHOT_KWARGS = dict(
+    trusted=('EXACT', 'BROAD', 'PHRASE', 'PT', 'CATEGORY', 'AUTO'),
+    use_expression=False,
+    blank_values=('-', 'NAN', 'NONE'),
+    blank_label='OTHER',
+)
+
+# (Match Type, Targeting, TargetingExpression,
+#  upload, upload without TargetingExpression, snapshot, snapshot after upload)
+ROWS = [
+    ('EXACT', 'keyword a', np.nan, 'EXACT', 'EXACT', 'EXACT', 'EXACT'),
+    ('broad', 'asin="B0X"', '', 'BROAD', 'BROAD', 'BROAD', 'BROAD'),
+    ('Phrase', 'close-match', 'nan', 'PHRASE', 'PHRASE', 'PHRASE', 'PHRASE'),
+    ('-', 'asin="B01234567"', np.nan, 'PT', 'PT', 'PT', 'PT'),
+    ('', 'b012345678', '', 'PT', 'PT', 'PT', 'PT'),
+    ('None', 'category="Kitchen"', np.nan, 'CATEGORY', 'CATEGORY', 'CATEGORY', 'CATEGORY'),
+    ('auto', 'keyword b', np.nan, 'AUTO', 'AUTO', 'AUTO', 'AUTO'),
+    ('PT', 'keyword c', 'category="toys"', 'CATEGORY', 'PT', 'PT', 'CATEGORY'),
+    (np.nan, 'loose-match', np.nan, 'AUTO', 'AUTO', 'AUTO', 'AUTO'),
+    ('targeting_expression', 'keyword d', 'asin-expanded="B0X1"',
+     'TARGETING_EXPRESSION', 'TARGETING_EXPRESSION', 'TARGETING_EXPRESSION', 'TARGETING_EXPRESSION'),
+    ('-', 'keyword e', 'close-match', 'AUTO', '-', 'OTHER', 'AUTO'),
+    (np.nan, 'keyword f', np.nan, '-', '-', 'OTHER', 'OTHER'),
+    ('-', np.nan, 'keyword', '-', '-', 'OTHER', 'OTHER'),
+    ('None', 'keyword g', np.nan, 'NONE', 'NONE', 'OTHER', 'OTHER'),
+    ('None', '*', np.nan, 'AUTO', 'AUTO', 'AUTO', 'AUTO'),
+    ('', 'substitutes', 'nan', 'AUTO', 'AUTO', 'AUTO', 'AUTO'),
+    ('auto', '', np.nan, 'AUTO', 'AUTO', 'AUTO', 'AUTO'),
+]
+
+
+def report():
+    df = pd.DataFrame([row[:3] for row in ROWS], columns=['Match Type', 'Targeting', 'TargetingExpression'])
+    df.index = df.index + 100
+    return df
+
+
+def expected(col):
+    return [row[col] for row in ROWS]
+
+
+class TestClassifyMatchType(unittest.TestCase):
+
+    def test_upload_labels(self):
+        df = report()
+        labels = classify_match_type(df)
+        self.assertIsInstance(labels.dtype, pd.CategoricalDtype)
+        self.assertTrue(labels.index.equals(df.index))
+        self.assertEqual(labels.astype(object).tolist(), expected(3))
+
+        no_expression = classify_match_type(df.drop(columns=['TargetingExpression']))
+        self.assertEqual(no_expression.astype(object).tolist(), expected(4))
+
+    def test_snapshot_labels(self):
+        df = report()
+        self.assertEqual(classify_match_type(df, **SNAPSHOT_KWARGS).astype(object).tolist(), expected(5))
+
+        uploaded = df.assign(**{'Match Type': classify_match_type(df)})
+        self.assertEqual(classify_match_type(uploaded, **SNAPSHOT_KWARGS).astype(object).tolist(), expected(6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+Metrics Cube Tests
+
+build_metrics_cube must agree with the pandas scans it replaces: totals and
+masked spend as column sums (missing cells skipped), rollups as
+df.groupby(keys).sum() (sorted, missing keys dropped) for plain and compact
+(categorical) frames, and ratios with 0 for a zero denominator. DataHub builds
+one cube per dataset fingerprint. The pages reading the cube (report card,
+performance snapshot, assistant) must report the numbers they used to scan for.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.data_hub import DataHub
+from core.data_loader import compact_frame
+from core.performance_calc import METRIC_VOLUMES, add_rate_metrics, build_metrics_cube, calculate_metrics
+from features.assistant import AssistantModule
+from features.performance_snapshot import PerformanceSnapshotModule
+from features.report_card import ReportCardModule
+
+
+def report():
+    return pd.DataFrame({
+        'Campaign Name': ['B', 'A', 'B', np.nan, 'A', 'C'],
+        'Ad Group Name': ['x', 'y', 'y', 'x', 'y', np.nan],
+        'Match Type': ['EXACT', 'BROAD', 'EXACT', 'AUTO', 'BROAD', 'PT'],
+        'Date': ['2025-01-02', '2025-01-01', 'not a date', '2025-01-02', '2025-01-01', '2025-01-03'],
+        'Spend': [10.0, 5.0, 2.5, 1.0, 0.0, 4.0],
+        'Sales': [30.0, 0.0, 5.0, 0.0, 8.0, np.nan],
+        'Orders': [2, 0, 1, 0, 1, np.nan],
+        'Clicks': [10, 4, 2, 1, 0, 3],
+        'Impressions': [100, 80, 50, 0, 10, 30],
+    })
+
+
+def expected_rollup(df, keys):
+    df = df.assign(Date=pd.to_datetime(df['Date'], errors='coerce'))
+    grouped = df.groupby(list(keys), observed=True)[list(METRIC_VOLUMES)].sum().reset_index()
+    return add_rate_metrics(grouped.astype({col: float for col in METRIC_VOLUMES}))
+
+
+class TestBuildMetricsCube(unittest.TestCase):
+
+    def test_totals_and_masked_spend(self):
+        df = report()
+        cube = build_metrics_cube(df)
+        self.assertEqual(cube['rows'], 6)
+        self.assertEqual(cube['totals']['spend'], df['Spend'].sum())
+        self.assertEqual(cube['totals']['sales'], df['Sales'].sum())
+        self.assertAlmostEqual(cube['totals']['cvr'], 4 / 20 * 100)
+        self.assertAlmostEqual(cube['totals']['ctr'], 20 / 270 * 100)
+        # A missing Orders cell is neither converting nor zero-order
+        self.assertEqual(cube['converting_spend'], df[df['Orders'] > 0]['Spend'].sum())
+        self.assertEqual(cube['zero_order_spend'], df[df['Orders'] == 0]['Spend'].sum())
+        no_orders = build_metrics_cube(df.drop(columns=['Orders']), rollups={})
+        self.assertEqual(no_orders['converting_spend'], df[df['Sales'] > 0]['Spend'].sum())
+        self.assertEqual((no_orders['totals']['orders'], no_orders['rollups']), (0.0, {}))
+
+    def test_rollups_match_groupby(self):
+        df = report()
+        for frame in (df, compact_frame(df)):
+            cube = build_metrics_cube(frame)
+            for name, keys in (('campaign', ('Campaign Name',)), ('ad_group', ('Campaign Name', 'Ad Group Name')),
+                               ('match_type', ('Match Type',)), ('date', ('Date',))):
+                got = cube['rollups'][name]
+                pd.testing.assert_frame_equal(got.astype({k: object for k in keys if k != 'Date'}),
+                                              expected_rollup(df, keys).astype({k: object for k in keys if k != 'Date'}))
+        self.assertEqual(cube['rollups']['campaign']['ROAS'].tolist(), [8 / 5, 35 / 12.5, 0.0])
+
+    def test_calculate_metrics_uses_mapped_columns(self):
+        df = report().rename(columns={'Spend': 'Cost'})
+        result = calculate_metrics(df, {'Spend': 'Cost', 'Sales': 'Sales', 'Clicks': 'Clicks'})
+        self.assertEqual(result['ROAS'].tolist()[:2], [3.0, 0.0])
+        self.assertEqual(result['CPC'].tolist()[:2], [1.0, 1.25])
+        self.assertNotIn('CTR', result.columns)
+        self.assertNotIn('ROAS', df.columns)
+
+
+class TestDataHubMetricsCube(unittest.TestCase):
+
+    def setUp(self):
+        st.session_state.clear()
+        self.hub = DataHub()
+
+    def test_cached_per_dataset_fingerprint(self):
+        self.assertIsNone(self.hub.get_metrics_cube())
+        self.hub._store('search_term_report', report())
+        before = DataHub.stage_cache_stats()['hits']
+        first = self.hub.get_metrics_cube()
+        first['rollups']['campaign'].loc[:, 'Spend'] = 0  # Callers get their own copy
+        second = self.hub.get_metrics_cube()
+        self.assertEqual(DataHub.stage_cache_stats()['hits'], before + 1)
+        self.assertEqual(second['rollups']['campaign']['Spend'].tolist(), [5.0, 12.5, 4.0])
+
+        # Enrichment output is preferred; a new dataset gets a new cube
+        self.hub._store('enriched_data', report().iloc[:2])
+        self.assertEqual(self.hub.get_metrics_cube()['rows'], 2)
+        self.assertEqual(self.hub.get_metrics_cube('search_term_report')['rows'], 6)
+
+
+def two_weeks():
+    # Jan 1-7: spend 25, sales 60, orders 3, clicks 20; Jan 8-14: spend 35, sales 75, orders 4, clicks 35
+    return pd.DataFrame({
+        'Campaign Name': ['A', 'B', 'A', 'A', 'B', 'C'],
+        'Date': ['2025-01-01', '2025-01-03', '2025-01-05', '2025-01-08', '2025-01-10', '2025-01-14'],
+        'Spend': [10.0, 10.0, 5.0, 20.0, 10.0, 5.0],
+        'Sales': [20.0, 40.0, 0.0, 60.0, 0.0, 15.0],
+        'Orders': [1, 2, 0, 3, 0, 1],
+        'Clicks': [10, 5, 5, 20, 10, 5],
+        'Impressions': [100, 50, 100, 200, 100, 50],
+    })
+
+
+class TestPageMetricsFromCube(unittest.TestCase):
+
+    def setUp(self):
+        st.session_state.clear()
+        st.session_state['target_roas'] = 3.0
+        self.df = two_weeks()
+        self.cube = build_metrics_cube(self.df)
+
+    def test_report_card(self):
+        card = ReportCardModule()._compute_metrics(self.df, self.cube)
+        self.assertEqual((card['total_spend'], card['total_sales'], card['roas']), (60.0, 135.0, 2.25))
+        self.assertEqual(card['spend_quality'], 75.0)  # 45 of 60 spend on rows with orders
+        # Row ROAS 2, 4, 0, 3, 0, 3 against Low < 2.4 <= Mid <= 3.6 < High
+        self.assertEqual(ReportCardModule._bucket_spend(self.df, 3.0), {'Low': 25.0, 'Mid': 25.0, 'High': 10.0})
+
+    def test_snapshot_period_deltas(self):
+        snapshot = PerformanceSnapshotModule()
+        snapshot.date_filter = None
+        self.assertEqual(snapshot._calculate_comparison_metrics(self.df, 7, self.cube), {
+            'spend': '+40.0%', 'sales': '+25.0%', 'orders': '+33.3%',
+            'roas': '-10.7%', 'acos': '+12.0%', 'cvr': '-23.8%',
+        })
+        # Jan 11-12 has no spend: no delta
+        self.assertIsNone(snapshot._calculate_comparison_metrics(self.df, 2, self.cube)['spend'])
+
+    def test_assistant_account_health(self):
+        health = AssistantModule()._compute_account_health(self.df, 3.0, self.cube)
+        # ROAS score 75, waste 15 / 60 -> waste score 50
+        self.assertEqual({k: health[k] for k in ('health_score', 'actual_roas', 'wasted_spend', 'waste_percentage')},
+                         {'health_score': 62, 'actual_roas': 2.25, 'wasted_spend': 15.0, 'waste_percentage': 25.0})
+        campaigns = self.cube['rollups']['campaign']
+        self.assertEqual(campaigns['Spend'].tolist(), [35.0, 20.0, 5.0])
+        self.assertEqual(campaigns['ROAS'].tolist(), [80 / 35, 2.0, 3.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
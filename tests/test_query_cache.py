@@ -0,0 +1,77 @@
+"""
+Query Cache Tests
+
+A reader that missed before a write must not cache its pre-write result after
+the write's invalidation: set() with the generation taken at miss time is
+dropped, in the memory tier and in the shared disk tier (including a second
+process that shares the file).
+"""
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.query_cache import QueryCache
+
+
+class TestGenerationRace(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_query_cache_')
+        self.disk_path = str(Path(self.tmpdir) / 'cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def caches(self):
+        return {
+            'memory': QueryCache(),
+            'disk': QueryCache(disk_path=self.disk_path),
+        }
+
+    def test_late_set_after_invalidation_is_dropped(self):
+        for tier, cache in self.caches().items():
+            with self.subTest(tier=tier):
+                # Reader misses and starts its query
+                generation = cache.generation('client_a')
+                self.assertIsNone(cache.get('stats', namespace='client_a'))
+                # Writer commits and invalidates before the reader stores
+                cache.invalidate('client_a')
+                cache.set('stats', 'pre-write', namespace='client_a', generation=generation)
+                self.assertIsNone(cache.get('stats', namespace='client_a'))
+                self.assertEqual(cache.stats()['stale_sets'], 1)
+
+                # The next reader caches normally
+                generation = cache.generation('client_a')
+                cache.set('stats', 'post-write', namespace='client_a', generation=generation)
+                self.assertEqual(cache.get('stats', namespace='client_a'), 'post-write')
+
+    def test_other_namespaces_and_clear(self):
+        cache = QueryCache()
+        generation = cache.generation('client_b')
+        cache.invalidate('client_a')
+        cache.set('stats', 'b', namespace='client_b', generation=generation)
+        self.assertEqual(cache.get('stats', namespace='client_b'), 'b')
+
+        generation = cache.generation('client_b')
+        cache.clear()
+        cache.set('stats', 'stale', namespace='client_b', generation=generation)
+        self.assertIsNone(cache.get('stats', namespace='client_b'))
+
+    def test_invalidation_from_another_process(self):
+        reader = QueryCache(disk_path=self.disk_path)
+        writer = QueryCache(disk_path=self.disk_path)
+        generation = reader.generation('client_a')
+        self.assertIsNone(reader.get('stats', namespace='client_a'))
+        writer.invalidate('client_a')
+        reader.set('stats', 'pre-write', namespace='client_a', generation=generation)
+        self.assertIsNone(reader.get('stats', namespace='client_a'))
+        self.assertIsNone(writer.get('stats', namespace='client_a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
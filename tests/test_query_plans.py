@@ -0,0 +1,127 @@
+"""
+Query Plan Regression Tests
+
+EXPLAIN the impact/dashboard queries and fail if a sequential scan on
+target_stats / actions_log reappears (i.e. the normalized LOWER(...) key
+expressions no longer match an index).
+
+SQLite always runs. Postgres runs when TEST_DATABASE_URL points at a
+disposable database.
+"""
+
+import os
+import re
+import sys
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class TestSQLiteImpactQueryPlans(unittest.TestCase):
+    """EXPLAIN QUERY PLAN checks for DatabaseManager impact queries."""
+
+    @classmethod
+    def setUpClass(cls):
+        from core.db_manager import DatabaseManager
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.db = DatabaseManager(Path(cls.tmpdir) / 'plans.db')
+
+        # Several clients/weeks so ANALYZE stats resemble a real account file
+        target_rows = [
+            (f'client_{c}', f'2024-11-{d:02d}', f'Campaign {i % 50}', f'Ad Group {i % 7}', f'Term {i}', 'exact', 1.0, 2.0, 3, 40)
+            for c in range(5) for d in (4, 11, 18, 25) for i in range(500)
+        ]
+        action_rows = [
+            (f'2024-11-{1 + i % 28:02d}T10:00:00', f'client_{i % 5}', 'b1', ['BID_CHANGE', 'NEGATIVE', 'hold'][i % 3],
+             f'Term {i}', f'Campaign {i % 50}', f'Ad Group {i % 7}')
+            for i in range(3000)
+        ]
+        with cls.db._get_connection() as conn:
+            conn.executemany("""
+                INSERT INTO target_stats (client_id, start_date, campaign_name, ad_group_name, target_text,
+                                          match_type, spend, sales, clicks, impressions)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, target_rows)
+            conn.executemany("""
+                INSERT INTO actions_log (action_date, client_id, batch_id, action_type, target_text, campaign_name, ad_group_name)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, action_rows)
+            conn.execute("ANALYZE")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db._pool.close_all()
+        cls.db._read_pool.close_all()
+        shutil.rmtree(cls.tmpdir, ignore_errors=True)
+
+    def _plan(self, query, params):
+        with self.db._get_connection() as conn:
+            return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()]
+
+    def assertNoTableScan(self, plan):
+        for step in plan:
+            # "SCAN t" = full table scan; "SCAN t USING [COVERING] INDEX" is an index walk
+            if re.match(r'SCAN (target_stats|actions_log|a)\b', step) and 'INDEX' not in step:
+                self.fail(f"Sequential scan in plan: {plan}")
+
+    def test_dates_query_uses_index(self):
+        from core.db_manager import IMPACT_DATES_QUERY
+        self.assertNoTableScan(self._plan(IMPACT_DATES_QUERY, ('client_1',)))
+
+    def test_actions_query_uses_index(self):
+        from core.db_manager import IMPACT_ACTIONS_QUERY
+        self.assertNoTableScan(self._plan(IMPACT_ACTIONS_QUERY, ('client_1',)))
+
+    def test_target_stats_query_uses_normalized_index(self):
+        from core.db_manager import IMPACT_TARGET_STATS_QUERY
+        plan = self._plan(IMPACT_TARGET_STATS_QUERY, ('client_1', '2024-11-18'))
+        self.assertNoTableScan(plan)
+        self.assertTrue(any('idx_target_stats_target_norm' in step for step in plan), plan)
+        self.assertFalse(any('TEMP B-TREE FOR GROUP BY' in step for step in plan), plan)
+
+    def test_campaign_stats_query_uses_normalized_index(self):
+        from core.db_manager import IMPACT_CAMPAIGN_STATS_QUERY
+        plan = self._plan(IMPACT_CAMPAIGN_STATS_QUERY, ('client_1', '2024-11-18'))
+        self.assertNoTableScan(plan)
+        self.assertTrue(any('idx_target_stats_campaign_norm' in step for step in plan), plan)
+        self.assertFalse(any('TEMP B-TREE FOR GROUP BY' in step for step in plan), plan)
+
+
+@unittest.skipUnless(os.getenv('TEST_DATABASE_URL'), "TEST_DATABASE_URL not set")
+class TestPostgresImpactQueryPlans(unittest.TestCase):
+    """EXPLAIN checks for PostgresManager impact queries (seq scans disabled)."""
+
+    @classmethod
+    def setUpClass(cls):
+        from core.postgres_manager import PostgresManager
+        cls.db = PostgresManager(os.getenv('TEST_DATABASE_URL'))
+
+    def _plan(self, query, params):
+        with self.db._get_connection() as conn:
+            with conn.cursor() as cursor:
+                # With seq scans priced out, a Seq Scan in the plan means no index can serve the query
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("EXPLAIN " + query, params)
+                return "\n".join(row[0] for row in cursor.fetchall())
+
+    def assertNoTableScan(self, plan):
+        for table in ('target_stats', 'actions_log', 'target_stats_weekly_agg'):
+            self.assertNotRegex(plan, rf'Seq Scan on {table}\b', plan)
+
+    def test_action_impact_query(self):
+        from core.postgres_manager import ACTION_IMPACT_QUERY
+        self.assertNoTableScan(self._plan(ACTION_IMPACT_QUERY, {
+            'client_id': 'plan_client', 'w_minus_1': 6, 'w': 7, 'w2': 13
+        }))
+
+    def test_aggregate_refresh_query(self):
+        from core.postgres_manager import IMPACT_AGG_REFRESH_QUERY
+        query = IMPACT_AGG_REFRESH_QUERY.format(scope="AND start_date = ANY(%s::date[])")
+        self.assertNoTableScan(self._plan(query, ['plan_client', ['2024-11-18']]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+"""
+RainforestClient Batch Lookup Tests
+
+Runs batch_lookup against a local stub of the Rainforest product endpoint:
+results keep input order, cache hits never reach the API (or the rate limiter),
+misses are fetched concurrently, and progress / cancellation callbacks work.
+"""
+
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.rainforest_client import RainforestClient, RateLimiter
+
+LATENCY = 0.2
+
+
+class StubRainforestHandler(BaseHTTPRequestHandler):
+    """Product endpoint stub: slow 200s, plus a not-found and an HTTP error ASIN."""
+
+    def do_GET(self):
+        server = self.server
+        asin = parse_qs(urlparse(self.path).query)['asin'][0]
+        with server.lock:
+            server.requests.append(asin)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(LATENCY)
+            if asin == 'B0ERROR000':
+                status, body = 500, {'error': 'upstream failure'}
+            elif asin == 'B0MISSING0':
+                status, body = 200, {'request_info': {'success': False}, 'error': 'Product not found'}
+            else:
+                status, body = 200, {'product': {'title': f'Product {asin}', 'brand': 'Acme', 'rating': 4.5}}
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRainforestBatchLookup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubRainforestHandler)
+        cls.server.lock = threading.Lock()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_address[1]}/request'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.tmpdir = tempfile.mkdtemp()
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _client(self, **kwargs) -> RainforestClient:
+        client = RainforestClient('test-key', cache_db=str(Path(self.tmpdir) / 'cache.db'), base_url=self.url, **kwargs)
+        self.clients.append(client)
+        return client
+
+    def test_priority_list_fetched_concurrently_in_order(self):
+        client = self._client()
+        asins = [f'B0{i:08d}' for i in range(30)]
+
+        start = time.perf_counter()
+        results = client.batch_lookup(asins)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([r['asin'] for r in results], asins)
+        self.assertTrue(all(r['status'] == 'success' and r['title'] == f"Product {r['asin']}" for r in results))
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(self.server.max_in_flight, client.max_workers)
+        # Serially this is 30 x LATENCY (6s); one burst window of 8 workers needs ~4 round trips
+        self.assertLess(elapsed, 30 * LATENCY / 2)
+
+    def test_cache_hits_skip_api_and_rate_limiter(self):
+        # One token every 10s: any cache hit that touched the limiter would stall the test
+        client = self._client(requests_per_second=0.1, burst=1)
+        cached = [f'B0CACHED{i:02d}' for i in range(10)]
+        for asin in cached:
+            client.cache.set(asin, 'AE', {'asin': asin, 'title': 'Cached', 'status': 'success'})
+
+        start = time.perf_counter()
+        results = client.batch_lookup(cached[:5] + ['b0fresh000'] + cached[5:] + ['B0FRESH000'])
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(self.server.requests, ['B0FRESH000'])
+        self.assertLess(elapsed, 2.0)
+        self.assertEqual([r['title'] for r in results[:5] + results[6:11]], ['Cached'] * 10)
+        self.assertEqual(results[5]['asin'], 'B0FRESH000')
+        self.assertEqual(results[11]['asin'], 'B0FRESH000')
+        # Duplicate positions get their own dicts (callers annotate results in place)
+        self.assertIsNot(results[5], results[11])
+
+        # The fresh result was cached, so a repeat batch makes no requests at all
+        client.batch_lookup(['B0FRESH000'])
+        self.assertEqual(self.server.requests, ['B0FRESH000'])
+
+    def test_errors_are_reported_per_asin(self):
+        client = self._client()
+        results = client.batch_lookup(['B0ERROR000', 'B0MISSING0', 'B000000001'])
+        self.assertEqual([r['status'] for r in results], ['error', 'not_found', 'success'])
+        self.assertEqual(results[0]['error'], 'HTTP 500')
+        # Only successful lookups are cached
+        self.assertEqual(set(client.cache.get_many(['B0ERROR000', 'B0MISSING0', 'B000000001'])), {'B000000001'})
+
+    def test_progress_callback(self):
+        client = self._client()
+        client.cache.set('B0CACHED00', 'AE', {'asin': 'B0CACHED00', 'status': 'success'})
+        calls = []
+        client.batch_lookup(['B0CACHED00', 'B000000001', 'B000000002'], progress_callback=lambda done, total: calls.append((done, total)))
+
+        self.assertEqual(calls[0], (1, 3))
+        self.assertEqual(calls[-1], (3, 3))
+        self.assertEqual([d for d, _ in calls], sorted(d for d, _ in calls))
+        # Progress is reported from the calling thread (safe for Streamlit widgets)
+        calling_thread = threading.current_thread()
+        client.batch_lookup(['B000000003'], progress_callback=lambda *_: self.assertIs(threading.current_thread(), calling_thread))
+
+    def test_cancel_stops_pending_lookups(self):
+        # One request per second after the first: without cancellation this takes ~5s
+        client = self._client(requests_per_second=1, burst=1, max_workers=2)
+        asins = [f'B0{i:08d}' for i in range(6)]
+        progress = []
+
+        start = time.perf_counter()
+        results = client.batch_lookup(asins, progress_callback=lambda done, total: progress.append(done),
+                                      should_cancel=lambda: bool(progress and progress[-1] >= 1))
+        elapsed = time.perf_counter() - start
+
+        statuses = [r['status'] for r in results]
+        self.assertEqual(statuses[0], 'success')
+        self.assertIn('cancelled', statuses)
+        self.assertEqual(len(self.server.requests), statuses.count('success'))
+        self.assertLess(elapsed, 3.0)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_token_bucket_burst_then_rate(self):
+        limiter = RateLimiter(requests_per_second=10, burst=5)
+        start = time.perf_counter()
+        for _ in range(5):
+            limiter.wait()
+        self.assertLess(time.perf_counter() - start, 0.05)
+        limiter.wait()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.08)
+
+    def test_wait_returns_false_when_cancelled(self):
+        limiter = RateLimiter(requests_per_second=0.1, burst=1)
+        limiter.wait()
+        cancel = threading.Event()
+        threading.Timer(0.1, cancel.set).start()
+        start = time.perf_counter()
+        self.assertFalse(limiter.wait(cancel))
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
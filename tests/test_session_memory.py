@@ -0,0 +1,101 @@
+"""
+Compact Session Storage Tests
+
+The DataHub keeps uploaded reports compact in session state (categorical
+labels, downcast integral counts). expand_frame must restore a frame equal to
+the original, counts that are not all whole numbers must be left alone, and
+the optimizer must give the same results from a compact frame as from the
+original.
+"""
+
+import contextlib
+import io
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.data_hub import DataHub
+from core.data_loader import classify_match_type, compact_frame, expand_frame
+from features.optimizer import DEFAULT_CONFIG, run_optimization
+
+
+def report(n_rows: int = 600, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    camp = rng.integers(0, 6, size=n_rows)
+    tgt = rng.integers(0, 40, size=n_rows)
+    match = rng.choice(['EXACT', 'BROAD', 'PHRASE', '-'], size=n_rows)
+    clicks = rng.poisson(3, size=n_rows).astype(float)
+    df = pd.DataFrame({
+        'Campaign Name': [f'Campaign {c} - SP - Manual' for c in camp],
+        'Ad Group Name': [f'Ad Group {c % 2}' for c in camp],
+        'Targeting': [f'keyword {t}' if m != '-' else ['close-match', 'loose-match', 'substitutes'][t % 3]
+                      for t, m in zip(tgt, match)],
+        'Customer Search Term': [f'search term {i % 200}' for i in range(n_rows)],
+        'Match Type': match,
+        'Impressions': rng.integers(0, 5000, size=n_rows).astype(float),
+        'Clicks': clicks,
+        'Spend': np.round(clicks * rng.gamma(2.0, 0.4, size=n_rows), 2),
+        'Sales': np.round(rng.gamma(1.0, 8.0, size=n_rows) * (rng.random(n_rows) < 0.3), 2),
+        'Orders': rng.poisson(0.3, size=n_rows).astype(float),
+        'Date': pd.Timestamp('2024-10-01') + pd.to_timedelta(rng.integers(0, 28, size=n_rows), unit='D'),
+    })
+    df['Match Type'] = classify_match_type(df)
+    return df
+
+
+class TestCompactFrame(unittest.TestCase):
+
+    def test_round_trip(self):
+        df = report()
+        compact = compact_frame(df)
+        self.assertEqual(compact['Campaign Name'].dtype, 'category')
+        self.assertEqual(compact['Targeting'].dtype, 'category')
+        self.assertEqual(compact['Impressions'].dtype, 'int16')
+        self.assertEqual(compact['Spend'].dtype, 'float64')
+        self.assertEqual(compact['Customer Search Term'].dtype, object)
+        self.assertLess(compact.memory_usage(deep=True).sum(), df.memory_usage(deep=True).sum())
+
+        pd.testing.assert_frame_equal(expand_frame(compact), df)
+        self.assertEqual(expand_frame(compact).attrs, {})
+
+    def test_fractional_or_missing_counts_stay_float(self):
+        df = report(20)
+        df.loc[0, 'Clicks'] = 1.5
+        df.loc[1, 'Orders'] = np.nan
+        compact = compact_frame(df)
+        self.assertEqual(compact['Clicks'].dtype, 'float64')
+        self.assertEqual(compact['Orders'].dtype, 'float64')
+        self.assertEqual(compact.attrs['compact_dtypes'].keys(),
+                         {'Campaign Name', 'Ad Group Name', 'Targeting', 'Impressions'})
+        pd.testing.assert_frame_equal(expand_frame(compact), df)
+
+    def test_hub_returns_working_frames(self):
+        st.session_state.clear()
+        hub = DataHub()
+        df = report()
+        hub._store('search_term_report', df)
+        working = hub.get_data('search_term_report')
+        pd.testing.assert_frame_equal(working, df)
+        working.loc[0, 'Spend'] = -1.0
+        self.assertNotEqual(hub.get_data('search_term_report').loc[0, 'Spend'], -1.0)
+
+    def test_optimizer_results_unchanged(self):
+        df = report()
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = run_optimization(df, DEFAULT_CONFIG)
+            actual = run_optimization(compact_frame(df), DEFAULT_CONFIG)
+        frames = [key for key, value in expected.items() if isinstance(value, pd.DataFrame) and not value.empty]
+        self.assertIn('direct_bids', frames)
+        for key in frames:
+            with self.subTest(key=key):
+                pd.testing.assert_frame_equal(actual[key], expected[key])
+
+
+if __name__ == '__main__':
+    unittest.main()
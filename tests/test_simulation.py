@@ -0,0 +1,114 @@
+"""
+Bid Simulation Tests
+
+run_simulation forecasts every scenario and sensitivity step in one matrix
+pass; each forecast must keep the per-row elasticity rules (holds and <0.5%
+changes skipped, harvest rows below 5 clicks skipped, AOV falling back to the
+account AOV) that the expected values below are worked out from by hand.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from features.optimizer import DEFAULT_CONFIG, run_simulation
+
+WEEKS = {"weeks": 2.0}
+EMPTY = pd.DataFrame()
+
+
+def account():
+    # Baseline: 100 clicks, 50 spend, 10 orders, 200 sales
+    return pd.DataFrame({"Clicks": [60, 40], "Spend": [30.0, 20.0], "Orders": [6, 4],
+                         "Sales": [120.0, 80.0], "Impressions": [6000, 4000]})
+
+
+def direct_bids():
+    return pd.DataFrame({
+        "Targeting": ["a", "b", "c", "d"], "Campaign Name": ["C1", "C1", "C2", "C2"],
+        "Clicks": [20, 8, 5, 0], "Spend": [10.0, 4.0, 2.5, 0.0], "Orders": [2, 1, 0, 0],
+        "Sales": [40.0, 20.0, 0.0, 0.0],
+        "Cost Per Click (CPC)": [0.5, 0.5, 0.5, 0.0], "New Bid": [0.6, 0.8, 0.501, 1.0],
+        "Reason": ["Scale up", "Hold: low data", "Scale up", "Scale up"],
+    })
+
+
+def agg_bids():
+    return pd.DataFrame({"Targeting": ["e"], "Campaign Name": ["C3"], "Clicks": [10], "Spend": [5.0],
+                         "Orders": [0], "Sales": [0.0], "CPC": [0.5], "New Bid": [0.25],
+                         "Reason": ["Reduce: low ROAS"]})
+
+
+def harvest():
+    return pd.DataFrame({"Clicks": [10, 4, 10], "Spend": [5.0, 2.0, 4.0], "Orders": [2, 1, 1],
+                         "Sales": [40.0, 20.0, 10.0], "CPC": [0.5, 0.5, 0.4], "New Bid": [1.0, 1.0, 0.0]})
+
+
+class TestRunSimulation(unittest.TestCase):
+
+    def assertMetrics(self, metrics, expected):
+        for key, value in expected.items():
+            self.assertAlmostEqual(metrics[key], value, places=9, msg=key)
+
+    def test_expected_scenario(self):
+        result = run_simulation(account(), direct_bids(), agg_bids(), harvest(), DEFAULT_CONFIG, WEEKS)
+
+        # Only bid "a" moves (+20%): clicks 20 -> 23.4, CPC 0.5 -> 0.55, CVR 0.1 -> 0.102.
+        # "e" has no "Cost Per Click (CPC)" once mixed with direct bids, so it reads as 0% and is skipped.
+        # Harvest rows 1 and 3 keep clicks, pay 0.95 x bid (row 3 launches at 2 x CPC), CVR x 1.30.
+        self.assertMetrics(result["scenarios"]["expected"], {
+            "clicks": (100 + 3.4) / 2,
+            "spend": (50 + 2.87 + 4.5 + 3.6) / 2,
+            "sales": (200 + 7.736 + 12.0 + 3.0) / 2,
+            "orders": (10 + 0.3868 + 0.6 + 0.3) / 2,
+            "impressions": 5000.0,
+            "ctr": 1.0,
+        })
+        self.assertEqual(result["scenarios"]["current"], {
+            "clicks": 50.0, "spend": 25.0, "sales": 100.0, "orders": 5.0, "impressions": 5000.0,
+            "cpc": 0.5, "cvr": 0.1, "roas": 4.0, "acos": 25.0, "ctr": 1.0,
+        })
+        self.assertEqual(result["diagnostics"], {
+            "total_recommendations": 5, "actual_changes": 4, "hold_count": 1, "harvest_count": 3,
+        })
+        self.assertEqual(result["risk_analysis"]["summary"],
+                         {"high_risk_count": 0, "medium_risk_count": 2, "low_risk_count": 2})
+
+        # The +0% sensitivity step is the expected scenario
+        sensitivity = result["sensitivity"]
+        self.assertEqual(sensitivity["Bid_Adjustment"].tolist(), ["-30%", "-20%", "-10%", "+0%", "+10%", "+20%", "+30%"])
+        step = sensitivity.set_index("Bid_Adjustment").loc["+0%"]
+        expected = result["scenarios"]["expected"]
+        for col, key in (("Spend", "spend"), ("Sales", "sales"), ("Orders", "orders"), ("ROAS", "roas"), ("ACoS", "acos")):
+            self.assertAlmostEqual(step[col], expected[key], places=12)
+        self.assertTrue(sensitivity["Spend"].is_monotonic_increasing)
+
+    def test_bid_decrease_with_account_aov(self):
+        result = run_simulation(account(), EMPTY, agg_bids(), EMPTY, DEFAULT_CONFIG, WEEKS)
+
+        # -50%: clicks 10 -> 5.75, CPC 0.5 -> 0.375; no orders, so no sales change
+        self.assertMetrics(result["scenarios"]["expected"], {
+            "clicks": (100 - 4.25) / 2, "spend": (50 - 2.84375) / 2, "sales": 100.0, "orders": 5.0,
+        })
+        # -30% step scales the change to -35%: clicks 7.025, CPC 0.4125
+        self.assertAlmostEqual(result["sensitivity"]["Spend"].iloc[0], (50 - 5 + 7.025 * 0.4125) / 2, places=9)
+        self.assertEqual(result["risk_analysis"], {
+            "summary": {"high_risk_count": 1, "medium_risk_count": 0, "low_risk_count": 0},
+            "high_risk": [{"keyword": "e", "campaign": "C3", "bid_change": "-50%",
+                           "current_bid": 0.5, "factors": "Large change (-50%)"}],
+        })
+
+    def test_no_recommendations(self):
+        result = run_simulation(account(), EMPTY, EMPTY, EMPTY, DEFAULT_CONFIG, WEEKS)
+        for name in ("conservative", "expected", "aggressive"):
+            self.assertEqual(result["scenarios"][name], result["scenarios"]["current"])
+        self.assertEqual(result["risk_analysis"]["summary"],
+                         {"high_risk_count": 0, "medium_risk_count": 0, "low_risk_count": 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
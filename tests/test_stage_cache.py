@@ -0,0 +1,108 @@
+"""
+Optimizer Stage Cache Tests
+
+prepare_data and calculate_account_benchmarks take the DataHub fingerprint of
+their input and cache results by (fingerprint, config) instead of hashing the
+frame on every rerun. Cached results must equal the uncached stages, callers
+must get their own copies, and a config change must not reuse old results.
+"""
+
+import contextlib
+import io
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.data_hub import DataHub
+from features.optimizer import (
+    DEFAULT_CONFIG,
+    _calculate_account_benchmarks,
+    _prepare_data,
+    calculate_account_benchmarks,
+    prepare_data,
+)
+
+
+def report(n_rows: int = 200, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    clicks = rng.poisson(3, size=n_rows).astype(float)
+    return pd.DataFrame({
+        'Campaign Name': [f'Campaign {c}' for c in rng.integers(0, 4, size=n_rows)],
+        'Ad Group Name': [f'Ad Group {a}' for a in rng.integers(0, 3, size=n_rows)],
+        'Targeting': [f'keyword {t}' for t in rng.integers(0, 30, size=n_rows)],
+        'Customer Search Term': [f'search term {i % 70}' for i in range(n_rows)],
+        'Match Type': rng.choice(['EXACT', 'BROAD', 'PHRASE'], size=n_rows),
+        'Impressions': rng.integers(0, 500, size=n_rows).astype(float),
+        'Clicks': clicks,
+        'Spend': np.round(clicks * 0.8, 2),
+        'Sales': np.round(rng.gamma(1.0, 8.0, size=n_rows) * (rng.random(n_rows) < 0.3), 2),
+        'Orders': rng.poisson(0.3, size=n_rows).astype(float),
+        'Date': pd.Timestamp('2024-10-01') + pd.to_timedelta(rng.integers(0, 28, size=n_rows), unit='D'),
+    })
+
+
+def rerun(prepare, benchmarks, df, config, **kwargs):
+    """Both stages, as the optimizer render path calls them."""
+    prepared, date_info = prepare(df, config, **kwargs)
+    return prepared, date_info, benchmarks(prepared, config, **kwargs)
+
+
+class TestStageCache(unittest.TestCase):
+
+    def setUp(self):
+        st.session_state.clear()
+        self.hub = DataHub()
+        self.hub._store('search_term_report', report())
+        self.df = self.hub.get_shared_frame('search_term_report')
+        self.fp = self.hub.get_fingerprint('search_term_report')
+
+    def run_stages(self, config, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return rerun(prepare_data, calculate_account_benchmarks, self.df, config, **kwargs)
+
+    def uncached(self, config):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return rerun(_prepare_data, _calculate_account_benchmarks, self.df, config)
+
+    def assert_same(self, got, expected):
+        pd.testing.assert_frame_equal(got[0], expected[0])
+        self.assertEqual(got[1], expected[1])
+        self.assertEqual(got[2], expected[2])
+
+    def test_cached_matches_uncached(self):
+        config = dict(DEFAULT_CONFIG)
+        expected = self.uncached(config)
+        before = DataHub.stage_cache_stats()
+        first = self.run_stages(config, fingerprint=self.fp)
+        second = self.run_stages(config, fingerprint=self.fp)
+        after = DataHub.stage_cache_stats()
+        self.assertEqual(after['misses'] - before['misses'], 2)
+        self.assertEqual(after['hits'] - before['hits'], 2)
+        self.assert_same(first, expected)
+        self.assert_same(second, expected)
+
+        # Cached frames are handed out as copies
+        second[0]['Spend'] = 0.0
+        pd.testing.assert_frame_equal(prepare_data(self.df, config, fingerprint=self.fp)[0], expected[0])
+
+        # No fingerprint: the stages just run
+        self.assert_same(self.run_stages(config), expected)
+        self.assertEqual(DataHub.stage_cache_stats()['hits'] - after['hits'], 1)
+
+    def test_config_change_recomputes(self):
+        config = dict(DEFAULT_CONFIG)
+        self.run_stages(config, fingerprint=self.fp)
+        misses = DataHub.stage_cache_stats()['misses']
+        changed = {**config, 'TARGET_ROAS': 3.5}
+        self.assert_same(self.run_stages(changed, fingerprint=self.fp), self.uncached(changed))
+        self.assertEqual(DataHub.stage_cache_stats()['misses'] - misses, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
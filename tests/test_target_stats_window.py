@@ -0,0 +1,98 @@
+"""
+Windowed target_stats Read Tests
+
+get_target_stats_window frames each fetchmany() chunk separately; the
+concatenated result must equal one from_records over all rows, including
+chunks where a column is entirely NULL, and the window must return the rows
+(and order) of the full account read filtered to its dates.
+"""
+
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.db_manager import DatabaseManager, fetch_frame
+
+COLUMNS = ['start_date', 'campaign_name', 'spend', 'orders']
+ROWS = [
+    ('2025-01-13', None, None, None),
+    ('2025-01-13', None, None, None),
+    ('2025-01-06', 'B', 2.5, 1),
+    ('2025-01-06', 'A', 4.0, 0),
+    ('2025-01-06', None, 1.0, None),
+]
+
+
+class TestFetchFrame(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute("CREATE TABLE t (start_date TEXT, campaign_name TEXT, spend REAL, orders INTEGER)")
+        self.conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?)", ROWS)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def fetch(self, chunk_size):
+        cursor = self.conn.execute("SELECT * FROM t ORDER BY start_date DESC")
+        return fetch_frame(cursor, COLUMNS, chunk_size)
+
+    def test_chunked_matches_single_read(self):
+        expected = pd.DataFrame.from_records(ROWS, columns=COLUMNS, coerce_float=True)
+        for chunk_size in (1, 2, 3, 100):
+            with self.subTest(chunk_size=chunk_size):
+                got = self.fetch(chunk_size)
+                pd.testing.assert_frame_equal(got, expected)
+                self.assertEqual(got['spend'].dtype, 'float64')
+
+    def test_empty_result(self):
+        self.conn.execute("DELETE FROM t")
+        got = self.fetch(2)
+        self.assertTrue(got.empty)
+        self.assertEqual(list(got.columns), COLUMNS)
+
+
+class TestTargetStatsWindow(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_target_stats_window_')
+        self.db = DatabaseManager(Path(self.tmpdir) / 'window.db')
+        with self.db._get_connection() as conn:
+            conn.executemany("""
+                INSERT INTO target_stats (client_id, start_date, campaign_name, ad_group_name, target_text,
+                                          match_type, spend, sales, orders, clicks, impressions)
+                VALUES ('acct', ?, ?, 'AG', ?, 'exact', ?, ?, ?, ?, ?)
+            """, [
+                (f'2025-01-{day:02d}', f'C{i}', f't{i}',
+                 float(i), 2.0 * i, i % 2 if day != 20 else None, i, 10 * i)
+                for day in (6, 13, 20) for i in range(7)
+            ])
+
+    def tearDown(self):
+        self.db._pool.close_all()
+        self.db._read_pool.close_all()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_chunk_size_does_not_change_result(self):
+        whole = self.db.get_target_stats_window('acct', '2025-01-13', '2025-01-20', columns=COLUMNS)
+        chunked = self.db.get_target_stats_window('acct', '2025-01-13', '2025-01-20', columns=COLUMNS, chunk_size=4)
+        self.assertEqual(len(whole), 14)
+        pd.testing.assert_frame_equal(chunked, whole)
+
+    def test_matches_filtered_account_read(self):
+        columns = ['start_date', 'campaign_name', 'target_text', 'spend', 'sales', 'orders', 'clicks']
+        windowed = self.db.get_target_stats_window('acct', '2025-01-13', '2025-01-20', columns=columns)
+        full = self.db.get_target_stats_by_account('acct', limit=10**9)
+        full = full[full['start_date'].isin(['2025-01-13', '2025-01-20'])]
+        pd.testing.assert_frame_equal(windowed, full[columns].reset_index(drop=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
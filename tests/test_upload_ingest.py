@@ -0,0 +1,107 @@
+"""
+Report Upload Ingest Tests
+
+load_uploaded_file(mapped_only=True) parses only the mapped and pass-through
+columns (header read first), label columns as strings, and returns the same
+frame from the content-hash Parquet cache on a repeat upload.
+"""
+
+import io
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.data_loader as data_loader
+from core.data_loader import load_uploaded_file, mapped_columns
+
+
+class Upload(io.BytesIO):
+    """Minimal stand-in for Streamlit's UploadedFile."""
+
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+
+def report():
+    return pd.DataFrame({
+        ' Campaign Name ': ['Brand', 'Brand', 'Auto'],
+        'Customer Search Term': [12345, 678, 90],  # numeric-looking terms stay text
+        'Match Type': ['EXACT', 'BROAD', None],
+        'Impressions': [100, 50, 10],
+        'Clicks': [3, 1, 0],
+        'Spend': [1.5, 0.25, 0.0],
+        '7 Day Total Sales ': [10.0, 0.0, np.nan],
+        'Portfolio name': ['P1', None, 'P2'],
+        'Unmapped Notes': ['a', 'b', 'c'],
+        'Another Extra': [1, 2, 3],
+    })
+
+
+def xlsx_bytes(df):
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False, engine='openpyxl')
+    return buffer.getvalue()
+
+
+class TestMappedUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='test_upload_ingest_')
+        patcher = patch.object(data_loader, 'UPLOAD_CACHE_DIR', self.tmpdir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_mapped_columns(self):
+        keep = mapped_columns([c.strip() for c in report().columns])
+        self.assertEqual(keep['Customer Search Term'], 'Customer Search Term')
+        self.assertIn('7 Day Total Sales', keep)
+        self.assertEqual(keep['Portfolio name'], 'Portfolio name')
+        self.assertNotIn('Unmapped Notes', keep)
+
+    def test_only_mapped_columns_parsed_with_text_dtypes(self):
+        for name, data in (('report.xlsx', xlsx_bytes(report())),
+                           ('report.csv', report().to_csv(index=False).encode())):
+            with self.subTest(name=name):
+                df = load_uploaded_file(Upload(data, name), mapped_only=True)
+                self.assertEqual(list(df.columns), [
+                    'Campaign Name', 'Customer Search Term', 'Match Type', 'Impressions',
+                    'Clicks', 'Spend', '7 Day Total Sales', 'Portfolio name',
+                ])
+                self.assertEqual(df['Customer Search Term'].tolist(), ['12345', '678', '90'])
+                self.assertTrue(pd.isna(df['Match Type'].iloc[2]))
+                self.assertTrue(pd.isna(df['Portfolio name'].iloc[1]))
+                self.assertEqual(df['Clicks'].dtype, np.int64)
+                self.assertEqual(df['Spend'].tolist(), [1.5, 0.25, 0.0])
+
+                # Repeat upload: same frame from the Parquet cache
+                cached = load_uploaded_file(Upload(data, name), mapped_only=True)
+                pd.testing.assert_frame_equal(cached, df)
+
+    def test_matches_openpyxl_read(self):
+        data = xlsx_bytes(report())
+        df = load_uploaded_file(Upload(data, 'report.xlsx'), mapped_only=True)
+        legacy = pd.read_excel(io.BytesIO(data), engine='openpyxl')
+        legacy.columns = legacy.columns.str.strip()
+        legacy['Customer Search Term'] = legacy['Customer Search Term'].astype(str)
+        pd.testing.assert_frame_equal(df, legacy[df.columns])
+
+    def test_full_load_keeps_every_column(self):
+        df = load_uploaded_file(Upload(xlsx_bytes(report()), 'report.xlsx'))
+        self.assertEqual(len(df.columns), len(report().columns))
+        self.assertEqual(df['Customer Search Term'].tolist(), [12345, 678, 90])
+
+
+if __name__ == '__main__':
+    unittest.main()
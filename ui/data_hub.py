@@ -212,6 +212,9 @@ def render_data_hub():
             </div>
             """, unsafe_allow_html=True)
             
+            mem = hub.get_memory_usage()
+            st.caption(f"Session memory: {mem['total_mb']:.1f} MB ({mem['hub_mb']:.1f} MB datasets, {mem['other_session_mb']:.1f} MB results)")
+            
             # 3 CTAs - All primary style with SVG icons
             c1, c2, c3 = st.columns(3)
             with c1:
@@ -1,54 +1,180 @@
-
+import numpy as np
 import pandas as pd
 import re
 import difflib
-from collections import defaultdict
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# Keyword indexes are cached by content fingerprint so repeated optimizer runs
+# over the same account data skip normalization and index construction.
+_INDEX_CACHE: "OrderedDict[str, _KeywordIndex]" = OrderedDict()
+_INDEX_CACHE_MAX = 8
+_INDEX_CACHE_LOCK = threading.Lock()
+
+
+def _normalize(s: str) -> str:
+    if not isinstance(s, str): return ""
+    return re.sub(r'[^a-zA-Z0-9\s]', '', s.lower())
+
+
+# Character alphabet for count bounds (normalized text is [a-z0-9] plus whitespace)
+_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+_CHAR_SLOT = {c: i for i, c in enumerate(_ALPHABET)}
+_OTHER_SLOT = len(_ALPHABET)
+
+
+def _char_counts(s: str) -> np.ndarray:
+    """Character histogram; all whitespace shares one slot (still an upper bound)."""
+    counts = np.zeros(len(_ALPHABET) + 1, dtype=np.int32)
+    for c in s:
+        counts[_CHAR_SLOT.get(c, _OTHER_SLOT)] += 1
+    return counts
+
+
+class _KeywordIndex:
+    """
+    Normalized exact-keyword index.
+
+    Keywords get integer ids in sorted order. Token postings hold ids sorted by
+    keyword length so a lookup only takes the slice of each posting list whose
+    lengths can still reach the similarity threshold; a per-keyword character
+    histogram matrix gives a vectorized quick_ratio() bound for the survivors.
+    """
+
+    def __init__(self, keywords: set):
+        self.keywords = keywords
+        self.words = np.array(sorted(keywords), dtype=object)
+        self.lengths = np.array([len(k) for k in self.words], dtype=np.int64)
+        self.char_matrix = (
+            np.vstack([_char_counts(k) for k in self.words])
+            if len(self.words) else np.zeros((0, len(_ALPHABET) + 1), dtype=np.int32)
+        )
+
+        postings = defaultdict(list)
+        for kw_id, kw in enumerate(self.words):
+            for t in set(kw.split()):
+                postings[t].append(kw_id)
+
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for t, ids in postings.items():
+            ids = np.array(ids, dtype=np.int64)
+            ids = ids[np.argsort(self.lengths[ids], kind="stable")]
+            self.postings[t] = (ids, self.lengths[ids])
+
+    def candidates(self, tokens: set, min_len: float, max_len: float) -> np.ndarray:
+        """Ids of keywords sharing at least one token with length in [min_len, max_len]."""
+        slices = []
+        for t in tokens:
+            entry = self.postings.get(t)
+            if entry is None:
+                continue
+            ids, lengths = entry
+            lo = np.searchsorted(lengths, min_len, side="left")
+            hi = np.searchsorted(lengths, max_len, side="right")
+            if hi > lo:
+                slices.append(ids[lo:hi])
+        if not slices:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(slices))
+
+
+def _get_keyword_index(terms: pd.Series) -> _KeywordIndex:
+    """Build (or reuse) the keyword index for a raw exact-keyword column."""
+    fingerprint = hashlib.sha1(
+        pd.util.hash_pandas_object(terms, index=False).values.tobytes()
+    ).hexdigest()
+
+    with _INDEX_CACHE_LOCK:
+        index = _INDEX_CACHE.get(fingerprint)
+        if index is not None:
+            _INDEX_CACHE.move_to_end(fingerprint)
+            return index
+
+    index = _KeywordIndex(set(terms.apply(_normalize).unique()))
+
+    with _INDEX_CACHE_LOCK:
+        _INDEX_CACHE[fingerprint] = index
+        while len(_INDEX_CACHE) > _INDEX_CACHE_MAX:
+            _INDEX_CACHE.popitem(last=False)
+    return index
+
 
 class ExactMatcher:
     """Fuzzy matcher for detecting existing exact match keywords."""
-    
+
     def __init__(self, df: pd.DataFrame):
         match_col = "Match Type" if "Match Type" in df.columns else "Match"
         if match_col not in df.columns:
-            self.exact_keywords = set()
-            return
-        match_types = df[match_col].astype(str).fillna("")
-        exact_rows = df[match_types.str.contains("exact", case=False, na=False)]
-        term_col = "Customer Search Term" if "Customer Search Term" in df.columns else "Term"
-        self.exact_keywords = set(exact_rows[term_col].astype(str).apply(self.normalize_text).unique())
-        self.token_index = defaultdict(set)
-        for kw in self.exact_keywords:
-            tokens = self.get_tokens(kw)
-            for t in tokens:
-                self.token_index[t].add(kw)
+            self._index = _KeywordIndex(set())
+        else:
+            match_types = df[match_col].astype(str).fillna("")
+            exact_rows = df[match_types.str.contains("exact", case=False, na=False)]
+            term_col = "Customer Search Term" if "Customer Search Term" in df.columns else "Term"
+            self._index = _get_keyword_index(exact_rows[term_col].astype(str))
+        self.exact_keywords = self._index.keywords
 
     def normalize_text(self, s: str) -> str:
-        if not isinstance(s, str): return ""
-        return re.sub(r'[^a-zA-Z0-9\s]', '', s.lower())
+        return _normalize(s)
 
     def get_tokens(self, s: str) -> set:
         return set(self.normalize_text(s).split())
 
     def find_match(self, term: str, threshold: float = 0.90) -> tuple[str | None, float]:
-        norm_term = self.normalize_text(str(term))
+        return self.find_matches([term], threshold)[0]
+
+    def find_matches(self, terms, threshold: float = 0.90) -> List[Tuple[Optional[str], float]]:
+        """
+        Batch version of find_match: one (match, score) tuple per input term.
+
+        Candidates must share a token with the term (as before), but are pruned
+        by length and character-count upper bounds on SequenceMatcher.ratio()
+        before any exact scoring, then scored best-bound-first so the search
+        stops as soon as no remaining candidate can beat the best score.
+        """
+        results = []
+        memo = {}
+        for term in terms:
+            norm_term = self.normalize_text(str(term))
+            if norm_term not in memo:
+                memo[norm_term] = self._best_match(norm_term, threshold)
+            results.append(memo[norm_term])
+        return results
+
+    def _best_match(self, norm_term: str, threshold: float) -> Tuple[Optional[str], float]:
         if not norm_term: return None, 0.0
         if norm_term in self.exact_keywords: return norm_term, 1.0
-        
-        term_tokens = self.get_tokens(norm_term)
-        candidates = set()
-        for t in term_tokens:
-            if t in self.token_index:
-                candidates.update(self.token_index[t])
-        
-        if not candidates: return None, 0.0
-        
+
+        # ratio() <= 2*min(la, lb) / (la + lb), so lengths outside this band can never pass
+        la = len(norm_term)
+        if threshold > 0:
+            min_len = la * threshold / (2 - threshold) - 1e-9
+            max_len = la * (2 - threshold) / threshold + 1e-9
+        else:
+            min_len, max_len = 0, float("inf")
+
+        ids = self._index.candidates(self.get_tokens(norm_term), min_len, max_len)
+        if not len(ids): return None, 0.0
+
+        # Character multiset overlap (SequenceMatcher.quick_ratio) is a tighter upper bound
+        overlap = np.minimum(self._index.char_matrix[ids], _char_counts(norm_term)).sum(axis=1)
+        bounds = 2.0 * overlap / (la + self._index.lengths[ids])
+        keep = bounds >= threshold
+        ids, bounds = ids[keep], bounds[keep]
+        # Best bound first; ids are in keyword sort order, so ties stay deterministic
+        order = np.argsort(-bounds, kind="stable")
+        bounded = zip(bounds[order], self._index.words[ids[order]])
+
         best_match = None
         best_score = 0.0
-        for cand in candidates:
+        for bound, cand in bounded:
+            if best_match is not None and bound <= best_score:
+                break
             score = difflib.SequenceMatcher(None, norm_term, cand).ratio()
             if score > best_score:
                 best_score = score
                 best_match = cand
-        
-        if best_score >= threshold: return best_match, best_score
+
+        if best_match is not None and best_score >= threshold: return best_match, best_score
         return None, 0.0